@@ -1,107 +1,158 @@
 # domain/backend/api/endpoints/optimization.py
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import insert, select
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from core.config import settings
 from database.session import get_db
 from models.optimization import OptimizationRun
+from services.optimization_jobs import optimization_jobs, run_fingerprint
+from services.data_transformer import DataTransformer
 from services.core_optimization_adapter import CoreOptimizationAdapter
-from services.optimization_metrics import compute_run_metrics
-from datetime import datetime, timezone
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 
 router = APIRouter(prefix="/optimization", tags=["Optimization"])
 logger = logging.getLogger(__name__)
 
 
-@router.post("/run")
+@router.post("/run", status_code=202)
 async def run_optimization(
     deadline_minutes: int = Query(480, ge=60, le=1440),
     max_distance_km: float = Query(100.0, ge=10.0, le=500.0),
+    routing_backend: Optional[str] = Query(None, pattern="^(ors|offline)$"),
+    solver: Optional[str] = Query(None, pattern="^(provider|native)$"),
+    incremental: bool = Query(False),
+    seed_run_id: Optional[UUID] = Query(None),
+    time_budget_seconds: Optional[float] = Query(None, gt=0, le=3600),
+    lns_time_budget_seconds: Optional[float] = Query(None, gt=0, le=3600),
+    multi_trip: bool = Query(False),
+    unload_minutes: Optional[float] = Query(None, ge=0, le=240),
+    force: bool = Query(False),
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Run optimization → store machine-generated result
+    Queue an optimization run → poll GET /optimization/runs/{run_id}
+    
+    Submitting the same inputs (vendors, hubs, fleet) and parameters again
+    while an identical run is queued, running or completed within
+    OPTIMIZATION_DEDUP_WINDOW_MINUTES returns that run ("deduplicated": true)
+    instead of computing it again; force=true always queues a new run.
+    Queued/running runs abandoned by a stopped worker are marked failed, not reused.
+    
+    routing_backend: "ors" (OpenRouteService) or "offline" (network-free estimator);
+    defaults to the ROUTING_BACKEND setting.
+    solver: "provider" (fleet packing + per-vehicle routing calls) or "native"
+    (in-process savings + local search); defaults to the ROUTE_SOLVER setting.
+    incremental: re-solve only the clusters whose vendors, hub or vehicle specs
+    changed since the latest completed run; the rest are copied from it.
+    seed_run_id: completed run (machine or manual) whose routes warm-start the
+    native solver; repaired for added/removed vendors and vehicles.
+    time_budget_seconds: wall-clock budget for the native solver; a feasible
+    plan is built first, then improved until the budget expires (the result
+    carries the improvement-over-time trace).
+    lns_time_budget_seconds: budget for a large-neighbourhood-search pass after
+    routing that moves farmers between vehicles and picks up other hubs'
+    unassigned farmers (works with either solver; reports the cost delta).
+    multi_trip: vehicles may run several routes a day, unloading at the hub for
+    unload_minutes (default: HUB_UNLOAD_MINUTES setting) between them, which
+    frees vehicles and picks up farmers a short fleet would leave unassigned.
     """
     try:
-        # Run the optimization engine
-        results = await CoreOptimizationAdapter.run_optimization(
-            db=db,
-            deadline_minutes=deadline_minutes,
-            max_distance_km=max_distance_km
-        )
+        if seed_run_id is not None:
+            seed = await db.execute(
+                select(OptimizationRun.id).where(
+                    OptimizationRun.id == seed_run_id,
+                    OptimizationRun.status == "completed",
+                )
+            )
+            if seed.scalar_one_or_none() is None:
+                raise HTTPException(status_code=404, detail="Seed run not found or not completed")
+
+        params = {
+            "deadline_minutes": deadline_minutes,
+            "max_distance_km": max_distance_km,
+            "routing_backend": routing_backend or settings.ROUTING_BACKEND,
+            "solver": solver or settings.ROUTE_SOLVER,
+            "incremental": incremental,
+            "seed_run_id": str(seed_run_id) if seed_run_id else None,
+            "time_budget_seconds": time_budget_seconds,
+            "lns_time_budget_seconds": lns_time_budget_seconds,
+            "multi_trip": multi_trip,
+            "unload_minutes": unload_minutes,
+        }
+        try:
+            engine_input = await DataTransformer.transform_db_to_engine_input(db)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        fingerprint = run_fingerprint(engine_input, params)
+
+        if settings.OPTIMIZATION_DEDUP_ENABLED and not force:
+            run_id, status, deduplicated = await optimization_jobs.submit_once(
+                db, params, fingerprint, engine_input=engine_input
+            )
+        else:
+            run_id = await optimization_jobs.submit(db, params, fingerprint=fingerprint, engine_input=engine_input)
+            status, deduplicated = "queued", False
 
-        if results is None:
-            raise HTTPException(status_code=500, detail="Optimization engine returned no result")
+        return {
+            "status": "success",
+            "data": {
+                "run_id": str(run_id),
+                "status": status,
+                "deduplicated": deduplicated,
+                "fingerprint": fingerprint,
+                "poll_url": f"{settings.API_V1_PREFIX}/optimization/runs/{run_id}",
+            },
+        }
 
-        # If engine reports error
-        if isinstance(results, dict) and results.get("status") == "ERROR":
-            raise HTTPException(status_code=400, detail=results.get("message") or "Optimization error")
+    except HTTPException:
+        raise
+    except Exception as e:
+        await db.rollback()
+        logger.exception("❌ Failed to queue optimization run")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Some adapters wrap engine output; normalize
-        optimization_results = (
-            results.get("optimization_results") if isinstance(results, dict) and results.get("optimization_results")
-            else (results if isinstance(results, dict) else {})
-        )
 
-        # Compute metrics safely
-        try:
-            metrics = compute_run_metrics(optimization_results) if callable(compute_run_metrics) else {}
-        except Exception:
-            metrics = {}
-
-        total_clusters = len(optimization_results.get("clusters", [])) if isinstance(optimization_results, dict) else 0
-        total_cost = optimization_results.get("total_cost", 0.0) if isinstance(optimization_results, dict) else 0.0
-        total_violations = optimization_results.get("total_violations", 0) if isinstance(optimization_results, dict) else 0
-        total_distance = 0.0
-
-        if isinstance(optimization_results, dict):
-            for cluster in optimization_results.get("clusters", []):
-                for vehicle in cluster.get("vehicles", []):
-                    total_distance += float(vehicle.get("distance", 0.0) or 0.0)
-
-        results_summary = {
-            "total_cost": round(float(total_cost or 0), 2),
-            "total_clusters": total_clusters,
-            "total_violations": int(total_violations or 0),
-            "total_distance": round(float(total_distance or 0), 2),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
-        }
+@router.post("/sweep", summary="Solve a grid of deadline / distance scenarios")
+async def sweep_scenarios(
+    deadline_minutes: List[int] = Query([480]),
+    max_distance_km: List[float] = Query([100.0]),
+    routing_backend: Optional[str] = Query(None, pattern="^(ors|offline)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Every combination of the given deadline_minutes × max_distance_km values,
+    solved with the native solver on one load of the inputs and routing matrix
+    (e.g. ?deadline_minutes=360&deadline_minutes=480&max_distance_km=80).
+    Returns cost, distance, violations and vehicles used per scenario.
+    """
+    try:
+        if any(not 60 <= d <= 1440 for d in deadline_minutes):
+            raise HTTPException(status_code=422, detail="deadline_minutes must be between 60 and 1440")
+        if any(not 10.0 <= m <= 500.0 for m in max_distance_km):
+            raise HTTPException(status_code=422, detail="max_distance_km must be between 10 and 500")
+
+        scenarios = [(d, m) for d in dict.fromkeys(deadline_minutes) for m in dict.fromkeys(max_distance_km)]
+        if len(scenarios) > settings.SWEEP_MAX_SCENARIOS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"{len(scenarios)} scenarios requested; the limit is {settings.SWEEP_MAX_SCENARIOS}"
+            )
 
-        # Persist run in DB
-        stmt = insert(OptimizationRun).values(
-            trigger_type="machine_generated_optimization",
-            trigger_details={
-                "source": "Core Optimization Engine",
-                "params": {
-                    "deadline_minutes": deadline_minutes,
-                    "max_distance_km": max_distance_km,
-                },
-            },
-            status="completed",
-            results_summary=results_summary,
-            input_config={
-                "deadline_minutes": deadline_minutes,
-                "max_distance_km": max_distance_km,
-            },
-            result=results,
-            started_at=datetime.now(timezone.utc),
-            completed_at=datetime.now(timezone.utc),
+        sweep = await CoreOptimizationAdapter.run_sweep(
+            db, scenarios,
+            routing_backend=routing_backend or settings.ROUTING_BACKEND,
+            max_workers=settings.SWEEP_MAX_WORKERS
         )
-
-        await db.execute(stmt)
-        await db.commit()
-
-        logger.info("✅ Optimization completed and saved successfully.")
-        return {"status": "success", "data": results}
+        return {"status": "success", "data": sweep}
 
     except HTTPException:
-        await db.rollback()
         raise
     except Exception as e:
         await db.rollback()
-        logger.exception("❌ Optimization run failed")
+        logger.exception("❌ Scenario sweep failed")
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -122,7 +173,12 @@ async def get_latest_optimization(db: AsyncSession = Depends(get_db)):
     Returns normalized hub + vehicle data for frontend.
     """
     try:
-        stmt = select(OptimizationRun).order_by(OptimizationRun.created_at.desc()).limit(1)
+        stmt = (
+            select(OptimizationRun)
+            .where(OptimizationRun.status == "completed")
+            .order_by(OptimizationRun.created_at.desc())
+            .limit(1)
+        )
         res = await db.execute(stmt)
         run = res.scalars().first()
 
@@ -288,6 +344,7 @@ async def get_machine_runs(db: AsyncSession = Depends(get_db)):
                 "id": str(r.id),
                 "trigger_type": r.trigger_type,
                 "status": r.status,
+                "progress": r.progress or {},
                 "started_at": r.started_at.isoformat() if r.started_at else None,
                 "completed_at": r.completed_at.isoformat() if r.completed_at else None,
                 "results_summary": r.results_summary or {},
@@ -307,6 +364,36 @@ async def get_machine_runs(db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/runs/{run_id}")
+async def get_run_status(run_id: UUID, db: AsyncSession = Depends(get_db)):
+    """Poll a single run: status, progress, and the result once completed"""
+    try:
+        run = await db.get(OptimizationRun, run_id)
+        if not run:
+            raise HTTPException(status_code=404, detail="Optimization run not found")
+
+        run_data = {
+            "id": str(run.id),
+            "trigger_type": run.trigger_type,
+            "status": run.status,
+            "progress": run.progress or {},
+            "created_at": run.created_at.isoformat() if run.created_at else None,
+            "started_at": run.started_at.isoformat() if run.started_at else None,
+            "completed_at": run.completed_at.isoformat() if run.completed_at else None,
+            "results_summary": run.results_summary or {},
+        }
+        if run.status == "completed":
+            run_data["result"] = run.result
+
+        return {"status": "success", "data": run_data}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("❌ Failed to fetch optimization run")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/manual")
 async def get_manual_runs(db: AsyncSession = Depends(get_db)):
     """Fetch all manually updated optimization runs"""
@@ -21,7 +21,12 @@ async def get_trip_schedule(db: AsyncSession = Depends(get_db)):
     """
     try:
         # Fetch the latest optimization run from database
-        stmt = select(OptimizationRun).order_by(OptimizationRun.created_at.desc()).limit(1)
+        stmt = (
+            select(OptimizationRun)
+            .where(OptimizationRun.status == "completed")
+            .order_by(OptimizationRun.created_at.desc())
+            .limit(1)
+        )
         res = await db.execute(stmt)
         run = res.scalars().first()
 
@@ -95,6 +100,7 @@ async def update_trip_schedule(payload: Dict[str, Any], db: AsyncSession = Depen
         q = (
             select(OptimizationRun)
             .where(OptimizationRun.trigger_type == "machine_generated_optimization")
+            .where(OptimizationRun.status == "completed")
             .order_by(OptimizationRun.started_at.desc())
             .limit(1)
         )
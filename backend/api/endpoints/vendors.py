@@ -9,6 +9,7 @@ from typing import List, Optional
 
 from api.deps import get_db
 from services import VendorService, ExcelService
+from services.spatial_index_service import SpatialIndexService
 from schemas.vendor import VendorResponse, VendorCreate, VendorUpdate
 from schemas.responses import BulkUploadResponse, MessageResponse
 
@@ -72,6 +73,21 @@ async def create_vendor(
 async def get_vendor_stats(db: AsyncSession = Depends(get_db)):
     return await VendorService.get_stats(db)
 
+@router.get("/nearby")
+async def get_nearby_vendors(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=200),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    """Active vendors within radius_km of a point, nearest first (in-memory spatial index)"""
+    try:
+        vendors = await SpatialIndexService.nearby_vendors(db, lat, lng, radius_km, limit)
+        return {"status": "success", "data": {"count": len(vendors), "vendors": vendors}}
+    except Exception as e:
+        raise HTTPException(500, f"Nearby vendor lookup failed: {str(e)}")
+
 @router.get("/{vendor_id}", response_model=VendorResponse)
 async def get_vendor(
     vendor_id: str,  # Changed from int to str
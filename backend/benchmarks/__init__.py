@@ -0,0 +1,7 @@
+#benchmarks/__init__.py
+"""
+Benchmarks
+Standalone performance checks for the optimization pipeline
+
+Run from backend/:  python -m benchmarks.<module>
+"""
@@ -0,0 +1,219 @@
+#benchmarks/engine_stages.py
+"""
+Engine Stage Benchmark
+Time each stage of the optimization pipeline on synthetic instances
+
+Stages, each fed by the previous one's output:
+- assignment:    capacity-aware vendor → hub assignment
+- matrix:        one (hub + vendors) distance/duration matrix per cluster
+- packing:       greedy heterogeneous fleet packing per cluster
+- routing:       native VRP solve per cluster on the stage's matrices
+- pipeline:      a full OptimizationEngine.run_optimization (native solver)
+- serialization: JSON round trip of the pipeline's results plus the run summary
+
+Everything runs offline on the estimator routing backend. Each stage is
+run --repeat times and its best time kept; the results file records the
+commit so runs can be compared across commits (--compare OLD.json).
+
+Usage (from backend/):
+    python -m benchmarks.engine_stages [--sizes 100 1000 10000] [--seed 42]
+        [--repeat 3] [--stages assignment matrix ...] [--output FILE] [--compare OLD.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from benchmarks.instances import generate_instance, describe
+from scripts.fleet_packing import pack_heterogeneous_fleet
+from scripts.optimization_engine import OptimizationEngine
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.spatial_index import SpatialIndex
+from scripts.vrp_solver import VRPSolver, DEFAULT_NEIGHBOURS
+from services.optimization_jobs import build_results_summary
+
+STAGES = ["assignment", "matrix", "packing", "routing", "pipeline", "serialization"]
+DEADLINE_MINUTES = 480
+MAX_DISTANCE_KM = 100
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(__file__), check=True
+        ).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(fn: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Best-of-repeat wall time; the last run's return value is kept as 'output'"""
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = fn()
+        runs.append(time.perf_counter() - started)
+    return {'seconds': round(min(runs), 4), 'runs': [round(r, 4) for r in runs], 'output': output}
+
+
+def make_engine(instance: Dict[str, Any]) -> OptimizationEngine:
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    engine.set_data(instance['centroids'], instance['center_capacity'],
+                    instance['subareas'], instance['farmers_milk'])
+    return engine
+
+
+def bench_instance(instance: Dict[str, Any], stages: Sequence[str], repeat: int) -> Dict[str, Dict]:
+    engine = make_engine(instance)
+    vehicle_types = instance['vehicle_types']
+    fleet = {v['name']: v['count'] for v in vehicle_types}
+    report: Dict[str, Dict] = {}
+
+    def record(stage: str, fn: Callable[[], Any], metrics: Callable[[Any], Dict] = lambda _: {}):
+        # Later stages need earlier outputs: a stage that was not asked for runs once, untimed
+        if stage not in stages:
+            return fn()
+        result = timed(fn, repeat)
+        report[stage] = {'seconds': result['seconds'], 'runs': result['runs'], **metrics(result['output'])}
+        return result['output']
+
+    clusters = record(
+        "assignment", lambda: engine.assign_clusters()[0],
+        lambda out: {'clusters': sum(1 for farmers in out.values() if farmers)}
+    )
+
+    def cluster_matrices():
+        matrices = {}
+        for name, farmers in clusters.items():
+            if farmers:
+                points = [tuple(engine.centroids[name])] + [tuple(engine.subareas[f]) for f in farmers]
+                matrices[name] = engine.routing_provider.matrix(points, points, metrics=("distance", "duration"))
+        return matrices
+
+    if "matrix" in stages or "routing" in stages:
+        matrices = record(
+            "matrix", cluster_matrices,
+            lambda out: {'elements': int(sum(m['distances'].size for m in out.values()))}
+        )
+
+    if "packing" in stages:
+        def pack():
+            availability, vehicles, unassigned = dict(fleet), 0, 0
+            for farmers in clusters.values():
+                assigned, left = pack_heterogeneous_fleet(farmers, engine.farmers_milk, vehicle_types, availability)
+                vehicles += len(assigned)
+                unassigned += len(left)
+            return vehicles, unassigned
+        record("packing", pack, lambda out: {'vehicles': out[0], 'unassigned': out[1]})
+
+    if "routing" in stages:
+        def route():
+            availability, routes, unassigned, cost = dict(fleet), 0, 0, 0.0
+            for name, matrix in matrices.items():
+                farmers = clusters[name]
+                solution = VRPSolver(
+                    matrix['distances'], matrix['durations'],
+                    [engine.farmers_milk[f] for f in farmers], vehicle_types,
+                    DEADLINE_MINUTES, MAX_DISTANCE_KM, fleet_availability=availability,
+                    neighbour_lists=SpatialIndex([engine.subareas[f] for f in farmers]).neighbour_lists(DEFAULT_NEIGHBOURS)
+                ).solve()
+                routes += len(solution['routes'])
+                unassigned += len(solution['unassigned'])
+                cost += sum(r['vehicle_spec']['fixed_cost'] + r['distance'] * r['vehicle_spec']['cost_per_km']
+                            for r in solution['routes'])
+            return routes, unassigned, cost
+        record("routing", route, lambda out: {'routes': out[0], 'unassigned': out[1], 'cost': round(out[2], 2)})
+
+    if "pipeline" in stages or "serialization" in stages:
+        results = record(
+            "pipeline",
+            lambda: make_engine(instance).run_optimization(
+                DEADLINE_MINUTES, MAX_DISTANCE_KM, vehicle_types, solver="native"
+            ),
+            lambda out: {'total_cost': round(out['total_cost'], 2), 'violations': out['total_violations'],
+                         'unassigned': len(out['unassigned_farmers'])}
+        )
+
+    if "serialization" in stages:
+        def serialize():
+            # Results are stored in a JSON column and read back for incremental runs
+            payload = json.dumps(results, default=str)
+            build_results_summary(json.loads(payload))
+            return len(payload)
+        record("serialization", serialize, lambda out: {'bytes': out})
+
+    return report
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]):
+    """Print stage times against an earlier results file (ratio > 1: slower now)"""
+    before = {
+        (row['instance']['vendors'], stage): data['seconds']
+        for row in baseline['results'] for stage, data in row['stages'].items()
+    }
+    print(f"\nvs {baseline.get('commit')}:")
+    print(f"{'vendors':>8} {'stage':>14} {'before s':>10} {'now s':>10} {'ratio':>7}")
+    for row in current['results']:
+        for stage, data in row['stages'].items():
+            old = before.get((row['instance']['vendors'], stage))
+            if old is not None:
+                print(f"{row['instance']['vendors']:>8} {stage:>14} {old:>10.4f} {data['seconds']:>10.4f} "
+                      f"{data['seconds'] / max(old, 1e-9):>6.2f}x")
+
+
+def run(sizes: List[int], seed: int, repeat: int, stages: Sequence[str],
+        output: Optional[str] = None) -> Dict[str, Any]:
+    """Benchmark every size; writes and returns the results document"""
+    commit = current_commit()
+    document = {
+        'benchmark': 'engine_stages',
+        'commit': commit,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': [],
+    }
+
+    print(f"{'vendors':>8} {'stage':>14} {'best s':>10}")
+    for size in sizes:
+        instance = generate_instance(size, seed)
+        stage_report = bench_instance(instance, stages, repeat)
+        document['results'].append({'instance': describe(instance), 'stages': stage_report})
+        for stage, data in stage_report.items():
+            print(f"{size:>8} {stage:>14} {data['seconds']:>10.4f}")
+
+    output = output or os.path.join(RESULTS_DIR, f"engine_stages_{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"\n💾 Results written to {output}")
+    return document
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--output", help="results file (default: benchmarks/results/engine_stages_<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    document = run(args.sizes, args.seed, args.repeat, args.stages, args.output)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(document, json.load(f))
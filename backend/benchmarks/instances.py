@@ -0,0 +1,138 @@
+#benchmarks/instances.py
+"""
+Synthetic Instances
+Seeded milk-collection districts in the engine's input format
+
+Hubs are spread over a region that grows with the instance so vendor
+density stays realistic; villages are scattered around each hub and vendors
+around their village. Milk is drawn in whole cans (a few half-can readings)
+and converted to liters like DataTransformer does. The fleet is a mini /
+small mix categorized the way FleetCategorizer does it (one category per
+distinct capacity, C1 = smallest, costs rising 30% per step), sized to carry
+the district's milk with some slack.
+
+Usage (from backend/):
+    python -m benchmarks.instances --vendors 1000 [--seed 42]
+"""
+
+import argparse
+import numpy as np
+from typing import Dict, List, Any, Optional
+
+from services.fleet_categorizer import FleetCategorizer
+from utils.conversions import cans_to_liters
+
+ORIGIN = (10.30, 78.40)            # Pudukkottai district, where the mock data lives
+HUB_SPACING_DEG = 0.12             # ~13 km between neighbouring hubs
+VENDORS_PER_HUB = 400
+VENDORS_PER_VILLAGE = 20
+VILLAGE_SPREAD_DEG = 0.04          # villages within ~5 km of their hub
+VENDOR_SPREAD_DEG = 0.004          # vendors within ~500 m of their village centre
+HUB_CAPACITY_SLACK = 1.25
+FLEET_SLACK = 1.5
+SPEED_KMPH = 40.0
+
+# (category, capacity in cans) per vehicle model, as in the fleet Excel
+FLEET_MODELS = [("mini", 30), ("mini", 40), ("small", 55), ("small", 70)]
+CAN_CHOICES = [1, 1.5, 2, 3, 4, 5, 6]
+CAN_WEIGHTS = [0.25, 0.05, 0.25, 0.2, 0.12, 0.08, 0.05]
+
+
+def fleet_categories(capacities_cans: List[float]) -> List[Dict[str, Any]]:
+    """FleetCategorizer's category table for a set of vehicle capacities"""
+    categories = []
+    for idx, capacity in enumerate(sorted(set(capacities_cans))):
+        cost_multiplier = 1 + (idx * 0.3)
+        categories.append({
+            'name': f"C{idx + 1}",
+            'capacity': cans_to_liters(capacity),
+            'count': 0,
+            'service_time': FleetCategorizer.BASE_SERVICE_TIME,
+            'cost_per_km': round(FleetCategorizer.BASE_COST_PER_KM * cost_multiplier, 2),
+            'fixed_cost': round(FleetCategorizer.BASE_FIXED_COST * cost_multiplier, 2),
+            'speed_kmph': SPEED_KMPH,
+        })
+    return categories
+
+
+def generate_instance(vendor_count: int, seed: int = 42,
+                      hub_count: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Args:
+        vendor_count: number of vendors (100 .. 100k is the intended range)
+        hub_count: defaults to one hub per VENDORS_PER_HUB vendors
+
+    Returns:
+        {"centroids", "center_capacity", "subareas", "farmers_milk",
+         "vehicle_types", "villages"}; same seed and sizes, same instance
+    """
+    if vendor_count < 1:
+        raise ValueError("vendor_count must be positive")
+    rng = np.random.default_rng(seed)
+    hub_count = hub_count or max(1, round(vendor_count / VENDORS_PER_HUB))
+
+    # Hubs on a jittered grid around the origin
+    side = int(np.ceil(np.sqrt(hub_count)))
+    cells = rng.permutation(side * side)[:hub_count]
+    hub_coords = np.column_stack([
+        ORIGIN[0] + (cells // side - (side - 1) / 2) * HUB_SPACING_DEG,
+        ORIGIN[1] + (cells % side - (side - 1) / 2) * HUB_SPACING_DEG,
+    ]) + rng.uniform(-0.25, 0.25, (hub_count, 2)) * HUB_SPACING_DEG
+    centroids = {f"HUB{i + 1:04d}": (round(lat, 6), round(lng, 6)) for i, (lat, lng) in enumerate(hub_coords)}
+
+    # Villages around a random hub, vendors around a random village
+    village_count = max(1, vendor_count // VENDORS_PER_VILLAGE)
+    village_hub = rng.integers(0, hub_count, village_count)
+    village_coords = hub_coords[village_hub] + rng.normal(0, VILLAGE_SPREAD_DEG, (village_count, 2))
+    vendor_village = rng.integers(0, village_count, vendor_count)
+    vendor_coords = village_coords[vendor_village] + rng.normal(0, VENDOR_SPREAD_DEG, (vendor_count, 2))
+    cans = rng.choice(CAN_CHOICES, size=vendor_count, p=CAN_WEIGHTS)
+
+    subareas = {f"V{i + 1:06d}": (round(lat, 6), round(lng, 6)) for i, (lat, lng) in enumerate(vendor_coords)}
+    farmers_milk = {name: cans_to_liters(float(c)) for name, c in zip(subareas, cans)}
+    total_milk = sum(farmers_milk.values())
+
+    # Hub capacity in proportion to the milk its villages produce
+    hub_milk = np.bincount(village_hub[vendor_village], weights=cans, minlength=hub_count)
+    center_capacity = {
+        name: cans_to_liters(max(float(milk), 1.0) * HUB_CAPACITY_SLACK)
+        for name, milk in zip(centroids, hub_milk)
+    }
+
+    # Vehicles drawn from the models until the fleet carries the milk FLEET_SLACK times over
+    vehicle_types = fleet_categories([capacity for _, capacity in FLEET_MODELS])
+    by_capacity = {v['capacity']: v for v in vehicle_types}
+    carried = 0.0
+    while carried < total_milk * FLEET_SLACK:
+        _, capacity = FLEET_MODELS[rng.integers(0, len(FLEET_MODELS))]
+        by_capacity[cans_to_liters(capacity)]['count'] += 1
+        carried += cans_to_liters(capacity)
+
+    return {
+        'centroids': centroids,
+        'center_capacity': center_capacity,
+        'subareas': subareas,
+        'farmers_milk': farmers_milk,
+        'vehicle_types': [v for v in vehicle_types if v['count']],
+        'villages': village_count,
+    }
+
+
+def describe(instance: Dict[str, Any]) -> Dict[str, Any]:
+    """Headline numbers of an instance"""
+    return {
+        'vendors': len(instance['subareas']),
+        'hubs': len(instance['centroids']),
+        'villages': instance['villages'],
+        'total_milk_liters': round(sum(instance['farmers_milk'].values()), 2),
+        'vehicles': sum(v['count'] for v in instance['vehicle_types']),
+        'vehicles_by_type': {v['name']: v['count'] for v in instance['vehicle_types']},
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vendors", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    print(describe(generate_instance(args.vendors, args.seed)))
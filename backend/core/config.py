@@ -5,7 +5,7 @@ Loads environment variables from .env file
 """
 
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -25,6 +25,50 @@ class Settings(BaseSettings):
     VERSION: str = "1.0.0"
     DEBUG: bool = True
     
+    # Routing Configuration
+    ROUTING_BACKEND: str = "ors"          # "ors" (OpenRouteService) or "offline" (estimator)
+    ROUTE_SOLVER: str = "provider"        # "provider" (per-vehicle routing calls) or "native" (in-process VRP)
+    ORS_API_KEY: Optional[str] = None     # Falls back to the key bundled with the engine
+    ORS_BASE_URL: str = "https://api.openrouteservice.org"
+    ROAD_CIRCUITY_FACTOR: float = 1.3     # Offline: road km per straight-line km
+    OFFLINE_SPEED_KMPH: float = 40.0      # Offline: speed when a vehicle has none
+    ROUTING_MAX_CONCURRENCY: int = 8      # In-flight routing requests per run
+    ROUTING_TIMEOUT_SECONDS: float = 30.0 # Per-call timeout
+    ROUTING_MAX_RETRIES: int = 3          # Retries on 429/5xx/connection errors (exponential backoff)
+    ORS_MATRIX_MAX_ELEMENTS: int = 3500   # Matrix requests are tiled to stay under this
+    ROUTE_GEOMETRY: bool = False          # Fetch road geometry per route (one directions call each)
+    ROUTING_FIXTURE_MODE: Optional[str] = None   # "record" / "replay" ORS responses (scripts/routing_fixtures.py)
+    ROUTING_FIXTURES_PATH: Optional[str] = None  # Compressed fixture file, e.g. fixtures/ors.json.gz
+    
+    # Background optimization jobs
+    OPTIMIZATION_MAX_CONCURRENT_JOBS: int = 2
+    OPTIMIZATION_DEDUP_ENABLED: bool = True       # Identical inputs + params → return the existing run
+    OPTIMIZATION_DEDUP_WINDOW_MINUTES: int = 60   # Runs older than this are never reused
+    OPTIMIZATION_HEARTBEAT_SECONDS: int = 30      # Queued/running runs touch updated_at this often
+    OPTIMIZATION_STALE_AFTER_SECONDS: int = 180   # Unfinished runs silent this long are abandoned
+    HUB_UNLOAD_MINUTES: float = 15.0      # Multi-trip: unloading between a vehicle's trips
+    CLUSTER_SOLVE_WORKERS: Optional[int] = 1   # Native solver: processes planning hubs side by side (None = CPU count)
+    PERF_TRACE_MEMORY: bool = False       # Per-stage tracemalloc peaks in results_summary.perf (slower runs)
+    
+    # Scenario sweeps (POST /optimization/sweep)
+    SWEEP_MAX_SCENARIOS: int = 50
+    SWEEP_MAX_WORKERS: Optional[int] = None   # Worker processes; None = CPU count
+    
+    # Routing Matrix Cache (table: routing_matrix_cache)
+    MATRIX_CACHE_ENABLED: bool = True
+    MATRIX_CACHE_TTL_HOURS: int = 168     # Coordinates rarely change; re-fetch weekly
+    MATRIX_CACHE_MAX_ENTRIES: int = 500_000   # In-memory entries per worker (LRU)
+    MATRIX_CACHE_MAX_ROWS: int = 2_000_000    # Rows kept in Postgres (oldest evicted)
+    
+    # Cluster Result Cache (table: cluster_result_cache)
+    CLUSTER_CACHE_ENABLED: bool = True
+    CLUSTER_CACHE_TTL_HOURS: int = 168
+    CLUSTER_CACHE_MAX_ENTRIES: int = 2000     # Solved clusters in memory per worker (LRU)
+    CLUSTER_CACHE_MAX_ROWS: int = 50_000      # Rows kept in Postgres (oldest evicted)
+    
+    # Vendor / hub spatial index (GET /vendors/nearby)
+    SPATIAL_INDEX_VERSION_CHECK_SECONDS: float = 30.0   # Writes from other workers show up within this
+    
     # Constants
     CAN_TO_LITER_RATIO: float = 40.0
     MAX_UPLOAD_SIZE_MB: int = 10
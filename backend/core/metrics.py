@@ -0,0 +1,290 @@
+#core/metrics.py
+"""
+Metrics
+Prometheus text-format metrics for the API and the optimization hot paths
+
+A small in-process registry (counters, gauges, histograms with labels) so
+the API needs no extra dependency. Hot paths only touch a dict entry under
+a lock per observation; values that already live elsewhere (in-flight jobs,
+matrix cache counters, SQLAlchemy pool state) are read by collectors when
+/metrics is scraped, costing nothing between scrapes.
+
+Exported:
+- http_request_duration_seconds{method,route,status}: histogram per route template
+- optimization_jobs_in_flight: queued + running jobs in this worker
+- routing_request_duration_seconds{provider,kind} / routing_request_errors_total{provider,kind,error}
+- matrix_cache_{hits,misses}_total, matrix_cache_hit_ratio, matrix_cache_entries
+- db_pool_{size,checked_in,checked_out,overflow}
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from scripts.async_routing import add_request_observer
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; API calls are mostly fast, optimization queueing and routing calls are not
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+logger = logging.getLogger(__name__)
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def set_total(self, value: float, **labels):
+        """Mirror a cumulative count kept elsewhere (read by a collector at scrape time)"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.set_total(value, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (non-cumulative, last = +Inf), sum]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Metrics plus collectors (callables refreshing gauges right before a scrape)"""
+
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]):
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                # A broken collector must not take the whole scrape down
+                logger.warning(f"⚠️ Metrics collector {collector.__name__} failed: {e}")
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+))
+OPTIMIZATION_JOBS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "optimization_jobs_in_flight", "Optimization jobs queued or running in this worker"
+))
+ROUTING_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "routing_request_duration_seconds", "Routing provider HTTP call latency (every attempt)",
+    ("provider", "kind")
+))
+ROUTING_REQUEST_ERRORS = REGISTRY.register(Counter(
+    "routing_request_errors_total", "Routing provider HTTP calls that failed or were retried",
+    ("provider", "kind", "error")
+))
+MATRIX_CACHE_HITS = REGISTRY.register(Counter(
+    "matrix_cache_hits_total", "Matrix cache pair lookups served from memory"
+))
+MATRIX_CACHE_MISSES = REGISTRY.register(Counter(
+    "matrix_cache_misses_total", "Matrix cache pair lookups that needed a routing call"
+))
+MATRIX_CACHE_HIT_RATIO = REGISTRY.register(Gauge(
+    "matrix_cache_hit_ratio", "Matrix cache hits / lookups since the worker started"
+))
+MATRIX_CACHE_ENTRIES = REGISTRY.register(Gauge(
+    "matrix_cache_entries", "Pairs held in the in-memory matrix cache"
+))
+DB_POOL = {
+    stat: REGISTRY.register(Gauge(f"db_pool_{stat}", documentation))
+    for stat, documentation in (
+        ("size", "Configured SQLAlchemy pool size"),
+        ("checked_in", "Idle connections in the SQLAlchemy pool"),
+        ("checked_out", "Connections currently in use"),
+        ("overflow", "Connections open beyond pool_size (negative: pool not yet full)"),
+    )
+}
+
+
+def observe_routing_request(provider: str, kind: str, seconds: float, error: Optional[str]):
+    ROUTING_REQUEST_DURATION.observe(seconds, provider=provider, kind=kind)
+    if error is not None:
+        ROUTING_REQUEST_ERRORS.inc(provider=provider, kind=kind, error=error)
+
+
+add_request_observer(observe_routing_request)
+
+
+def collect_matrix_cache():
+    from scripts.matrix_cache import existing_shared_matrix_cache
+
+    cache = existing_shared_matrix_cache()
+    if cache is None:
+        return
+    lookups = cache.hits + cache.misses
+    MATRIX_CACHE_HITS.set_total(cache.hits)
+    MATRIX_CACHE_MISSES.set_total(cache.misses)
+    MATRIX_CACHE_HIT_RATIO.set(cache.hits / lookups if lookups else 0.0)
+    MATRIX_CACHE_ENTRIES.set(len(cache))
+
+
+def collect_jobs():
+    from services.optimization_jobs import optimization_jobs
+
+    OPTIMIZATION_JOBS_IN_FLIGHT.set(optimization_jobs.in_flight)
+
+
+def collect_db_pool():
+    from database.session import engine
+
+    pool = engine.sync_engine.pool
+    DB_POOL["size"].set(pool.size())
+    DB_POOL["checked_in"].set(pool.checkedin())
+    DB_POOL["checked_out"].set(pool.checkedout())
+    DB_POOL["overflow"].set(pool.overflow())
+
+
+REGISTRY.add_collector(collect_matrix_cache)
+REGISTRY.add_collector(collect_jobs)
+REGISTRY.add_collector(collect_db_pool)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request. Labelled by the matched
+    route template (/api/v1/vendors/{vendor_id}), never the raw path, so
+    label cardinality stays bounded; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", None) or "unmatched",
+                status=str(status["code"]),
+            )
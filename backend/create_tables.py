@@ -1,10 +1,24 @@
 import asyncio
+from sqlalchemy import text
 from database.session import engine, Base
 from models import optimization  # ensures models are imported
 
 async def create_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # Optimization models (runs, changes, routing and cluster caches) use their own metadata
+        await conn.run_sync(optimization.Base.metadata.create_all)
+        # Columns added to existing tables (create_all only creates missing tables)
+        for statement in (
+            "ALTER TABLE vendors ADD COLUMN IF NOT EXISTS pickup_start_minute INTEGER",
+            "ALTER TABLE vendors ADD COLUMN IF NOT EXISTS pickup_end_minute INTEGER",
+            "ALTER TABLE storage_hubs ADD COLUMN IF NOT EXISTS open_minute INTEGER",
+            "ALTER TABLE storage_hubs ADD COLUMN IF NOT EXISTS close_minute INTEGER",
+            "ALTER TABLE optimization_runs ADD COLUMN IF NOT EXISTS progress JSON",
+            "ALTER TABLE optimization_runs ADD COLUMN IF NOT EXISTS input_fingerprint VARCHAR(64)",
+            "CREATE INDEX IF NOT EXISTS ix_optimization_runs_input_fingerprint ON optimization_runs (input_fingerprint)",
+        ):
+            await conn.execute(text(statement))
     print("✅ Optimization tables created successfully!")
 
 asyncio.run(create_tables())
@@ -4,6 +4,8 @@ Database Session Management
 Handles PostgreSQL connection using SQLAlchemy async
 """
 #backend/database/session.py
+import asyncio
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -84,16 +86,19 @@ async def close_db():
 # HEALTH CHECK
 # ============================================================
 
-async def check_db_connection():
+async def check_db_connection(timeout: float = 5.0):
     """
     Check if database connection is healthy
     
+    Args:
+        timeout: seconds before an unresponsive database counts as down
+    
     Returns:
         bool: True if connected, False otherwise
     """
     try:
         async with AsyncSessionLocal() as session:
-            await session.execute("SELECT 1")
+            await asyncio.wait_for(session.execute(text("SELECT 1")), timeout)
             return True
     except Exception as e:
         print(f"❌ Database connection failed: {e}")
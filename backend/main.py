@@ -5,10 +5,13 @@ FastAPI application entry point
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
 from contextlib import asynccontextmanager
 
 from core.config import settings
-from database.session import init_db, close_db
+from core.metrics import REGISTRY, CONTENT_TYPE, MetricsMiddleware
+from database.session import init_db, close_db, check_db_connection
+from services.optimization_jobs import optimization_jobs
 from api import vendors_router, storage_hubs_router, fleet_router
 
 
@@ -47,6 +50,9 @@ async def lifespan(app: FastAPI):
     print("🛑 SHUTTING DOWN MILK COLLECTION BACKEND")
     print("="*70)
     
+    optimization_jobs.shutdown()
+    print("✅ Optimization job queue stopped")
+    
     await close_db()
     print("✅ Database connections closed")
     print("👋 Goodbye!\n")
@@ -109,6 +115,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so the latency includes every other middleware
+app.add_middleware(MetricsMiddleware)
+
 
 # ============================================================
 # API ROUTERS
@@ -165,12 +174,26 @@ async def root():
 async def health_check():
     """
     Health check endpoint
+    Pings the database; 503 when it does not answer
     """
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "api": "operational"
-    }
+    database_ok = await check_db_connection()
+    return JSONResponse(
+        status_code=200 if database_ok else 503,
+        content={
+            "status": "healthy" if database_ok else "unhealthy",
+            "database": "connected" if database_ok else "unreachable",
+            "api": "operational",
+            "optimization_jobs_in_flight": optimization_jobs.in_flight,
+        }
+    )
+
+
+@app.get("/metrics", tags=["Root"], include_in_schema=False)
+async def metrics():
+    """
+    Prometheus metrics (text exposition format)
+    """
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
 
 
 # ============================================================
@@ -1,6 +1,6 @@
 # backend/models/optimization.py
 
-from sqlalchemy import Column, String, JSON, DateTime, ForeignKey
+from sqlalchemy import Column, String, JSON, DateTime, ForeignKey, Float, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from sqlalchemy.orm import declarative_base, relationship
@@ -15,13 +15,15 @@ class OptimizationRun(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     trigger_type = Column(String, nullable=False)
     trigger_details = Column(JSON, nullable=True)
-    status = Column(String, nullable=True)
+    status = Column(String, nullable=True)  # queued → running → completed | failed
+    progress = Column(JSON, nullable=True)  # {stage, clusters_done, clusters_total, percent}
     started_at = Column(DateTime(timezone=True), server_default=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     results_summary = Column(JSON, nullable=True)
     manual_changes = Column(JSON, nullable=True)
     # ✅ Add missing columns here
     input_config = Column(JSON, nullable=True)
+    input_fingerprint = Column(String(64), nullable=True, index=True)  # services.optimization_jobs.run_fingerprint
     result = Column(JSON, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -46,3 +48,41 @@ class OptimizationChange(Base):
 
     # Relationship
     run = relationship("OptimizationRun", back_populates="changes")
+
+
+class RoutingMatrixCache(Base):
+    """Persistent pair-keyed distance/duration cache shared by all workers"""
+    __tablename__ = "routing_matrix_cache"
+
+    # e.g. "ors:driving-car" - entries are never shared across providers/profiles
+    namespace = Column(String(50), primary_key=True)
+    # Quantized "lat,lng" keys (see scripts/matrix_cache.coord_key)
+    origin_key = Column(String(32), primary_key=True)
+    destination_key = Column(String(32), primary_key=True)
+
+    distance_km = Column(Float, nullable=True)
+    duration_min = Column(Float, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_routing_matrix_cache_created_at", "created_at"),
+    )
+
+
+class ClusterResultCache(Base):
+    """Solved clusters keyed by input fingerprint, shared by all workers"""
+    __tablename__ = "cluster_result_cache"
+
+    # OptimizationEngine.cluster_fingerprint (SHA-1 hex)
+    fingerprint = Column(String(40), primary_key=True)
+    hub = Column(String, nullable=False, index=True)
+    cluster = Column(JSON, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ix_cluster_result_cache_created_at", "created_at"),
+    )
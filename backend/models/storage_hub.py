@@ -41,6 +41,11 @@ class StorageHub(Base):
     current_load_liters = Column(Float, default=0.0)
     current_load_cans = Column(Float, default=0.0)
     
+    # Receiving window (optional): vehicles leave at open, are back by close
+    # (minutes after collection starts)
+    open_minute = Column(Integer, nullable=True)
+    close_minute = Column(Integer, nullable=True)
+    
     # Metadata
     is_active = Column(Boolean, default=True)
     upload_batch_id = Column(String(36), nullable=True)
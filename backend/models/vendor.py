@@ -36,6 +36,10 @@ class Vendor(Base):
     milk_quantity_cans = Column(Float, nullable=False, default=0.0)
     milk_quantity_liters = Column(Float, nullable=False, default=0.0)
     
+    # Pickup window (optional): minutes after collection starts
+    pickup_start_minute = Column(Integer, nullable=True)
+    pickup_end_minute = Column(Integer, nullable=True)
+    
     # Metadata
     is_active = Column(Boolean, default=True)
     upload_batch_id = Column(String(36), nullable=True)  # UUID for Excel upload tracking
@@ -17,6 +17,16 @@ class StorageHubBase(BaseModel):
     longitude: float = Field(..., ge=-180, le=180, description="Longitude coordinate")
     contact_number: Optional[str] = Field(None, pattern=r"^\d{10}$", description="10-digit phone number")
     capacity_liters: float = Field(..., gt=0, description="Storage capacity in liters")
+    open_minute: Optional[int] = Field(None, ge=0, le=1440, description="Vehicles leave from (minutes after collection starts)")
+    close_minute: Optional[int] = Field(None, ge=0, le=1440, description="Vehicles back by (minutes after collection starts)")
+    
+    @validator('close_minute')
+    def validate_window(cls, v, values):
+        """Window must not close before it opens"""
+        opens = values.get('open_minute')
+        if v is not None and opens is not None and v < opens:
+            raise ValueError("Hub window must close after it opens")
+        return v
     
     @validator('capacity_liters')
     def validate_capacity(cls, v):
@@ -47,7 +57,17 @@ class StorageHubUpdate(BaseModel):
     contact_number: Optional[str] = Field(None, pattern=r"^\d{10}$")
     capacity_liters: Optional[float] = Field(None, gt=0)
     current_load_liters: Optional[float] = Field(None, ge=0)
+    open_minute: Optional[int] = Field(None, ge=0, le=1440)
+    close_minute: Optional[int] = Field(None, ge=0, le=1440)
     is_active: Optional[bool] = None
+    
+    @validator('close_minute')
+    def validate_window(cls, v, values):
+        """Window must not close before it opens (when both are given)"""
+        opens = values.get('open_minute')
+        if v is not None and opens is not None and v < opens:
+            raise ValueError("Hub window must close after it opens")
+        return v
 
 
 class StorageHubResponse(StorageHubBase):
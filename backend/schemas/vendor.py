@@ -15,6 +15,16 @@ class VendorBase(BaseModel):
     longitude: float
     contact_number: Optional[str] = None
     milk_quantity_cans: float
+    pickup_start_minute: Optional[int] = Field(None, ge=0, le=1440, description="Pickup window start (minutes after collection starts)")
+    pickup_end_minute: Optional[int] = Field(None, ge=0, le=1440, description="Pickup window end (minutes after collection starts)")
+
+    @validator('pickup_end_minute')
+    def validate_pickup_window(cls, v, values):
+        """Window must not end before it starts"""
+        start = values.get('pickup_start_minute')
+        if v is not None and start is not None and v < start:
+            raise ValueError("Pickup window must end after it starts")
+        return v
 
     @validator('milk_quantity_cans')
     def validate_cans(cls, v):
@@ -43,8 +53,18 @@ class VendorUpdate(BaseModel):
     longitude: Optional[float] = Field(None, ge=-180, le=180)
     contact_number: Optional[str] = Field(None, pattern=r"^\d{10}$")
     milk_quantity_cans: Optional[float] = Field(None, gt=0, le=100)
+    pickup_start_minute: Optional[int] = Field(None, ge=0, le=1440)
+    pickup_end_minute: Optional[int] = Field(None, ge=0, le=1440)
     is_active: Optional[bool] = None
 
+    @validator('pickup_end_minute')
+    def validate_pickup_window(cls, v, values):
+        """Window must not end before it starts (when both are given)"""
+        start = values.get('pickup_start_minute')
+        if v is not None and start is not None and v < start:
+            raise ValueError("Pickup window must end after it starts")
+        return v
+
 from pydantic import BaseModel
 from uuid import UUID
 from datetime import datetime
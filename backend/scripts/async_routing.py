@@ -0,0 +1,159 @@
+#scripts/async_routing.py
+"""
+Async Routing Client
+Pooled, concurrency-bounded HTTP client for routing APIs
+
+One AsyncRoutingClient is opened per engine run: connections are kept alive
+and reused across all vehicles, a semaphore caps in-flight requests (ORS
+rate limits), and every call carries its own timeout. Rate-limited (429),
+gateway (502-504) and connection failures are retried with exponential backoff.
+"""
+
+import asyncio
+import threading
+import time
+import httpx
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_BACKOFF_SECONDS = 0.5
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+# observer(provider, kind, seconds, error or None) for every routing HTTP attempt,
+# e.g. the API's Prometheus metrics; kept here so the engine needs no metrics import
+RequestObserver = Callable[[str, str, float, Optional[str]], None]
+_REQUEST_OBSERVERS: List[RequestObserver] = []
+
+
+class RoutingRequestError(Exception):
+    """A routing request still failed after all retries"""
+
+
+def add_request_observer(observer: RequestObserver):
+    if observer not in _REQUEST_OBSERVERS:
+        _REQUEST_OBSERVERS.append(observer)
+
+
+def request_kind(path: str) -> str:
+    """matrix / optimization / directions for an ORS path"""
+    return next((k for k in ("matrix", "optimization", "directions") if k in path), path)
+
+
+def observe_request(provider: str, path: str, seconds: float, error: Optional[str] = None):
+    for observer in _REQUEST_OBSERVERS:
+        observer(provider, request_kind(path), seconds, error)
+
+
+class AsyncRoutingClient:
+    """httpx.AsyncClient wrapper with a bounded-concurrency POST helper"""
+
+    def __init__(self, base_url: str, headers: Dict[str, str],
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 max_connections: int = DEFAULT_MAX_CONNECTIONS,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+                 on_response: Optional[Callable[[str, int], None]] = None,
+                 provider: str = "routing",
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        on_response(path, bytes sent + received) is called for every HTTP response;
+        provider names the backend in request observations; transport replaces
+        the network (fixture record/replay, an in-process ORS stand-in)
+        """
+        self.base_url = base_url
+        self.provider = provider
+        self.headers = headers
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.on_response = on_response
+        self.transport = transport
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def __aenter__(self) -> "AsyncRoutingClient":
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            limits=self.limits,
+            timeout=self.timeout,
+            transport=self.transport
+        )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    async def post(self, path: str, body: Dict[str, Any],
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """POST JSON and return the decoded JSON body"""
+        if self._client is None:
+            raise RuntimeError("AsyncRoutingClient must be used inside 'async with'")
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.semaphore:
+                    # Timed inside the semaphore: latency of the call, not of the queue
+                    started = time.perf_counter()
+                    response = await self._client.post(
+                        path, json=body, timeout=timeout or self.timeout
+                    )
+            except httpx.TransportError as e:
+                observe_request(self.provider, path, time.perf_counter() - started, type(e).__name__)
+                failure = f"{type(e).__name__}: {e}"
+            else:
+                observe_request(
+                    self.provider, path, time.perf_counter() - started,
+                    f"http_{response.status_code}" if response.status_code >= 400 else None
+                )
+                if self.on_response is not None:
+                    self.on_response(path, len(response.request.content) + len(response.content))
+                if response.status_code not in RETRY_STATUS_CODES:
+                    return response.json()
+                failure = f"HTTP {response.status_code}"
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+
+        raise RoutingRequestError(
+            f"POST {path} failed after {self.max_retries + 1} attempts ({failure})"
+        )
+
+
+def run_async(coro: Awaitable[T]) -> T:
+    """
+    Run a coroutine to completion from synchronous engine code.
+    Uses a private thread when the caller already runs an event loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    outcome: Dict[str, Any] = {}
+
+    def runner():
+        try:
+            outcome["value"] = asyncio.run(coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=runner, name="routing-async-runner")
+    thread.start()
+    thread.join()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
@@ -0,0 +1,99 @@
+#scripts/cluster_cache.py
+"""
+Cluster Cache
+Solved clusters memoized by input fingerprint
+
+A cluster's fingerprint (OptimizationEngine.cluster_fingerprint) covers its
+hub, member vendors with their milk and windows, vehicle specs, constraints,
+solver stages and routing backend. Equal fingerprints mean the solver would
+be asked the same question, so the stored plan (vehicles, routes, metrics,
+cost) is reused verbatim.
+
+Entries are kept as JSON text: every get() hands out an independent copy,
+and the text is what the service layer persists to Postgres. The in-memory
+store is LRU-bounded with a TTL, like the matrix cache.
+"""
+
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 2000
+
+
+class ClusterCache:
+    """
+    In-memory fingerprint → solved cluster cache.
+    Thread-safe; shared by every run in a worker process.
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # fingerprint → (hub name, cluster JSON, expires_at)
+        self._entries: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.pending: List[Dict[str, Any]] = []
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """A fresh copy of the cached cluster, or None"""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None and entry[2] < time.time():
+                del self._entries[fingerprint]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(fingerprint)
+            self.hits += 1
+            return json.loads(entry[1])
+
+    def put(self, fingerprint: str, hub: str, cluster: Any,
+            expires_at: Optional[float] = None, persist: bool = True):
+        """
+        Store a solved cluster (dict, or JSON text when loaded from storage);
+        queue it for persistence unless it came from storage
+        """
+        payload = cluster if isinstance(cluster, str) else json.dumps(cluster, default=str)
+        expires_at = expires_at or time.time() + self.ttl_seconds
+
+        with self._lock:
+            self._entries[fingerprint] = (hub, payload, expires_at)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            if persist:
+                self.pending.append({
+                    "fingerprint": fingerprint,
+                    "hub": hub,
+                    "cluster": payload,
+                    "expires_at": expires_at,
+                })
+
+    def drain_pending(self) -> List[Dict[str, Any]]:
+        """Hand over entries that still need to be written to storage"""
+        with self._lock:
+            pending, self.pending = self.pending, []
+        return pending
+
+
+_shared_cache: Optional[ClusterCache] = None
+
+
+def shared_cluster_cache(**options) -> ClusterCache:
+    """Process-wide cache reused by every run in this worker"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = ClusterCache(**options)
+    return _shared_cache
@@ -0,0 +1,139 @@
+#scripts/fleet_packing.py
+"""
+Fleet Packing
+Heterogeneous vehicle packing on an indexed pool of remaining stops
+
+Same greedy as the original OptimizationEngine.assign_heterogeneous_fleet:
+for every available vehicle type, fill it first-fit from the largest milk
+quantity down, keep the type with the best utilization, repeat. Instead of
+rescanning every remaining farmer per type, the pool keeps the distinct milk
+quantities sorted and jumps with bisect to the largest quantity that still
+fits, so a trial fill only touches the farmers it actually takes.
+"""
+
+from bisect import bisect_right
+from collections import deque
+from typing import List, Dict, Tuple, Callable, Optional, Any
+
+
+class RemainingStops:
+    """Remaining farmers grouped by milk quantity (ascending), FIFO within a quantity"""
+
+    def __init__(self, farmer_list: List[str], farmers_milk: Dict):
+        groups: Dict[float, deque] = {}
+        for name in farmer_list:
+            groups.setdefault(farmers_milk.get(name, 0), deque()).append(name)
+        self.values = sorted(groups)
+        self.groups = groups
+        self.count = len(farmer_list)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def trial_fill(self, capacity: float) -> Tuple[List[Tuple[int, int]], float]:
+        """
+        First-fit from the largest quantity down, without removing anything.
+
+        Returns:
+            ([(value index, farmers taken)], load) in taking order
+        """
+        taken: List[Tuple[int, int]] = []
+        load = 0
+        upper = len(self.values)     # only strictly smaller quantities are left to try
+
+        while upper > 0:
+            idx = min(bisect_right(self.values, capacity - load), upper) - 1
+            # Use the same `load + milk <= capacity` test as a sequential scan
+            while idx + 1 < upper and load + self.values[idx + 1] <= capacity:
+                idx += 1
+            while idx >= 0 and load + self.values[idx] > capacity:
+                idx -= 1
+            if idx < 0:
+                break
+
+            value = self.values[idx]
+            available = len(self.groups[value])
+            n = 0
+            while n < available and load + value <= capacity:
+                load += value
+                n += 1
+            taken.append((idx, n))
+            upper = idx
+
+        return taken, load
+
+    def take(self, taken: List[Tuple[int, int]]) -> List[str]:
+        """Remove the farmers of a trial fill; returns their names in taking order"""
+        names = []
+        for idx, n in taken:
+            group = self.groups[self.values[idx]]
+            names.extend(group.popleft() for _ in range(n))
+
+        # taken is in descending index order, so deleting keeps earlier indices valid
+        for idx, _ in taken:
+            value = self.values[idx]
+            if not self.groups[value]:
+                del self.groups[value]
+                del self.values[idx]
+
+        self.count -= len(names)
+        return names
+
+    def remaining(self) -> List[Tuple[str, Any]]:
+        """(name, milk) of every farmer left, largest quantity first"""
+        return [(name, value) for value in reversed(self.values) for name in self.groups[value]]
+
+
+def pack_heterogeneous_fleet(farmer_list: List[str], farmers_milk: Dict,
+                             fleet_types_dict: List[Dict], fleet_availability: Dict,
+                             vehicle_info_for: Optional[Callable[[str], Optional[Dict]]] = None):
+    """
+    vehicle_info_for: physical vehicle for a route of the given type, called as
+    each route is given one (e.g. VehiclePool.take)
+
+    Returns:
+        (vehicle_assignments, unassigned_farmers) - same format as the engine's
+        assign_heterogeneous_fleet; fleet_availability is decremented in place
+    """
+    pool = RemainingStops(farmer_list, farmers_milk)
+    sorted_vehicle_types = sorted(fleet_types_dict, key=lambda x: x['capacity'], reverse=True)
+    vehicle_assignments = []
+
+    while len(pool):
+        best = None
+        best_utilization = 0
+
+        for vehicle_spec in sorted_vehicle_types:
+            if fleet_availability.get(vehicle_spec['name'], 0) <= 0:
+                continue
+
+            capacity = vehicle_spec['capacity']
+            taken, load = pool.trial_fill(capacity)
+            if not taken:
+                continue
+
+            utilization = (load / capacity) * 100
+            if utilization > best_utilization:
+                best_utilization = utilization
+                best = (vehicle_spec, taken, load)
+
+        if best is None:
+            break
+
+        vehicle_spec, taken, load = best
+        category_key = vehicle_spec['name']
+        vehicle_assignments.append({
+            "vehicle_type": category_key,
+            "vehicle_spec": vehicle_spec,
+            "vehicle_info": vehicle_info_for(category_key) if vehicle_info_for else None,
+            "farmers": pool.take(taken),
+            "total_milk": load,
+            "utilization": round(best_utilization, 2)
+        })
+        fleet_availability[category_key] = fleet_availability.get(category_key, 0) - 1
+
+    unassigned_farmers = [
+        {"name": name, "milk": milk}
+        for name, milk in pool.remaining()
+    ]
+    return vehicle_assignments, unassigned_farmers
@@ -0,0 +1,126 @@
+#scripts/hub_assignment.py
+"""
+Hub Assignment
+Capacity-aware vendor → chilling center assignment on a NumPy distance matrix
+
+Every vendor first targets its nearest hub. When a hub's capacity runs out,
+the vendors with the least to lose (smallest extra distance to their next
+option) spill to their next-nearest hub, round by round over the k nearest
+hubs. Vendors that fit nowhere stay at their nearest hub and are reported
+as overflow, so no milk is silently dropped.
+
+Unroutable pairs (NaN or inf, e.g. null cells of a tiled ORS matrix) are
+never assigned; a vendor that can reach no hub at all is left unassigned
+(hub index -1) and reported as unreachable.
+"""
+
+import numpy as np
+from typing import Dict, Any, Optional, Sequence
+
+DEFAULT_CANDIDATE_HUBS = 8
+EPSILON = 1e-9
+
+
+def assign_vendors_to_hubs(distances: np.ndarray, demands: Sequence[float],
+                           capacities: Sequence[Optional[float]],
+                           candidate_hubs: int = DEFAULT_CANDIDATE_HUBS) -> Dict[str, Any]:
+    """
+    Args:
+        distances: (vendors, hubs) road distance in km; NaN / inf = unroutable
+        demands: milk (liters) per vendor
+        capacities: liters per hub; None / 0 means unlimited
+        candidate_hubs: nearest hubs a vendor may spill to before the fallback pass
+
+    Returns:
+        {"hub_index": hub per vendor, "assigned_milk": liters per hub,
+         "fill_ratio": assigned / capacity per hub (nan when unlimited),
+         "spilled": vendors not at their nearest hub,
+         "overflow": vendors placed over capacity,
+         "unreachable": vendors with no routable hub (hub index -1)}
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    if np.isnan(distances).any():
+        distances = np.where(np.isnan(distances), np.inf, distances)
+    vendor_count, hub_count = distances.shape
+    demands = np.asarray(demands, dtype=np.float64)
+    capacities = np.asarray(
+        [c if c else np.inf for c in capacities], dtype=np.float64
+    )
+
+    hub_index = np.full(vendor_count, -1, dtype=np.intp)
+    if vendor_count == 0 or hub_count == 0:
+        return _summary(hub_index, demands, capacities, hub_count, 0, 0)
+
+    nearest = np.argmin(distances, axis=1)
+    reachable = np.isfinite(distances[np.arange(vendor_count), nearest])
+    nearest[~reachable] = -1
+    if np.isinf(capacities).all():
+        return _summary(nearest, demands, capacities, hub_count, 0, 0)
+
+    # k nearest hubs per vendor, ordered by distance
+    k = min(candidate_hubs, hub_count)
+    if k < hub_count:
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    else:
+        candidates = np.broadcast_to(np.arange(hub_count), (vendor_count, hub_count)).copy()
+    candidate_dist = np.take_along_axis(distances, candidates, axis=1)
+    order = np.argsort(candidate_dist, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    candidate_dist = np.take_along_axis(candidate_dist, order, axis=1)
+
+    remaining = capacities.copy()
+    pending = np.flatnonzero(reachable)
+
+    for rank in range(k):
+        if pending.size == 0:
+            break
+        # Candidates are sorted, so a vendor unroutable at this rank is at every later one
+        routable = np.isfinite(candidate_dist[pending, rank])
+        waiting, pending = pending[~routable], pending[routable]
+        hubs = candidates[pending, rank]
+        here = candidate_dist[pending, rank]
+        # Vendors whose next option is much farther keep their place first
+        regret = candidate_dist[pending, rank + 1] - here if rank + 1 < k else np.full(pending.size, np.inf)
+
+        by_hub = np.lexsort((-regret, hubs))
+        vendors, hubs = pending[by_hub], hubs[by_hub]
+        load = np.cumsum(demands[vendors])
+        group_start = np.flatnonzero(np.r_[True, hubs[1:] != hubs[:-1]])
+        before_group = np.r_[0.0, load][group_start]
+        load_in_hub = load - np.repeat(before_group, np.diff(np.r_[group_start, len(hubs)]))
+
+        accepted = load_in_hub <= remaining[hubs] + EPSILON
+        hub_index[vendors[accepted]] = hubs[accepted]
+        remaining -= np.bincount(hubs[accepted], weights=demands[vendors[accepted]], minlength=hub_count)
+        pending = np.concatenate([vendors[~accepted], waiting])
+
+    # Fallback: nearest hub with room anywhere, else nearest hub (over capacity)
+    overflow = 0
+    for vendor in pending:
+        has_room = np.flatnonzero((remaining + EPSILON >= demands[vendor]) & np.isfinite(distances[vendor]))
+        if has_room.size:
+            hub = has_room[np.argmin(distances[vendor, has_room])]
+        else:
+            hub = nearest[vendor]
+            overflow += 1
+        hub_index[vendor] = hub
+        remaining[hub] -= demands[vendor]
+
+    spilled = int((hub_index != nearest).sum())
+    return _summary(hub_index, demands, capacities, hub_count, spilled, overflow)
+
+
+def _summary(hub_index: np.ndarray, demands: np.ndarray, capacities: np.ndarray,
+             hub_count: int, spilled: int, overflow: int) -> Dict[str, Any]:
+    assigned = hub_index >= 0
+    assigned_milk = np.bincount(hub_index[assigned], weights=demands[assigned], minlength=hub_count)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fill_ratio = np.where(np.isinf(capacities), np.nan, assigned_milk / capacities)
+    return {
+        "hub_index": hub_index,
+        "assigned_milk": assigned_milk,
+        "fill_ratio": fill_ratio,
+        "spilled": spilled,
+        "overflow": overflow,
+        "unreachable": int((hub_index < 0).sum()),
+    }
@@ -0,0 +1,512 @@
+#scripts/lns.py
+"""
+Large Neighbourhood Search
+Destroy / repair improvement of a cluster's multi-vehicle plan on its matrix
+
+Each iteration removes a handful of stops (random, related, worst-cost or a
+whole route)
+and re-inserts them, together with every stop still unassigned, using greedy
+or regret-2 insertion. Stops may move between vehicles, open a new vehicle
+from the remaining fleet, or stay unassigned (at a penalty larger than any
+route). Distance / deadline limits are soft: the constructive plan may break
+them (fleet packing ignores geography), so excess km and minutes are priced
+well above any routing cost and the search works them out. Operators are picked by adaptive roulette; candidates are accepted
+record-to-record against the best plan, with a threshold that shrinks to
+zero as the time budget runs out.
+
+Operators are plain functions registered in DESTROY_OPERATORS /
+REPAIR_OPERATORS:
+    destroy(lns, plan, count, rng) -> removed stops
+    repair(lns, plan, stops, rng)  -> None (leftovers go to plan.unassigned)
+
+Node 0 of the matrices is the depot; stops are 1..n, like VRPSolver.
+"""
+
+import time
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Any, Callable, Tuple
+
+from scripts.vrp_solver import VRPSolver, DEFAULT_SERVICE_TIME, DEFAULT_SPEED_KMPH, EPSILON
+
+RELATED_NEIGHBOURS = 15
+MIN_REMOVAL = 4
+MAX_REMOVAL = 30
+MAX_REMOVAL_FRACTION = 0.2
+WORST_REMOVAL_RANDOMNESS = 3.0
+START_THRESHOLD = 0.02          # accept up to 2% worse than best at the start
+SCORE_BEST, SCORE_BETTER, SCORE_ACCEPTED = 3.0, 2.0, 1.0
+WEIGHT_DECAY = 0.8
+EXCESS_PENALTY_FACTOR = 10.0    # per km / minute over a limit, × the dearest cost_per_km
+
+
+class Plan:
+    """Routes (vehicle spec + stops) and unassigned stops, with per-route measures"""
+
+    def __init__(self, lns: "LNSImprover", routes: List[Dict], unassigned: Sequence[int]):
+        self.lns = lns
+        self.routes = routes                 # {"vehicle_spec", "stops", "origin"}
+        self.unassigned = list(unassigned)
+        self.home: Dict[int, Dict] = {}      # removed stop → route it came from
+        for route in routes:
+            self.measure(route)
+
+    def copy(self) -> "Plan":
+        clone = Plan.__new__(Plan)
+        clone.lns = self.lns
+        clone.routes = [dict(r, stops=list(r['stops'])) for r in self.routes]
+        clone.unassigned = list(self.unassigned)
+        clone.home = {}
+        return clone
+
+    def measure(self, route: Dict):
+        lns = self.lns
+        path = np.asarray([0] + route['stops'] + [0], dtype=np.intp)
+        route['distance'] = float(lns.dist[path[:-1], path[1:]].sum())
+        route['travel_time'] = float(lns.dur[path[:-1], path[1:]].sum())
+        route['load'] = float(lns.demand[route['stops']].sum())
+
+    def route_cost(self, route: Dict) -> float:
+        if not route['stops']:
+            return 0.0
+        spec = route['vehicle_spec']
+        return spec['fixed_cost'] + route['distance'] * spec['cost_per_km']
+
+    def routing_cost(self) -> float:
+        return sum(self.route_cost(r) for r in self.routes)
+
+    def violations(self) -> int:
+        return sum(1 for r in self.routes if r['stops'] and self.lns.excess(r) > EPSILON)
+
+    def cost(self) -> float:
+        """Routing cost plus penalties for limit excess and stops left out (optional ones too)"""
+        lns = self.lns
+        excess = sum(lns.excess(r) for r in self.routes if r['stops'])
+        return (self.routing_cost() + lns.excess_penalty * excess +
+                lns.unassigned_penalty * len(self.unassigned))
+
+    def route_of(self) -> Dict[int, int]:
+        return {stop: r for r, route in enumerate(self.routes) for stop in route['stops']}
+
+    def remove(self, stops: Sequence[int]):
+        doomed = set(stops)
+        for route in self.routes:
+            if doomed.intersection(route['stops']):
+                self.home.update((s, route) for s in route['stops'] if s in doomed)
+                route['stops'] = [s for s in route['stops'] if s not in doomed]
+                route['dirty'] = True
+                self.measure(route)
+        # Emptied original routes stay (their vehicle is released); new ones go
+        self.routes = [r for r in self.routes if r['stops'] or r['origin'] is not None]
+
+
+# ---------- destroy operators ----------
+
+def random_removal(lns: "LNSImprover", plan: Plan, count: int, rng: np.random.Generator) -> List[int]:
+    served = [s for r in plan.routes for s in r['stops']]
+    if not served:
+        return []
+    return rng.choice(served, size=min(count, len(served)), replace=False).tolist()
+
+
+def related_removal(lns: "LNSImprover", plan: Plan, count: int, rng: np.random.Generator) -> List[int]:
+    """A random stop and the served stops nearest to it (spatially related)"""
+    route_of = plan.route_of()
+    if not route_of:
+        return []
+    seed = int(rng.choice(list(route_of)))
+    removed = [seed]
+    for stop in lns.nearest[seed]:
+        if len(removed) >= count:
+            break
+        if int(stop) in route_of:
+            removed.append(int(stop))
+    return removed
+
+
+def worst_removal(lns: "LNSImprover", plan: Plan, count: int, rng: np.random.Generator) -> List[int]:
+    """Stops with the largest detour, randomized towards the worst"""
+    stops, gains = [], []
+    for route in plan.routes:
+        if not route['stops']:
+            continue
+        path = np.asarray([0] + route['stops'] + [0], dtype=np.intp)
+        gain = (lns.dist[path[:-2], path[1:-1]] + lns.dist[path[1:-1], path[2:]]
+                - lns.dist[path[:-2], path[2:]])
+        stops.extend(route['stops'])
+        gains.extend(gain * route['vehicle_spec']['cost_per_km'])
+    if not stops:
+        return []
+
+    ranked = [stops[i] for i in np.argsort(gains)[::-1]]
+    removed = []
+    while ranked and len(removed) < count:
+        idx = int(rng.random() ** WORST_REMOVAL_RANDOMNESS * len(ranked))
+        removed.append(ranked.pop(idx))
+    return removed
+
+
+def route_removal(lns: "LNSImprover", plan: Plan, count: int, rng: np.random.Generator) -> List[int]:
+    """Every stop of one route (lightly loaded routes first), freeing its vehicle"""
+    routes = [r for r in plan.routes if r['stops']]
+    if len(routes) < 2:
+        return []
+    fill = np.asarray([r['load'] / r['vehicle_spec']['capacity'] for r in routes])
+    weights = (1.0 - fill) + 0.05
+    route = routes[int(rng.choice(len(routes), p=weights / weights.sum()))]
+    return list(route['stops'])
+
+
+# ---------- repair operators ----------
+
+def greedy_insertion(lns: "LNSImprover", plan: Plan, stops: Sequence[int], rng: np.random.Generator):
+    lns.insert(plan, stops, regret=False)
+
+
+def regret_insertion(lns: "LNSImprover", plan: Plan, stops: Sequence[int], rng: np.random.Generator):
+    lns.insert(plan, stops, regret=True)
+
+
+DESTROY_OPERATORS: Dict[str, Callable] = {
+    "random": random_removal,
+    "related": related_removal,
+    "worst": worst_removal,
+    "route": route_removal,
+}
+REPAIR_OPERATORS: Dict[str, Callable] = {
+    "greedy": greedy_insertion,
+    "regret": regret_insertion,
+}
+
+
+class LNSImprover:
+    """
+    Args:
+        distances / durations: (n+1, n+1) cluster matrix, depot first (durations
+                               may be None → distances at the vehicles' speed)
+        demands: milk per stop
+        vehicle_types: engine vehicle types
+        fleet_availability: vehicles still free per type (for new routes);
+                            updated in place with the improved plan's usage
+        optional_stops / optional_capacity: 0-based stops served only while their
+                            total load fits (e.g. another hub's leftovers); they
+                            are not reported as unassigned when left out
+    """
+
+    def __init__(self, distances: np.ndarray, durations: Optional[np.ndarray],
+                 demands: Sequence[float], vehicle_types: List[Dict],
+                 deadline_minutes: float, max_distance_km: float,
+                 fleet_availability: Dict[str, int],
+                 neighbour_lists: Optional[np.ndarray] = None,
+                 optional_stops: Sequence[int] = (), optional_capacity: float = np.inf,
+                 destroy_operators: Optional[Dict[str, Callable]] = None,
+                 repair_operators: Optional[Dict[str, Callable]] = None,
+                 seed: int = 0):
+        self.dist = np.asarray(distances, dtype=np.float64)
+        self.n = self.dist.shape[0] - 1
+        self.demand = np.concatenate([[0.0], np.asarray(demands, dtype=np.float64)])
+        if durations is None:
+            speed = max((v.get('speed_kmph') or DEFAULT_SPEED_KMPH for v in vehicle_types),
+                        default=DEFAULT_SPEED_KMPH)
+            durations = self.dist / speed * 60
+        self.dur = np.asarray(durations, dtype=np.float64)
+        self.vehicle_types = vehicle_types
+        self.deadline_minutes = deadline_minutes
+        self.max_distance_km = max_distance_km
+        self.fleet_availability = fleet_availability
+        self.optional = {int(s) + 1 for s in optional_stops}
+        self.optional_capacity = optional_capacity
+        self.destroy_operators = destroy_operators or DESTROY_OPERATORS
+        self.repair_operators = repair_operators or REPAIR_OPERATORS
+        self.rng = np.random.default_rng(seed)
+
+        k = min(RELATED_NEIGHBOURS, self.n - 1)
+        if neighbour_lists is not None:
+            nearest = np.asarray(neighbour_lists, dtype=np.intp)[:, :k] + 1
+        elif k > 0:
+            block = self.dist[1:, 1:].copy()
+            np.fill_diagonal(block, np.inf)
+            nearest = np.argsort(block, axis=1)[:, :k] + 1
+        else:
+            nearest = np.empty((self.n, 0), dtype=np.intp)
+        # nearest[stop] → stops nearest to it (row 0 unused)
+        self.nearest = np.vstack([np.zeros((1, nearest.shape[1]), dtype=np.intp), nearest])
+        self.near_sets = [set(row.tolist()) for row in self.nearest]
+
+        # Serving any stop beats leaving it out, whatever the route costs
+        self.unassigned_penalty = max(
+            (v['fixed_cost'] + 2 * max_distance_km * v['cost_per_km'] for v in vehicle_types), default=0.0
+        ) + 1.0
+        self.excess_penalty = EXCESS_PENALTY_FACTOR * max(
+            (v['cost_per_km'] for v in vehicle_types), default=1.0
+        )
+        self._spare: Dict[str, int] = {}
+        # Intra-route 2-opt / Or-opt for the start and final plans
+        self._polisher = VRPSolver(
+            self.dist, self.dur, demands, vehicle_types, deadline_minutes, max_distance_km,
+            fleet_availability={v['name']: 1 for v in vehicle_types}
+        )
+
+    # ---------- insertion ----------
+
+    def _optional_load(self, plan: Plan) -> float:
+        return sum(self.demand[s] for r in plan.routes for s in r['stops'] if s in self.optional)
+
+    def _within_limits(self, distance: float, travel_time: float, stops: int, spec: Dict) -> bool:
+        service = spec.get('service_time', DEFAULT_SERVICE_TIME)
+        return (distance <= self.max_distance_km + EPSILON and
+                travel_time + stops * service <= self.deadline_minutes + EPSILON)
+
+    def _excess(self, distance, travel_time, stops: int, spec: Dict):
+        """km over the distance limit + minutes over the deadline (array-friendly)"""
+        service = spec.get('service_time', DEFAULT_SERVICE_TIME)
+        return (np.maximum(distance - self.max_distance_km, 0.0) +
+                np.maximum(travel_time + stops * service - self.deadline_minutes, 0.0))
+
+    def excess(self, route: Dict) -> float:
+        return float(self._excess(route['distance'], route['travel_time'], len(route['stops']),
+                                  route['vehicle_spec']))
+
+    def best_position(self, route: Dict, stop: int) -> Optional[Tuple[float, int]]:
+        """(added cost incl. any added limit excess, position) of the cheapest insertion, or None"""
+        spec = route['vehicle_spec']
+        # Emptied routes have released their vehicle; new stops open a new one
+        if not route['stops'] or route['load'] + self.demand[stop] > spec['capacity'] + EPSILON:
+            return None
+        path = np.asarray([0] + route['stops'] + [0], dtype=np.intp)
+        head, tail = path[:-1], path[1:]
+        added = self.dist[head, stop] + self.dist[stop, tail] - self.dist[head, tail]
+        added_time = self.dur[head, stop] + self.dur[stop, tail] - self.dur[head, tail]
+        added_excess = self._excess(route['distance'] + added, route['travel_time'] + added_time,
+                                    len(route['stops']) + 1, spec) - self.excess(route)
+        cost = added * spec['cost_per_km'] + self.excess_penalty * added_excess
+        pos = int(np.argmin(cost))
+        return float(cost[pos]), pos
+
+    def new_route_option(self, stop: int) -> Optional[Tuple[float, Dict]]:
+        """Cheapest free vehicle that can serve the stop alone"""
+        best = None
+        for spec in self.vehicle_types:
+            if self._spare.get(spec['name'], 0) <= 0 or spec['capacity'] < self.demand[stop]:
+                continue
+            distance = self.dist[0, stop] + self.dist[stop, 0]
+            if not self._within_limits(distance, self.dur[0, stop] + self.dur[stop, 0], 1, spec):
+                continue
+            cost = spec['fixed_cost'] + distance * spec['cost_per_km']
+            if best is None or cost < best[0]:
+                best = (cost, spec)
+        return best
+
+    def _route_options(self, plan: Plan, stop: int, route_of: Dict[int, int]) -> Dict[int, float]:
+        """Cheapest insertion cost per candidate route (its own route or one serving a nearby stop)"""
+        candidates = {route_of[s] for s in self.nearest[stop] if s in route_of}
+        home = plan.home.get(stop)
+        if home is not None and home['stops'] and home['stops'][0] in route_of:
+            candidates.add(route_of[home['stops'][0]])
+        if not candidates:
+            candidates = range(len(plan.routes))
+        options = {}
+        for r in candidates:
+            found = self.best_position(plan.routes[r], stop)
+            if found is not None:
+                options[r] = found[0]
+        return options
+
+    def insert(self, plan: Plan, stops: Sequence[int], regret: bool):
+        """
+        Greedy (cheapest first) or regret-2 insertion of stops + everything
+        unassigned. Options are cached per stop; after each insertion only the
+        changed route is re-priced.
+        """
+        pending = list(dict.fromkeys(list(stops) + plan.unassigned))
+        optional_load = self._optional_load(plan)
+        route_of = plan.route_of()
+        route_options = {stop: self._route_options(plan, stop, route_of) for stop in pending}
+        new_options = {stop: self.new_route_option(stop) for stop in pending}
+
+        while pending:
+            best = None
+            for stop in pending:
+                if stop in self.optional and optional_load + self.demand[stop] > self.optional_capacity:
+                    continue
+                costs = sorted(
+                    [(cost, r) for r, cost in route_options[stop].items()] +
+                    ([new_options[stop]] if new_options[stop] is not None else []),
+                    key=lambda o: o[0]
+                )
+                if not costs:
+                    continue
+                if regret:
+                    second = costs[1][0] if len(costs) > 1 else self.unassigned_penalty
+                    score = costs[0][0] - second
+                else:
+                    score = costs[0][0]
+                if best is None or score < best[0]:
+                    best = (score, stop, costs[0][1])
+            if best is None:
+                break
+
+            _, stop, target = best
+            if isinstance(target, dict):
+                self._spare[target['name']] -= 1
+                r = len(plan.routes)
+                plan.routes.append({'vehicle_spec': target, 'stops': [stop], 'origin': None})
+            else:
+                r = target
+                route = plan.routes[r]
+                route['stops'].insert(self.best_position(route, stop)[1], stop)
+            plan.routes[r]['dirty'] = True
+            plan.measure(plan.routes[r])
+            if stop in self.optional:
+                optional_load += self.demand[stop]
+            pending.remove(stop)
+
+            for other in pending:
+                if r in route_options[other] or stop in self.near_sets[other]:
+                    found = self.best_position(plan.routes[r], other)
+                    if found is None:
+                        route_options[other].pop(r, None)
+                    else:
+                        route_options[other][r] = found[0]
+                if isinstance(target, dict):
+                    new_options[other] = self.new_route_option(other)
+
+        plan.unassigned = pending
+
+    def polish(self, plan: Plan, dirty_only: bool = False):
+        """2-opt / Or-opt every route (or only those changed since the last polish)"""
+        for route in plan.routes:
+            if dirty_only and not route.get('dirty'):
+                continue
+            route['dirty'] = False
+            if len(route['stops']) > 2:
+                route['stops'] = self._polisher.improve(route['stops'])
+                plan.measure(route)
+
+    # ---------- search ----------
+
+    def _spare_for(self, plan: Plan) -> Dict[str, int]:
+        """Free vehicles given the plan's non-empty routes (originals keep theirs)"""
+        spare = dict(self._base_spare)
+        for route in plan.routes:
+            if route['origin'] is None and route['stops']:
+                spare[route['vehicle_spec']['name']] -= 1
+            elif route['origin'] is not None and not route['stops']:
+                spare[route['vehicle_spec']['name']] += 1
+        return spare
+
+    def _pick(self, weights: Dict[str, float]) -> str:
+        names = list(weights)
+        w = np.asarray([weights[n] for n in names])
+        return names[int(self.rng.choice(len(names), p=w / w.sum()))]
+
+    def improve(self, routes: List[Tuple[Dict, Sequence[int]]], unassigned: Sequence[int] = (),
+                time_budget_seconds: float = 1.0, max_iterations: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Args:
+            routes: (vehicle_spec, 0-based stops in visiting order) of the constructive plan
+            unassigned: 0-based stops the constructive plan left out
+
+        Returns:
+            {"routes": [{"vehicle_spec", "stops", "load", "distance", "travel_time",
+                         "origin": index into `routes` or None for a new vehicle}],
+             "unassigned": [...], "optional_served": [...], "stats": {...}}
+            Stops are 0-based; empty routes are dropped (their vehicle is freed).
+        """
+        started = time.perf_counter()
+        deadline = started + time_budget_seconds
+        self._base_spare = dict(self.fleet_availability)
+        initial = Plan(self, [
+            {'vehicle_spec': spec, 'stops': [int(s) + 1 for s in stops], 'origin': i}
+            for i, (spec, stops) in enumerate(routes)
+        ], [int(s) + 1 for s in unassigned] + sorted(self.optional))
+        initial_cost = initial.routing_cost()
+        initial_unassigned = len(unassigned)
+        initial_violations = initial.violations()
+
+        # Constructive plan + whatever unassigned / optional stops fit right away
+        self._spare = self._spare_for(initial)
+        self.insert(initial, [], regret=True)
+        self.polish(initial)
+        current = best = initial
+        best_cost = current_cost = best.cost()
+
+        destroy_weights = {name: 1.0 for name in self.destroy_operators}
+        repair_weights = {name: 1.0 for name in self.repair_operators}
+        usage = {name: {'used': 0, 'improved': 0}
+                 for name in list(self.destroy_operators) + list(self.repair_operators)}
+        iterations = accepted = 0
+        served = sum(len(r['stops']) for r in current.routes) + len(current.unassigned)
+        max_removal = max(MIN_REMOVAL, min(MAX_REMOVAL, int(served * MAX_REMOVAL_FRACTION)))
+
+        while served > 1 and (max_iterations is None or iterations < max_iterations):
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            iterations += 1
+            threshold = START_THRESHOLD * (deadline - now) / time_budget_seconds
+
+            destroy_name, repair_name = self._pick(destroy_weights), self._pick(repair_weights)
+            candidate = current.copy()
+            count = int(self.rng.integers(min(MIN_REMOVAL, served), max_removal + 1))
+            removed = self.destroy_operators[destroy_name](self, candidate, count, self.rng)
+            candidate.remove(removed)
+            self._spare = self._spare_for(candidate)
+            self.repair_operators[repair_name](self, candidate, removed, self.rng)
+            self.polish(candidate, dirty_only=True)
+            candidate_cost = candidate.cost()
+
+            score = 0.0
+            if candidate_cost < best_cost - EPSILON:
+                best, best_cost, score = candidate, candidate_cost, SCORE_BEST
+            elif candidate_cost < current_cost - EPSILON:
+                score = SCORE_BETTER
+            elif candidate_cost <= best_cost * (1 + threshold):
+                score = SCORE_ACCEPTED
+            if score:
+                current, current_cost = candidate, candidate_cost
+                accepted += 1
+
+            for name, weights in ((destroy_name, destroy_weights), (repair_name, repair_weights)):
+                weights[name] = WEIGHT_DECAY * weights[name] + (1 - WEIGHT_DECAY) * max(score, 0.1)
+                usage[name]['used'] += 1
+                usage[name]['improved'] += score == SCORE_BEST
+
+        # Hand the best plan's fleet usage back to the caller
+        self.fleet_availability.clear()
+        self.fleet_availability.update(self._spare_for(best))
+
+        optional_served = sorted(
+            s - 1 for r in best.routes for s in r['stops'] if s in self.optional
+        )
+        result_routes = [
+            {
+                'vehicle_spec': r['vehicle_spec'],
+                'stops': [s - 1 for s in r['stops']],
+                'load': r['load'],
+                'distance': r['distance'],
+                'travel_time': r['travel_time'],
+                'origin': r['origin'],
+            }
+            for r in best.routes if r['stops']
+        ]
+        improved_cost = best.routing_cost()
+        stats = {
+            'iterations': iterations,
+            'accepted': accepted,
+            'constructive_cost': round(initial_cost, 2),
+            'improved_cost': round(improved_cost, 2),
+            'cost_delta': round(improved_cost - initial_cost, 2),
+            'violations_before': initial_violations,
+            'violations_after': best.violations(),
+            'unassigned_before': initial_unassigned,
+            'unassigned_after': sum(1 for s in best.unassigned if s not in self.optional),
+            'optional_served': len(optional_served),
+            'operators': usage,
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+        return {
+            'routes': result_routes,
+            'unassigned': sorted(s - 1 for s in best.unassigned if s not in self.optional),
+            'optional_served': optional_served,
+            'stats': stats,
+        }
@@ -0,0 +1,470 @@
+#scripts/matrix_cache.py
+"""
+Matrix Cache
+Pair-keyed distance/duration cache in front of a RoutingProvider
+
+Keys are coordinate-quantized (5 decimals ≈ 1.1 m) so the same vendor/hub
+maps to the same entry across runs. Entries expire after a TTL and the
+in-memory store is LRU-bounded. New entries are queued in `pending` so the
+async service layer can persist them to Postgres after a run.
+"""
+
+import time
+import threading
+import numpy as np
+from typing import List, Dict, Tuple, Optional, Sequence, Any
+
+from scripts.routing_providers import RoutingProvider, Coord
+
+COORD_PRECISION = 5
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 500_000
+
+
+def coord_key(coord: Coord, precision: int = COORD_PRECISION) -> str:
+    """Quantized cache key for a (lat, lng) pair"""
+    lat, lng = coord
+    return f"{float(lat):.{precision}f},{float(lng):.{precision}f}"
+
+
+class _NamespaceStore:
+    """
+    One namespace's entries as parallel NumPy arrays sorted by pair code
+    (origin id << 32 | destination id), so a whole block is looked up with one
+    searchsorted and inserted with one np.insert. NaN is a stored value
+    (unroutable pair); the has_* flags tell a metric never fetched apart.
+    """
+
+    def __init__(self):
+        self.codes = np.empty(0, dtype=np.int64)
+        self.distance = np.empty(0, dtype=np.float64)
+        self.duration = np.empty(0, dtype=np.float64)
+        self.has_distance = np.empty(0, dtype=bool)
+        self.has_duration = np.empty(0, dtype=bool)
+        self.expires = np.empty(0, dtype=np.float64)
+        self.last_used = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def find(self, codes: np.ndarray):
+        """(positions, found) of codes in the sorted store"""
+        positions = np.searchsorted(self.codes, codes)
+        found = np.zeros(codes.shape, dtype=bool)
+        inside = positions < len(self.codes)
+        found[inside] = self.codes[positions[inside]] == codes[inside]
+        return positions, found
+
+    def keep(self, mask: np.ndarray):
+        for name in ("codes", "distance", "duration", "has_distance", "has_duration", "expires", "last_used"):
+            setattr(self, name, getattr(self, name)[mask])
+
+
+class MatrixCache:
+    """
+    In-memory pair cache: (namespace, origin_key, destination_key) → (distance_km, duration_min)
+    Thread-safe; shared by every run in a worker process.
+
+    Lookups and inserts work on whole blocks (get_block / put_block /
+    put_pairs): location keys are mapped to integer ids once per call and
+    every pair is then handled by vectorized NumPy operations. LRU order is a
+    per-entry "last used" tick, so the least recently used entries are the
+    ones dropped once max_entries is exceeded.
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._ids: Dict[str, int] = {}
+        self._stores: Dict[str, _NamespaceStore] = {}
+        self._tick = 0
+        self._lock = threading.Lock()
+        # Blocks written since the last drain: (namespace, origin keys, destination keys,
+        # distances or None, durations or None, expires_at per pair)
+        self._pending: List[Tuple[str, List[str], List[str], Optional[np.ndarray],
+                                  Optional[np.ndarray], np.ndarray]] = []
+        # Pair lookups over the cache's lifetime (per-run counts live on CachedRoutingProvider)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return sum(len(store) for store in self._stores.values())
+
+    # ---------- key → id ----------
+
+    def _known_ids(self, keys: Sequence[str]) -> np.ndarray:
+        """Ids of keys (-1 for keys never stored)"""
+        get = self._ids.get
+        return np.fromiter((get(k, -1) for k in keys), dtype=np.int64, count=len(keys))
+
+    def _assign_ids(self, keys: Sequence[str]) -> np.ndarray:
+        ids = self._ids
+        for key in keys:
+            if key not in ids:
+                ids[key] = len(ids)
+        return self._known_ids(keys)
+
+    # ---------- block operations ----------
+
+    def get_block(self, namespace: str, origin_keys: Sequence[str], destination_keys: Sequence[str],
+                  metrics: Sequence[str] = ("distance", "duration")
+                  ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (distances, durations, hit) for every origin x destination pair; a pair
+        is a hit when it is live and has every requested metric
+        """
+        shape = (len(origin_keys), len(destination_keys))
+        distances = np.full(shape, np.nan)
+        durations = np.full(shape, np.nan)
+        hit = np.zeros(shape, dtype=bool)
+
+        with self._lock:
+            store = self._stores.get(namespace)
+            if store is None or not len(store) or not all(shape):
+                return distances, durations, hit
+            origins = self._known_ids(origin_keys)
+            destinations = self._known_ids(destination_keys)
+            known = (origins >= 0)[:, None] & (destinations >= 0)[None, :]
+            codes = (origins[:, None] << 32) | np.maximum(destinations, 0)[None, :]
+
+            positions, found = store.find(codes[known])
+            positions = positions[found]
+            live = store.expires[positions] >= time.time()
+            if "distance" in metrics:
+                live &= store.has_distance[positions]
+            if "duration" in metrics:
+                live &= store.has_duration[positions]
+            positions = positions[live]
+
+            cells = np.flatnonzero(known)[np.flatnonzero(found)[live]]
+            hit.flat[cells] = True
+            distances.flat[cells] = store.distance[positions]
+            durations.flat[cells] = store.duration[positions]
+            self._tick += 1
+            store.last_used[positions] = self._tick
+        return distances, durations, hit
+
+    def put_block(self, namespace: str, origin_keys: Sequence[str], destination_keys: Sequence[str],
+                  distances: Optional[np.ndarray], durations: Optional[np.ndarray],
+                  persist: bool = True):
+        """Insert/refresh every origin x destination pair of a fetched block"""
+        shape = (len(origin_keys), len(destination_keys))
+        if not all(shape):
+            return
+        expires_at = np.full(shape[0] * shape[1], time.time() + self.ttl_seconds)
+        with self._lock:
+            origins = self._assign_ids(origin_keys)
+            destinations = self._assign_ids(destination_keys)
+            codes = ((origins[:, None] << 32) | destinations[None, :]).ravel()
+            self._upsert(
+                namespace, codes,
+                None if distances is None else np.asarray(distances, dtype=np.float64).ravel(),
+                None if durations is None else np.asarray(durations, dtype=np.float64).ravel(),
+                expires_at
+            )
+            if persist:
+                self._pending.append((
+                    namespace, list(origin_keys), list(destination_keys),
+                    None if distances is None else np.asarray(distances, dtype=np.float64),
+                    None if durations is None else np.asarray(durations, dtype=np.float64),
+                    expires_at
+                ))
+
+    def put_pairs(self, namespace: str, origin_keys: Sequence[str], destination_keys: Sequence[str],
+                  distances: Sequence[Optional[float]], durations: Sequence[Optional[float]],
+                  expires_at: Sequence[float]):
+        """Insert individual (origin, destination) pairs loaded from storage (not re-persisted)"""
+        if not len(origin_keys):
+            return
+        with self._lock:
+            codes = (self._assign_ids(origin_keys) << 32) | self._assign_ids(destination_keys)
+            self._upsert(
+                namespace, codes,
+                np.array([np.nan if d is None else d for d in distances], dtype=np.float64),
+                np.array([np.nan if d is None else d for d in durations], dtype=np.float64),
+                np.asarray(expires_at, dtype=np.float64),
+                has_distance=np.array([d is not None for d in distances], dtype=bool),
+                has_duration=np.array([d is not None for d in durations], dtype=bool),
+            )
+
+    def _upsert(self, namespace: str, codes: np.ndarray, distances: Optional[np.ndarray],
+                durations: Optional[np.ndarray], expires_at: np.ndarray,
+                has_distance: Optional[np.ndarray] = None, has_duration: Optional[np.ndarray] = None):
+        """Caller holds the lock. A metric that is None (or not has_*) keeps its stored value."""
+        store = self._stores.setdefault(namespace, _NamespaceStore())
+        # Last write wins within one call
+        codes, first = np.unique(codes[::-1], return_index=True)
+        pick = len(expires_at) - 1 - first
+        expires_at = expires_at[pick]
+        size = len(codes)
+        new_distance = np.full(size, np.nan) if distances is None else distances[pick]
+        new_duration = np.full(size, np.nan) if durations is None else durations[pick]
+        set_distance = (np.full(size, distances is not None) if has_distance is None
+                        else has_distance[pick])
+        set_duration = (np.full(size, durations is not None) if has_duration is None
+                        else has_duration[pick])
+        self._tick += 1
+
+        positions, found = store.find(codes)
+        existing = positions[found]
+        update_distance = set_distance[found]
+        update_duration = set_duration[found]
+        store.distance[existing[update_distance]] = new_distance[found][update_distance]
+        store.has_distance[existing[update_distance]] = True
+        store.duration[existing[update_duration]] = new_duration[found][update_duration]
+        store.has_duration[existing[update_duration]] = True
+        store.expires[existing] = expires_at[found]
+        store.last_used[existing] = self._tick
+
+        fresh = ~found
+        if fresh.any():
+            at = positions[fresh]
+            store.codes = np.insert(store.codes, at, codes[fresh])
+            store.distance = np.insert(store.distance, at, new_distance[fresh])
+            store.duration = np.insert(store.duration, at, new_duration[fresh])
+            store.has_distance = np.insert(store.has_distance, at, set_distance[fresh])
+            store.has_duration = np.insert(store.has_duration, at, set_duration[fresh])
+            store.expires = np.insert(store.expires, at, expires_at[fresh])
+            store.last_used = np.insert(store.last_used, at, np.full(int(fresh.sum()), self._tick))
+        self._evict_overflow()
+
+    def _evict_overflow(self):
+        overflow = len(self) - self.max_entries
+        if overflow <= 0:
+            return
+        # Least recently used first, across namespaces
+        ticks = np.concatenate([store.last_used for store in self._stores.values()])
+        cutoff_order = np.argsort(ticks, kind="stable")[:overflow]
+        drop = np.zeros(len(ticks), dtype=bool)
+        drop[cutoff_order] = True
+        offset = 0
+        for store in self._stores.values():
+            size = len(store)
+            store.keep(~drop[offset:offset + size])
+            offset += size
+
+    # ---------- single pairs ----------
+
+    def get(self, namespace: str, origin_key: str, destination_key: str
+            ) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        """Return (distance_km, duration_min) for a live entry, else None"""
+        with self._lock:
+            store = self._stores.get(namespace)
+            origin, destination = self._ids.get(origin_key), self._ids.get(destination_key)
+            if store is None or origin is None or destination is None:
+                return None
+            positions, found = store.find(np.array([(origin << 32) | destination], dtype=np.int64))
+            if not found[0] or store.expires[positions[0]] < time.time():
+                return None
+            i = positions[0]
+            self._tick += 1
+            store.last_used[i] = self._tick
+            return (float(store.distance[i]) if store.has_distance[i] else None,
+                    float(store.duration[i]) if store.has_duration[i] else None)
+
+    def put(self, namespace: str, origin_key: str, destination_key: str,
+            distance_km: Optional[float], duration_min: Optional[float],
+            expires_at: Optional[float] = None, persist: bool = True):
+        """Insert/refresh an entry; queue it for persistence unless loaded from storage"""
+        expires_at = expires_at or time.time() + self.ttl_seconds
+        with self._lock:
+            codes = (self._assign_ids([origin_key]) << 32) | self._assign_ids([destination_key])
+            self._upsert(
+                namespace, codes,
+                np.array([np.nan if distance_km is None else distance_km], dtype=np.float64),
+                np.array([np.nan if duration_min is None else duration_min], dtype=np.float64),
+                np.array([expires_at]),
+                has_distance=np.array([distance_km is not None]),
+                has_duration=np.array([duration_min is not None]),
+            )
+            if persist:
+                self._pending.append((
+                    namespace, [origin_key], [destination_key],
+                    None if distance_km is None else np.array([[distance_km]], dtype=np.float64),
+                    None if duration_min is None else np.array([[duration_min]], dtype=np.float64),
+                    np.array([expires_at])
+                ))
+
+    # ---------- bookkeeping ----------
+
+    def record_lookups(self, hits: int, misses: int):
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def drain_pending(self) -> List[Dict[str, Any]]:
+        """Hand over entries that still need to be written to storage (one dict per pair)"""
+        with self._lock:
+            blocks, self._pending = self._pending, []
+
+        entries = []
+        for namespace, origin_keys, destination_keys, distances, durations, expires_at in blocks:
+            width = len(destination_keys)
+            for i, origin_key in enumerate(origin_keys):
+                for j, destination_key in enumerate(destination_keys):
+                    entries.append({
+                        "namespace": namespace,
+                        "origin_key": origin_key,
+                        "destination_key": destination_key,
+                        "distance_km": None if distances is None else float(distances[i, j]),
+                        "duration_min": None if durations is None else float(durations[i, j]),
+                        "expires_at": float(expires_at[i * width + j]),
+                    })
+        return entries
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        removed = 0
+        with self._lock:
+            for store in self._stores.values():
+                live = store.expires >= now
+                removed += int((~live).sum())
+                store.keep(live)
+        return removed
+
+
+_shared_cache: Optional[MatrixCache] = None
+
+
+def shared_matrix_cache(**options) -> MatrixCache:
+    """Process-wide cache reused by every run in this worker"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = MatrixCache(**options)
+    return _shared_cache
+
+
+def existing_shared_matrix_cache() -> Optional[MatrixCache]:
+    """The process-wide cache if a run has created it (for metrics), without creating it"""
+    return _shared_cache
+
+
+class CachedRoutingProvider(RoutingProvider):
+    """
+    Wraps a provider so matrix() is served from a MatrixCache first.
+    Only rows/columns containing a miss are requested from the wrapped provider.
+    """
+
+    def __init__(self, provider: RoutingProvider, cache: MatrixCache):
+        self.provider = provider
+        self.cache = cache
+        self.name = provider.name
+        self.remote = provider.remote
+        self.namespace = provider.cache_namespace
+        self.hits = 0
+        self.misses = 0
+        self.fetched_elements = 0
+
+    def attach_perf(self, perf):
+        self.perf = perf
+        self.provider.attach_perf(perf)
+
+    def matrix(self, sources: Sequence[Coord], destinations: Sequence[Coord],
+               metrics: Sequence[str] = ("distance",)) -> Dict[str, np.ndarray]:
+        return self.matrix_many([(sources, destinations)], metrics)[0]
+
+    def matrix_many(self, blocks: Sequence[Tuple[Sequence[Coord], Sequence[Coord]]],
+                    metrics: Sequence[str] = ("distance",)) -> List[Dict[str, np.ndarray]]:
+        """
+        Each matrix is looked up in the cache; the misses of all of them go to
+        the wrapped provider in one matrix_many call
+        """
+        lookups, fetches = [], []
+        for sources, destinations in blocks:
+            src_keys = [coord_key(c) for c in sources]
+            dst_keys = [coord_key(c) for c in destinations]
+            distances, durations, hit = self.cache.get_block(self.namespace, src_keys, dst_keys, metrics)
+
+            hit_count = int(hit.sum())
+            self.hits += hit_count
+            self.misses += hit.size - hit_count
+            self.cache.record_lookups(hit_count, hit.size - hit_count)
+
+            lookups.append((sources, destinations, src_keys, dst_keys, distances, durations))
+            fetches.extend((len(lookups) - 1, rows, cols) for rows, cols in self._miss_blocks(hit))
+
+        if fetches:
+            fetched = self.provider.matrix_many(
+                [([lookups[i][0][r] for r in rows], [lookups[i][1][c] for c in cols]) for i, rows, cols in fetches],
+                metrics
+            )
+            for (i, rows, cols), block in zip(fetches, fetched):
+                self._store_block(lookups[i], rows, cols, block, metrics)
+
+        results = []
+        for _, _, _, _, distances, durations in lookups:
+            result = {}
+            if "distance" in metrics:
+                result["distances"] = distances
+            if "duration" in metrics:
+                result["durations"] = durations
+            results.append(result)
+        return results
+
+    @staticmethod
+    def _miss_blocks(hit: np.ndarray) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        New locations miss their whole row: those against every column, then the
+        remaining misses as one (missing rows x missing columns) block
+        """
+        if hit.all():
+            return []
+        new_rows = ~hit.any(axis=1)
+        blocks = []
+        if new_rows.any():
+            blocks.append((np.flatnonzero(new_rows), np.arange(hit.shape[1])))
+        partial = hit.copy()
+        partial[new_rows] = True
+        if not partial.all():
+            blocks.append((np.flatnonzero(~partial.all(axis=1)), np.flatnonzero(~partial.all(axis=0))))
+        return blocks
+
+    def _store_block(self, lookup, rows, cols, fetched, metrics):
+        """Copy one fetched sub-matrix into a lookup's result and cache every pair"""
+        _, _, src_keys, dst_keys, distances, durations = lookup
+        want_distance = "distance" in metrics
+        want_duration = "duration" in metrics
+        self.fetched_elements += len(rows) * len(cols)
+
+        block = np.ix_(rows, cols)
+        if want_distance:
+            distances[block] = fetched["distances"]
+        if want_duration:
+            durations[block] = fetched["durations"]
+
+        self.cache.put_block(
+            self.namespace, [src_keys[i] for i in rows], [dst_keys[j] for j in cols],
+            fetched["distances"] if want_distance else None,
+            fetched["durations"] if want_duration else None,
+        )
+
+    def optimize_route(self, *args, **kwargs):
+        return self.provider.optimize_route(*args, **kwargs)
+
+    def route_metrics(self, *args, **kwargs):
+        return self.provider.route_metrics(*args, **kwargs)
+
+    def duration_factor(self, *args, **kwargs):
+        return self.provider.duration_factor(*args, **kwargs)
+
+    def route_geometry(self, *args, **kwargs):
+        return self.provider.route_geometry(*args, **kwargs)
+
+    def session(self):
+        return self.provider.session()
+
+    async def optimize_route_async(self, *args, **kwargs):
+        return await self.provider.optimize_route_async(*args, **kwargs)
+
+    async def route_geometry_async(self, *args, **kwargs):
+        return await self.provider.route_geometry_async(*args, **kwargs)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "fetched_elements": self.fetched_elements,
+        }
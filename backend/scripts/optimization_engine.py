@@ -9,13 +9,43 @@ so frontend can plot markers correctly.
 """
 
 import json
-import requests
+import hashlib
+import math
 import os
+import asyncio
+import time
+import numpy as np
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict, Any, Tuple, Optional
+from typing import List, Dict, Any, Tuple, Optional, Callable, Sequence
+
+from scripts.routing_providers import (
+    RoutingProvider, ORSRoutingProvider, ORS_API_KEY, haversine_matrix, route_matrix_metrics
+)
+from scripts.async_routing import run_async
+from scripts.vrp_solver import DEFAULT_NEIGHBOURS
+from scripts.parallel_clusters import cluster_solver, plan_clusters
+from scripts.hub_assignment import assign_vendors_to_hubs, DEFAULT_CANDIDATE_HUBS
+from scripts.spatial_index import SpatialIndex
+from scripts.fleet_packing import pack_heterogeneous_fleet
+from scripts.vehicle_pool import VehiclePool
+from scripts.lns import LNSImprover
+from scripts.time_windows import TimeWindows
+from scripts.perf import PerfRecorder, maybe_span
+from scripts.cluster_cache import ClusterCache
+from scripts.trip_scheduling import (
+    schedule_trips, vehicles_with_time_left, DEFAULT_UNLOAD_MINUTES, MAX_EXTRA_TRIP_ROUNDS
+)
 
 # ========== API CONFIGURATION ==========
-API_KEY = "eyJvcmciOiI1YjNjZTM1OTc4NTExMTAwMDFjZjYyNDgiLCJpZCI6ImIyNjFmZWMzYWRhNTRmMDE5YzVjZWZkYTQ2MzRjNzk2IiwiaCI6Im11cm11cjY0In0="
+API_KEY = ORS_API_KEY
+
+# "provider": fleet packing + per-vehicle ordering by the routing provider
+# "native":   in-process savings + local search on the cluster matrix
+ROUTE_SOLVERS = ("provider", "native")
+
+# Hubs an unassigned vendor may be rescued by during the LNS stage
+LNS_RESCUE_HUBS = 3
 
 class OptimizationEngine:
     """
@@ -24,20 +54,79 @@ class OptimizationEngine:
     NOW INCLUDES: Unassigned farmer tracking and unused vehicle reporting
     """
     
-    def __init__(self):
-        """Initialize the optimization engine with empty data structures"""
+    def __init__(self, routing_provider: Optional[RoutingProvider] = None):
+        """Initialize the optimization engine with empty data structures
+
+        Args:
+            routing_provider: Backend for matrix / route calls (defaults to ORS)
+        """
         self.centroids = {}
         self.center_capacity = {}
         self.subareas = {}
         self.farmers_milk = {}
         self.api_key = API_KEY
         self.fleet_lookup = {}   # Added for safety
+        self.vehicle_pool = VehiclePool()   # physical vehicles of the current run
+        self.cluster_legs: Dict[Tuple[float, float], List[Tuple[Dict[str, int], Dict]]] = {}   # see remember_legs
+        self.pickup_windows = {}  # farmer -> (start, end) minutes after collection starts
+        self.hub_windows = {}     # hub -> (open, close) minutes
+        self.perf: Optional[PerfRecorder] = None   # set while run_optimization runs
+        self.routing_provider = routing_provider or ORSRoutingProvider(api_key=self.api_key)
     
-    def set_data(self, centroids: Dict, center_capacity: Dict, subareas: Dict, farmers_milk: Dict):
+    def set_data(self, centroids: Dict, center_capacity: Dict, subareas: Dict, farmers_milk: Dict,
+                 pickup_windows: Optional[Dict] = None, hub_windows: Optional[Dict] = None):
         self.centroids = centroids
         self.center_capacity = center_capacity
         self.subareas = subareas
         self.farmers_milk = farmers_milk
+        self.pickup_windows = pickup_windows or {}
+        self.hub_windows = hub_windows or {}
+    
+    def cluster_time_windows(self, cluster_name: str, farmers: List[str], durations: np.ndarray,
+                             service_time: float) -> Optional[TimeWindows]:
+        """Pickup windows on a (hub + farmers) duration matrix, or None when nobody has one"""
+        stop_windows = [self.pickup_windows.get(f) for f in farmers]
+        hub_window = self.hub_windows.get(cluster_name)
+        if not TimeWindows.constrained(stop_windows, hub_window):
+            return None
+        return TimeWindows.from_windows(durations, stop_windows, hub_window, service_time)
+    
+    def late_farmers(self, cluster_name: str, route: List[str], vehicle_spec: Dict,
+                     depart_minute: float = 0.0) -> List[str]:
+        """
+        Farmers on a route (in driving order) whose pickup window closes before
+        the vehicle gets there; depart_minute is when it leaves the hub (later
+        trips of a multi-trip vehicle).
+        """
+        farmers = [f for f in route if f in self.subareas]
+        stop_windows = [self.pickup_windows.get(f) for f in farmers]
+        opens, closes = self.hub_windows.get(cluster_name) or (None, None)
+        if not farmers or not TimeWindows.constrained(stop_windows, (opens, closes)):
+            return []
+        durations = self.route_durations(cluster_name, farmers) * self.routing_provider.duration_factor(vehicle_spec)
+        windows = TimeWindows.from_windows(
+            durations, stop_windows, (max(opens or 0, depart_minute), closes),
+            vehicle_spec.get('service_time', 4)
+        )
+        return [farmers[i] for i in windows.late_stops(range(1, len(farmers) + 1))]
+    
+    def remember_legs(self, hub_coords: Tuple[float, float], farmers: Sequence[str], matrix: Dict):
+        """Keep a (hub + farmers) cluster matrix of this run for later per-route lookups"""
+        position = {f: i + 1 for i, f in enumerate(farmers)}
+        self.cluster_legs.setdefault(tuple(hub_coords), []).append((position, matrix))
+    
+    def route_durations(self, cluster_name: str, farmers: Sequence[str]) -> np.ndarray:
+        """
+        (hub + farmers) duration matrix, indexed out of a cluster matrix already
+        built this run; only measured anew when none covers every farmer
+        """
+        hub_coords = tuple(self.centroids[cluster_name])
+        for position, matrix in reversed(self.cluster_legs.get(hub_coords, [])):
+            if all(f in position for f in farmers):
+                idx = [0] + [position[f] for f in farmers]
+                return np.asarray(matrix['durations'], dtype=np.float64)[np.ix_(idx, idx)]
+        points = [hub_coords] + [tuple(self.subareas[f]) for f in farmers]
+        return np.asarray(self.cluster_matrix(points)['durations'], dtype=np.float64)
     
     def load_data_from_files(self):
         try:
@@ -106,246 +195,1015 @@ class OptimizationEngine:
 
     def get_optimized_route(self, cluster_center: Tuple[float, float], 
                         route_coords: List[Tuple[float, float]], 
-                        farmer_names: List[str]) -> Tuple[List[str], Optional[float], Optional[float]]:
+                        farmer_names: List[str],
+                        vehicle: Optional[Dict] = None) -> Tuple[List[str], Optional[float], Optional[float]]:
 
         if not route_coords or len(route_coords) == 0:
             return farmer_names, None, None
         
-        # full_route_coords expects items as (lat, lon)
-        full_route_coords = [cluster_center] + route_coords + [cluster_center]
-        # ORS expects coords as [lon, lat]
-        coordinates = [[lon, lat] for lat, lon in full_route_coords]
-        
-        url = "https://api.openrouteservice.org/v2/directions/driving-car"
-        headers = {
-            'Authorization': self.api_key,
-            'Content-Type': 'application/json'
-        }
-        
-        payload = {
-            'coordinates': coordinates,
-            'radiuses': [-1] * len(coordinates),
-            'instructions': False
-        }
-        
         try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                route = data['routes'][0]
-                summary = route['summary']
-                
-                distance_m = summary['distance']
-                duration_s = summary['duration']
-                
-                distance_km = distance_m / 1000
-                travel_time_min = duration_s / 60
-                
-                # way_points / waypoint_order handling
-                waypoint_order = route.get('way_points', list(range(len(coordinates))))
-                
-                if len(waypoint_order) > 2:
-                    farmer_indices = waypoint_order[1:-1]
-                    optimized_farmer_order = [farmer_names[i - 1] for i in farmer_indices if 0 <= i - 1 < len(farmer_names)]
-                else:
-                    optimized_farmer_order = farmer_names
-                
-                return optimized_farmer_order, distance_km, travel_time_min
-                
-            else:
-                return farmer_names, None, None
-                
+            distance_km, travel_time_min = self.measure_route(cluster_center, route_coords, vehicle)
         except Exception:
             return farmer_names, None, None
 
+        # Measured in the order given
+        return farmer_names, distance_km, travel_time_min
+    
+    def cluster_matrix(self, points: Sequence[Tuple[float, float]]) -> Dict[str, np.ndarray]:
+        """
+        Distance and duration between every pair of points in one matrix pass.
+        Both metrics are always requested together: ORS charges per element,
+        not per metric, and cached pairs then serve every later lookup.
+        """
+        with maybe_span(self.perf, "matrix"):
+            return self.routing_provider.matrix(points, points, metrics=("distance", "duration"))
+    
+    def measure_route(self, hub_coords: Tuple[float, float], stop_coords: Sequence[Tuple[float, float]],
+                      vehicle: Optional[Dict] = None) -> Tuple[Optional[float], Optional[float]]:
+        """Distance (km) and travel time (minutes) of hub → stops → hub, summed over matrix legs"""
+        if not stop_coords:
+            return None, None
+        points = [tuple(hub_coords)] + [tuple(c) for c in stop_coords]
+        matrix = self.cluster_matrix(points)
+        return route_matrix_metrics(
+            matrix['distances'], matrix['durations'], [0, *range(1, len(points)), 0],
+            self.routing_provider.duration_factor(vehicle)
+        )
+
     def assign_heterogeneous_fleet(self, farmer_list: List[str], cluster_name: str, 
                                    farmers_milk: Dict, fleet_types_dict: List[Dict],
                                    fleet_availability: Dict):
-
-        total_milk = sum(farmers_milk.get(f, 0) for f in farmer_list)
-        farmers_sorted = sorted(
-            [(name, farmers_milk.get(name, 0)) for name in farmer_list],
-            key=lambda x: x[1],
-            reverse=True
+        """Greedy best-utilization packing (see scripts/fleet_packing.py)"""
+        return pack_heterogeneous_fleet(
+            farmer_list, farmers_milk, fleet_types_dict, fleet_availability,
+            vehicle_info_for=self.vehicle_pool.take
         )
+    
+    def solve_cluster_native(self, cluster_name: str, farmer_list: List[str],
+                             vehicle_types_list: List[Dict], fleet_availability: Dict,
+                             deadline_minutes: int, max_distance_km: int,
+                             seed_routes: Optional[List[List[str]]] = None,
+                             time_budget_seconds: Optional[float] = None):
+        """
+        Plan a cluster with the in-process VRP solver (no per-vehicle routing calls).
+        Returns the same vehicle assignments / unassigned farmers as
+        assign_heterogeneous_fleet, plus the route evaluation of every vehicle.
         
-        vehicle_assignments = []
-        remaining_farmers = farmers_sorted.copy()
-        
-        sorted_vehicle_types = sorted(fleet_types_dict, key=lambda x: x['capacity'], reverse=True)
+        seed_routes: farmer names per route of an earlier plan, used as the
+        solver's starting solution (farmers not in this cluster are ignored)
+        time_budget_seconds: improvement budget for this cluster (anytime mode)
+        """
+        farmers = [f for f in farmer_list if f in self.subareas]
+        if not farmers:
+            return [], [], [], {}
         
-        while remaining_farmers:
-            best_assignment = None
-            best_utilization = 0
-            
-            for vehicle_spec in sorted_vehicle_types:
-                if fleet_availability.get(vehicle_spec['name'], 0) <= 0:
-                    continue
-                
-                current_vehicle_farmers = []
-                current_load = 0
-                capacity = vehicle_spec['capacity']
-                
-                for farmer, milk in remaining_farmers:
-                    if current_load + milk <= capacity:
-                        current_vehicle_farmers.append(farmer)
-                        current_load += milk
-                
-                if not current_vehicle_farmers:
-                    continue
-                
-                utilization = (current_load / capacity) * 100
-                if utilization > best_utilization:
-                    best_utilization = utilization
-
-                    category_key = vehicle_spec['name']
-                    vehicle_info = None
-                    
-                    if hasattr(self, 'fleet_lookup') and category_key in self.fleet_lookup:
-                        used_count = sum(1 for v in vehicle_assignments if v['vehicle_type'] == category_key)
-                        
-                        if used_count < len(self.fleet_lookup[category_key]):
-                            vehicle_info = self.fleet_lookup[category_key][used_count]
-                        else:
-                            vehicle_info = self.fleet_lookup[category_key][0] if self.fleet_lookup[category_key] else None
-                    
-                    best_assignment = {
-                        "vehicle_type": vehicle_spec['name'],
-                        "vehicle_spec": vehicle_spec,
-                        "vehicle_info": vehicle_info,
-                        "farmers": current_vehicle_farmers,
-                        "total_milk": current_load,
-                        "utilization": round(utilization, 2)
-                    }
+        task, matrix = self.native_cluster_task(
+            cluster_name, farmers, vehicle_types_list, deadline_minutes, max_distance_km,
+            seed_routes, time_budget_seconds
+        )
+        solution = cluster_solver(task, matrix['distances'], matrix['durations'], fleet_availability).solve(
+            task['seed_routes'], time_budget_seconds=time_budget_seconds
+        )
+        return self.native_cluster_result(farmers, solution)
+    
+    def native_cluster_task(self, cluster_name: str, farmers: List[str], vehicle_types_list: List[Dict],
+                            deadline_minutes: int, max_distance_km: int,
+                            seed_routes: Optional[List[List[str]]] = None,
+                            time_budget_seconds: Optional[float] = None) -> Tuple[Dict, Dict[str, np.ndarray]]:
+        """
+        Everything the native solver needs for a cluster besides the fleet, as a
+        picklable task for scripts/parallel_clusters.py, plus the cluster matrix
+        """
+        points = [tuple(self.centroids[cluster_name])] + [tuple(self.subareas[f]) for f in farmers]
+        matrix = self.cluster_matrix(points)
+        self.remember_legs(points[0], farmers, matrix)
+        # Longest service time of the fleet, so windows hold for any vehicle picked
+        windows = self.cluster_time_windows(
+            cluster_name, farmers, matrix['durations'],
+            max((v.get('service_time', 4) for v in vehicle_types_list), default=4)
+        )
+        position = {name: i for i, name in enumerate(farmers)}
+        task = {
+            'name': cluster_name,
+            'demands': [self.farmers_milk.get(f, 0) for f in farmers],
+            'vehicle_types': vehicle_types_list,
+            'deadline_minutes': deadline_minutes,
+            'max_distance_km': max_distance_km,
+            'neighbour_lists': SpatialIndex(points[1:]).neighbour_lists(DEFAULT_NEIGHBOURS),
+            # Window bounds only; the durations come from the matrix
+            'windows': (windows.earliest, windows.latest, windows.service_time) if windows else None,
+            'seed_routes': [
+                [position[name] for name in route if name in position] for route in seed_routes
+            ] if seed_routes else None,
+            'time_budget_seconds': time_budget_seconds,
+        }
+        return task, matrix
+    
+    def native_cluster_result(self, farmers: List[str], solution: Dict):
+        """VRPSolver solution → (vehicle assignments, unassigned farmers, evaluations, stats)"""
+        vehicle_assignments, evaluations = [], []
+        for route in solution['routes']:
+            vehicle_spec = route['vehicle_spec']
+            route_farmers = [farmers[i] for i in route['stops']]
             
-            if best_assignment:
-                vehicle_assignments.append(best_assignment)
-                fleet_availability[best_assignment["vehicle_type"]] = fleet_availability.get(best_assignment["vehicle_type"], 0) - 1
-                assigned_names = set(best_assignment["farmers"])
-                remaining_farmers = [(f, m) for f, m in remaining_farmers if f not in assigned_names]
-            else:
-                break
+            vehicle_assignments.append({
+                "vehicle_type": vehicle_spec['name'],
+                "vehicle_spec": vehicle_spec,
+                "vehicle_info": self.vehicle_pool.take(vehicle_spec['name']),
+                "farmers": route_farmers,
+                "total_milk": route['load'],
+                "utilization": round(route['load'] / vehicle_spec['capacity'] * 100, 2)
+            })
+            evaluations.append({
+                'route': route_farmers,
+                'distance': round(route['distance'], 2),
+                'travel_time': round(route['travel_time'], 2),
+                'requests': 0
+            })
         
         unassigned_farmers = [
-            {"name": name, "milk": milk} 
-            for name, milk in remaining_farmers
+            {"name": farmers[i], "milk": self.farmers_milk.get(farmers[i], 0)}
+            for i in solution['unassigned']
         ]
+        return vehicle_assignments, unassigned_farmers, evaluations, solution['stats']
+    
+    def solve_clusters_parallel(self, cluster_jobs: List[Tuple[str, List[str]]],
+                                vehicle_types_list: List[Dict], fleet_availability: Dict,
+                                deadline_minutes: int, max_distance_km: int,
+                                seed_routes: Dict[str, List[List[str]]],
+                                time_budget_seconds: Optional[float], workers: Optional[int],
+                                on_planned: Optional[Callable[[str], None]] = None) -> Tuple[List[Tuple], Dict]:
+        """
+        solve_cluster_native for many clusters, planned on a process pool
+        (see scripts/parallel_clusters.py) and merged in cluster_jobs order.
+        
+        time_budget_seconds: shared the way the sequential loop shares it, scaled
+        by the number of workers since clusters are planned side by side
         
-        return vehicle_assignments, unassigned_farmers
+        Returns:
+            ([solve_cluster_native result per job], {"workers", "clusters", "replanned"})
+        """
+        tasks, matrices, cluster_farmers = [], {}, []
+        total_stops = sum(len(subarea_list) for _, subarea_list in cluster_jobs)
+        pool_size = max(1, min(workers or os.cpu_count() or 1, len(cluster_jobs)))
+        for centroid_name, subarea_list in cluster_jobs:
+            farmers = [f for f in subarea_list if f in self.subareas]
+            cluster_farmers.append(farmers)
+            if not farmers:
+                continue
+            budget = None
+            if time_budget_seconds:
+                budget = max(time_budget_seconds * min(pool_size * len(subarea_list) / max(total_stops, 1), 1), 1e-6)
+            task, matrix = self.native_cluster_task(
+                centroid_name, farmers, vehicle_types_list, deadline_minutes, max_distance_km,
+                seed_routes.get(centroid_name), budget
+            )
+            tasks.append(task)
+            matrices[f"{centroid_name}:distance"] = np.asarray(matrix['distances'], dtype=np.float64)
+            matrices[f"{centroid_name}:duration"] = np.asarray(matrix['durations'], dtype=np.float64)
+        
+        plans = dict(zip(
+            (task['name'] for task in tasks),
+            plan_clusters(
+                tasks, matrices, fleet_availability, max_workers=pool_size,
+                on_planned=(lambda index: on_planned(tasks[index]['name'])) if on_planned else None
+            )
+        ))
+        
+        # Deterministic merge: vehicles are handed out in cluster order from the shared fleet
+        solved, replanned = [], 0
+        tasks_by_name = {task['name']: task for task in tasks}
+        for (centroid_name, _), farmers in zip(cluster_jobs, cluster_farmers):
+            if not farmers:
+                solved.append(([], [], [], {}))
+                continue
+            task = tasks_by_name[centroid_name]
+            solver = cluster_solver(
+                task, matrices[f"{centroid_name}:distance"], matrices[f"{centroid_name}:duration"],
+                fleet_availability
+            )
+            plan = plans[centroid_name]
+            if (solver.reference or {}).get('name') != plan['reference']:
+                # Earlier clusters used up this plan's reference vehicle: re-plan with what is left
+                replanned += 1
+                solution = solver.solve(task['seed_routes'], time_budget_seconds=task['time_budget_seconds'])
+            else:
+                solution = solver.assign_vehicles(plan)
+            solved.append(self.native_cluster_result(farmers, solution))
+        
+        return solved, {'workers': pool_size, 'clusters': len(tasks), 'replanned': replanned}
+    
+    def vendor_hub_distances(self, candidate_hubs: int = DEFAULT_CANDIDATE_HUBS) -> np.ndarray:
+        """
+        (vendors, hubs) road distance matrix for hub assignment.
+        
+        With more hubs than candidate_hubs, only each vendor's nearest hubs
+        (great-circle, via a SpatialIndex) get road distances: one column per
+        hub for the vendors that shortlisted it, all requested together
+        (matrix_many). Pairs never measured rank behind every measured one, in
+        great-circle order, so the assignment's fallback pass still prefers
+        nearby hubs.
+        
+        Pairs the router could not route (NaN) come back as inf, so they are
+        never assigned; neither is a vendor none of whose shortlisted hubs
+        could be routed to (its unmeasured hubs stay inf too).
+        """
+        origins = [tuple(coords) for coords in self.subareas.values()]
+        destinations = [tuple(coords) for coords in self.centroids.values()]
+        if len(destinations) <= candidate_hubs or not origins:
+            road = np.asarray(self.routing_provider.matrix(
+                origins, destinations, metrics=("distance", "duration")
+            )['distances'], dtype=np.float64)
+            return np.where(np.isnan(road), np.inf, road)
+        
+        shortlist, _ = SpatialIndex(destinations).nearest_many(origins, candidate_hubs)
+        road = np.full((len(origins), len(destinations)), np.inf)
+        requested = np.zeros(road.shape, dtype=bool)
+        columns = []
+        for hub_idx in range(len(destinations)):
+            vendors = np.flatnonzero((shortlist == hub_idx).any(axis=1))
+            if vendors.size:
+                columns.append((hub_idx, vendors))
+        measured_columns = self.routing_provider.matrix_many(
+            [([origins[v] for v in vendors], [destinations[hub_idx]]) for hub_idx, vendors in columns],
+            metrics=("distance", "duration")
+        )
+        for (hub_idx, vendors), column in zip(columns, measured_columns):
+            road[vendors, hub_idx] = np.asarray(column['distances'], dtype=np.float64)[:, 0]
+            requested[vendors, hub_idx] = True
+        
+        road[np.isnan(road)] = np.inf
+        measured = np.isfinite(road)
+        farthest = np.where(measured, road, 0).max(axis=1, keepdims=True)
+        # A vendor with no routable shortlisted hub is not sent to an unchecked one
+        farthest[~measured.any(axis=1)] = np.inf
+        unmeasured = farthest + haversine_matrix(origins, destinations)
+        print(f"📍 Hub shortlist: {int(requested.sum())} of {road.size} vendor-hub distances requested")
+        return np.where(requested, road, unmeasured)
+    
+    @staticmethod
+    def seed_routes_from_results(seed_results: Optional[Dict]) -> Dict[str, List[List[str]]]:
+        """
+        Farmer names per vehicle route of a stored run, by hub. Accepts engine
+        output as well as manual schedules saved via /trips/schedule/update,
+        where farmers may have been moved without re-ordering `route`.
+        """
+        seeds: Dict[str, List[List[str]]] = {}
+        for cluster in (seed_results or {}).get('clusters', []):
+            routes = []
+            for vehicle in cluster.get('vehicles', []):
+                farmers = [
+                    f.get('name') if isinstance(f, dict) else f
+                    for f in vehicle.get('farmers', [])
+                ]
+                members = set(farmers)
+                ordered = [name for name in vehicle.get('route') or [] if name in members]
+                in_route = set(ordered)
+                ordered += [name for name in farmers if name not in in_route]
+                if ordered:
+                    routes.append(ordered)
+            if routes:
+                seeds.setdefault(cluster.get('name'), []).extend(routes)
+        return seeds
+    
+    def cluster_fingerprint(self, centroid_name: str, subarea_list: List[str],
+                            vehicle_types_list: List[Dict], deadline_minutes: int,
+                            max_distance_km: int, solver: str) -> str:
+        """
+        Hash of every input a cluster's plan depends on: the hub, its assigned
+        vendors (with pickup windows), vehicle specs, constraints, solver and routing backend.
+        Fleet counts are left out; reuse checks them against the shared fleet
+        and skips clusters that left vendors unassigned (see fully_served).
+        """
+        payload = {
+            'hub': [centroid_name, [round(float(c), 6) for c in self.centroids[centroid_name]],
+                    self.center_capacity.get(centroid_name)]
+                   + ([list(self.hub_windows[centroid_name])] if centroid_name in self.hub_windows else []),
+            'vendors': sorted(
+                [name, [round(float(c), 6) for c in self.subareas[name]],
+                 round(float(self.farmers_milk.get(name, 0)), 3)]
+                + ([list(self.pickup_windows[name])] if name in self.pickup_windows else [])
+                for name in subarea_list
+            ),
+            'vehicle_types': sorted(
+                ({k: v for k, v in vt.items() if k != 'count'} for vt in vehicle_types_list),
+                key=lambda vt: vt['name']
+            ),
+            'constraints': [deadline_minutes, max_distance_km],
+            'solver': solver,
+            'routing': getattr(self.routing_provider, 'name', None),
+        }
+        return hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    
+    def reusable_clusters(self, previous_results: Optional[Dict], cluster_fingerprints: Dict[str, str],
+                          fleet_availability: Dict) -> Dict[str, Dict]:
+        """
+        Clusters of a previous run whose inputs are unchanged, in cluster order.
+        Their vehicles are taken from fleet_availability and their vehicle
+        numbers from the vehicle pool; a cluster whose vehicles no longer fit
+        the remaining fleet is re-solved instead, and so is one that left
+        vendors unassigned (the fleet may serve them now).
+        """
+        if not previous_results:
+            return {}
+        
+        previous_fingerprints = previous_results.get('cluster_fingerprints') or {}
+        previous_clusters = {c.get('name'): c for c in previous_results.get('clusters', [])}
+        
+        reused = {}
+        for centroid_name, fingerprint in cluster_fingerprints.items():
+            cluster = previous_clusters.get(centroid_name)
+            if cluster is None or previous_fingerprints.get(centroid_name) != fingerprint:
+                continue
+            if not self.fully_served(cluster):
+                continue
+            if self.take_cluster_fleet(cluster, fleet_availability, self.vehicle_pool):
+                reused[centroid_name] = cluster
+        return reused
+    
+    @staticmethod
+    def fully_served(cluster: Dict) -> bool:
+        """
+        No vendor left unassigned. Fleet counts are not in the fingerprint, so
+        only such clusters are cached or reused: a plan made while the fleet was
+        short must not outlive the shortage.
+        """
+        return not cluster.get('unassigned_farmers')
+    
+    @staticmethod
+    def take_cluster_fleet(cluster: Dict, fleet_availability: Dict,
+                           vehicle_pool: Optional[VehiclePool] = None) -> bool:
+        """
+        Take a stored cluster's vehicles from fleet_availability, and its
+        vehicle numbers from vehicle_pool so no re-solved cluster is given them;
+        False (nothing taken) if they don't fit or a vehicle is no longer free
+        """
+        # Later trips of a multi-trip vehicle do not take another vehicle
+        first_trips = [vehicle for vehicle in cluster.get('vehicles', []) if vehicle.get('trip', 1) == 1]
+        used = Counter(vehicle['type'] for vehicle in first_trips)
+        if any(fleet_availability.get(vtype, 0) < count for vtype, count in used.items()):
+            return False
+        
+        held = []
+        for vehicle in first_trips if vehicle_pool is not None else []:
+            if not vehicle_pool.fleet.get(vehicle['type']) or vehicle.get('vehicle_number') is None:
+                continue
+            vehicle_info = vehicle_pool.hold(vehicle['type'], vehicle['vehicle_number'])
+            if vehicle_info is None:
+                for vtype, info in held:
+                    vehicle_pool.give_back(vtype, info)
+                return False
+            held.append((vehicle['type'], vehicle_info))
+        
+        for vtype, count in used.items():
+            fleet_availability[vtype] -= count
+        return True
+    
+    def cached_clusters(self, cluster_cache: ClusterCache, cluster_fingerprints: Dict[str, str],
+                        skip: Sequence[str], fleet_availability: Dict) -> Dict[str, Dict]:
+        """
+        Clusters (other than skip) whose fingerprint is in the cluster cache,
+        that served every vendor and whose fleet (vehicle numbers included)
+        still fits
+        """
+        cached = {}
+        for centroid_name, fingerprint in cluster_fingerprints.items():
+            if centroid_name in skip:
+                continue
+            cluster = cluster_cache.get(fingerprint)
+            if (cluster is not None and self.fully_served(cluster)
+                    and self.take_cluster_fleet(cluster, fleet_availability, self.vehicle_pool)):
+                cached[centroid_name] = cluster
+        return cached
     
     def optimize_vehicle_route(self, chilling_center_name: str, chilling_center_coords: Tuple, 
                                farmer_list: List[str], vehicle_id: int, 
-                               vehicle_capacity: int, farmers_milk: Dict):
+                               vehicle_capacity: int, farmers_milk: Dict,
+                               vehicle: Optional[Dict] = None):
 
         if not farmer_list:
             return [], None
         
-        jobs = []
-        for idx, farmer_name in enumerate(farmer_list):
-            # subareas stores [lat, lng]
-            lat, lon = self.subareas[farmer_name]
-            jobs.append({
-                "id": idx,
-                "location": [lon, lat],
-                "delivery": [farmers_milk.get(farmer_name, 0)]
-            })
+        # subareas stores [lat, lng]
+        stops = [tuple(self.subareas[farmer_name]) for farmer_name in farmer_list]
+        demands = [farmers_milk.get(farmer_name, 0) for farmer_name in farmer_list]
         
-        vehicle = {
-            "id": vehicle_id,
-            "start": [chilling_center_coords[1], chilling_center_coords[0]],
-            "end": [chilling_center_coords[1], chilling_center_coords[0]],
-            "profile": "driving-car",
-            "capacity": [vehicle_capacity]
+        try:
+            order, optimized_data = self.routing_provider.optimize_route(
+                tuple(chilling_center_coords), stops, demands,
+                vehicle_capacity, vehicle_id, vehicle
+            )
+            return [farmer_list[idx] for idx in order], optimized_data
+        except Exception as e:
+            raise Exception(f"Error in route optimization: {str(e)}")
+    
+    def get_route_metrics(self, ordered_names: List[str], chilling_center_coords: Tuple,
+                          vehicle: Optional[Dict] = None):
+        try:
+            return self.measure_route(
+                chilling_center_coords, [self.subareas[name] for name in ordered_names], vehicle
+            )
+        except Exception as e:
+            raise Exception(f"Error getting route metrics: {str(e)}")
+    
+    def build_vehicle_result(self, vehicle_idx: int, vehicle_data: Dict, evaluation: Dict,
+                             deadline_minutes: int, max_distance_km: int,
+                             late_farmers: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Cost, constraint status and farmer details for one evaluated vehicle route"""
+        vtype = vehicle_data["vehicle_type"]
+        vspec = vehicle_data["vehicle_spec"]
+        v_info = vehicle_data.get('vehicle_info')
+        farmer_names = vehicle_data['farmers']
+        optimized_route = evaluation['route']
+        distance_km = evaluation['distance']
+        travel_time_min = evaluation['travel_time']
+        
+        service_time = len(farmer_names) * vspec.get('service_time', 4)
+        total_time = (travel_time_min or 0) + service_time
+        
+        if distance_km:
+            # Multi-trip: the vehicle's fixed cost is paid on its first trip only
+            fixed_cost = vspec['fixed_cost'] if vehicle_data.get('trip', 1) == 1 else 0
+            cost = fixed_cost + (distance_km * vspec['cost_per_km'])
+        else:
+            cost = 0
+        
+        time_violation = total_time > deadline_minutes if distance_km else False
+        distance_violation = distance_km > max_distance_km if distance_km else False
+        is_violated = time_violation or distance_violation
+        
+        if not distance_km:
+            status = "NO DATA"
+        elif is_violated:
+            if time_violation and distance_violation:
+                status = "TIME & DISTANCE EXCEEDED"
+            elif time_violation:
+                status = "TIME EXCEEDED | WITHIN DISTANCE"
+            else:
+                status = "ON TIME | DISTANCE EXCEEDED"
+        else:
+            status = "ON TIME | WITHIN DISTANCE"
+        if late_farmers and distance_km:
+            is_violated = True
+            status += " | PICKUP WINDOW MISSED"
+        
+        # ----------------- CONVERT farmers to objects (name, lat, lng, milk) -----------------
+        farmer_details = [
+            self.get_farmer_details(name)
+            for name in farmer_names
+        ]
+
+        vehicle_info = {
+            'id': vehicle_idx + 1,
+            'type': vtype,
+            'capacity': vspec['capacity'],
+            'vehicle_number': v_info.get('vehicle_number') if v_info else None,
+            'vehicle_code': v_info.get('vehicle_code') if v_info else None,
+            'vehicle_name': v_info.get('vehicle_name') if v_info else None,
+            'total_milk': vehicle_data['total_milk'],
+            'farmers' : farmer_details,    # <-- now objects with lat/lng
+            'utilization': vehicle_data['utilization'],
+            'route': optimized_route,
+            'distance': distance_km,
+            'travel_time': travel_time_min,
+            'is_violated': is_violated,
+            'status': status,
+            'total_time': total_time,
+            'service_time': service_time,
+            'cost': round(cost, 2),
+            'time_violation': time_violation,
+            'distance_violation': distance_violation,
+            'time_diff': deadline_minutes - total_time if distance_km else 0,
+            'dist_diff': max_distance_km - distance_km if distance_km else 0,
+            'violation_type': 'Distance' if distance_violation and not time_violation else (
+                'Time' if time_violation and not distance_violation else (
+                    'Both' if is_violated else ''
+                )
+            )
         }
+        if late_farmers is not None:
+            vehicle_info['late_farmers'] = late_farmers
+        if 'trip' in vehicle_data:
+            vehicle_info.update(
+                trip=vehicle_data['trip'],
+                start_minute=vehicle_data['start_minute'],
+                end_minute=vehicle_data['end_minute']
+            )
+    
+        return vehicle_info
+    
+    def route_legs(self, route_jobs: List[Tuple]) -> Dict[Tuple[float, float], Tuple[Dict[str, int], Dict]]:
+        """
+        One distance + duration matrix per hub over every farmer its vehicles
+        visit: hub coords → (farmer → matrix index, matrix)
+        """
+        hub_farmers: Dict[Tuple[float, float], Dict[str, None]] = {}
+        for chilling_center_coords, _, vehicle_data in route_jobs:
+            farmers = hub_farmers.setdefault(tuple(chilling_center_coords), {})
+            farmers.update(dict.fromkeys(f for f in vehicle_data['farmers'] if f in self.subareas))
         
-        optimization_req_body = {"jobs": jobs, "vehicles": [vehicle]}
-        headers = {'Authorization': self.api_key, 'Content-Type': 'application/json'}
+        legs = {}
+        for hub_coords, farmers in hub_farmers.items():
+            if farmers:
+                points = [hub_coords] + [tuple(self.subareas[f]) for f in farmers]
+                self.remember_legs(hub_coords, farmers, self.cluster_matrix(points))
+                legs[hub_coords] = self.cluster_legs[hub_coords][-1]
+        return legs
+    
+    async def _evaluate_vehicle_route(self, chilling_center_coords: Tuple, vehicle_idx: int,
+                                      vehicle_data: Dict, legs: Tuple[Dict[str, int], Dict]) -> Dict[str, Any]:
+        """Stop order from one routing call; distance and duration from the cluster matrix legs"""
+        vspec = vehicle_data["vehicle_spec"]
+        farmer_names = [f for f in vehicle_data['farmers'] if f in self.subareas]
+        if not farmer_names:
+            return {'route': [], 'distance': None, 'travel_time': None, 'requests': 0}
         
+        stops = [tuple(self.subareas[f]) for f in farmer_names]
+        demands = [self.farmers_milk.get(f, 0) for f in farmer_names]
         try:
-            response = requests.post(
-                "https://api.openrouteservice.org/optimization",
-                json=optimization_req_body,
-                headers=headers,
-                timeout=30
+            order, _ = await self.routing_provider.optimize_route_async(
+                tuple(chilling_center_coords), stops, demands,
+                vspec['capacity'], vehicle_idx, vspec
             )
-            optimized_data = response.json()
-            
-            if "routes" in optimized_data and optimized_data["routes"]:
-                steps = optimized_data["routes"][0]["steps"]
-                route = [farmer_list[step["id"]] for step in steps if step["type"] == "job"]
-                return route, optimized_data
-            else:
-                return [], optimized_data
         except Exception as e:
             raise Exception(f"Error in route optimization: {str(e)}")
+        
+        route = [farmer_names[i] for i in order]
+        position, matrix = legs
+        distance_km, travel_time_min = route_matrix_metrics(
+            matrix['distances'], matrix['durations'], [0, *(position[f] for f in route), 0],
+            self.routing_provider.duration_factor(vspec)
+        )
+        return {
+            'route': route,
+            'distance': distance_km,
+            'travel_time': travel_time_min,
+            'requests': 1 if self.routing_provider.remote else 0
+        }
     
-    def get_route_metrics(self, ordered_names: List[str], chilling_center_coords: Tuple):
-        coordinates = [[chilling_center_coords[1], chilling_center_coords[0]]]
-        for name in ordered_names:
-            lat, lon = self.subareas[name]
-            coordinates.append([lon, lat])
-        coordinates.append([chilling_center_coords[1], chilling_center_coords[0]])
+    async def _evaluate_vehicle_routes_async(self, route_jobs: List[Tuple], legs: Dict,
+                                             on_job_done: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        async def evaluate(job_idx: int, job: Tuple) -> Dict:
+            evaluation = await self._evaluate_vehicle_route(*job, legs.get(tuple(job[0])))
+            if on_job_done:
+                on_job_done(job_idx)
+            return evaluation
         
-        unique_coords = set(tuple(c) for c in coordinates)
-        if len(unique_coords) < 2:
-            return None, None
+        async with self.routing_provider.session():
+            return await asyncio.gather(
+                *(evaluate(job_idx, job) for job_idx, job in enumerate(route_jobs))
+            )
+    
+    def evaluate_vehicle_routes(self, route_jobs: List[Tuple],
+                                on_job_done: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """
+        Evaluate every (chilling_center_coords, vehicle_idx, vehicle_data) job:
+        one routing call per vehicle gives its stop order, and its distance and
+        duration are summed from one matrix per hub. All vehicles of all
+        clusters share one pooled client and are issued concurrently (bounded
+        by the provider's semaphore).
+        """
+        if not route_jobs:
+            return []
+        legs = self.route_legs(route_jobs)
+        return run_async(self._evaluate_vehicle_routes_async(route_jobs, legs, on_job_done))
+    
+    def attach_route_geometry(self, clusters: List[Dict]) -> Dict[str, int]:
+        """
+        Road geometry ([lat, lng] points) for every vehicle route without one,
+        fetched concurrently in one session; stored as vehicle['geometry']
+        """
+        jobs = []
+        for cluster in clusters:
+            hub = tuple(self.centroids[cluster['name']])
+            for vehicle in cluster['vehicles']:
+                stops = [tuple(self.subareas[f]) for f in vehicle.get('route') or [] if f in self.subareas]
+                if stops and 'geometry' not in vehicle:
+                    jobs.append((vehicle, [hub] + stops + [hub]))
         
-        url = 'https://api.openrouteservice.org/v2/directions/driving-car'
-        body = {"coordinates": coordinates, "format": "json"}
-        headers = {'Authorization': self.api_key, 'Content-Type': 'application/json'}
+        async def fetch_all():
+            async with self.routing_provider.session():
+                return await asyncio.gather(
+                    *(self.routing_provider.route_geometry_async(coords) for _, coords in jobs)
+                )
         
+        geometries = run_async(fetch_all()) if jobs else []
+        for (vehicle, _), geometry in zip(jobs, geometries):
+            vehicle['geometry'] = [list(point) for point in geometry] if geometry else None
+        return {
+            'vehicles': len(jobs),
+            'with_geometry': sum(1 for geometry in geometries if geometry),
+            'requests': len(jobs) if self.routing_provider.remote else 0
+        }
+    
+    def _report_progress(self, progress_callback: Optional[Callable[[Dict], None]], stage: str,
+                         clusters_done: int, clusters_total: int, cluster: Optional[str] = None):
+        """Send a progress snapshot to the caller; never lets a callback failure stop the run"""
+        if progress_callback is None:
+            return
         try:
-            response = requests.post(url, json=body, headers=headers, timeout=30)
-            data = response.json()
-            
-            if 'error' in data:
-                return None, None
-            
-            summary = data['routes'][0]['summary']
-            distance_km = summary['distance'] / 1000
-            duration_min = summary['duration'] / 60
-            return round(distance_km, 2), round(duration_min, 2)
+            progress_callback({
+                'stage': stage,
+                'clusters_done': clusters_done,
+                'clusters_total': clusters_total,
+                'current_cluster': cluster,
+                'percent': round(100 * clusters_done / clusters_total) if clusters_total else 100
+            })
         except Exception as e:
-            raise Exception(f"Error getting route metrics: {str(e)}")
+            print(f"⚠️ Progress callback failed: {e}")
     
-    def run_optimization(self, deadline_minutes: int, max_distance_km: int, 
-                        vehicle_types_list: List[Dict]):
-
-        try:
-            origins = [[lon, lat] for lat, lon in self.subareas.values()]
-            destinations = [[lon, lat] for lat, lon in self.centroids.values()]
-            all_locations = origins + destinations
-            sources = list(range(len(origins)))
-            dest_idx_start = len(origins)
-            destinations_indices = list(range(dest_idx_start, dest_idx_start + len(destinations)))
+    def improve_cluster_lns(self, cluster_name: str, vehicle_assignments: List[Dict],
+                            evaluations: List[Dict], unassigned_farmers: List[Dict],
+                            vehicle_types_list: List[Dict], fleet_availability: Dict,
+                            deadline_minutes: int, max_distance_km: int,
+                            time_budget_seconds: float,
+                            rescue_farmers: Sequence[str] = (), rescue_capacity: float = 0.0):
+        """
+        Large-neighbourhood search over a planned cluster (see scripts/lns.py).
+        Vehicles may swap farmers, give up or take on vehicles from the shared
+        fleet, and pick up this cluster's unassigned farmers as well as
+        rescue_farmers (other hubs' leftovers) up to rescue_capacity litres.
+        
+        Returns:
+            (vehicle_assignments, evaluations, unassigned_farmers,
+             rescued farmer names, LNS stats)
+        """
+        routes = []
+        for vehicle_data, evaluation in zip(vehicle_assignments, evaluations):
+            members = [f for f in vehicle_data['farmers'] if f in self.subareas]
+            ordered = [f for f in evaluation.get('route') or [] if f in members]
+            routes.append((vehicle_data, ordered + [f for f in members if f not in ordered]))
+        unassigned = [u['name'] for u in unassigned_farmers if u['name'] in self.subareas]
+        rescue = [f for f in rescue_farmers if f in self.subareas]
+        farmers = list(dict.fromkeys([f for _, stops in routes for f in stops] + unassigned + rescue))
+        if not farmers:
+            return vehicle_assignments, evaluations, unassigned_farmers, [], None
+        
+        position = {name: i for i, name in enumerate(farmers)}
+        points = [tuple(self.centroids[cluster_name])] + [tuple(self.subareas[f]) for f in farmers]
+        matrix = self.cluster_matrix(points)
+        self.remember_legs(points[0], farmers, matrix)
+        
+        improver = LNSImprover(
+            matrix['distances'], matrix['durations'],
+            [self.farmers_milk.get(f, 0) for f in farmers],
+            vehicle_types_list, deadline_minutes, max_distance_km,
+            fleet_availability=fleet_availability,
+            neighbour_lists=SpatialIndex(points[1:]).neighbour_lists(DEFAULT_NEIGHBOURS),
+            optional_stops=[position[f] for f in rescue],
+            optional_capacity=rescue_capacity
+        )
+        solution = improver.improve(
+            [(vehicle_data['vehicle_spec'], [position[f] for f in stops]) for vehicle_data, stops in routes],
+            [position[f] for f in unassigned],
+            time_budget_seconds=time_budget_seconds
+        )
+        
+        # Vehicles whose route LNS emptied go back before new routes take theirs
+        kept = {route['origin'] for route in solution['routes']}
+        for origin, vehicle_data in enumerate(vehicle_assignments):
+            if origin not in kept:
+                self.vehicle_pool.give_back(vehicle_data['vehicle_type'], vehicle_data.get('vehicle_info'))
+        
+        improved_assignments, improved_evaluations = [], []
+        for route in solution['routes']:
+            vehicle_spec = route['vehicle_spec']
+            route_farmers = [farmers[i] for i in route['stops']]
+            origin = route['origin']
+            if origin is None:
+                vehicle_info = self.vehicle_pool.take(vehicle_spec['name'])
+            else:
+                vehicle_info = vehicle_assignments[origin].get('vehicle_info')
             
-            matrix_req_body = {
-                "locations": all_locations,
-                "sources": sources,
-                "destinations": destinations_indices,
-                "metrics": ["distance"],
-                "units": "km"
-            }
-            headers = {'Authorization': self.api_key, 'Content-Type': 'application/json'}
+            improved_assignments.append({
+                "vehicle_type": vehicle_spec['name'],
+                "vehicle_spec": vehicle_spec,
+                "vehicle_info": vehicle_info,
+                "farmers": route_farmers,
+                "total_milk": route['load'],
+                "utilization": round(route['load'] / vehicle_spec['capacity'] * 100, 2)
+            })
+            if origin is not None and routes[origin][1] == route_farmers:
+                # Untouched vehicle: keep the routing provider's measurement
+                improved_evaluations.append(evaluations[origin])
+            else:
+                improved_evaluations.append({
+                    'route': route_farmers,
+                    'distance': round(route['distance'], 2),
+                    'travel_time': round(route['travel_time'], 2),
+                    'requests': 0
+                })
+        
+        still_unassigned = [
+            {"name": farmers[i], "milk": self.farmers_milk.get(farmers[i], 0)}
+            for i in solution['unassigned']
+        ]
+        rescued = [farmers[i] for i in solution['optional_served']]
+        return improved_assignments, improved_evaluations, still_unassigned, rescued, solution['stats']
+    
+    def run_lns_stage(self, packed_clusters: List[Tuple], cluster_evaluations: List[List[Dict]],
+                      reused_clusters: Dict[str, Dict], hub_fill: Dict[str, Dict],
+                      vehicle_types_list: List[Dict], fleet_availability: Dict,
+                      deadline_minutes: int, max_distance_km: int,
+                      time_budget_seconds: float) -> Dict[str, Any]:
+        """
+        LNS improvement of every planned (non-reused) cluster, in cluster order,
+        each on a share of the budget proportional to its farmers. Unassigned
+        farmers of a hub may be picked up by one of their LNS_RESCUE_HUBS
+        nearest hubs that has room left; they then move to that cluster.
+        packed_clusters / cluster_evaluations / hub_fill are updated in place.
+        """
+        stage_started = time.perf_counter()
+        planned = [idx for idx, packed in enumerate(packed_clusters) if packed[0] not in reused_clusters]
+        hub_names = list(self.centroids.keys())
+        hub_index = SpatialIndex([tuple(self.centroids[name]) for name in hub_names], keys=hub_names)
+        rescue_hubs = {
+            u['name']: {hub for hub, _ in hub_index.nearest(*self.subareas[u['name']], k=LNS_RESCUE_HUBS)}
+            for idx in planned for u in packed_clusters[idx][3] if u['name'] in self.subareas
+        }
+        home_cluster = {u['name']: idx for idx in planned for u in packed_clusters[idx][3]}
+        
+        cluster_stats, rescued_total = [], []
+        farmers_left = sum(len(packed_clusters[idx][1]) for idx in planned)
+        for idx in planned:
+            centroid_name, subarea_list, vehicle_assignments, unassigned_farmers = packed_clusters[idx]
+            remaining = max(time_budget_seconds - (time.perf_counter() - stage_started), 0)
+            cluster_budget = remaining * len(subarea_list) / max(farmers_left, 1)
+            farmers_left -= len(subarea_list)
+            
+            capacity = hub_fill[centroid_name]['capacity'] or 0
+            room = max(capacity - hub_fill[centroid_name]['assigned_milk'], 0.0)
+            rescue = [
+                name for name, hubs in rescue_hubs.items()
+                if centroid_name in hubs and home_cluster.get(name) not in (None, idx)
+            ]
             
-            response = requests.post(
-                'https://api.openrouteservice.org/v2/matrix/driving-car',
-                json=matrix_req_body,
-                headers=headers,
-                timeout=30
+            vehicle_assignments, evaluations, unassigned_farmers, rescued, stats = self.improve_cluster_lns(
+                centroid_name, vehicle_assignments, cluster_evaluations[idx], unassigned_farmers,
+                vehicle_types_list, fleet_availability, deadline_minutes, max_distance_km,
+                cluster_budget, rescue_farmers=rescue, rescue_capacity=room
             )
-            data_response = response.json()
-            distance_matrix = data_response['distances']
             
-            cluster_assignments = {centroid: [] for centroid in self.centroids.keys()}
-            subarea_names = list(self.subareas.keys())
-            centroid_names = list(self.centroids.keys())
+            for name in rescued:
+                # Move the farmer from its home hub to this one
+                home = packed_clusters[home_cluster[name]]
+                home[1].remove(name)
+                home[3][:] = [u for u in home[3] if u['name'] != name]
+                milk = self.farmers_milk.get(name, 0)
+                hub_fill[home[0]]['assigned_milk'] = round(hub_fill[home[0]]['assigned_milk'] - milk, 2)
+                hub_fill[centroid_name]['assigned_milk'] = round(hub_fill[centroid_name]['assigned_milk'] + milk, 2)
+                subarea_list.append(name)
+                del rescue_hubs[name]
+                rescued_total.append({'farmer_name': name, 'from': home[0], 'to': centroid_name})
+            for name in (u['name'] for u in unassigned_farmers):
+                home_cluster[name] = idx
             
-            for i, distances_to_centroids in enumerate(distance_matrix):
-                nearest_centroid_index = distances_to_centroids.index(min(distances_to_centroids))
-                nearest_centroid_name = centroid_names[nearest_centroid_index]
-                cluster_assignments[nearest_centroid_name].append(subarea_names[i])
+            packed_clusters[idx] = (centroid_name, subarea_list, vehicle_assignments, unassigned_farmers)
+            cluster_evaluations[idx] = evaluations
+            if stats is not None:
+                cluster_stats.append({'cluster': centroid_name, **stats})
+        
+        for fill in hub_fill.values():
+            if fill['capacity']:
+                fill['fill_ratio'] = round(fill['assigned_milk'] / fill['capacity'], 4)
+        
+        operators: Dict[str, Dict[str, int]] = {}
+        for stats in cluster_stats:
+            for name, usage in stats.pop('operators').items():
+                total = operators.setdefault(name, {'used': 0, 'improved': 0})
+                total['used'] += usage['used']
+                total['improved'] += usage['improved']
+        constructive = sum(stats['constructive_cost'] for stats in cluster_stats)
+        improved = sum(stats['improved_cost'] for stats in cluster_stats)
+        return {
+            'seconds': time_budget_seconds,
+            'elapsed_seconds': round(time.perf_counter() - stage_started, 3),
+            'iterations': sum(stats['iterations'] for stats in cluster_stats),
+            'constructive_cost': round(constructive, 2),
+            'improved_cost': round(improved, 2),
+            'cost_delta': round(improved - constructive, 2),
+            'rescued_farmers': rescued_total,
+            'operators': operators,
+            'clusters': cluster_stats
+        }
+    
+    @staticmethod
+    def trip_minutes(vehicle_data: Dict, evaluation: Dict, deadline_minutes: int) -> float:
+        """Travel + service time of an evaluated route (unmeasured routes take the whole day)"""
+        service = len(vehicle_data['farmers']) * vehicle_data['vehicle_spec'].get('service_time', 4)
+        travel = evaluation['travel_time'] if evaluation['distance'] else deadline_minutes
+        return (travel or 0) + service
+    
+    def schedule_multi_trip(self, packed_clusters: List[Tuple], cluster_evaluations: List[List[Dict]],
+                            reused_clusters: Dict[str, Dict], vehicle_types_list: List[Dict],
+                            deadline_minutes: int, unload_minutes: float
+                            ) -> Tuple[Dict[str, int], Dict[str, Any], List[Dict]]:
+        """
+        Let vehicles run several routes (trips) a day, unloading at the hub in between
+        (scripts/trip_scheduling.py).
+        
+        1. Each cluster's routes are chained onto as few of the hub's vehicles as
+           the deadline allows, using the travel times already evaluated; the
+           vehicles this frees go back to the shared fleet.
+        2. Farmers still unassigned are packed into extra routes for the freed
+           vehicles and the hub's vehicles with time left, which are evaluated
+           and scheduled the same way (a few rounds, while anyone is picked up).
+        
+        packed_clusters / cluster_evaluations are updated in place.
+        
+        Returns:
+            (physical vehicles left per type, multi-trip summary, evaluations of the extra routes)
+        """
+        counts = {v['name']: v['count'] for v in vehicle_types_list}
+        available = dict(counts)
+        for cluster in reused_clusters.values():
+            for vehicle in cluster.get('vehicles', []):
+                if vehicle.get('trip', 1) == 1:
+                    available[vehicle['type']] -= 1
+        
+        planned = [idx for idx, packed in enumerate(packed_clusters) if packed[0] not in reused_clusters]
+        # Routes are re-assigned to vehicles from scratch: the planned clusters' vehicles go back
+        for idx in planned:
+            for vehicle_data in packed_clusters[idx][2]:
+                self.vehicle_pool.give_back(vehicle_data['vehicle_type'], vehicle_data.get('vehicle_info'))
+        open_vehicles = {idx: {} for idx in planned}   # per cluster and type: busy minutes per vehicle
+        vehicle_ids = {idx: {} for idx in planned}     # per cluster and type: physical vehicle per vehicle
+        trips = {idx: [] for idx in planned}           # (vehicle_data, evaluation, slot)
+        
+        def place(idx: int, routes: List[Tuple[Dict, Dict]]) -> List[Dict]:
+            """Schedule routes at cluster idx; returns the routes that did not fit"""
+            before = dict(available)
+            schedule = schedule_trips(
+                [self.trip_minutes(v, e, deadline_minutes) for v, e in routes],
+                [v['vehicle_type'] for v, _ in routes],
+                available, deadline_minutes, unload_minutes, open_vehicles[idx]
+            )
+            for vtype, opened in before.items():
+                ids = vehicle_ids[idx].setdefault(vtype, [])
+                ids.extend(self.vehicle_pool.take(vtype) for _ in range(opened - available[vtype]))
+            left_out = []
+            for (vehicle_data, evaluation), slot in zip(routes, schedule):
+                if slot is None:
+                    left_out.append(vehicle_data)
+                else:
+                    trips[idx].append((vehicle_data, evaluation, slot))
+            return left_out
+        
+        # ---- 1: chain the planned routes ----
+        for idx in planned:
+            unassigned_farmers = packed_clusters[idx][3]
+            for vehicle_data in place(idx, list(zip(packed_clusters[idx][2], cluster_evaluations[idx]))):
+                unassigned_farmers.extend(
+                    {"name": f, "milk": self.farmers_milk.get(f, 0)} for f in vehicle_data['farmers']
+                )
+        
+        # ---- 2: extra trips for whoever is still unassigned ----
+        extra_evaluations = []
+        for _ in range(MAX_EXTRA_TRIP_ROUNDS):
+            picked_up = 0
+            for idx in planned:
+                centroid_name, _, _, unassigned_farmers = packed_clusters[idx]
+                if not unassigned_farmers:
+                    continue
+                spare = vehicles_with_time_left(open_vehicles[idx], deadline_minutes)
+                availability = {
+                    name: available.get(name, 0) + spare.get(name, 0) for name in counts
+                }
+                routes, _ = pack_heterogeneous_fleet(
+                    [u['name'] for u in unassigned_farmers], self.farmers_milk,
+                    vehicle_types_list, availability
+                )
+                if not routes:
+                    continue
+                evaluations = self.evaluate_vehicle_routes(
+                    [(self.centroids[centroid_name], k, v) for k, v in enumerate(routes)]
+                )
+                extra_evaluations.extend(evaluations)
+                left_out = place(idx, list(zip(routes, evaluations)))
+                served = {f for v in routes for f in v['farmers']} - {f for v in left_out for f in v['farmers']}
+                unassigned_farmers[:] = [u for u in unassigned_farmers if u['name'] not in served]
+                picked_up += len(served)
+            if not picked_up:
+                break
+        
+        # ---- 3: vehicles, trip numbers and order ----
+        total_trips = total_vehicles = 0
+        for idx in planned:
+            centroid_name, subarea_list, _, unassigned_farmers = packed_clusters[idx]
+            ordered = sorted(
+                trips[idx],
+                key=lambda t: (t[0]['vehicle_type'], t[2]['vehicle'], t[2]['start_minute'])
+            )
+            vehicle_assignments, evaluations = [], []
+            previous = None
+            for vehicle_data, evaluation, slot in ordered:
+                vtype, vehicle = vehicle_data['vehicle_type'], slot['vehicle']
+                trip = trip + 1 if previous == (vtype, vehicle) else 1
+                previous = (vtype, vehicle)
+                vehicle_assignments.append({
+                    **vehicle_data,
+                    'vehicle_info': vehicle_ids[idx][vtype][vehicle],
+                    'trip': trip,
+                    'start_minute': slot['start_minute'],
+                    'end_minute': slot['end_minute'],
+                })
+                evaluations.append(evaluation)
+                total_vehicles += trip == 1
+            total_trips += len(vehicle_assignments)
+            packed_clusters[idx] = (centroid_name, subarea_list, vehicle_assignments, unassigned_farmers)
+            cluster_evaluations[idx] = evaluations
+        
+        return available, {
+            'unload_minutes': unload_minutes,
+            'trips': total_trips,
+            'vehicles': total_vehicles,
+            'extra_trips': total_trips - total_vehicles,
+            'extra_routes': len(extra_evaluations)
+        }, extra_evaluations
+    
+    def assign_clusters(self) -> Tuple[Dict[str, List[str]], Dict[str, Any], Dict[str, Dict]]:
+        """
+        Capacity-aware vendor → hub assignment.
+        
+        Returns:
+            (farmer names per hub, assign_vendors_to_hubs output, fill summary per hub)
+        """
+        subarea_names = list(self.subareas.keys())
+        centroid_names = list(self.centroids.keys())
+        hub_assignment = assign_vendors_to_hubs(
+            self.vendor_hub_distances(),
+            [self.farmers_milk.get(name, 0) for name in subarea_names],
+            [self.center_capacity.get(name) for name in centroid_names]
+        )
+        
+        cluster_assignments = {centroid: [] for centroid in centroid_names}
+        unreachable = []
+        for subarea_name, hub_idx in zip(subarea_names, hub_assignment['hub_index'].tolist()):
+            if hub_idx < 0:
+                unreachable.append(subarea_name)
+                continue
+            cluster_assignments[centroid_names[hub_idx]].append(subarea_name)
+        hub_assignment['unreachable_vendors'] = unreachable
+        
+        hub_fill = {
+            name: {
+                'hub': name,
+                'capacity': self.center_capacity.get(name, 0),
+                'assigned_milk': round(float(milk), 2),
+                'fill_ratio': None if math.isnan(fill) else round(float(fill), 4)
+            }
+            for name, milk, fill in zip(
+                centroid_names, hub_assignment['assigned_milk'], hub_assignment['fill_ratio']
+            )
+        }
+        return cluster_assignments, hub_assignment, hub_fill
+    
+    def run_optimization(self, deadline_minutes: int, max_distance_km: int, 
+                        vehicle_types_list: List[Dict],
+                        progress_callback: Optional[Callable[[Dict], None]] = None,
+                        solver: str = "provider",
+                        previous_results: Optional[Dict] = None,
+                        seed_results: Optional[Dict] = None,
+                        time_budget_seconds: Optional[float] = None,
+                        lns_time_budget_seconds: Optional[float] = None,
+                        multi_trip: bool = False,
+                        unload_minutes: float = DEFAULT_UNLOAD_MINUTES,
+                        route_geometry: bool = False,
+                        cluster_cache: Optional[ClusterCache] = None,
+                        cluster_workers: Optional[int] = 1,
+                        perf: Optional[PerfRecorder] = None):
+        """
+        previous_results: engine output of an earlier run; clusters whose
+        fingerprint is unchanged are copied from it instead of re-solved
+        seed_results: engine output / manual schedule whose routes warm-start
+        the native solver (ignored by the provider solver)
+        time_budget_seconds: wall-clock budget for the native solver; every
+        cluster gets a feasible plan first, then improves until its share of
+        what is left of the budget runs out (ignored by the provider solver)
+        lns_time_budget_seconds: budget for the large-neighbourhood-search stage
+        that revisits vehicle and hub decisions after routing (off when None)
+        multi_trip: let a vehicle run several routes a day, unloading at the hub
+        (unload_minutes) between them, as long as the last one ends by the deadline
+        route_geometry: add each vehicle's road geometry (one directions call per
+        route; distances and times always come from the cluster matrices)
+        cluster_cache: solved clusters by fingerprint; hits are reused verbatim
+        (after previous_results), newly solved self-contained clusters are added
+        cluster_workers: worker processes planning native-solver clusters side by
+        side (None = CPU count); 1 solves them one after another in-process.
+        Merged in cluster order, so the plan does not depend on the worker count.
+        perf: recorder to add this run's stages to (e.g. the adapter's, to nest
+        them under its own spans); a fresh one otherwise. Reported as results['perf'].
+        """
+        run_started = time.perf_counter()
+
+        if solver not in ROUTE_SOLVERS:
+            raise ValueError(f"Unknown solver '{solver}'. Choose from: {', '.join(ROUTE_SOLVERS)}")
+
+        self.perf = perf or PerfRecorder()
+        self.routing_provider.attach_perf(self.perf)
+        try:
+            self.perf.stage("assignment")
+            cluster_assignments, hub_assignment, hub_fill = self.assign_clusters()
             
             results = {
                 'clusters': [],
@@ -361,15 +1219,191 @@ class OptimizationEngine:
             }
             
             global_fleet_availability = {v['name']: v['count'] for v in vehicle_types_list}
+            self.vehicle_pool = VehiclePool(self.fleet_lookup)
+            self.cluster_legs = {}
             
-            for centroid_name, subarea_list in cluster_assignments.items():
-                chilling_center_coords = self.centroids[centroid_name]
-                total_cluster_milk = sum(self.farmers_milk.get(farmer, 0) for farmer in subarea_list)
+            stages = [solver] + (["lns"] if lns_time_budget_seconds else []) + (
+                [f"multi_trip:{unload_minutes}"] if multi_trip else [])
+            cluster_fingerprints = {
+                centroid_name: self.cluster_fingerprint(
+                    centroid_name, subarea_list, vehicle_types_list,
+                    deadline_minutes, max_distance_km, "+".join(stages)
+                )
+                for centroid_name, subarea_list in cluster_assignments.items()
+            }
+            reused_clusters = self.reusable_clusters(
+                previous_results, cluster_fingerprints, global_fleet_availability
+            )
+            from_previous = len(reused_clusters)
+            if cluster_cache is not None:
+                reused_clusters.update(self.cached_clusters(
+                    cluster_cache, cluster_fingerprints, reused_clusters, global_fleet_availability
+                ))
+            # Members as assigned, before LNS may move vendors between hubs
+            assigned_members = {name: set(subarea_list) for name, subarea_list in cluster_assignments.items()}
+            
+            seed_routes = self.seed_routes_from_results(seed_results) if solver == "native" else {}
+            
+            self._report_progress(progress_callback, 'packing', 0, len(cluster_assignments))
+            self.perf.stage("solving" if solver == "native" else "packing")
+            
+            # ---- Phase 1: fleet packing per cluster (shares the global fleet) ----
+            # The native solver also orders and measures its routes here
+            packed_clusters = []
+            cluster_evaluations = []
+            solver_stats = []
+            improvement_trace = []
+            stops_left = sum(
+                len(subarea_list) for name, subarea_list in cluster_assignments.items()
+                if name not in reused_clusters
+            )
+            cluster_jobs = [
+                (name, subarea_list) for name, subarea_list in cluster_assignments.items()
+                if name not in reused_clusters
+            ]
+            parallel_solved, parallel_summary = {}, None
+            if solver == "native" and cluster_workers != 1 and len(cluster_jobs) > 1:
+                planned = 0
                 
-                vehicle_assignments, unassigned_farmers = self.assign_heterogeneous_fleet(
-                    subarea_list, centroid_name, self.farmers_milk, 
-                    vehicle_types_list, global_fleet_availability
+                def on_planned(centroid_name: str):
+                    nonlocal planned
+                    planned += 1
+                    self._report_progress(
+                        progress_callback, 'solving', planned, len(cluster_assignments), centroid_name
+                    )
+                
+                solving_started = time.perf_counter() - run_started
+                solved, parallel_summary = self.solve_clusters_parallel(
+                    cluster_jobs, vehicle_types_list, global_fleet_availability,
+                    deadline_minutes, max_distance_km, seed_routes,
+                    time_budget_seconds, cluster_workers, on_planned
+                )
+                parallel_solved = {name: result for (name, _), result in zip(cluster_jobs, solved)}
+            for cluster_idx, (centroid_name, subarea_list) in enumerate(cluster_assignments.items()):
+                if centroid_name in reused_clusters:
+                    # Spliced in as-is during assembly; no packing or routing calls
+                    packed_clusters.append((centroid_name, subarea_list, [], []))
+                    cluster_evaluations.append([])
+                    continue
+                if centroid_name in parallel_solved:
+                    vehicle_assignments, unassigned_farmers, evaluations, stats = parallel_solved[centroid_name]
+                    for point in stats.pop('trace', []):
+                        improvement_trace.append({
+                            'cluster': centroid_name,
+                            **point,
+                            'seconds': round(solving_started + point['seconds'], 3)
+                        })
+                    solver_stats.append({'cluster': centroid_name, **stats})
+                elif solver == "native":
+                    cluster_budget = None
+                    if time_budget_seconds:
+                        # Share of the remaining budget proportional to this cluster's stops
+                        remaining = max(time_budget_seconds - (time.perf_counter() - run_started), 0)
+                        # (never 0: a zero budget would mean "unbounded" to the solver)
+                        cluster_budget = max(remaining * len(subarea_list) / max(stops_left, 1), 1e-6)
+                        stops_left -= len(subarea_list)
+                    cluster_started = time.perf_counter() - run_started
+                    vehicle_assignments, unassigned_farmers, evaluations, stats = self.solve_cluster_native(
+                        centroid_name, subarea_list, vehicle_types_list,
+                        global_fleet_availability, deadline_minutes, max_distance_km,
+                        seed_routes=seed_routes.get(centroid_name),
+                        time_budget_seconds=cluster_budget
+                    )
+                    for point in stats.pop('trace', []):
+                        improvement_trace.append({
+                            'cluster': centroid_name,
+                            **point,
+                            'seconds': round(cluster_started + point['seconds'], 3)
+                        })
+                    solver_stats.append({'cluster': centroid_name, **stats})
+                    self._report_progress(
+                        progress_callback, 'solving', cluster_idx + 1, len(cluster_assignments), centroid_name
+                    )
+                else:
+                    vehicle_assignments, unassigned_farmers = self.assign_heterogeneous_fleet(
+                        subarea_list, centroid_name, self.farmers_milk, 
+                        vehicle_types_list, global_fleet_availability
+                    )
+                    evaluations = None
+                packed_clusters.append((centroid_name, subarea_list, vehicle_assignments, unassigned_farmers))
+                cluster_evaluations.append(evaluations)
+            
+            # ---- Phase 2: every vehicle's routing call, concurrently across clusters ----
+            self.perf.stage("routing")
+            route_jobs = []
+            job_cluster = []
+            for cluster_idx, (centroid_name, _, vehicle_assignments, _) in enumerate(packed_clusters):
+                if cluster_evaluations[cluster_idx] is not None:
+                    continue
+                cluster_evaluations[cluster_idx] = []
+                for vehicle_idx, vehicle_data in enumerate(vehicle_assignments):
+                    route_jobs.append((self.centroids[centroid_name], vehicle_idx, vehicle_data))
+                    job_cluster.append(cluster_idx)
+            
+            clusters_total = len(packed_clusters)
+            pending_per_cluster = [0] * clusters_total
+            for cluster_idx in job_cluster:
+                pending_per_cluster[cluster_idx] += 1
+            clusters_done = sum(1 for pending in pending_per_cluster if pending == 0)
+            self._report_progress(progress_callback, 'routing', clusters_done, clusters_total)
+            
+            def on_job_done(job_idx: int):
+                nonlocal clusters_done
+                cluster_idx = job_cluster[job_idx]
+                pending_per_cluster[cluster_idx] -= 1
+                if pending_per_cluster[cluster_idx] == 0:
+                    clusters_done += 1
+                    self._report_progress(
+                        progress_callback, 'routing', clusters_done, clusters_total,
+                        packed_clusters[cluster_idx][0]
+                    )
+            
+            for job_idx, evaluation in enumerate(self.evaluate_vehicle_routes(route_jobs, on_job_done)):
+                cluster_evaluations[job_cluster[job_idx]].append(evaluation)
+            evaluation_list = [e for evaluations in cluster_evaluations for e in evaluations]
+            
+            # ---- Phase 2b: LNS over vehicles and hubs, on the cluster matrices ----
+            lns_summary = None
+            if lns_time_budget_seconds:
+                self.perf.stage("lns")
+                self._report_progress(progress_callback, 'improving', 0, clusters_total)
+                lns_summary = self.run_lns_stage(
+                    packed_clusters, cluster_evaluations, reused_clusters, hub_fill,
+                    vehicle_types_list, global_fleet_availability,
+                    deadline_minutes, max_distance_km, lns_time_budget_seconds
+                )
+            
+            # ---- Phase 2c: chain routes onto physical vehicles ----
+            multi_trip_summary = None
+            if multi_trip:
+                self.perf.stage("multi_trip")
+                global_fleet_availability, multi_trip_summary, extra_evaluations = self.schedule_multi_trip(
+                    packed_clusters, cluster_evaluations, reused_clusters,
+                    vehicle_types_list, deadline_minutes, unload_minutes
                 )
+                evaluation_list.extend(extra_evaluations)
+            
+            # ---- Phase 3: assemble results in cluster order ----
+            self.perf.stage("assembly")
+            late_pickups = []
+            for (centroid_name, subarea_list, vehicle_assignments, unassigned_farmers), evaluations in zip(
+                    packed_clusters, cluster_evaluations):
+                if centroid_name in reused_clusters:
+                    cluster_data = dict(
+                        reused_clusters[centroid_name],
+                        fill_ratio=hub_fill[centroid_name]['fill_ratio']
+                    )
+                    for unassigned in cluster_data.get('unassigned_farmers', []):
+                        results['unassigned_farmers'].append({
+                            'cluster': centroid_name,
+                            'farmer_name': unassigned['name'],
+                            'milk': unassigned['milk']
+                        })
+                    results['total_cost'] += cluster_data.get('cost', 0)
+                    results['clusters'].append(cluster_data)
+                    continue
+                
+                total_cluster_milk = sum(self.farmers_milk.get(farmer, 0) for farmer in subarea_list)
                 
                 cluster_data = {
                     'name': centroid_name,
@@ -377,7 +1411,8 @@ class OptimizationEngine:
                     'capacity': self.center_capacity.get(centroid_name, 0),
                     'vehicles': [],
                     'cost': 0,
-                    'unassigned_farmers': unassigned_farmers
+                    'unassigned_farmers': unassigned_farmers,
+                    'fill_ratio': hub_fill[centroid_name]['fill_ratio']
                 }
                 
                 for unassigned in unassigned_farmers:
@@ -388,131 +1423,48 @@ class OptimizationEngine:
                     })
                 
                 for vehicle_idx, vehicle_data in enumerate(vehicle_assignments):
-                    vtype = vehicle_data["vehicle_type"]
-                    vspec = vehicle_data["vehicle_spec"]
-                    
-                    optimized_route, _ = self.optimize_vehicle_route(
-                        centroid_name,
-                        chilling_center_coords,
-                        vehicle_data['farmers'],
-                        vehicle_idx,
-                        vspec['capacity'],
-                        self.farmers_milk
-                    )
-                    
-                    distance_km, travel_time_min = self.get_route_metrics(
-                        optimized_route, chilling_center_coords
-                    )
-
-                    print("8888888888888888888888888888888888888888888888888888")
-                    print(vehicle_data)
-
-                    v_info = vehicle_data.get('vehicle_info')
-                    farmer_names = vehicle_data['farmers']
-                    route_coords = [self.subareas[f] for f in farmer_names if f in self.subareas]
-                    
-                    # FIXED: cluster_center → chilling_center_coords
-                    if route_coords and len(route_coords) > 0:
-                        try:
-                            optimized_route, distance_km, travel_time_min = self.get_optimized_route(
-                                chilling_center_coords, route_coords, farmer_names
-                            )
-                        except Exception as e:
-                            print(f"❌ Route optimization failed: {e}")
-                            optimized_route = farmer_names
-                            distance_km = None
-                            travel_time_min = None
-                    else:
-                        optimized_route = farmer_names
-                        distance_km = None
-                        travel_time_min = None
-                    
-                    service_time = len(farmer_names) * vspec.get('service_time', 4)
-                    total_time = (travel_time_min or 0) + service_time
-                    
-                    if distance_km:
-                        cost = vspec['fixed_cost'] + (distance_km * vspec['cost_per_km'])
-                    else:
-                        cost = 0
-                    
-                    time_violation = total_time > deadline_minutes if distance_km else False
-                    distance_violation = distance_km > max_distance_km if distance_km else False
-                    is_violated = time_violation or distance_violation
-                    
-                    if not distance_km:
-                        status = "NO DATA"
-                    elif is_violated:
-                        if time_violation and distance_violation:
-                            status = "TIME & DISTANCE EXCEEDED"
-                        elif time_violation:
-                            status = "TIME EXCEEDED | WITHIN DISTANCE"
-                        else:
-                            status = "ON TIME | DISTANCE EXCEEDED"
-                    else:
-                        status = "ON TIME | WITHIN DISTANCE"
-                    
-                    # ----------------- CONVERT farmers to objects (name, lat, lng, milk) -----------------
-                    farmer_details = [
-                        self.get_farmer_details(name)
-                        for name in farmer_names
-                    ]
-
-                    vehicle_info = {
-                        'id': vehicle_idx + 1,
-                        'type': vtype,
-                        'capacity': vspec['capacity'],
-                        'vehicle_number': v_info.get('vehicle_number') if v_info else None,
-                        'vehicle_code': v_info.get('vehicle_code') if v_info else None,
-                        'vehicle_name': v_info.get('vehicle_name') if v_info else None,
-                        'total_milk': vehicle_data['total_milk'],
-                        'farmers' : farmer_details,    # <-- now objects with lat/lng
-                        'utilization': vehicle_data['utilization'],
-                        'route': optimized_route,
-                        'distance': distance_km,
-                        'travel_time': travel_time_min,
-                        'is_violated': is_violated,
-                        'status': status,
-                        'total_time': total_time,
-                        'service_time': service_time,
-                        'cost': round(cost, 2),
-                        'time_violation': time_violation,
-                        'distance_violation': distance_violation,
-                        'time_diff': deadline_minutes - total_time if distance_km else 0,
-                        'dist_diff': max_distance_km - distance_km if distance_km else 0,
-                        'violation_type': 'Distance' if distance_violation and not time_violation else (
-                            'Time' if time_violation and not distance_violation else (
-                                'Both' if is_violated else ''
-                            )
+                    late = None
+                    if self.pickup_windows or centroid_name in self.hub_windows:
+                        late = self.late_farmers(
+                            centroid_name, evaluations[vehicle_idx]['route'] or vehicle_data['farmers'],
+                            vehicle_data['vehicle_spec'], vehicle_data.get('start_minute', 0.0)
                         )
-                    }
-                    
-                    cluster_data['cost'] += cost
-                    
-                    # KEEP ONLY ONE APPEND (FIXED)
+                        late_pickups.extend(late)
+                    vehicle_info = self.build_vehicle_result(
+                        vehicle_idx, vehicle_data, evaluations[vehicle_idx],
+                        deadline_minutes, max_distance_km, late_farmers=late
+                    )
+                    cluster_data['cost'] += vehicle_info['cost']
                     cluster_data['vehicles'].append(vehicle_info)
                 
                 cluster_data['cost'] = round(cluster_data['cost'],2)
                 results['total_cost'] += cluster_data['cost']
                 results['clusters'].append(cluster_data)
+                
+                # Cache only a cluster that served exactly the vendors its fingerprint covers
+                members = {f for v in vehicle_assignments for f in v['farmers']}
+                if (cluster_cache is not None and members == assigned_members[centroid_name]
+                        and self.fully_served(cluster_data)):
+                    cluster_cache.put(cluster_fingerprints[centroid_name], centroid_name, cluster_data)
+            
+            if route_geometry:
+                self.perf.stage("geometry")
+                results['route_geometry'] = self.attach_route_geometry(results['clusters'])
             
             unused_vehicles = []
             for vehicle_type, count in global_fleet_availability.items():
                 if count > 0:
                     vehicle_spec = next(v for v in vehicle_types_list if v['name'] == vehicle_type)
                     
-                    unused_fleet_details = []
-                    if hasattr(self, 'fleet_lookup') and vehicle_type in self.fleet_lookup:
-                        used_count = vehicle_spec['count'] - count
-                        
-                        for idx in range(used_count, len(self.fleet_lookup[vehicle_type])):
-                            if len(unused_fleet_details) < count:
-                                vehicle_info = self.fleet_lookup[vehicle_type][idx]
-                                unused_fleet_details.append({
-                                    'vehicle_number': vehicle_info.get('vehicle_number'),
-                                    'vehicle_code': vehicle_info.get('vehicle_code'),
-                                    'vehicle_name': vehicle_info.get('vehicle_name'),
-                                    'capacity_liters': vehicle_info.get('capacity_liters')
-                                })
+                    unused_fleet_details = [
+                        {
+                            'vehicle_number': vehicle_info.get('vehicle_number'),
+                            'vehicle_code': vehicle_info.get('vehicle_code'),
+                            'vehicle_name': vehicle_info.get('vehicle_name'),
+                            'capacity_liters': vehicle_info.get('capacity_liters')
+                        }
+                        for vehicle_info in self.vehicle_pool.free(vehicle_type)[:count]
+                    ]
                     
                     unused_vehicles.append({
                         "type": vehicle_type,
@@ -522,13 +1474,96 @@ class OptimizationEngine:
                     })
 
             results['unused_vehicles'] = unused_vehicles
+            results['hub_assignment'] = {
+                'spilled_vendors': hub_assignment['spilled'],
+                'overflow_vendors': hub_assignment['overflow'],
+                'unreachable_vendors': len(hub_assignment['unreachable_vendors']),
+                'hubs': list(hub_fill.values())
+            }
+            self._report_progress(progress_callback, 'completed', clusters_total, clusters_total)
+            # No routable hub: never reached a cluster
+            for farmer_name in hub_assignment['unreachable_vendors']:
+                results['unassigned_farmers'].append({
+                    'cluster': None,
+                    'farmer_name': farmer_name,
+                    'milk': self.farmers_milk.get(farmer_name, 0)
+                })
             results['total_unassigned_farmers'] = len(results['unassigned_farmers'])
             results['total_unassigned_milk'] = sum(f['milk'] for f in results['unassigned_farmers'])
             
+            # Route evaluation used to make 3 routing calls per vehicle
+            # (optimize, measure optimized order, re-measure assigned order)
+            evaluated = [e for e in evaluation_list if e['route']]
+            routing_requests = sum(e['requests'] for e in evaluation_list)
+            legacy_requests = 3 * len(evaluated) if self.routing_provider.remote else 0
+            results['routing_calls'] = {
+                'vehicles': len(evaluated),
+                'requests': routing_requests,
+                'requests_saved': legacy_requests - routing_requests
+            }
+            
+            results['solver'] = solver
+            results['cluster_fingerprints'] = cluster_fingerprints
+            if time_budget_seconds:
+                results['time_budget'] = {
+                    'seconds': time_budget_seconds,
+                    'applied': solver == "native",
+                    'elapsed_seconds': round(time.perf_counter() - run_started, 3),
+                    'trace': improvement_trace
+                }
+            if seed_results is not None:
+                results['warm_start'] = {
+                    'applied': solver == "native",
+                    'seeded_clusters': sorted(
+                        name for name in seed_routes if name in cluster_assignments
+                        and name not in reused_clusters
+                    )
+                }
+            if previous_results is not None:
+                results['incremental'] = {
+                    'reused_clusters': list(reused_clusters),
+                    'resolved_clusters': [name for name in cluster_assignments if name not in reused_clusters]
+                }
+            if reused_clusters or cluster_cache is not None:
+                results['cluster_reuse'] = {
+                    'clusters': len(cluster_assignments),
+                    'from_previous_run': from_previous,
+                    'from_cache': len(reused_clusters) - from_previous,
+                    'reuse_ratio': round(len(reused_clusters) / len(cluster_assignments), 4)
+                                   if cluster_assignments else 0.0
+                }
+            if lns_summary is not None:
+                results['lns'] = lns_summary
+            if multi_trip_summary is not None:
+                results['multi_trip'] = multi_trip_summary
+            if self.pickup_windows or self.hub_windows:
+                results['time_windows'] = {
+                    'vendors_with_windows': sum(1 for f in self.subareas if f in self.pickup_windows),
+                    'late_pickups': len(late_pickups),
+                    'late_farmers': late_pickups
+                }
+            if solver_stats:
+                results['solver_stats'] = solver_stats
+            if parallel_summary is not None:
+                results['parallel_solve'] = parallel_summary
+            
+            # Matrix cache savings (only when the provider is wrapped in a cache)
+            if hasattr(self.routing_provider, 'cache_stats'):
+                results['matrix_cache'] = self.routing_provider.cache_stats()
+            
+            self.perf.end_stage()
+            results['perf'] = self.perf.report()
             return results
         
         except Exception as e:
             raise Exception(f"Error in optimization: {str(e)}")
+        finally:
+            self.perf.end_stage()
+            self.cluster_legs = {}
+            self.routing_provider.attach_perf(None)
+            if perf is None:
+                self.perf.close()
+            self.perf = None
     
     def save_optimization_result(self, results: Dict, output_dir: str = "optimization_history"):
         if not os.path.exists(output_dir):
@@ -0,0 +1,189 @@
+#scripts/ors_standin.py
+"""
+ORS Stand-in
+A local HTTP server answering the OpenRouteService calls the engine makes
+
+Serves POST /v2/matrix/{profile}, /v2/directions/{profile}[/geojson] and
+/optimization in the ORS response shapes the ORS provider parses. A request
+found in the fixture store (recorded from the real API, see
+scripts/routing_fixtures.py) gets its recorded response; anything else is
+answered by the offline estimator, so every run against the stand-in is
+deterministic and needs no network or API key.
+
+Point the backend at it with ORS_BASE_URL=http://127.0.0.1:8081, or use
+httpx.ASGITransport(app=create_app()) as the ORS provider's transport to run
+it in-process.
+
+Usage (from backend/):
+    python -m scripts.ors_standin [--port 8081] [--fixtures fixtures/ors.json.gz]
+"""
+
+import argparse
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from scripts.routing_fixtures import FixtureStore
+from scripts.routing_providers import OfflineRoutingProvider, Coord, haversine_legs
+
+DEFAULT_PORT = 8081
+
+
+def _coords(lng_lat: Sequence[Sequence[float]]) -> List[Coord]:
+    """ORS [lng, lat] pairs → the (lat, lng) tuples providers take"""
+    return [(float(lat), float(lng)) for lng, lat in lng_lat]
+
+
+def _ors_error(status: int, message: str) -> JSONResponse:
+    return JSONResponse(status_code=status, content={"error": {"code": status, "message": message}})
+
+
+class ORSStandIn:
+    """ORS-shaped answers from the offline estimator"""
+
+    def __init__(self, estimator: Optional[OfflineRoutingProvider] = None):
+        self.estimator = estimator or OfflineRoutingProvider()
+
+    def route_meters_seconds(self, coords: Sequence[Coord]):
+        if len(coords) < 2:
+            return 0.0, 0.0
+        km = float(haversine_legs(coords).sum() * self.estimator.circuity_factor)
+        return km * 1000, km / self.estimator.speed_kmph * 3600
+
+    def matrix(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        locations = _coords(body["locations"])
+        sources = [locations[i] for i in body.get("sources", range(len(locations)))]
+        destinations = [locations[i] for i in body.get("destinations", range(len(locations)))]
+        metrics = body.get("metrics", ["duration"])
+        data = self.estimator.matrix(sources, destinations, metrics=("distance", "duration"))
+
+        response: Dict[str, Any] = {"metadata": {"service": "matrix", "engine": "ors-standin"}}
+        if "distance" in metrics:
+            scale = {"km": 1.0, "mi": 1 / 1.609344}.get(body.get("units", "m"), 1000.0)
+            response["distances"] = np.round(data["distances"] * scale, 2).tolist()
+        if "duration" in metrics:
+            # ORS durations are always seconds
+            response["durations"] = np.round(data["durations"] * 60, 2).tolist()
+        return response
+
+    def directions(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        meters, seconds = self.route_meters_seconds(_coords(body["coordinates"]))
+        return {"routes": [{"summary": {"distance": round(meters, 1), "duration": round(seconds, 1)}}]}
+
+    def geometry(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Straight lines between the waypoints (the estimator has no road network)"""
+        coordinates = [list(point) for point in body["coordinates"]]
+        meters, seconds = self.route_meters_seconds(_coords(coordinates))
+        return {"type": "FeatureCollection", "features": [{
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": coordinates},
+            "properties": {"summary": {"distance": round(meters, 1), "duration": round(seconds, 1)}},
+        }]}
+
+    def optimization(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        One nearest-neighbour tour per vehicle; jobs are handed out in tour
+        order until a vehicle is full, the rest are reported unassigned
+        """
+        jobs = list(body.get("jobs", []))
+        routes, total_duration = [], 0.0
+
+        for vehicle in body.get("vehicles", []):
+            if not jobs:
+                break
+            start = _coords([vehicle["start"]])[0]
+            end = _coords([vehicle.get("end", vehicle["start"])])[0]
+            order, _ = self.estimator.optimize_route(
+                start, _coords([job["location"] for job in jobs]), [], 0
+            )
+            capacity = (vehicle.get("capacity") or [float("inf")])[0]
+            load, taken = 0.0, []
+            for index in order:
+                demand = (jobs[index].get("delivery") or jobs[index].get("pickup") or [0])[0]
+                if load + demand <= capacity:
+                    load += demand
+                    taken.append(index)
+            _, seconds = self.route_meters_seconds(
+                [start] + _coords([jobs[i]["location"] for i in taken]) + [end]
+            )
+
+            route = {
+                "vehicle": vehicle["id"],
+                "cost": round(seconds),
+                "duration": round(seconds),
+                "steps": [{"type": "start", "location": vehicle["start"]}]
+                         + [{"type": "job", "id": jobs[i]["id"], "location": jobs[i]["location"]} for i in taken]
+                         + [{"type": "end", "location": vehicle.get("end", vehicle["start"])}],
+            }
+            total_duration += round(seconds)
+            routes.append(route)
+            taken_ids = {jobs[i]["id"] for i in taken}
+            jobs = [job for job in jobs if job["id"] not in taken_ids]
+
+        summary = {"cost": total_duration, "routes": len(routes), "unassigned": len(jobs), "duration": total_duration}
+        return {
+            "code": 0,
+            "summary": summary,
+            "unassigned": [{"id": job["id"], "location": job["location"]} for job in jobs],
+            "routes": routes,
+        }
+
+
+def create_app(fixtures: Optional[FixtureStore] = None,
+               estimator: Optional[OfflineRoutingProvider] = None) -> FastAPI:
+    """
+    Args:
+        fixtures: recorded ORS responses, served before the estimator is asked
+        estimator: offline provider answering unrecorded requests
+    """
+    app = FastAPI(title="ORS stand-in")
+    standin = ORSStandIn(estimator)
+    app.state.served = {"fixture": 0, "estimator": 0}
+
+    async def answer(request: Request, compute) -> JSONResponse:
+        body = await request.json()
+        hit = fixtures.get(request.url.path, body) if fixtures is not None else None
+        if hit is not None:
+            app.state.served["fixture"] += 1
+            return JSONResponse(status_code=hit[0], content=hit[1])
+        try:
+            content = compute(body)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            return _ors_error(400, f"Invalid request body: {e}")
+        app.state.served["estimator"] += 1
+        return JSONResponse(content=content)
+
+    @app.post("/v2/matrix/{profile}")
+    async def matrix(profile: str, request: Request):
+        return await answer(request, standin.matrix)
+
+    @app.post("/v2/directions/{profile}")
+    async def directions(profile: str, request: Request):
+        return await answer(request, standin.directions)
+
+    @app.post("/v2/directions/{profile}/geojson")
+    async def geometry(profile: str, request: Request):
+        return await answer(request, standin.geometry)
+
+    @app.post("/optimization")
+    async def optimization(request: Request):
+        return await answer(request, standin.optimization)
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--fixtures", help="recorded fixture file (.json.gz) to serve first")
+    args = parser.parse_args()
+
+    store = FixtureStore(args.fixtures) if args.fixtures else None
+    print(f"🛰️ ORS stand-in on http://{args.host}:{args.port}"
+          + (f" ({len(store)} recorded responses)" if store is not None else ""))
+    uvicorn.run(create_app(store), host=args.host, port=args.port)
@@ -0,0 +1,116 @@
+#scripts/parallel_clusters.py
+"""
+Parallel Cluster Solves
+Native-solver planning of many hubs on a process pool
+
+Once vendors are assigned to hubs, a cluster's routes depend only on its own
+matrix and on the reference vehicle (the largest type still available) they
+are built against; the shared fleet only matters when vehicles are handed
+out. So the fleet is split in two phases:
+
+1. Upfront, in the parent: every cluster gets the same fleet snapshot, hence
+   its reference vehicle, and all cluster matrices go into one shared-memory
+   block (SharedMatrices) that worker processes map read-only.
+2. Workers construct and improve routes (VRPSolver.plan) concurrently.
+
+The merge then gives routes vehicles (VRPSolver.assign_vehicles) cluster by
+cluster in input order, from the shared fleet, exactly as the sequential loop
+would. A cluster whose reference vehicle ran out in the meantime is
+re-planned in the parent against what is left, so the merged result matches
+a sequential solve and does not depend on which worker finished first.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, List, Optional
+
+from scripts.vrp_solver import VRPSolver
+from scripts.time_windows import TimeWindows
+from scripts.scenario_sweep import SharedMatrices
+
+# Filled in each worker by _init_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+def cluster_solver(task: Dict[str, Any], distances: np.ndarray, durations: np.ndarray,
+                   fleet_availability: Dict[str, int]) -> VRPSolver:
+    """
+    VRPSolver for one cluster task
+
+    task: {"name", "demands", "vehicle_types", "deadline_minutes", "max_distance_km",
+           "neighbour_lists", "windows" ((earliest, latest, service_time) or None),
+           "seed_routes" (stop positions or None), "time_budget_seconds"}
+    """
+    return VRPSolver(
+        distances, durations, task['demands'], task['vehicle_types'],
+        task['deadline_minutes'], task['max_distance_km'],
+        fleet_availability=fleet_availability,
+        neighbour_lists=task['neighbour_lists'],
+        time_windows=TimeWindows(durations, *task['windows']) if task.get('windows') else None
+    )
+
+
+def plan_cluster(task: Dict[str, Any], matrices: Dict[str, np.ndarray],
+                 fleet_availability: Dict[str, int]) -> Dict[str, Any]:
+    """Routes of one cluster against a fleet snapshot (nothing is decremented)"""
+    solver = cluster_solver(
+        task, matrices[f"{task['name']}:distance"], matrices[f"{task['name']}:duration"],
+        dict(fleet_availability)
+    )
+    return solver.plan(task.get('seed_routes'), time_budget_seconds=task.get('time_budget_seconds'))
+
+
+def _init_worker(spec, fleet_availability: Dict[str, int]):
+    shm, matrices = SharedMatrices.attach(spec)
+    # Keep the mapping alive for the life of the worker
+    _WORKER_STATE.update(shm=shm, matrices=matrices, fleet_availability=fleet_availability)
+
+
+def _plan_in_worker(task: Dict[str, Any]) -> Dict[str, Any]:
+    return plan_cluster(task, _WORKER_STATE['matrices'], _WORKER_STATE['fleet_availability'])
+
+
+def plan_clusters(tasks: List[Dict[str, Any]], matrices: Dict[str, np.ndarray],
+                  fleet_availability: Dict[str, int], max_workers: Optional[int] = None,
+                  on_planned: Optional[Callable[[int], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Plan every task against the same fleet snapshot.
+
+    Args:
+        matrices: "{name}:distance" / "{name}:duration" per task
+        max_workers: worker processes (None = CPU count); 1 plans in-process
+        on_planned: called with a task's index as its plan arrives (completion order)
+
+    Returns:
+        plans in task order
+    """
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+    if workers == 1:
+        plans = []
+        for index, task in enumerate(tasks):
+            plans.append(plan_cluster(task, matrices, fleet_availability))
+            if on_planned:
+                on_planned(index)
+        return plans
+
+    shared = SharedMatrices(matrices)
+    try:
+        # spawn: never fork a server process that runs threads
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("spawn"),
+            initializer=_init_worker, initargs=(shared.spec, dict(fleet_availability))
+        ) as pool:
+            # Largest clusters first, so a big hub does not start last and hold up the merge
+            order = sorted(range(len(tasks)), key=lambda i: -len(tasks[i]['demands']))
+            futures = {pool.submit(_plan_in_worker, tasks[i]): i for i in order}
+            plans: List[Optional[Dict[str, Any]]] = [None] * len(tasks)
+            for future in as_completed(futures):
+                index = futures[future]
+                plans[index] = future.result()
+                if on_planned:
+                    on_planned(index)
+        return plans
+    finally:
+        shared.close()
@@ -0,0 +1,170 @@
+#scripts/perf.py
+"""
+Perf Recorder
+Per-stage wall time, external calls, bytes and memory for one optimization run
+
+A run opens one span per stage (`with perf.span("routing"): ...`, or
+perf.stage(name) for back-to-back phases). Spans may nest; the adapter's
+"engine" span contains the engine's own stages. Routing providers report
+every HTTP request with `perf.count(kind, bytes)`, which is charged to all
+spans open at that moment - requests are issued from the routing thread
+while the engine thread sits inside a stage, so the open-span stack is
+shared across threads rather than thread-local.
+
+Memory: max_rss_mb (process high-water mark, always recorded; it never goes
+down, so read it as "by the end of this stage") and, when trace_memory is on,
+peak_traced_mb per span from tracemalloc. tracemalloc slows Python-heavy
+stages noticeably and is process-wide, so it is opt-in.
+"""
+
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+MB = 1024 * 1024
+# ru_maxrss is bytes on macOS, kilobytes elsewhere
+RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def max_rss_bytes() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * RSS_UNIT
+
+
+class PerfRecorder:
+    """Collects spans for one run; report() gives the JSON stored with the run"""
+
+    def __init__(self, trace_memory: bool = False):
+        self.started = time.perf_counter()
+        self.trace_memory = trace_memory
+        self._owns_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracing = True
+        self._lock = threading.Lock()
+        self._open: List[Dict[str, Any]] = []
+        self.spans: List[Dict[str, Any]] = []
+        self._stage: Optional[Dict[str, Any]] = None
+
+    def _fold_peak(self):
+        """Charge the traced peak so far to every open span, then restart the peak"""
+        if not self.trace_memory or not tracemalloc.is_tracing():
+            return
+        peak = tracemalloc.get_traced_memory()[1]
+        for span in self._open:
+            span['peak_traced'] = max(span['peak_traced'], peak)
+        tracemalloc.reset_peak()
+
+    def _enter(self, name: str) -> Dict[str, Any]:
+        span = {
+            'name': name,
+            'parent': None,
+            'started': time.perf_counter(),
+            'calls': {},
+            'bytes': 0,
+            'peak_traced': 0,
+        }
+        with self._lock:
+            self._fold_peak()
+            span['parent'] = self._open[-1]['name'] if self._open else None
+            self._open.append(span)
+        return span
+
+    def _exit(self, span: Dict[str, Any]):
+        with self._lock:
+            self._fold_peak()
+            self._open.remove(span)
+            span['seconds'] = time.perf_counter() - span['started']
+            span['max_rss'] = max_rss_bytes()
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[Dict[str, Any]]:
+        span = self._enter(name)
+        try:
+            yield span
+        finally:
+            self._exit(span)
+
+    def stage(self, name: str):
+        """
+        End the current stage (if any) and start `name`: for a pipeline's
+        sequential phases, without wrapping each one in a with-block
+        """
+        self.end_stage()
+        self._stage = self._enter(name)
+
+    def end_stage(self):
+        if self._stage is not None:
+            self._exit(self._stage)
+            self._stage = None
+
+    def count(self, kind: str, nbytes: int = 0, calls: int = 1):
+        """An external call of `kind` (e.g. "matrix") moving nbytes, charged to the open spans"""
+        with self._lock:
+            for span in self._open:
+                span['calls'][kind] = span['calls'].get(kind, 0) + calls
+                span['bytes'] += nbytes
+
+    def close(self):
+        if self._owns_tracing:
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Spans in start order, with totals over the top-level spans. Spans of
+        the same name under the same parent (e.g. one "matrix" per cluster)
+        are merged; 'count' says how many there were.
+        """
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s['started'])
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        for span in spans:
+            stage = merged.get((span['parent'], span['name']))
+            if stage is None:
+                stage = merged[(span['parent'], span['name'])] = {
+                    'name': span['name'],
+                    'parent': span['parent'],
+                    'count': 0,
+                    'start_seconds': round(span['started'] - self.started, 4),
+                    'seconds': 0.0,
+                    'external_calls': 0,
+                    'calls_by_kind': {},
+                    'bytes': 0,
+                    'max_rss_mb': 0.0,
+                }
+                if self.trace_memory:
+                    stage['peak_traced_mb'] = 0.0
+            stage['count'] += 1
+            stage['seconds'] = round(stage['seconds'] + span['seconds'], 4)
+            stage['external_calls'] += sum(span['calls'].values())
+            for kind, calls in span['calls'].items():
+                stage['calls_by_kind'][kind] = stage['calls_by_kind'].get(kind, 0) + calls
+            stage['bytes'] += span['bytes']
+            stage['max_rss_mb'] = max(stage['max_rss_mb'], round(span['max_rss'] / MB, 1))
+            if self.trace_memory:
+                stage['peak_traced_mb'] = max(stage['peak_traced_mb'], round(span['peak_traced'] / MB, 2))
+
+        stages = list(merged.values())
+        top = [s for s in stages if s['parent'] is None]
+        return {
+            'total_seconds': round(time.perf_counter() - self.started, 4),
+            'external_calls': sum(s['external_calls'] for s in top),
+            'bytes': sum(s['bytes'] for s in top),
+            'max_rss_mb': round(max_rss_bytes() / MB, 1),
+            'stages': stages,
+        }
+
+
+@contextmanager
+def maybe_span(perf: Optional[PerfRecorder], name: str) -> Iterator[Optional[Dict[str, Any]]]:
+    """perf.span(name), or nothing when no recorder is attached"""
+    if perf is None:
+        yield None
+    else:
+        with perf.span(name) as span:
+            yield span
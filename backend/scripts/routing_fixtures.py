@@ -0,0 +1,144 @@
+#scripts/routing_fixtures.py
+"""
+Routing Fixtures
+Record ORS request/response pairs once, replay them with no network
+
+A FixtureStore is one gzip-compressed JSON file mapping a request key
+(SHA-256 of path + canonical JSON body) to the recorded status and response.
+The same request always has the same key, so a recorded run replays exactly
+as long as the engine asks the same questions.
+
+FixtureTransport plugs into the httpx client the ORS provider already uses:
+- record: forward to the real API and store every successful JSON response
+- replay: answer from the store; a request that was never recorded goes to
+  the fallback transport (e.g. the local ORS stand-in) or fails loudly
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+FIXTURE_MODES = ("record", "replay")
+FORMAT_VERSION = 1
+
+
+class FixtureMissError(Exception):
+    """Replay was asked for a request that is not in the fixture store"""
+
+
+def fixture_key(path: str, body: Any) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{path}\n{canonical}".encode()).hexdigest()
+
+
+class FixtureStore:
+    """Request key → (status, JSON response), persisted as one .json.gz file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported fixture format in {path}: {data.get('version')}")
+            self.entries = data["entries"]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, path: str, body: Any) -> Optional[Tuple[int, Any]]:
+        entry = self.entries.get(fixture_key(path, body))
+        return (entry["status"], entry["response"]) if entry else None
+
+    def put(self, path: str, body: Any, status: int, response: Any):
+        with self._lock:
+            self.entries[fixture_key(path, body)] = {"path": path, "status": status, "response": response}
+            self._dirty = True
+
+    def save(self):
+        """Write the store if anything was recorded (atomic: temp file + rename)"""
+        with self._lock:
+            if not self._dirty:
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+                f.write(json.dumps({"version": FORMAT_VERSION, "entries": self.entries},
+                                   sort_keys=True).encode("utf-8"))
+            os.replace(tmp, self.path)
+            self._dirty = False
+
+
+def _request_path(request: httpx.Request) -> str:
+    return request.url.path
+
+
+class FixtureTransport(httpx.AsyncBaseTransport):
+    """
+    Args:
+        store: fixtures to record into / replay from
+        mode: "record" or "replay"
+        upstream: transport for real requests (record) or unrecorded ones (replay);
+                  defaults to the network when recording, nothing when replaying.
+                  A passed-in upstream is shared, so it is left open on aclose()
+    """
+
+    def __init__(self, store: FixtureStore, mode: str,
+                 upstream: Optional[httpx.AsyncBaseTransport] = None):
+        if mode not in FIXTURE_MODES:
+            raise ValueError(f"Unknown fixture mode '{mode}'. Choose from: {', '.join(FIXTURE_MODES)}")
+        self.store = store
+        self.mode = mode
+        self._owns_upstream = upstream is None and mode == "record"
+        self.upstream = httpx.AsyncHTTPTransport() if self._owns_upstream else upstream
+        self.replayed = 0
+        self.recorded = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        path = _request_path(request)
+        body = json.loads(request.content or b"null")
+
+        if self.mode == "replay":
+            hit = self.store.get(path, body)
+            if hit is not None:
+                self.replayed += 1
+                return httpx.Response(hit[0], json=hit[1], request=request)
+            if self.upstream is None:
+                raise FixtureMissError(f"No recorded response for POST {path}")
+
+        response = await self.upstream.handle_async_request(request)
+        if self.mode == "record":
+            await response.aread()
+            if response.status_code < 400:
+                self.store.put(path, body, response.status_code, response.json())
+                self.recorded += 1
+        return response
+
+    async def aclose(self):
+        if self.mode == "record":
+            self.store.save()
+        if self._owns_upstream:
+            await self.upstream.aclose()
+
+
+_stores: Dict[str, FixtureStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_fixture_store(path: str) -> FixtureStore:
+    """One FixtureStore per file in this process, so concurrent clients share it"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = FixtureStore(path)
+        return _stores[path]
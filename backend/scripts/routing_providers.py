@@ -0,0 +1,540 @@
+#scripts/routing_providers.py
+"""
+Routing Providers
+Pluggable distance/duration backends for the optimization engine
+
+- ORSRoutingProvider: OpenRouteService HTTP API (matrix, optimization, directions)
+- OfflineRoutingProvider: haversine x road-circuity estimate, no network needed
+
+The engine fetches one distance + duration matrix per cluster and measures
+every route by summing its legs (route_matrix_metrics); per vehicle it only
+asks the provider for a stop order (one /optimization call for ORS, none
+offline). Directions calls are left for optional road geometry.
+
+ORSRoutingProvider can record its responses to a fixture file and replay
+them later with no network (scripts/routing_fixtures.py); scripts/ors_standin.py
+serves the same API locally.
+
+All coordinates passed to a provider are (lat, lng) tuples, the same format
+the engine keeps in `subareas` and `centroids`. Providers convert to the
+[lon, lat] order ORS expects internally.
+"""
+
+import os
+import math
+import time
+import asyncio
+import httpx
+import requests
+import numpy as np
+from contextlib import asynccontextmanager, nullcontext
+from typing import List, Dict, Tuple, Optional, Sequence, Any, Union
+
+from scripts.async_routing import (
+    AsyncRoutingClient, RoutingRequestError, run_async, request_kind, observe_request,
+    DEFAULT_MAX_CONCURRENCY, DEFAULT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_RETRIES, DEFAULT_RETRY_BACKOFF_SECONDS,
+)
+from scripts.routing_fixtures import FixtureStore, FixtureTransport, FIXTURE_MODES, open_fixture_store
+
+# ========== API CONFIGURATION ==========
+ORS_API_KEY = os.getenv(
+    "ORS_API_KEY",
+    "eyJvcmciOiI1YjNjZTM1OTc4NTExMTAwMDFjZjYyNDgiLCJpZCI6ImIyNjFmZWMzYWRhNTRmMDE5YzVjZWZkYTQ2MzRjNzk2IiwiaCI6Im11cm11cjY0In0="
+)
+ORS_BASE_URL = "https://api.openrouteservice.org"
+ORS_MATRIX_MAX_ELEMENTS = 3500   # public API: sources x destinations per matrix request
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_CIRCUITY_FACTOR = 1.3   # road distance / great-circle distance
+DEFAULT_SPEED_KMPH = 40.0       # matches the fleet Excel default (Avg Speed)
+
+Coord = Tuple[float, float]
+
+
+def haversine_matrix(sources: Sequence[Coord], destinations: Sequence[Coord]) -> np.ndarray:
+    """Great-circle distance (km) between every source and destination"""
+    src = np.radians(np.asarray(sources, dtype=np.float64).reshape(-1, 2))
+    dst = np.radians(np.asarray(destinations, dtype=np.float64).reshape(-1, 2))
+
+    lat1 = src[:, 0][:, None]
+    lat2 = dst[:, 0][None, :]
+    dlat = lat2 - lat1
+    dlng = dst[:, 1][None, :] - src[:, 1][:, None]
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def haversine_legs(points: Sequence[Coord]) -> np.ndarray:
+    """Great-circle distance (km) of each consecutive leg along a path"""
+    pts = np.radians(np.asarray(points, dtype=np.float64).reshape(-1, 2))
+    lat1, lat2 = pts[:-1, 0], pts[1:, 0]
+    dlat = lat2 - lat1
+    dlng = pts[1:, 1] - pts[:-1, 1]
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def route_matrix_metrics(distances: np.ndarray, durations: np.ndarray, path: Sequence[int],
+                         duration_factor: float = 1.0) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Distance (km) and travel time (minutes) of a path of matrix indices, summed
+    over its legs; (None, None) when the path has no legs or a leg is unroutable
+    """
+    if len(path) < 2:
+        return None, None
+    rows, cols = np.asarray(path[:-1]), np.asarray(path[1:])
+    distance_km = float(distances[rows, cols].sum())
+    travel_time_min = float(durations[rows, cols].sum()) * duration_factor
+    if not (math.isfinite(distance_km) and math.isfinite(travel_time_min)):
+        return None, None
+    return round(distance_km, 2), round(travel_time_min, 2)
+
+
+def matrix_tiles(source_count: int, destination_count: int,
+                 max_elements: int) -> List[Tuple[slice, slice]]:
+    """
+    Split a sources x destinations matrix into blocks of at most max_elements.
+    A short side is kept whole; otherwise blocks are roughly square.
+    """
+    if source_count * destination_count <= max_elements:
+        return [(slice(0, source_count), slice(0, destination_count))]
+
+    side = max(1, math.isqrt(max_elements))
+    if destination_count <= side:
+        cols, rows = destination_count, max_elements // destination_count
+    elif source_count <= side:
+        rows, cols = source_count, max_elements // source_count
+    else:
+        rows = cols = side
+
+    return [
+        (slice(r, min(r + rows, source_count)), slice(c, min(c + cols, destination_count)))
+        for r in range(0, source_count, rows)
+        for c in range(0, destination_count, cols)
+    ]
+
+
+class RoutingProvider:
+    """
+    Base interface for routing backends.
+    Subclasses implement matrix, route ordering and route metrics.
+    """
+
+    name = "base"
+    cacheable = False    # worth putting a persistent matrix cache in front of
+    remote = False       # every call is a network request
+    perf = None          # PerfRecorder of the current run; external calls are counted on it
+
+    def attach_perf(self, perf):
+        """Report this provider's external calls to a run's PerfRecorder (None detaches)"""
+        self.perf = perf
+
+    def record_call(self, path: str, nbytes: int):
+        """Count one HTTP request (kind from the path: matrix / optimization / directions)"""
+        if self.perf is not None:
+            self.perf.count(request_kind(path), nbytes)
+
+    @property
+    def cache_namespace(self) -> str:
+        """Cache entries are only shared between providers with the same namespace"""
+        return self.name
+
+    def matrix(self, sources: Sequence[Coord], destinations: Sequence[Coord],
+               metrics: Sequence[str] = ("distance",)) -> Dict[str, np.ndarray]:
+        """
+        Distance (km) and/or duration (minutes) from every source to every destination
+
+        Returns:
+            {"distances": ndarray, "durations": ndarray} - only requested metrics present
+        """
+        raise NotImplementedError
+
+    def matrix_many(self, blocks: Sequence[Tuple[Sequence[Coord], Sequence[Coord]]],
+                    metrics: Sequence[str] = ("distance",)) -> List[Dict[str, np.ndarray]]:
+        """matrix() for several independent (sources, destinations) pairs, in order"""
+        return [self.matrix(sources, destinations, metrics) for sources, destinations in blocks]
+
+    def optimize_route(self, depot: Coord, stops: Sequence[Coord], demands: Sequence[float],
+                       capacity: float, vehicle_id: int = 0,
+                       vehicle: Optional[Dict] = None) -> Tuple[List[int], Any]:
+        """
+        Order stops for a single vehicle starting and ending at depot
+
+        Returns:
+            (visiting order as indices into stops, raw provider response)
+        """
+        raise NotImplementedError
+
+    def route_metrics(self, coords: Sequence[Coord],
+                      vehicle: Optional[Dict] = None) -> Tuple[Optional[float], Optional[float]]:
+        """Distance (km) and travel time (minutes) driving through coords in order"""
+        raise NotImplementedError
+
+    def duration_factor(self, vehicle: Optional[Dict] = None) -> float:
+        """Multiplier turning matrix durations into this vehicle's travel time"""
+        return 1.0
+
+    def route_geometry(self, coords: Sequence[Coord]) -> Optional[List[Coord]]:
+        """Road geometry through coords as (lat, lng) points; None when the backend has none"""
+        return None
+
+    # ---------- async API (used for concurrent per-vehicle fan-out) ----------
+
+    def session(self):
+        """Async context wrapping a batch of *_async calls (pooled client for HTTP backends)"""
+        return nullcontext(self)
+
+    async def optimize_route_async(self, depot: Coord, stops: Sequence[Coord], demands: Sequence[float],
+                                   capacity: float, vehicle_id: int = 0,
+                                   vehicle: Optional[Dict] = None) -> Tuple[List[int], Any]:
+        return self.optimize_route(depot, stops, demands, capacity, vehicle_id, vehicle)
+
+    async def route_geometry_async(self, coords: Sequence[Coord]) -> Optional[List[Coord]]:
+        return self.route_geometry(coords)
+
+
+class ORSRoutingProvider(RoutingProvider):
+    """OpenRouteService backed provider (network required)"""
+
+    name = "ors"
+    cacheable = True
+    remote = True
+
+    def __init__(self, api_key: str = ORS_API_KEY, base_url: str = ORS_BASE_URL,
+                 profile: str = "driving-car",
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 timeout: float = DEFAULT_TIMEOUT_SECONDS,
+                 matrix_max_elements: int = ORS_MATRIX_MAX_ELEMENTS,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 retry_backoff: float = DEFAULT_RETRY_BACKOFF_SECONDS,
+                 fixtures: Optional[Union[str, FixtureStore]] = None,
+                 fixture_mode: Optional[str] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        fixtures / fixture_mode: record every response into a fixture file, or
+        replay them from it ("record" / "replay"); a replay miss raises
+        FixtureMissError instead of reaching the network.
+        transport: httpx transport used instead of the network, shared by every
+        client this provider opens (so it must survive aclose(), like
+        httpx.ASGITransport around the ORS stand-in)
+        """
+        if fixture_mode is not None and fixture_mode not in FIXTURE_MODES:
+            raise ValueError(f"Unknown fixture mode '{fixture_mode}'. Choose from: {', '.join(FIXTURE_MODES)}")
+        if fixture_mode is not None and fixtures is None:
+            raise ValueError(f"fixture_mode '{fixture_mode}' needs a fixtures path")
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.profile = profile
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.matrix_max_elements = matrix_max_elements
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.fixture_mode = fixture_mode
+        self.fixtures = open_fixture_store(fixtures) if isinstance(fixtures, str) else fixtures
+        self.transport = transport
+        self._client: Optional[AsyncRoutingClient] = None
+
+    @property
+    def cache_namespace(self) -> str:
+        return f"{self.name}:{self.profile}"
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        return {'Authorization': self.api_key, 'Content-Type': 'application/json'}
+
+    # ---------- request bodies / response parsing (shared by sync + async) ----------
+
+    def _optimization_body(self, depot: Coord, stops: Sequence[Coord], demands: Sequence[float],
+                           capacity: float, vehicle_id: int) -> Dict[str, Any]:
+        jobs = [
+            {"id": idx, "location": [lng, lat], "delivery": [demand]}
+            for idx, ((lat, lng), demand) in enumerate(zip(stops, demands))
+        ]
+        ors_vehicle = {
+            "id": vehicle_id,
+            "start": [depot[1], depot[0]],
+            "end": [depot[1], depot[0]],
+            "profile": self.profile,
+            "capacity": [capacity]
+        }
+        return {"jobs": jobs, "vehicles": [ors_vehicle]}
+
+    @staticmethod
+    def _parse_optimization(optimized_data: Dict[str, Any]) -> Tuple[List[int], Any]:
+        if "routes" in optimized_data and optimized_data["routes"]:
+            steps = optimized_data["routes"][0]["steps"]
+            return [step["id"] for step in steps if step["type"] == "job"], optimized_data
+        return [], optimized_data
+
+    @staticmethod
+    def _directions_body(coords: Sequence[Coord]) -> Dict[str, Any]:
+        return {"coordinates": [[lng, lat] for lat, lng in coords], "format": "json"}
+
+    @staticmethod
+    def _parse_directions(data: Dict[str, Any]) -> Tuple[Optional[float], Optional[float]]:
+        if 'error' in data:
+            return None, None
+
+        summary = data['routes'][0]['summary']
+        return round(summary['distance'] / 1000, 2), round(summary['duration'] / 60, 2)
+
+    @staticmethod
+    def _geometry_body(coords: Sequence[Coord]) -> Dict[str, Any]:
+        return {"coordinates": [[lng, lat] for lat, lng in coords]}
+
+    @staticmethod
+    def _parse_geometry(data: Dict[str, Any]) -> Optional[List[Coord]]:
+        if 'error' in data or not data.get('features'):
+            return None
+        return [(lat, lng) for lng, lat, *_ in data['features'][0]['geometry']['coordinates']]
+
+    def _post(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if self.fixture_mode is not None or self.transport is not None:
+            # Record/replay and injected transports live on the httpx client
+            return run_async(self._post_once(path, body))
+
+        started = time.perf_counter()
+        try:
+            response = requests.post(
+                f"{self.base_url}{path}",
+                json=body,
+                headers=self.headers,
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            observe_request(self.name, path, time.perf_counter() - started, type(e).__name__)
+            raise
+        observe_request(
+            self.name, path, time.perf_counter() - started,
+            f"http_{response.status_code}" if response.status_code >= 400 else None
+        )
+        self.record_call(path, len(response.request.body or b"") + len(response.content))
+        return response.json()
+
+    # ---------- sync API ----------
+
+    def matrix(self, sources: Sequence[Coord], destinations: Sequence[Coord],
+               metrics: Sequence[str] = ("distance",)) -> Dict[str, np.ndarray]:
+        """Tiled into blocks within the ORS element limit, fetched concurrently"""
+        return run_async(self._matrix_tiled(list(sources), list(destinations), metrics))
+
+    def matrix_many(self, blocks: Sequence[Tuple[Sequence[Coord], Sequence[Coord]]],
+                    metrics: Sequence[str] = ("distance",)) -> List[Dict[str, np.ndarray]]:
+        """Every tile of every matrix fetched concurrently on one client"""
+        async def fetch_all():
+            async with self._new_client() as client:
+                return await asyncio.gather(*(
+                    self._matrix_tiled(list(sources), list(destinations), metrics, client)
+                    for sources, destinations in blocks
+                ))
+        return list(run_async(fetch_all())) if blocks else []
+
+    async def _matrix_tiled(self, sources: List[Coord], destinations: List[Coord],
+                            metrics: Sequence[str],
+                            client: Optional[AsyncRoutingClient] = None) -> Dict[str, np.ndarray]:
+        shape = (len(sources), len(destinations))
+        result = {}
+        if "distance" in metrics:
+            result["distances"] = np.empty(shape, dtype=np.float32)
+        if "duration" in metrics:
+            result["durations"] = np.empty(shape, dtype=np.float32)
+
+        async def fetch_block(client: AsyncRoutingClient, rows: slice, cols: slice):
+            body = self._matrix_body(sources[rows], destinations[cols], metrics)
+            data = await client.post(f"/v2/matrix/{self.profile}", body)
+            if any(f"{metric}s" not in data for metric in metrics):
+                raise RoutingRequestError(
+                    f"ORS matrix block [{rows.start}:{rows.stop}, {cols.start}:{cols.stop}] "
+                    f"failed: {data.get('error', data)}"
+                )
+            if "distance" in metrics:
+                result["distances"][rows, cols] = self._as_block(data["distances"])
+            if "duration" in metrics:
+                # ORS always reports durations in seconds
+                result["durations"][rows, cols] = self._as_block(data["durations"]) / 60
+
+        async with nullcontext(client) if client is not None else self._new_client() as client:
+            await asyncio.gather(*(
+                fetch_block(client, rows, cols)
+                for rows, cols in matrix_tiles(*shape, self.matrix_max_elements)
+            ))
+        return result
+
+    @staticmethod
+    def _matrix_body(sources: Sequence[Coord], destinations: Sequence[Coord],
+                     metrics: Sequence[str]) -> Dict[str, Any]:
+        all_locations = [[lng, lat] for lat, lng in list(sources) + list(destinations)]
+        dest_idx_start = len(sources)
+        return {
+            "locations": all_locations,
+            "sources": list(range(len(sources))),
+            "destinations": list(range(dest_idx_start, dest_idx_start + len(destinations))),
+            "metrics": list(metrics),
+            "units": "km"
+        }
+
+    @staticmethod
+    def _as_block(rows: List[List[Optional[float]]]) -> np.ndarray:
+        """Unroutable pairs come back as null → NaN"""
+        return np.array(
+            [[np.nan if value is None else value for value in row] for row in rows],
+            dtype=np.float32
+        )
+
+    def optimize_route(self, depot: Coord, stops: Sequence[Coord], demands: Sequence[float],
+                       capacity: float, vehicle_id: int = 0,
+                       vehicle: Optional[Dict] = None) -> Tuple[List[int], Any]:
+        body = self._optimization_body(depot, stops, demands, capacity, vehicle_id)
+        return self._parse_optimization(self._post("/optimization", body))
+
+    def route_metrics(self, coords: Sequence[Coord],
+                      vehicle: Optional[Dict] = None) -> Tuple[Optional[float], Optional[float]]:
+        data = self._post(f"/v2/directions/{self.profile}", self._directions_body(coords))
+        return self._parse_directions(data)
+
+    def route_geometry(self, coords: Sequence[Coord]) -> Optional[List[Coord]]:
+        data = self._post(f"/v2/directions/{self.profile}/geojson", self._geometry_body(coords))
+        return self._parse_geometry(data)
+
+    async def _post_once(self, path: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        async with self._new_client() as client:
+            return await client.post(path, body)
+
+    # ---------- async API ----------
+
+    def _client_transport(self) -> Optional[httpx.AsyncBaseTransport]:
+        if self.fixture_mode is None:
+            return self.transport
+        # A fresh wrapper per client: closing it saves recorded fixtures
+        return FixtureTransport(self.fixtures, self.fixture_mode, upstream=self.transport)
+
+    def _new_client(self) -> AsyncRoutingClient:
+        return AsyncRoutingClient(
+            self.base_url, self.headers,
+            max_concurrency=self.max_concurrency,
+            timeout=self.timeout,
+            max_retries=self.max_retries,
+            retry_backoff=self.retry_backoff,
+            on_response=self.record_call,
+            provider=self.name,
+            transport=self._client_transport()
+        )
+
+    @asynccontextmanager
+    async def session(self):
+        """Open one pooled keep-alive client for every async call in the block"""
+        async with self._new_client() as client:
+            self._client = client
+            try:
+                yield self
+            finally:
+                self._client = None
+
+    async def optimize_route_async(self, depot: Coord, stops: Sequence[Coord], demands: Sequence[float],
+                                   capacity: float, vehicle_id: int = 0,
+                                   vehicle: Optional[Dict] = None) -> Tuple[List[int], Any]:
+        if self._client is None:
+            return self.optimize_route(depot, stops, demands, capacity, vehicle_id, vehicle)
+
+        body = self._optimization_body(depot, stops, demands, capacity, vehicle_id)
+        return self._parse_optimization(await self._client.post("/optimization", body))
+
+    async def route_geometry_async(self, coords: Sequence[Coord]) -> Optional[List[Coord]]:
+        if self._client is None:
+            return self.route_geometry(coords)
+
+        data = await self._client.post(f"/v2/directions/{self.profile}/geojson", self._geometry_body(coords))
+        return self._parse_geometry(data)
+
+
+class OfflineRoutingProvider(RoutingProvider):
+    """
+    Network-free estimator.
+    Road distance = haversine x circuity factor; travel time from a speed
+    model that uses the vehicle's `speed_kmph` when present.
+    """
+
+    name = "offline"
+
+    def __init__(self, circuity_factor: float = DEFAULT_CIRCUITY_FACTOR,
+                 speed_kmph: float = DEFAULT_SPEED_KMPH):
+        if circuity_factor < 1.0:
+            raise ValueError("circuity_factor must be >= 1.0")
+        if speed_kmph <= 0:
+            raise ValueError("speed_kmph must be positive")
+        self.circuity_factor = circuity_factor
+        self.speed_kmph = speed_kmph
+
+    def speed_for(self, vehicle: Optional[Dict] = None) -> float:
+        """Average speed (km/h) for a vehicle spec, falling back to the default"""
+        speed = (vehicle or {}).get("speed_kmph")
+        return float(speed) if speed and speed > 0 else self.speed_kmph
+
+    def duration_factor(self, vehicle: Optional[Dict] = None) -> float:
+        """Matrix durations are at the default speed"""
+        return self.speed_kmph / self.speed_for(vehicle)
+
+    def road_distance_matrix(self, sources: Sequence[Coord],
+                             destinations: Sequence[Coord]) -> np.ndarray:
+        return haversine_matrix(sources, destinations) * self.circuity_factor
+
+    def matrix(self, sources: Sequence[Coord], destinations: Sequence[Coord],
+               metrics: Sequence[str] = ("distance",)) -> Dict[str, np.ndarray]:
+        distances = self.road_distance_matrix(sources, destinations)
+
+        result = {}
+        if "distance" in metrics:
+            result["distances"] = distances
+        if "duration" in metrics:
+            result["durations"] = distances / self.speed_kmph * 60
+        return result
+
+    def optimize_route(self, depot: Coord, stops: Sequence[Coord], demands: Sequence[float],
+                       capacity: float, vehicle_id: int = 0,
+                       vehicle: Optional[Dict] = None) -> Tuple[List[int], Any]:
+        """Nearest-neighbour tour from the depot"""
+        if not stops:
+            return [], None
+
+        dist = self.road_distance_matrix([depot] + list(stops), [depot] + list(stops))
+        unvisited = set(range(1, len(stops) + 1))
+        order = []
+        current = 0
+
+        while unvisited:
+            nxt = min(unvisited, key=lambda j: dist[current, j])
+            order.append(nxt - 1)
+            unvisited.remove(nxt)
+            current = nxt
+
+        return order, None
+
+    def route_metrics(self, coords: Sequence[Coord],
+                      vehicle: Optional[Dict] = None) -> Tuple[Optional[float], Optional[float]]:
+        if len(coords) < 2:
+            return None, None
+
+        distance_km = float(haversine_legs(coords).sum() * self.circuity_factor)
+        travel_time_min = distance_km / self.speed_for(vehicle) * 60
+        return round(distance_km, 2), round(travel_time_min, 2)
+
+
+ROUTING_PROVIDERS = {
+    ORSRoutingProvider.name: ORSRoutingProvider,
+    OfflineRoutingProvider.name: OfflineRoutingProvider,
+}
+
+
+def get_routing_provider(name: str = "ors", **options) -> RoutingProvider:
+    """Build a routing provider by name ("ors" or "offline")"""
+    try:
+        provider_cls = ROUTING_PROVIDERS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown routing backend '{name}'. Choose from: {', '.join(ROUTING_PROVIDERS)}"
+        )
+    return provider_cls(**options)
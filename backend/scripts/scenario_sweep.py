@@ -0,0 +1,191 @@
+#scripts/scenario_sweep.py
+"""
+Scenario Sweep
+Solve a grid of deadline / max-distance scenarios on one set of inputs
+
+Hub assignment and every cluster's distance/duration matrix are computed
+once in the parent. The matrices go into a single shared-memory block that
+worker processes map read-only, so each scenario only pays for the native
+solver. Scenarios are independent; results come back in input order as a
+compact comparison table.
+"""
+
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+from typing import List, Dict, Tuple, Optional, Any, Sequence
+
+from scripts.vrp_solver import VRPSolver, DEFAULT_NEIGHBOURS
+from scripts.spatial_index import SpatialIndex
+from scripts.time_windows import TimeWindows
+
+# Filled in each worker by _init_worker
+_WORKER_STATE: Dict[str, Any] = {}
+
+
+class SharedMatrices:
+    """Named float64 matrices packed into one shared-memory block"""
+
+    def __init__(self, matrices: Dict[str, np.ndarray]):
+        self.layout = []
+        offset = 0
+        for key, matrix in matrices.items():
+            self.layout.append((key, matrix.shape, offset))
+            offset += matrix.size * 8
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (key, shape, start), matrix in zip(self.layout, matrices.values()):
+            view = np.ndarray(shape, dtype=np.float64, buffer=self.shm.buf, offset=start)
+            view[...] = matrix
+
+    @property
+    def spec(self) -> Tuple[str, List]:
+        """Picklable handle for attach()"""
+        return self.shm.name, self.layout
+
+    @staticmethod
+    def attach(spec: Tuple[str, List]) -> Tuple[shared_memory.SharedMemory, Dict[str, np.ndarray]]:
+        name, layout = spec
+        shm = shared_memory.SharedMemory(name=name)
+        views = {}
+        for key, shape, start in layout:
+            view = np.ndarray(shape, dtype=np.float64, buffer=shm.buf, offset=start)
+            view.flags.writeable = False
+            views[key] = view
+        return shm, views
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+def prepare_clusters(engine, vehicle_types: Sequence[Dict] = ()
+                     ) -> Tuple[List[Dict], Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Hub assignment plus one (hub + farmers) matrix per cluster, fetched once,
+    with pickup-window bounds when any are set (service time: the slowest vehicle type).
+
+    Returns:
+        (cluster metadata, matrices by key, hub assignment summary)
+    """
+    cluster_assignments, hub_assignment, _ = engine.assign_clusters()
+    clusters, matrices = [], {}
+    for name, farmer_list in cluster_assignments.items():
+        farmers = [f for f in farmer_list if f in engine.subareas]
+        if not farmers:
+            continue
+        points = [tuple(engine.centroids[name])] + [tuple(engine.subareas[f]) for f in farmers]
+        matrix = engine.routing_provider.matrix(points, points, metrics=("distance", "duration"))
+        matrices[f"{name}:distance"] = np.asarray(matrix['distances'], dtype=np.float64)
+        matrices[f"{name}:duration"] = np.asarray(matrix['durations'], dtype=np.float64)
+        windows = engine.cluster_time_windows(
+            name, farmers, matrices[f"{name}:duration"],
+            max((v.get('service_time', 4) for v in vehicle_types), default=4)
+        )
+        clusters.append({
+            'name': name,
+            'farmers': farmers,
+            'demands': [engine.farmers_milk.get(f, 0) for f in farmers],
+            'neighbour_lists': SpatialIndex(points[1:]).neighbour_lists(DEFAULT_NEIGHBOURS),
+            # Window bounds only; the durations come from the shared matrix
+            'windows': (windows.earliest, windows.latest, windows.service_time) if windows else None,
+        })
+    summary = {'spilled_vendors': hub_assignment['spilled'], 'overflow_vendors': hub_assignment['overflow'],
+               'unreachable_vendors': len(hub_assignment['unreachable_vendors'])}
+    return clusters, matrices, summary
+
+
+def solve_scenario(clusters: List[Dict], matrices: Dict[str, np.ndarray], vehicle_types: List[Dict],
+                   deadline_minutes: float, max_distance_km: float) -> Dict[str, Any]:
+    """One scenario over every cluster (clusters share the fleet, in order); compact metrics only"""
+    started = time.perf_counter()
+    fleet_availability = {v['name']: v['count'] for v in vehicle_types}
+    cost = distance = 0.0
+    violations = unassigned = unassigned_milk = 0
+    vehicles_used: Dict[str, int] = {}
+
+    for cluster in clusters:
+        solution = VRPSolver(
+            matrices[f"{cluster['name']}:distance"], matrices[f"{cluster['name']}:duration"],
+            cluster['demands'], vehicle_types, deadline_minutes, max_distance_km,
+            fleet_availability=fleet_availability,
+            neighbour_lists=cluster['neighbour_lists'],
+            time_windows=TimeWindows(matrices[f"{cluster['name']}:duration"], *cluster['windows'])
+            if cluster.get('windows') else None
+        ).solve()
+
+        for route in solution['routes']:
+            spec = route['vehicle_spec']
+            total_time = route['travel_time'] + len(route['stops']) * spec.get('service_time', 4)
+            cost += spec['fixed_cost'] + route['distance'] * spec['cost_per_km']
+            distance += route['distance']
+            violations += total_time > deadline_minutes or route['distance'] > max_distance_km
+            vehicles_used[spec['name']] = vehicles_used.get(spec['name'], 0) + 1
+        unassigned += len(solution['unassigned'])
+        unassigned_milk += sum(cluster['demands'][i] for i in solution['unassigned'])
+
+    return {
+        'deadline_minutes': deadline_minutes,
+        'max_distance_km': max_distance_km,
+        'total_cost': round(cost, 2),
+        'total_distance': round(distance, 2),
+        'violations': int(violations),
+        'vehicles_used': sum(vehicles_used.values()),
+        'vehicles_by_type': vehicles_used,
+        'unassigned_farmers': unassigned,
+        'unassigned_milk': round(float(unassigned_milk), 2),
+        'solve_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def _init_worker(spec: Tuple[str, List], clusters: List[Dict], vehicle_types: List[Dict]):
+    shm, matrices = SharedMatrices.attach(spec)
+    # Keep the mapping alive for the life of the worker
+    _WORKER_STATE.update(shm=shm, matrices=matrices, clusters=clusters, vehicle_types=vehicle_types)
+
+
+def _solve_in_worker(scenario: Tuple[float, float]) -> Dict[str, Any]:
+    return solve_scenario(
+        _WORKER_STATE['clusters'], _WORKER_STATE['matrices'], _WORKER_STATE['vehicle_types'], *scenario
+    )
+
+
+def run_scenario_sweep(engine, vehicle_types: List[Dict], scenarios: Sequence[Tuple[float, float]],
+                       max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Args:
+        engine: OptimizationEngine with data and routing provider set
+        scenarios: (deadline_minutes, max_distance_km) pairs
+
+    Returns:
+        {"scenarios": [row per scenario, input order], "clusters", "hub_assignment",
+         "workers", "prepare_seconds", "solve_seconds"}
+    """
+    started = time.perf_counter()
+    clusters, matrices, hub_summary = prepare_clusters(engine, vehicle_types)
+    prepared = time.perf_counter()
+
+    workers = max(1, min(max_workers or 1, len(scenarios)))
+    if workers == 1:
+        rows = [solve_scenario(clusters, matrices, vehicle_types, *scenario) for scenario in scenarios]
+    else:
+        shared = SharedMatrices(matrices)
+        del matrices
+        try:
+            # spawn: never fork a server process that runs threads
+            with ProcessPoolExecutor(
+                max_workers=workers, mp_context=get_context("spawn"),
+                initializer=_init_worker, initargs=(shared.spec, clusters, vehicle_types)
+            ) as pool:
+                rows = list(pool.map(_solve_in_worker, scenarios))
+        finally:
+            shared.close()
+
+    return {
+        'scenarios': rows,
+        'clusters': len(clusters),
+        'hub_assignment': hub_summary,
+        'workers': workers,
+        'prepare_seconds': round(prepared - started, 3),
+        'solve_seconds': round(time.perf_counter() - prepared, 3),
+    }
@@ -0,0 +1,153 @@
+#scripts/spatial_index.py
+"""
+Spatial Index
+Uniform grid over locally projected (km) coordinates for radius / k-nearest queries
+
+Points are projected once (equirectangular around the data's mean latitude,
+accurate to well under 1% across a district) and bucketed into square cells.
+A query only looks at the cells overlapping its search circle, then ranks
+the few candidates by great-circle distance.
+"""
+
+import math
+import numpy as np
+from typing import List, Dict, Tuple, Optional, Sequence, Any
+
+from scripts.routing_providers import EARTH_RADIUS_KM, Coord, haversine_matrix
+
+DEFAULT_CELL_KM = 2.0
+
+
+class SpatialIndex:
+    """
+    Grid index over (lat, lng) points; `keys` are returned with every hit
+    (defaults to the point's position in `coords`).
+    """
+
+    def __init__(self, coords: Sequence[Coord], keys: Optional[Sequence[Any]] = None,
+                 cell_km: float = DEFAULT_CELL_KM):
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+        self.keys = list(keys) if keys is not None else list(range(len(self.coords)))
+        self.cell_km = cell_km
+
+        if len(self.keys) != len(self.coords):
+            raise ValueError("keys must have one entry per coordinate")
+
+        self.lat0 = float(self.coords[:, 0].mean()) if len(self.coords) else 0.0
+        self.cos_lat0 = math.cos(math.radians(self.lat0))
+        self.xy = self._project(self.coords)
+
+        cells = np.floor(self.xy / cell_km).astype(np.int64)
+        self.cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if len(cells):
+            order = np.lexsort((cells[:, 1], cells[:, 0]))
+            sorted_cells = cells[order]
+            starts = np.flatnonzero(np.r_[True, (np.diff(sorted_cells, axis=0) != 0).any(axis=1)])
+            for start, stop in zip(starts, np.r_[starts[1:], len(order)]):
+                self.cells[(int(sorted_cells[start, 0]), int(sorted_cells[start, 1]))] = order[start:stop]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _project(self, coords: np.ndarray) -> np.ndarray:
+        rad = np.radians(coords)
+        x = EARTH_RADIUS_KM * rad[:, 1] * self.cos_lat0
+        y = EARTH_RADIUS_KM * (rad[:, 0] - math.radians(self.lat0))
+        return np.stack([x, y], axis=1)
+
+    def _candidates(self, center_xy: np.ndarray, ring_km: float) -> np.ndarray:
+        """Point positions in every cell overlapping the square around center"""
+        lo = np.floor((center_xy - ring_km) / self.cell_km).astype(np.int64)
+        hi = np.floor((center_xy + ring_km) / self.cell_km).astype(np.int64)
+
+        if (hi - lo + 1).prod() > len(self.cells):
+            # Search square larger than the data: scanning occupied cells is cheaper
+            found = [idx for (cx, cy), idx in self.cells.items()
+                     if lo[0] <= cx <= hi[0] and lo[1] <= cy <= hi[1]]
+        else:
+            found = [
+                self.cells[(cx, cy)]
+                for cx in range(lo[0], hi[0] + 1)
+                for cy in range(lo[1], hi[1] + 1)
+                if (cx, cy) in self.cells
+            ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.intp)
+
+    def within(self, lat: float, lng: float, radius_km: float) -> List[Tuple[Any, float]]:
+        """(key, great-circle km) of every point within radius_km, nearest first"""
+        center_xy = self._project(np.array([[lat, lng]]))[0]
+        # 0.5% slack so projection error never drops a boundary point
+        candidates = self._candidates(center_xy, radius_km * 1.005)
+        if candidates.size == 0:
+            return []
+
+        distances = haversine_matrix([(lat, lng)], self.coords[candidates])[0]
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return [(self.keys[i], float(d)) for i, d in zip(candidates[order], distances[order])]
+
+    def _knn(self, coords: np.ndarray, k: int,
+             self_positions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        k nearest indexed points for every query, nearest first.
+
+        Queries are batched per grid cell: one candidate set and one distance
+        block serve every query in the cell. `self_positions` excludes each
+        query's own point when the queries are the indexed points themselves.
+        """
+        positions = np.empty((len(coords), k), dtype=np.intp)
+        distances = np.empty((len(coords), k))
+        if k <= 0 or len(coords) == 0:
+            return positions, distances
+
+        query_cells = np.floor(self._project(coords) / self.cell_km).astype(np.int64)
+        order = np.lexsort((query_cells[:, 1], query_cells[:, 0]))
+        starts = np.flatnonzero(np.r_[True, (np.diff(query_cells[order], axis=0) != 0).any(axis=1)])
+
+        for start, stop in zip(starts, np.r_[starts[1:], len(order)]):
+            group = order[start:stop]
+            center_xy = (query_cells[group[0]] + 0.5) * self.cell_km
+            half_cell = self.cell_km / 2
+            ring_km = self.cell_km * 1.5
+            while True:
+                candidates = self._candidates(center_xy, ring_km)
+                block = haversine_matrix(coords[group], self.coords[candidates])
+                if self_positions is not None:
+                    block[candidates[None, :] == self_positions[group][:, None]] = np.inf
+                if candidates.size == len(self):
+                    break
+                if candidates.size >= k + (self_positions is not None):
+                    kth = np.partition(block, k - 1, axis=1)[:, k - 1]
+                    # Any query is within half a cell of the center, so the square
+                    # covers at least (ring - half cell) around it; 0.5% projection slack
+                    if (kth * 1.005 <= ring_km - half_cell).all():
+                        break
+                ring_km *= 2
+
+            nearest = np.argpartition(block, k - 1, axis=1)[:, :k] if k < block.shape[1] \
+                else np.broadcast_to(np.arange(block.shape[1]), (len(group), block.shape[1]))
+            nearest_dist = np.take_along_axis(block, nearest, axis=1)
+            ranked = np.argsort(nearest_dist, axis=1, kind="stable")
+            positions[group] = candidates[np.take_along_axis(nearest, ranked, axis=1)]
+            distances[group] = np.take_along_axis(nearest_dist, ranked, axis=1)
+
+        return positions, distances
+
+    def nearest(self, lat: float, lng: float, k: int = 1) -> List[Tuple[Any, float]]:
+        """(key, great-circle km) of the k nearest points, nearest first"""
+        positions, distances = self.nearest_many([(lat, lng)], k)
+        return [(self.keys[i], float(d)) for i, d in zip(positions[0], distances[0])]
+
+    def nearest_many(self, coords: Sequence[Coord], k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            ((queries, k) positions, (queries, k) great-circle km), nearest first
+        """
+        k = min(k, len(self))
+        return self._knn(np.asarray(coords, dtype=np.float64).reshape(-1, 2), k)
+
+    def neighbour_lists(self, k: int) -> np.ndarray:
+        """(n, k) positions of each point's k nearest other points, nearest first"""
+        k = max(min(k, len(self) - 1), 0)
+        return self._knn(self.coords, k, self_positions=np.arange(len(self)))[0]
@@ -0,0 +1,101 @@
+#scripts/time_windows.py
+"""
+Time Windows
+Pickup-window feasibility for routes on a duration matrix
+
+Times are minutes after the start of collection. Every node has a window
+[earliest, latest] (node 0 is the hub: vehicles leave at its earliest and
+must be back by its latest). A vehicle arriving early waits; service at a
+stop must start by its latest.
+
+For a route, `forward` gives the service start at every stop and `backward`
+the latest start at every stop that still lets the rest of the route (and
+the return to the hub) meet its windows. With both, inserting a stop at any
+position is checked in O(1): the stop's own start must fit its window and
+the next stop must be reached by its latest start.
+"""
+
+import numpy as np
+from typing import List, Optional, Sequence, Tuple
+
+Window = Tuple[Optional[float], Optional[float]]
+
+
+class TimeWindows:
+    """
+    Args:
+        durations: (n+1, n+1) travel minutes, hub first
+        earliest / latest: (n+1,) window per node, hub first (0 / inf when open)
+        service_time: minutes spent at every stop
+    """
+
+    def __init__(self, durations: np.ndarray, earliest: Sequence[float], latest: Sequence[float],
+                 service_time: float):
+        self.dur = np.asarray(durations, dtype=np.float64)
+        self.earliest = np.asarray(earliest, dtype=np.float64)
+        self.latest = np.asarray(latest, dtype=np.float64)
+        self.service_time = float(service_time)
+
+    @classmethod
+    def from_windows(cls, durations: np.ndarray, stop_windows: Sequence[Optional[Window]],
+                     hub_window: Optional[Window], service_time: float) -> "TimeWindows":
+        """Build from (start, end) pairs; None or a None bound means unconstrained"""
+        windows = [hub_window] + list(stop_windows)
+        earliest = [w[0] if w and w[0] is not None else 0.0 for w in windows]
+        latest = [w[1] if w and w[1] is not None else np.inf for w in windows]
+        return cls(durations, earliest, latest, service_time)
+
+    @staticmethod
+    def constrained(stop_windows: Sequence[Optional[Window]], hub_window: Optional[Window]) -> bool:
+        return any(w and (w[0] is not None or w[1] is not None)
+                   for w in [hub_window] + list(stop_windows))
+
+    def forward(self, route: Sequence[int]) -> Tuple[np.ndarray, float]:
+        """(service start per stop, arrival back at the hub)"""
+        starts = np.empty(len(route))
+        time, previous = self.earliest[0], 0
+        for i, node in enumerate(route):
+            time = max(self.earliest[node], time + self.dur[previous, node])
+            starts[i] = time
+            time += self.service_time
+            previous = node
+        return starts, time + self.dur[previous, 0]
+
+    def backward(self, route: Sequence[int]) -> np.ndarray:
+        """Latest service start per stop, plus the hub's latest return as the last entry"""
+        latest = np.empty(len(route) + 1)
+        latest[-1] = self.latest[0]
+        following = 0
+        for i in range(len(route) - 1, -1, -1):
+            node = route[i]
+            latest[i] = min(self.latest[node],
+                            latest[i + 1] - self.service_time - self.dur[node, following])
+            following = node
+        return latest
+
+    def feasible(self, route: Sequence[int]) -> bool:
+        starts, back = self.forward(route)
+        return bool((starts <= self.latest[list(route)] + 1e-9).all() and back <= self.latest[0] + 1e-9)
+
+    def late_stops(self, route: Sequence[int]) -> List[int]:
+        """Positions in route whose service starts after their window closes"""
+        starts, _ = self.forward(route)
+        return np.flatnonzero(starts > self.latest[list(route)] + 1e-9).tolist()
+
+    def insertion_feasible(self, route: Sequence[int], node: int,
+                           starts: Optional[np.ndarray] = None,
+                           latest: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Window feasibility of inserting node at every position 0..len(route),
+        O(1) per position given the route's forward starts and backward latest
+        starts (computed here when not passed in).
+        """
+        if starts is None:
+            starts, _ = self.forward(route)
+        if latest is None:
+            latest = self.backward(route)
+        path = np.asarray([0] + list(route) + [0], dtype=np.intp)
+        depart = np.concatenate([[self.earliest[0]], starts + self.service_time])
+        start = np.maximum(self.earliest[node], depart + self.dur[path[:-1], node])
+        return ((start <= self.latest[node] + 1e-9) &
+                (start + self.service_time + self.dur[node, path[1:]] <= latest + 1e-9))
@@ -0,0 +1,77 @@
+#scripts/trip_scheduling.py
+"""
+Trip Scheduling
+Chain a hub's routes (trips) onto physical vehicles within the deadline
+
+A vehicle may run several trips back to back, unloading at the hub between
+them: trips + unload gaps must end by the deadline. Per hub, trips are
+placed first-fit decreasing by duration onto that hub's vehicles of the
+trip's type, opening a new vehicle from the shared fleet only when no open
+one has time left; a vehicle drives its trips in placement order. Durations
+come from the already-evaluated routes, so scheduling is a sort plus a scan
+per trip. A trip too long for the deadline on its own still gets a vehicle
+to itself, as in single-trip plans, and shows up as a time violation.
+"""
+
+from typing import List, Dict, Optional, Sequence, Any
+
+DEFAULT_UNLOAD_MINUTES = 15.0
+# Rounds of extra trips for farmers the first trips left behind
+MAX_EXTRA_TRIP_ROUNDS = 3
+
+
+def schedule_trips(durations: Sequence[float], vehicle_types: Sequence[str],
+                   fleet_availability: Dict[str, int], deadline_minutes: float,
+                   unload_minutes: float = DEFAULT_UNLOAD_MINUTES,
+                   open_vehicles: Optional[Dict[str, List[float]]] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    First-fit decreasing of one hub's trips onto vehicles.
+
+    Args:
+        durations: minutes per trip (travel + service at the farms)
+        vehicle_types: vehicle type per trip
+        fleet_availability: free vehicles per type; decremented for every
+                            vehicle opened
+        open_vehicles: per type, minutes already driven by this hub's vehicles
+                       (including unload after their last trip); filled first
+                       and updated in place, new vehicles are appended
+
+    Returns:
+        Per trip (input order): {"vehicle": index into open_vehicles[type],
+        "start_minute", "end_minute"} or None when no vehicle has time left
+        and the fleet has none free.
+    """
+    # A vehicle busy b minutes (unloads included) can take a trip of d if
+    # b + d <= deadline, leaving it busy b + d + unload: bins of deadline + unload
+    horizon = deadline_minutes + unload_minutes
+    busy = open_vehicles if open_vehicles is not None else {}
+    order = sorted(range(len(durations)), key=lambda i: -durations[i])
+    schedule: List[Optional[Dict[str, Any]]] = [None] * len(durations)
+
+    for i in order:
+        # A trip longer than the deadline takes a whole vehicle (and is reported as late)
+        vtype, size = vehicle_types[i], min(durations[i] + unload_minutes, horizon)
+        loads = busy.setdefault(vtype, [])
+        vehicle = next((v for v, used in enumerate(loads) if used + size <= horizon), None)
+        if vehicle is None:
+            if fleet_availability.get(vtype, 0) <= 0:
+                continue
+            fleet_availability[vtype] -= 1
+            loads.append(0.0)
+            vehicle = len(loads) - 1
+        schedule[i] = {
+            'vehicle': vehicle,
+            'start_minute': round(loads[vehicle], 2),
+            'end_minute': round(loads[vehicle] + durations[i], 2),
+        }
+        loads[vehicle] += size
+    return schedule
+
+
+def vehicles_with_time_left(open_vehicles: Dict[str, List[float]], deadline_minutes: float,
+                            min_trip_minutes: float = 0.0) -> Dict[str, int]:
+    """Per type, open vehicles that could still start a trip of min_trip_minutes"""
+    return {
+        vtype: sum(1 for used in loads if used + min_trip_minutes < deadline_minutes)
+        for vtype, loads in open_vehicles.items()
+    }
@@ -0,0 +1,61 @@
+#scripts/vehicle_pool.py
+"""
+Vehicle Pool
+Which physical vehicle (fleet_lookup entry) each route of a run drives
+
+Fleet availability only counts vehicles per type. The pool hands out the
+vehicles themselves, lowest fleet_lookup position first, as routes are given
+a vehicle; routes that are dropped again (LNS, multi-trip chaining) give
+theirs back. Clusters spliced in from an earlier run or the cluster cache
+hold on to their stored vehicle numbers. No vehicle is ever handed out twice
+in a run; a type whose vehicles have all been handed out yields None.
+"""
+
+import heapq
+from typing import Dict, List, Optional
+
+
+class VehiclePool:
+    """Free fleet_lookup entries per vehicle type"""
+
+    def __init__(self, fleet_lookup: Optional[Dict[str, List[Dict]]] = None):
+        self.fleet = {vtype: list(vehicles) for vtype, vehicles in (fleet_lookup or {}).items()}
+        # Min-heaps of free positions in self.fleet[vtype]
+        self._free = {vtype: list(range(len(vehicles))) for vtype, vehicles in self.fleet.items()}
+
+    def take(self, vehicle_type: str) -> Optional[Dict]:
+        """The free vehicle of this type that comes first in fleet_lookup"""
+        free = self._free.get(vehicle_type)
+        if not free:
+            return None
+        return self.fleet[vehicle_type][heapq.heappop(free)]
+
+    def hold(self, vehicle_type: str, vehicle_number: Optional[str]) -> Optional[Dict]:
+        """Take a specific vehicle by number; None if it is not in the fleet or already out"""
+        free = self._free.get(vehicle_type)
+        if not free or vehicle_number is None:
+            return None
+        for heap_idx, position in enumerate(free):
+            if self.fleet[vehicle_type][position].get('vehicle_number') == vehicle_number:
+                free[heap_idx] = free[-1]
+                free.pop()
+                heapq.heapify(free)
+                return self.fleet[vehicle_type][position]
+        return None
+
+    def give_back(self, vehicle_type: str, vehicle_info: Optional[Dict]):
+        """Return a vehicle handed out by take() or hold()"""
+        if vehicle_info is None:
+            return
+        free = self._free.get(vehicle_type)
+        if free is None:
+            return
+        free_positions = set(free)
+        for position, vehicle in enumerate(self.fleet[vehicle_type]):
+            if vehicle is vehicle_info and position not in free_positions:
+                heapq.heappush(free, position)
+                return
+
+    def free(self, vehicle_type: str) -> List[Dict]:
+        """Vehicles of this type not handed out, in fleet_lookup order"""
+        return [self.fleet[vehicle_type][position] for position in sorted(self._free.get(vehicle_type, []))]
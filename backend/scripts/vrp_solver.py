@@ -0,0 +1,611 @@
+#scripts/vrp_solver.py
+"""
+Native VRP Solver
+In-process capacitated vehicle routing on NumPy matrices (no external calls)
+
+- Construction: Clarke-Wright savings over a k-nearest-neighbour candidate list,
+  or a warm start from a previous plan's routes (repaired for added/removed stops)
+- Improvement: vectorized 2-opt and Or-opt (segments of 1-3 stops) per route;
+  with a time budget, inter-route relocate moves continue until it runs out
+  (anytime: the best plan so far is always feasible and returned on expiry)
+- Fleet: heterogeneous vehicle types with limited counts; every route gets the
+  cheapest available type that fits its load, deadline and distance limit.
+  Routes are built for the largest type; once it runs out, the stops left
+  over are re-planned for the next-largest type still available
+- Pickup windows (optional TimeWindows): merges, moves and insertions keep
+  every route window-feasible; insertions use O(1) slack checks
+
+Node 0 of the distance/duration matrices is the depot (chilling center);
+nodes 1..n are the stops, in the same order as `demands`.
+"""
+
+import time
+import numpy as np
+from typing import List, Dict, Optional, Sequence, Any
+
+from scripts.time_windows import TimeWindows
+
+DEFAULT_NEIGHBOURS = 40
+DEFAULT_SERVICE_TIME = 4       # minutes per stop, same default as the engine
+DEFAULT_SPEED_KMPH = 40.0
+MAX_LOCAL_SEARCH_PASSES = 1000
+RELOCATE_NEIGHBOURS = 10
+EPSILON = 1e-9
+
+
+class VRPSolver:
+    """
+    Savings + local search solver for one depot.
+
+    Args:
+        distances: (n+1, n+1) road distance in km, depot first
+        durations: (n+1, n+1) travel time in minutes (None → distances at vehicle speed)
+        demands: milk (liters) for each of the n stops
+        vehicle_types: engine vehicle types (name, capacity, count, service_time,
+                       cost_per_km, fixed_cost[, speed_kmph])
+        fleet_availability: remaining vehicles per type name; decremented in place
+                            like OptimizationEngine.assign_heterogeneous_fleet
+        neighbour_lists: optional (n, k) nearest other stops per stop (0-based stop
+                         positions, e.g. SpatialIndex.neighbour_lists); replaces the
+                         k-nearest scan over the distance matrix
+        time_windows: optional pickup windows on the same node numbering
+    """
+
+    def __init__(self, distances: np.ndarray, durations: Optional[np.ndarray],
+                 demands: Sequence[float], vehicle_types: List[Dict],
+                 deadline_minutes: float, max_distance_km: float,
+                 fleet_availability: Optional[Dict[str, int]] = None,
+                 neighbours: int = DEFAULT_NEIGHBOURS,
+                 neighbour_lists: Optional[np.ndarray] = None,
+                 time_windows: Optional[TimeWindows] = None):
+        self.dist = np.asarray(distances, dtype=np.float64)
+        self.n = self.dist.shape[0] - 1
+        self.demand = np.concatenate([[0.0], np.asarray(demands, dtype=np.float64)])
+        self.vehicle_types = vehicle_types
+        self.deadline_minutes = deadline_minutes
+        self.max_distance_km = max_distance_km
+        self.fleet_availability = (
+            fleet_availability if fleet_availability is not None
+            else {v['name']: v['count'] for v in vehicle_types}
+        )
+        self.neighbours = neighbours
+        self.neighbour_lists = neighbour_lists
+        self.time_windows = time_windows
+
+        if len(self.demand) != self.n + 1:
+            raise ValueError("demands must have one entry per stop (matrix size - 1)")
+
+        available = [v for v in vehicle_types if self.fleet_availability.get(v['name'], 0) > 0]
+        # Routes are built against the largest available vehicle, then right-sized
+        self.reference = max(available, key=lambda v: v['capacity']) if available else None
+
+        if durations is None:
+            speed = (self.reference or {}).get('speed_kmph') or DEFAULT_SPEED_KMPH
+            durations = self.dist / speed * 60
+        self.dur = np.asarray(durations, dtype=np.float64)
+
+        self.stats: Dict[str, Any] = {}
+        self.trace: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+        self._deadline: Optional[float] = None
+
+    # ---------- route measures ----------
+
+    def route_distance(self, route: Sequence[int]) -> float:
+        path = np.concatenate([[0], route, [0]]).astype(np.intp)
+        return float(self.dist[path[:-1], path[1:]].sum())
+
+    def route_travel_time(self, route: Sequence[int]) -> float:
+        path = np.concatenate([[0], route, [0]]).astype(np.intp)
+        return float(self.dur[path[:-1], path[1:]].sum())
+
+    def _service_time(self, vehicle_spec: Optional[Dict]) -> float:
+        return (vehicle_spec or {}).get('service_time', DEFAULT_SERVICE_TIME)
+
+    def _within_limits(self, distance: float, travel_time: float, stops: int,
+                       vehicle_spec: Optional[Dict]) -> bool:
+        total_time = travel_time + stops * self._service_time(vehicle_spec)
+        return distance <= self.max_distance_km and total_time <= self.deadline_minutes
+
+    def _route_fits(self, route: List[int]) -> bool:
+        """Distance, deadline and pickup windows for the reference vehicle"""
+        return (self._within_limits(self.route_distance(route), self.route_travel_time(route),
+                                    len(route), self.reference) and
+                (self.time_windows is None or self.time_windows.feasible(route)))
+
+    def _window_ok(self, old_route: List[int], new_route: List[int]) -> bool:
+        """Not making a window-feasible route infeasible"""
+        tw = self.time_windows
+        return tw is None or tw.feasible(new_route) or not tw.feasible(old_route)
+
+    # ---------- construction ----------
+
+    def _nearest_stops(self, k: int) -> np.ndarray:
+        """(n, k) 0-based positions of each stop's k nearest other stops"""
+        if self.neighbour_lists is not None:
+            return np.asarray(self.neighbour_lists, dtype=np.intp)[:, :k]
+
+        n = self.n
+        chunks = []
+        chunk_size = 1024
+        for start in range(0, n, chunk_size):
+            stop = min(start + chunk_size, n)
+            block = self.dist[1 + start:1 + stop, 1:].copy()
+            block[np.arange(stop - start), np.arange(start, stop)] = np.inf
+            chunks.append(np.argpartition(block, k - 1, axis=1)[:, :k])
+        return np.concatenate(chunks)
+
+    def _candidate_pairs(self) -> np.ndarray:
+        """Stop pairs (a, b), a < b, from each stop's k nearest neighbours, best saving first"""
+        n = self.n
+        k = min(self.neighbours, n - 1)
+        if k <= 0:
+            return np.empty((0, 2), dtype=np.intp)
+
+        nearest = self._nearest_stops(k)
+        rows = np.repeat(np.arange(n), nearest.shape[1])
+        pairs = np.stack([rows, nearest.ravel()], axis=1) + 1
+        pairs.sort(axis=1)
+        pairs = np.unique(pairs, axis=0)
+
+        a, b = pairs[:, 0], pairs[:, 1]
+        savings = self.dist[a, 0] + self.dist[0, b] - self.dist[a, b]
+        keep = savings > EPSILON
+        order = np.argsort(-savings[keep], kind='stable')
+        return pairs[keep][order]
+
+    def construct(self, stops: Sequence[int]) -> List[List[int]]:
+        """Clarke-Wright savings: merge routes end-to-end while load and limits allow"""
+        capacity = self.reference['capacity']
+
+        route_of = np.full(self.n + 1, -1, dtype=np.intp)
+        routes: Dict[int, List[int]] = {}
+        load: Dict[int, float] = {}
+        for node in stops:
+            routes[node] = [node]
+            load[node] = self.demand[node]
+            route_of[node] = node
+
+        for a, b in self._candidate_pairs():
+            ra, rb = route_of[a], route_of[b]
+            if ra < 0 or rb < 0 or ra == rb:
+                continue
+            A, B = routes[ra], routes[rb]
+            if a != A[0] and a != A[-1]:
+                continue
+            if b != B[0] and b != B[-1]:
+                continue
+            if load[ra] + load[rb] > capacity:
+                continue
+
+            # a joins b: A must end at a, B must start at b
+            if A[-1] != a:
+                A = A[::-1]
+            if B[0] != b:
+                B = B[::-1]
+            merged = A + B
+
+            if not self._route_fits(merged):
+                continue
+
+            keep, drop = (ra, rb) if len(A) >= len(B) else (rb, ra)
+            routes[keep] = merged
+            load[keep] = load[ra] + load[rb]
+            for node in routes[drop]:
+                route_of[node] = keep
+            del routes[drop], load[drop]
+
+        return list(routes.values())
+
+    def _split_feasible(self, route: List[int]) -> List[List[int]]:
+        """Cut a route, in order, into pieces that fit the reference vehicle and limits"""
+        pieces, current = [], []
+        for node in route:
+            candidate = current + [node]
+            fits = self.demand[candidate].sum() <= self.reference['capacity'] and self._route_fits(candidate)
+            if current and not fits:
+                pieces.append(current)
+                candidate = [node]
+            current = candidate
+        if current:
+            pieces.append(current)
+        return pieces
+
+    def _cheapest_insertion(self, routes: List[List[int]], node: int) -> bool:
+        """Insert node where it adds the least distance without breaking a limit"""
+        best = None
+        for r, route in enumerate(routes):
+            if self.demand[route].sum() + self.demand[node] > self.reference['capacity']:
+                continue
+            path = np.asarray([0] + route + [0], dtype=np.intp)
+            delta = self.dist[path[:-1], node] + self.dist[node, path[1:]] - self.dist[path[:-1], path[1:]]
+            if self.time_windows is not None:
+                delta[~self.time_windows.insertion_feasible(route, node)] = np.inf
+            for pos in np.argsort(delta, kind='stable'):
+                if not np.isfinite(delta[pos]):
+                    break
+                if best is not None and delta[pos] >= best[0]:
+                    break
+                candidate = route[:pos] + [node] + route[pos:]
+                if self._within_limits(self.route_distance(candidate), self.route_travel_time(candidate),
+                                       len(candidate), self.reference):
+                    best = (delta[pos], r, candidate)
+                    break
+        if best is None:
+            return False
+        routes[best[1]] = best[2]
+        return True
+
+    def warm_start(self, initial_routes: Sequence[Sequence[int]], stops: Sequence[int]) -> List[List[int]]:
+        """
+        Repair a previous plan into routes over `stops` (1-based nodes):
+        unknown / duplicate stops are dropped, overfull routes are split, and
+        stops the seed doesn't cover are inserted at their cheapest feasible
+        position; whatever still fits nowhere is built into new routes by savings.
+        """
+        allowed = set(stops)
+        seen = set()
+        routes = []
+        for route in initial_routes:
+            kept = []
+            for stop in route:
+                node = int(stop) + 1
+                if node in allowed and node not in seen:
+                    seen.add(node)
+                    kept.append(node)
+            if kept:
+                routes.extend(self._split_feasible(kept))
+
+        missing = [node for node in stops if node not in seen]
+        leftovers = [node for node in missing if not self._cheapest_insertion(routes, node)]
+        new_routes = self.construct(leftovers) if leftovers else []
+
+        self.stats['warm_start'] = {
+            'seeded_stops': len(seen),
+            'inserted_stops': len(missing) - len(leftovers),
+            'new_routes': len(new_routes),
+        }
+        return routes + new_routes
+
+    # ---------- local search ----------
+
+    def _accept(self, old_route: List[int], new_route: List[int]) -> bool:
+        """Shorter, and not pushing a within-deadline (or window-feasible) route out of it"""
+        if self.route_distance(new_route) >= self.route_distance(old_route) - EPSILON:
+            return False
+        service = len(new_route) * self._service_time(self.reference)
+        old_time = self.route_travel_time(old_route) + service
+        new_time = self.route_travel_time(new_route) + service
+        return new_time <= max(self.deadline_minutes, old_time) and self._window_ok(old_route, new_route)
+
+    def out_of_time(self) -> bool:
+        return self._deadline is not None and time.perf_counter() >= self._deadline
+
+    def _record(self, phase: str, routes: List[List[int]]):
+        """Append a point to the improvement-over-time trace"""
+        self.trace.append({
+            'seconds': round(time.perf_counter() - self._started, 3),
+            'distance': round(sum(self.route_distance(r) for r in routes), 2),
+            'routes': len(routes),
+            'phase': phase,
+        })
+
+    def two_opt(self, route: List[int]) -> List[int]:
+        """Best-improvement 2-opt; all segment reversals scored in one NumPy pass"""
+        for _ in range(MAX_LOCAL_SEARCH_PASSES):
+            if len(route) < 3 or self.out_of_time():
+                return route
+            path = np.asarray([0] + route + [0], dtype=np.intp)
+            head, tail = path[:-1], path[1:]
+            edge = self.dist[head, tail]
+
+            delta = (self.dist[head[:, None], head[None, :]]
+                     + self.dist[tail[:, None], tail[None, :]]
+                     - edge[:, None] - edge[None, :])
+            delta[np.tril_indices(len(edge), 1)] = 0.0
+
+            i, j = np.unravel_index(np.argmin(delta), delta.shape)
+            if delta[i, j] >= -EPSILON:
+                return route
+
+            candidate = path.copy()
+            candidate[i + 1:j + 1] = candidate[i + 1:j + 1][::-1]
+            candidate = candidate[1:-1].tolist()
+            if not self._accept(route, candidate):
+                return route
+            route = candidate
+        return route
+
+    def or_opt(self, route: List[int]) -> List[int]:
+        """Best-improvement Or-opt: move a run of 1-3 stops to another position"""
+        for _ in range(MAX_LOCAL_SEARCH_PASSES):
+            if self.out_of_time():
+                return route
+            path = np.asarray([0] + route + [0], dtype=np.intp)
+            m = len(path)
+            best = (-EPSILON, None)
+
+            for seg_len in (1, 2, 3):
+                if m - 2 <= seg_len:
+                    break
+                starts = np.arange(1, m - seg_len)
+                first, last = path[starts], path[starts + seg_len - 1]
+                prev, nxt = path[starts - 1], path[starts + seg_len]
+                removal_gain = self.dist[prev, first] + self.dist[last, nxt] - self.dist[prev, nxt]
+
+                edges = np.arange(m - 1)
+                a, b = path[edges], path[edges + 1]
+                insertion_cost = (self.dist[a[None, :], first[:, None]]
+                                  + self.dist[last[:, None], b[None, :]]
+                                  - self.dist[a, b][None, :])
+                delta = insertion_cost - removal_gain[:, None]
+                # An edge touching the segment is not a new position
+                touching = ((edges[None, :] >= starts[:, None] - 1)
+                            & (edges[None, :] <= starts[:, None] + seg_len - 1))
+                delta[touching] = np.inf
+
+                s, e = np.unravel_index(np.argmin(delta), delta.shape)
+                if delta[s, e] < best[0]:
+                    best = (delta[s, e], (int(starts[s]), seg_len, int(edges[e])))
+
+            if best[1] is None:
+                return route
+
+            start, seg_len, edge = best[1]
+            segment = path[start:start + seg_len].tolist()
+            rest = np.delete(path, np.arange(start, start + seg_len)).tolist()
+            insert_at = edge + 1 if edge < start else edge + 1 - seg_len
+            candidate = (rest[:insert_at] + segment + rest[insert_at:])[1:-1]
+            if not self._accept(route, candidate):
+                return route
+            route = candidate
+        return route
+
+    def improve(self, route: List[int]) -> List[int]:
+        while True:
+            improved = self.or_opt(self.two_opt(route))
+            if improved == route or self.out_of_time():
+                return improved
+            route = improved
+
+    def relocate(self, routes: List[List[int]]) -> List[List[int]]:
+        """
+        Inter-route relocate until no move improves or the budget runs out:
+        move a stop next to one of its nearest stops on another route when that
+        shortens the total and the receiving route stays within load and limits.
+        Emptied routes are dropped.
+        """
+        k = min(RELOCATE_NEIGHBOURS, self.n - 1)
+        if k <= 0 or len(routes) < 2:
+            return routes
+        nearest = self._nearest_stops(k) + 1
+        capacity = self.reference['capacity']
+        service_time = self._service_time(self.reference)
+
+        routes = [list(r) for r in routes]
+        route_of = np.full(self.n + 1, -1, dtype=np.intp)
+        for r, route in enumerate(routes):
+            route_of[route] = r
+        load = [float(self.demand[r].sum()) for r in routes]
+        distance = [self.route_distance(r) for r in routes]
+        travel = [self.route_travel_time(r) for r in routes]
+        tw = self.time_windows
+        # Forward starts / backward latest starts per route, for O(1) window checks
+        slack = [(tw.forward(r)[0], tw.backward(r)) if tw else None for r in routes]
+
+        improved = True
+        while improved and not self.out_of_time():
+            improved = False
+            for a in range(1, self.n + 1):
+                if self.out_of_time():
+                    break
+                ra = route_of[a]
+                if ra < 0:
+                    continue
+                A = routes[ra]
+                i = A.index(a)
+                prev_a = A[i - 1] if i > 0 else 0
+                next_a = A[i + 1] if i + 1 < len(A) else 0
+                removal_gain = self.dist[prev_a, a] + self.dist[a, next_a] - self.dist[prev_a, next_a]
+
+                for b in nearest[a - 1]:
+                    rb = route_of[b]
+                    if rb < 0 or rb == ra or load[rb] + self.demand[a] > capacity:
+                        continue
+                    B = routes[rb]
+                    j = B.index(b)
+                    # Insert a just before or just after b
+                    for pos in (j, j + 1):
+                        before = B[pos - 1] if pos > 0 else 0
+                        after = B[pos] if pos < len(B) else 0
+                        added = self.dist[before, a] + self.dist[a, after] - self.dist[before, after]
+                        if added - removal_gain >= -EPSILON:
+                            continue
+                        new_distance = distance[rb] + added
+                        new_travel = travel[rb] + (self.dur[before, a] + self.dur[a, after]
+                                                   - self.dur[before, after])
+                        if (new_distance > self.max_distance_km or
+                                new_travel + (len(B) + 1) * service_time > self.deadline_minutes):
+                            continue
+                        if tw and not tw.insertion_feasible(B, a, *slack[rb])[pos]:
+                            continue
+
+                        B.insert(pos, a)
+                        del A[i]
+                        route_of[a] = rb
+                        load[rb] += self.demand[a]
+                        load[ra] -= self.demand[a]
+                        distance[rb], travel[rb] = new_distance, new_travel
+                        distance[ra], travel[ra] = self.route_distance(A), self.route_travel_time(A)
+                        if tw:
+                            slack[ra] = (tw.forward(A)[0], tw.backward(A))
+                            slack[rb] = (tw.forward(B)[0], tw.backward(B))
+                        improved = True
+                        break
+                    if route_of[a] != ra:
+                        break
+            if improved:
+                self._record('relocate', [r for r in routes if r])
+
+        return [r for r in routes if r]
+
+    # ---------- fleet ----------
+
+    def _pick_vehicle(self, route: List[int], load: float, distance: float,
+                      travel_time: float) -> Optional[Dict]:
+        """Cheapest available type that fits; a violating one if nothing fits the limits"""
+        fitting = [
+            v for v in self.vehicle_types
+            if self.fleet_availability.get(v['name'], 0) > 0 and v['capacity'] >= load
+        ]
+        if not fitting:
+            return None
+
+        def cost(v):
+            return v['fixed_cost'] + distance * v['cost_per_km']
+
+        within = [v for v in fitting if self._within_limits(distance, travel_time, len(route), v)]
+        return min(within or fitting, key=cost)
+
+    # ---------- entry point ----------
+
+    def solve(self, initial_routes: Optional[Sequence[Sequence[int]]] = None,
+              time_budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Args:
+            initial_routes: optional warm start, stop positions per route
+                            (e.g. the previous run's routes)
+            time_budget_seconds: anytime mode - construction always completes,
+                            then improvement (including inter-route relocate)
+                            runs until the budget expires or nothing improves
+
+        Returns:
+            {"routes": [{"vehicle_spec", "stops", "load", "distance", "travel_time"}],
+             "unassigned": [stop indices], "stats": {...}}
+            stop indices are 0-based positions in `demands`
+        """
+        return self.assign_vehicles(self.plan(initial_routes, time_budget_seconds))
+
+    def plan(self, initial_routes: Optional[Sequence[Sequence[int]]] = None,
+             time_budget_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Construction + improvement only: the routes, not yet given vehicles.
+        Depends on the fleet only through the reference vehicle, so plans can
+        be made elsewhere (another process) and handed to assign_vehicles.
+
+        Returns (picklable):
+            {"routes": [node lists], "unassigned": [stop indices too large for any
+             vehicle], "reference": reference type name or None, "stats": {...},
+             "seconds": planning time}
+        """
+        started = self._started = time.perf_counter()
+        self._deadline = started + time_budget_seconds if time_budget_seconds else None
+        self.trace = []
+        reference = self.reference['name'] if self.reference else None
+        if self.n == 0 or self.reference is None:
+            return {"routes": [], "unassigned": list(range(self.n)), "reference": reference,
+                    "stats": dict(self.stats), "seconds": 0.0}
+
+        servable = [i for i in range(1, self.n + 1) if self.demand[i] <= self.reference['capacity']]
+        too_large = [i for i in range(1, self.n + 1) if self.demand[i] > self.reference['capacity']]
+
+        routes = self.warm_start(initial_routes, servable) if initial_routes else self.construct(servable)
+        construction_distance = sum(self.route_distance(r) for r in routes)
+        self._record('construction', routes)
+        routes = [r if self.out_of_time() else self.improve(r) for r in routes]
+        self._record('route_search', routes)
+        if self._deadline is not None and not self.out_of_time():
+            routes = self.relocate(routes)
+            routes = [r if self.out_of_time() else self.improve(r) for r in routes]
+            self._record('final', routes)
+        improved_distance = sum(self.route_distance(r) for r in routes)
+
+        stats = {
+            **self.stats,
+            "construction_distance": round(construction_distance, 2),
+            "improved_distance": round(improved_distance, 2),
+        }
+        if self._deadline is not None:
+            stats["time_budget_seconds"] = time_budget_seconds
+            stats["trace"] = self.trace
+        return {
+            "routes": [[int(i) for i in route] for route in routes],
+            "unassigned": [i - 1 for i in too_large],
+            "reference": reference,
+            "stats": stats,
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _largest_available(self) -> Optional[Dict]:
+        available = [v for v in self.vehicle_types if self.fleet_availability.get(v['name'], 0) > 0]
+        return max(available, key=lambda v: v['capacity']) if available else None
+
+    def _replan_smaller(self, stops: List[int], unassigned: List[int]) -> List[List[int]]:
+        """
+        Routes over stops (1-based) left without a vehicle, rebuilt for the
+        largest type still available; stops too large for it go to unassigned
+        """
+        reference = self._largest_available()
+        if reference is None or reference['capacity'] >= self.reference['capacity']:
+            # Nothing smaller to fall back to (a larger type would have been picked)
+            unassigned.extend(i - 1 for i in stops)
+            return []
+
+        self.reference = reference
+        servable = [i for i in stops if self.demand[i] <= reference['capacity']]
+        unassigned.extend(i - 1 for i in stops if self.demand[i] > reference['capacity'])
+        return [self.improve(r) for r in self.construct(servable)]
+
+    def assign_vehicles(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Give a plan's routes vehicles from fleet_availability, heaviest first
+        (decremented in place). Once the reference type runs out, the stops of
+        routes nothing fits are re-planned against the largest type still
+        available, and so on down the fleet; only stops no remaining vehicle can
+        take are left unassigned. Returns the solve() result.
+        """
+        if self.n == 0 or plan["reference"] is None:
+            return {"routes": [], "unassigned": plan["unassigned"], "stats": plan["stats"]}
+
+        started = time.perf_counter()
+        solved, unassigned = [], list(plan["unassigned"])
+        routes, replans = plan["routes"], 0
+        while routes:
+            leftover = []
+            measured = sorted(
+                ((r, float(self.demand[r].sum())) for r in routes), key=lambda x: x[1], reverse=True
+            )
+            for route, load in measured:
+                distance = self.route_distance(route)
+                travel_time = self.route_travel_time(route)
+                vehicle_spec = self._pick_vehicle(route, load, distance, travel_time)
+                if vehicle_spec is None:
+                    leftover.extend(route)
+                    continue
+
+                self.fleet_availability[vehicle_spec['name']] -= 1
+                solved.append({
+                    "vehicle_spec": vehicle_spec,
+                    "stops": [i - 1 for i in route],
+                    "load": load,
+                    "distance": distance,
+                    "travel_time": travel_time,
+                })
+
+            routes = self._replan_smaller(leftover, unassigned) if leftover else []
+            replans += bool(leftover and routes)
+
+        self.stats = {
+            **{key: value for key, value in plan["stats"].items() if key not in ("time_budget_seconds", "trace")},
+            "stops": self.n,
+            "routes": len(solved),
+            **({"fleet_replans": replans} if replans else {}),
+            **({"time_window_violations": sum(
+                1 for r in solved if not self.time_windows.feasible([i + 1 for i in r['stops']])
+            )} if self.time_windows is not None else {}),
+            "solve_seconds": round(plan["seconds"] + time.perf_counter() - started, 3),
+        }
+        if "time_budget_seconds" in plan["stats"]:
+            self.stats["time_budget_seconds"] = plan["stats"]["time_budget_seconds"]
+            self.stats["trace"] = plan["stats"]["trace"]
+        return {"routes": solved, "unassigned": sorted(unassigned), "stats": self.stats}
@@ -0,0 +1,106 @@
+#services/cluster_cache_service.py
+"""
+Cluster Cache Service
+Load/persist solved clusters from the cluster_result_cache table
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from sqlalchemy import select, delete
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.optimization import ClusterResultCache
+from scripts.cluster_cache import ClusterCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPSERT_BATCH_SIZE = 500
+
+
+class ClusterCacheService:
+    """Bridge between the in-memory ClusterCache and Postgres"""
+
+    @staticmethod
+    async def load(db: AsyncSession, cache: ClusterCache, hubs: Iterable[str]) -> int:
+        """Load the newest live entries of these hubs (at most the cache's size)"""
+        hubs = list(set(hubs))
+        if not hubs:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        result = await db.execute(
+            select(ClusterResultCache)
+            .where(ClusterResultCache.hub.in_(hubs), ClusterResultCache.expires_at > now)
+            .order_by(ClusterResultCache.created_at.desc())
+            .limit(cache.max_entries)
+        )
+        rows = result.scalars().all()
+
+        # Oldest first, so the newest end up most recently used
+        for row in reversed(rows):
+            cache.put(
+                row.fingerprint, row.hub, row.cluster,
+                expires_at=row.expires_at.timestamp(), persist=False
+            )
+
+        logger.info(f"📦 Loaded {len(rows)} cached clusters")
+        return len(rows)
+
+    @staticmethod
+    async def persist(db: AsyncSession, cache: ClusterCache) -> int:
+        """Upsert clusters solved during the run"""
+        pending = cache.drain_pending()
+        if not pending:
+            return 0
+
+        latest: Dict[str, Dict] = {entry["fingerprint"]: entry for entry in pending}
+        rows: List[Dict] = [
+            {
+                "fingerprint": entry["fingerprint"],
+                "hub": entry["hub"],
+                "cluster": json.loads(entry["cluster"]),
+                "expires_at": datetime.fromtimestamp(entry["expires_at"], tz=timezone.utc),
+            }
+            for entry in latest.values()
+        ]
+
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = pg_insert(ClusterResultCache).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["fingerprint"],
+                set_={"cluster": stmt.excluded.cluster, "expires_at": stmt.excluded.expires_at}
+            )
+            await db.execute(stmt)
+
+        await db.commit()
+        logger.info(f"💾 Persisted {len(rows)} cached clusters")
+        return len(rows)
+
+    @staticmethod
+    async def evict(db: AsyncSession, max_rows: int) -> int:
+        """Drop expired entries, then the oldest ones beyond max_rows"""
+        now = datetime.now(timezone.utc)
+        expired = await db.execute(
+            delete(ClusterResultCache).where(ClusterResultCache.expires_at <= now)
+        )
+        removed = expired.rowcount or 0
+
+        cutoff = (await db.execute(
+            select(ClusterResultCache.created_at)
+            .order_by(ClusterResultCache.created_at.desc())
+            .offset(max_rows)
+            .limit(1)
+        )).scalar_one_or_none()
+
+        if cutoff is not None:
+            overflow = await db.execute(
+                delete(ClusterResultCache).where(ClusterResultCache.created_at <= cutoff)
+            )
+            removed += overflow.rowcount or 0
+
+        await db.commit()
+        if removed:
+            logger.info(f"🧹 Evicted {removed} cached clusters")
+        return removed
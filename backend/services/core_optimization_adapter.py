@@ -5,10 +5,15 @@ Core Optimization Adapter
 Bridge between FastAPI and the core optimization engine
 """
 
+import asyncio
+import functools
 import logging
-from typing import Dict
+import os
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
+from core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -22,14 +27,151 @@ except ImportError:
 class CoreOptimizationAdapter:
     """Adapter to call core optimization engine"""
     
+    @staticmethod
+    def build_routing_provider(routing_backend: Optional[str] = None):
+        """Create the routing provider for a run (defaults to settings.ROUTING_BACKEND)"""
+        from scripts.routing_providers import get_routing_provider, ORS_API_KEY
+        
+        backend = routing_backend or settings.ROUTING_BACKEND
+        if backend == "offline":
+            return get_routing_provider(
+                "offline",
+                circuity_factor=settings.ROAD_CIRCUITY_FACTOR,
+                speed_kmph=settings.OFFLINE_SPEED_KMPH
+            )
+        return get_routing_provider(
+            backend,
+            api_key=settings.ORS_API_KEY or ORS_API_KEY,
+            base_url=settings.ORS_BASE_URL,
+            max_concurrency=settings.ROUTING_MAX_CONCURRENCY,
+            timeout=settings.ROUTING_TIMEOUT_SECONDS,
+            matrix_max_elements=settings.ORS_MATRIX_MAX_ELEMENTS,
+            max_retries=settings.ROUTING_MAX_RETRIES,
+            fixtures=settings.ROUTING_FIXTURES_PATH,
+            fixture_mode=settings.ROUTING_FIXTURE_MODE
+        )
+    
+    @staticmethod
+    async def attach_matrix_cache(db: AsyncSession, routing_provider, engine_input: Dict):
+        """Wrap a cacheable provider with the shared matrix cache, preloaded from Postgres"""
+        from scripts.matrix_cache import CachedRoutingProvider, shared_matrix_cache, coord_key
+        from services.matrix_cache_service import MatrixCacheService
+        
+        if not (settings.MATRIX_CACHE_ENABLED and routing_provider.cacheable):
+            return routing_provider
+        
+        cache = shared_matrix_cache(
+            ttl_seconds=settings.MATRIX_CACHE_TTL_HOURS * 3600,
+            max_entries=settings.MATRIX_CACHE_MAX_ENTRIES
+        )
+        keys = [
+            coord_key(coords)
+            for coords in list(engine_input['subareas'].values()) + list(engine_input['centroids'].values())
+        ]
+        try:
+            await MatrixCacheService.load(db, cache, routing_provider.cache_namespace, keys)
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"⚠️ Matrix cache preload failed, using in-memory cache only: {e}")
+        
+        return CachedRoutingProvider(routing_provider, cache)
+    
+    @staticmethod
+    async def persist_matrix_cache(db: AsyncSession, routing_provider):
+        """Write newly fetched matrix entries back to Postgres"""
+        from services.matrix_cache_service import MatrixCacheService
+        
+        cache = getattr(routing_provider, 'cache', None)
+        if cache is None:
+            return
+        try:
+            await MatrixCacheService.persist(db, cache)
+            await MatrixCacheService.evict(db, settings.MATRIX_CACHE_MAX_ROWS)
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"⚠️ Matrix cache persist failed: {e}")
+    
+    @staticmethod
+    async def load_cluster_cache(db: AsyncSession, engine_input: Dict):
+        """The shared cluster cache, preloaded from Postgres with entries for these hubs (None if disabled)"""
+        from scripts.cluster_cache import shared_cluster_cache
+        from services.cluster_cache_service import ClusterCacheService
+        
+        if not settings.CLUSTER_CACHE_ENABLED:
+            return None
+        
+        cache = shared_cluster_cache(
+            ttl_seconds=settings.CLUSTER_CACHE_TTL_HOURS * 3600,
+            max_entries=settings.CLUSTER_CACHE_MAX_ENTRIES
+        )
+        try:
+            await ClusterCacheService.load(db, cache, engine_input['centroids'].keys())
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"⚠️ Cluster cache preload failed, using in-memory cache only: {e}")
+        return cache
+    
+    @staticmethod
+    async def persist_cluster_cache(db: AsyncSession, cache):
+        """Write newly solved clusters back to Postgres"""
+        from services.cluster_cache_service import ClusterCacheService
+        
+        if cache is None:
+            return
+        try:
+            await ClusterCacheService.persist(db, cache)
+            await ClusterCacheService.evict(db, settings.CLUSTER_CACHE_MAX_ROWS)
+        except Exception as e:
+            await db.rollback()
+            logger.warning(f"⚠️ Cluster cache persist failed: {e}")
+    
+    @staticmethod
+    async def load_run_results(db: AsyncSession, run_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        {'run_id', 'results'} of a stored run (engine output or manual schedule);
+        without run_id, the latest completed run. None if there is none.
+        """
+        from sqlalchemy import select
+        from models.optimization import OptimizationRun
+        
+        stmt = select(OptimizationRun).where(OptimizationRun.status == "completed")
+        if run_id:
+            stmt = stmt.where(OptimizationRun.id == run_id)
+        else:
+            stmt = stmt.order_by(OptimizationRun.created_at.desc()).limit(1)
+        run = (await db.execute(stmt)).scalars().first()
+        if run is None or not isinstance(run.result, dict):
+            return None
+        
+        optimization_results = run.result.get('optimization_results') or run.result
+        return {'run_id': str(run.id), 'results': optimization_results}
+    
     @staticmethod
     async def run_optimization(
         db: AsyncSession,
         deadline_minutes: int = 480,
         max_distance_km: float = 100.0,
-        use_categorized_fleet: bool = True
+        use_categorized_fleet: bool = True,
+        routing_backend: Optional[str] = None,
+        solver: Optional[str] = None,
+        incremental: bool = False,
+        seed_run_id: Optional[str] = None,
+        time_budget_seconds: Optional[float] = None,
+        lns_time_budget_seconds: Optional[float] = None,
+        multi_trip: bool = False,
+        unload_minutes: Optional[float] = None,
+        progress_callback: Optional[Callable[[Dict], None]] = None,
+        executor: Optional[Executor] = None,
+        engine_input: Optional[Dict] = None
     ) -> Dict:
-        """Run optimization using core script with database data"""
+        """
+        Run optimization using core script with database data
+        (or with engine_input, when the caller already transformed it)
+        """
+        from scripts.perf import PerfRecorder
+        
+        # Per-stage timings / calls / memory, stored with the run as results_summary["perf"]
+        perf = PerfRecorder(trace_memory=settings.PERF_TRACE_MEMORY)
         try:
             if OptimizationEngine is None:
                 raise Exception("OptimizationEngine not available. Check script path.")
@@ -38,35 +180,79 @@ class CoreOptimizationAdapter:
             
             from services.data_transformer import DataTransformer
             
-            logger.info("📊 Transforming database to engine format...")
-            engine_input = await DataTransformer.transform_db_to_engine_input(db)
+            with perf.span("load_inputs"):
+                if engine_input is None:
+                    logger.info("📊 Transforming database to engine format...")
+                    engine_input = await DataTransformer.transform_db_to_engine_input(db)
 
-            print("=== DataTransformer Output ===")
-            print(f"vehicle_types: {engine_input.get('vehicle_types')}")
-            print(f"Does it have fleetlookup? {bool(engine_input.get('fleet_lookup'))}")
-            
-            engine = OptimizationEngine()
-            engine.set_data(
-                centroids=engine_input['centroids'],
-                center_capacity=engine_input['center_capacity'],
-                subareas=engine_input['subareas'],
-                farmers_milk=engine_input['farmers_milk']
-            )
-            
-            engine.fleet_lookup = engine_input.get('fleet_lookup', {})
-            engine.vehicle_types = engine_input.get('vehicle_types', [])
+                print("=== DataTransformer Output ===")
+                print(f"vehicle_types: {engine_input.get('vehicle_types')}")
+                print(f"Does it have fleetlookup? {bool(engine_input.get('fleet_lookup'))}")
+                
+                routing_provider = CoreOptimizationAdapter.build_routing_provider(routing_backend)
+                routing_provider = await CoreOptimizationAdapter.attach_matrix_cache(
+                    db, routing_provider, engine_input
+                )
+                logger.info(f"🧭 Routing backend: {routing_provider.name}")
+                cluster_cache = await CoreOptimizationAdapter.load_cluster_cache(db, engine_input)
+                
+                engine = OptimizationEngine(routing_provider=routing_provider)
+                engine.set_data(
+                    centroids=engine_input['centroids'],
+                    center_capacity=engine_input['center_capacity'],
+                    subareas=engine_input['subareas'],
+                    farmers_milk=engine_input['farmers_milk'],
+                    pickup_windows=engine_input.get('pickup_windows'),
+                    hub_windows=engine_input.get('hub_windows')
+                )
+                
+                engine.fleet_lookup = engine_input.get('fleet_lookup', {})
+                engine.vehicle_types = engine_input.get('vehicle_types', [])
+                
+                # Incremental: only clusters whose inputs changed since the latest run are re-solved
+                base_run = await CoreOptimizationAdapter.load_run_results(db) if incremental else None
+                if incremental:
+                    logger.info(f"♻️ Incremental run based on {base_run['run_id'] if base_run else 'nothing (no completed run)'}")
+                
+                # Warm start: the seed run's routes are the native solver's starting solution
+                seed_run = await CoreOptimizationAdapter.load_run_results(db, seed_run_id) if seed_run_id else None
+                if seed_run_id and seed_run is None:
+                    raise Exception(f"Seed run {seed_run_id} not found or not completed")
 
             logger.info(f"✅ Engine initialized with {engine_input['metadata']['vendors_count']} vendors")
             
-            optimization_results = engine.run_optimization(
-                deadline_minutes=deadline_minutes,
-                max_distance_km=max_distance_km,
-                vehicle_types_list=engine_input['vehicle_types']
-            )
+            # The engine is synchronous; run it off the event loop so the API keeps serving
+            with perf.span("engine"):
+                optimization_results = await asyncio.get_running_loop().run_in_executor(
+                    executor,
+                    functools.partial(
+                        engine.run_optimization,
+                        deadline_minutes=deadline_minutes,
+                        max_distance_km=max_distance_km,
+                        vehicle_types_list=engine_input['vehicle_types'],
+                        progress_callback=progress_callback,
+                        solver=solver or settings.ROUTE_SOLVER,
+                        previous_results=base_run['results'] if base_run else None,
+                        seed_results=seed_run['results'] if seed_run else None,
+                        time_budget_seconds=time_budget_seconds,
+                        lns_time_budget_seconds=lns_time_budget_seconds,
+                        multi_trip=multi_trip,
+                        unload_minutes=settings.HUB_UNLOAD_MINUTES if unload_minutes is None else unload_minutes,
+                        route_geometry=settings.ROUTE_GEOMETRY,
+                        cluster_cache=cluster_cache,
+                        cluster_workers=settings.CLUSTER_SOLVE_WORKERS,
+                        perf=perf
+                    )
+                )
             
             if not optimization_results:
                 raise Exception("Optimization engine returned no results")
             
+            with perf.span("persist_matrix_cache"):
+                await CoreOptimizationAdapter.persist_matrix_cache(db, routing_provider)
+            with perf.span("persist_cluster_cache"):
+                await CoreOptimizationAdapter.persist_cluster_cache(db, cluster_cache)
+            
             results = {
                 'status': 'SUCCESS',
                 'timestamp': datetime.now().isoformat(),
@@ -75,11 +261,20 @@ class CoreOptimizationAdapter:
                 'constraints': {
                     'deadline_minutes': deadline_minutes,
                     'max_distance_km': max_distance_km
-                }
+                },
+                'routing_backend': routing_provider.name,
+                'solver': optimization_results.get('solver')
             }
+            if incremental:
+                results['base_run_id'] = base_run['run_id'] if base_run else None
+            if seed_run:
+                results['seed_run_id'] = seed_run['run_id']
             
-            result_file = engine.save_optimization_result(optimization_results)
+            with perf.span("save_file"):
+                result_file = engine.save_optimization_result(optimization_results)
             results['saved_file'] = result_file
+            # Whole run: input loading and persistence around the engine's own stages
+            results['perf'] = perf.report()
             
             return results
             
@@ -90,6 +285,53 @@ class CoreOptimizationAdapter:
                 'error_type': 'OPTIMIZATION_ERROR',
                 'message': str(e)
             }
+        finally:
+            perf.close()
+    
+    @staticmethod
+    async def run_sweep(
+        db: AsyncSession,
+        scenarios: List[Tuple[int, float]],
+        routing_backend: Optional[str] = None,
+        max_workers: Optional[int] = None
+    ) -> Dict:
+        """Solve every (deadline, max distance) scenario on one load of inputs and matrices"""
+        from scripts.scenario_sweep import run_scenario_sweep
+        from services.data_transformer import DataTransformer
+        
+        engine_input = await DataTransformer.transform_db_to_engine_input(db)
+        routing_provider = CoreOptimizationAdapter.build_routing_provider(routing_backend)
+        routing_provider = await CoreOptimizationAdapter.attach_matrix_cache(
+            db, routing_provider, engine_input
+        )
+        
+        engine = OptimizationEngine(routing_provider=routing_provider)
+        engine.set_data(
+            centroids=engine_input['centroids'],
+            center_capacity=engine_input['center_capacity'],
+            subareas=engine_input['subareas'],
+            farmers_milk=engine_input['farmers_milk'],
+            pickup_windows=engine_input.get('pickup_windows'),
+            hub_windows=engine_input.get('hub_windows')
+        )
+        engine.fleet_lookup = engine_input.get('fleet_lookup', {})
+        
+        logger.info(f"🧪 Sweeping {len(scenarios)} scenarios ({routing_provider.name})")
+        sweep = await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                run_scenario_sweep, engine, engine_input['vehicle_types'], scenarios,
+                max_workers=max_workers or os.cpu_count()
+            )
+        )
+        await CoreOptimizationAdapter.persist_matrix_cache(db, routing_provider)
+        
+        return {
+            **sweep,
+            'routing_backend': routing_provider.name,
+            'solver': 'native',
+            'input_metadata': engine_input['metadata'],
+        }
     
     @staticmethod
     async def get_transformation_preview(db: AsyncSession) -> Dict:
@@ -52,6 +52,8 @@ class DataTransformer:
         try:
             subareas = {}
             farmers_milk = {}
+            pickup_windows = {}
+            hub_windows = {}
             
             # ✅ Transform vendors - Convert milk from CANS to LITERS
             for vendor in data['vendors']:
@@ -62,6 +64,8 @@ class DataTransformer:
                 # ✅ FI XED: Use correct field name 'milk_quantity_cans'
                 milk_in_cans = float(vendor.milk_quantity_cans)
                 farmers_milk[vendor.vendor_name] = cans_to_liters(milk_in_cans)
+                if vendor.pickup_start_minute is not None or vendor.pickup_end_minute is not None:
+                    pickup_windows[vendor.vendor_name] = (vendor.pickup_start_minute, vendor.pickup_end_minute)
             
             centroids = {}
             center_capacity = {}
@@ -73,6 +77,8 @@ class DataTransformer:
                     float(hub.longitude)
                 )
                 center_capacity[hub.hub_name] = float(hub.capacity_liters)
+                if hub.open_minute is not None or hub.close_minute is not None:
+                    hub_windows[hub.hub_name] = (hub.open_minute, hub.close_minute)
             
             vehicle_types = {}
             fleet_lookup = {}
@@ -85,6 +91,7 @@ class DataTransformer:
                     # ✅ FIXED: Convert vehicle capacity from CANS to LITERS
                     capacity_in_cans = int(vehicle.capacity_cans)
                     capacity_in_liters = cans_to_liters(capacity_in_cans)
+                    specs = vehicle.realistic_specs or {}
                     
                     vehicle_types[category] = {
                         'name': category,
@@ -93,6 +100,7 @@ class DataTransformer:
                         'service_time': vehicle.service_time or 10,
                         'cost_per_km': float(vehicle.cost_per_km or 10.0),
                         'fixed_cost': float(vehicle.fixed_cost or 500.0),
+                        'speed_kmph': float(specs.get('avg_speed_kmph') or 40.0),
                     }
                 else:
                     vehicle_types[category]['count'] += 1
@@ -122,6 +130,8 @@ class DataTransformer:
                 'center_capacity': center_capacity,
                 'subareas': subareas,
                 'farmers_milk': farmers_milk,
+                'pickup_windows': pickup_windows,
+                'hub_windows': hub_windows,
                 'vehicle_types': vehicle_types_list,
                 'fleet_lookup': fleet_lookup,  # NEW: Add this line
                 'metadata': {
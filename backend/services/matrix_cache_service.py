@@ -0,0 +1,126 @@
+#services/matrix_cache_service.py
+"""
+Matrix Cache Service
+Load/persist the routing matrix cache from the routing_matrix_cache table
+"""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List
+from sqlalchemy import select, delete, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.optimization import RoutingMatrixCache
+from scripts.matrix_cache import MatrixCache
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Keeps each INSERT well below the 32767 bind-parameter limit
+UPSERT_BATCH_SIZE = 4000
+# Keys per IN list when loading; two lists per query stay below the same limit
+LOAD_KEY_CHUNK = 10_000
+
+
+class MatrixCacheService:
+    """Bridge between the in-memory MatrixCache and Postgres"""
+
+    @staticmethod
+    async def load(db: AsyncSession, cache: MatrixCache, namespace: str,
+                   keys: Iterable[str]) -> int:
+        """
+        Load live entries whose origin and destination are both in `keys`.
+        The key filter is split into (origin chunk x destination chunk) queries
+        so large regions stay under the bind-parameter limit.
+        """
+        keys = sorted(set(keys))
+        if not keys:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        chunks = [keys[start:start + LOAD_KEY_CHUNK] for start in range(0, len(keys), LOAD_KEY_CHUNK)]
+        loaded = 0
+        for origin_chunk in chunks:
+            for destination_chunk in chunks:
+                result = await db.execute(
+                    select(
+                        RoutingMatrixCache.origin_key, RoutingMatrixCache.destination_key,
+                        RoutingMatrixCache.distance_km, RoutingMatrixCache.duration_min,
+                        RoutingMatrixCache.expires_at,
+                    ).where(
+                        RoutingMatrixCache.namespace == namespace,
+                        RoutingMatrixCache.origin_key.in_(origin_chunk),
+                        RoutingMatrixCache.destination_key.in_(destination_chunk),
+                        RoutingMatrixCache.expires_at > now,
+                    )
+                )
+                rows = result.all()
+                if not rows:
+                    continue
+                origins, destinations, distances, durations, expires = zip(*rows)
+                cache.put_pairs(
+                    namespace, origins, destinations, distances, durations,
+                    [expires_at.timestamp() for expires_at in expires]
+                )
+                loaded += len(rows)
+
+        logger.info(f"📦 Loaded {loaded} cached matrix entries ({namespace})")
+        return loaded
+
+    @staticmethod
+    async def persist(db: AsyncSession, cache: MatrixCache) -> int:
+        """Upsert entries fetched during the run"""
+        pending = cache.drain_pending()
+        if not pending:
+            return 0
+
+        # Last write wins for pairs fetched more than once in a run
+        latest: Dict[tuple, Dict] = {}
+        for entry in pending:
+            latest[(entry["namespace"], entry["origin_key"], entry["destination_key"])] = entry
+        rows: List[Dict] = [
+            {**entry, "expires_at": datetime.fromtimestamp(entry["expires_at"], tz=timezone.utc)}
+            for entry in latest.values()
+        ]
+
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            stmt = pg_insert(RoutingMatrixCache).values(rows[start:start + UPSERT_BATCH_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["namespace", "origin_key", "destination_key"],
+                set_={
+                    "distance_km": func.coalesce(stmt.excluded.distance_km, RoutingMatrixCache.distance_km),
+                    "duration_min": func.coalesce(stmt.excluded.duration_min, RoutingMatrixCache.duration_min),
+                    "expires_at": stmt.excluded.expires_at,
+                }
+            )
+            await db.execute(stmt)
+
+        await db.commit()
+        logger.info(f"💾 Persisted {len(rows)} matrix cache entries")
+        return len(rows)
+
+    @staticmethod
+    async def evict(db: AsyncSession, max_rows: int) -> int:
+        """Drop expired entries, then the oldest ones beyond max_rows"""
+        now = datetime.now(timezone.utc)
+        expired = await db.execute(
+            delete(RoutingMatrixCache).where(RoutingMatrixCache.expires_at <= now)
+        )
+        removed = expired.rowcount or 0
+
+        cutoff = (await db.execute(
+            select(RoutingMatrixCache.created_at)
+            .order_by(RoutingMatrixCache.created_at.desc())
+            .offset(max_rows)
+            .limit(1)
+        )).scalar_one_or_none()
+
+        if cutoff is not None:
+            overflow = await db.execute(
+                delete(RoutingMatrixCache).where(RoutingMatrixCache.created_at <= cutoff)
+            )
+            removed += overflow.rowcount or 0
+
+        await db.commit()
+        if removed:
+            logger.info(f"🧹 Evicted {removed} matrix cache entries")
+        return removed
@@ -0,0 +1,392 @@
+#services/optimization_jobs.py
+"""
+Optimization Job Queue
+Run optimizations as background jobs tracked in the optimization_runs table
+
+POST /optimization/run inserts a "queued" row and returns its id right away.
+The job then runs on a bounded worker pool (queued → running → completed |
+failed), writing per-cluster progress to the row so clients can poll
+GET /optimization/runs/{id}.
+
+Each run is stamped with a fingerprint of its inputs (the DataTransformer
+output plus the query parameters). A submission whose fingerprint matches a
+queued, running or completed run from the last OPTIMIZATION_DEDUP_WINDOW_MINUTES
+gets that run back instead of a new one, so double clicks and client retries
+poll the same job. Concurrent identical submissions are single-flighted: in
+this process through a shared future, across workers through a Postgres
+advisory lock held while looking up and inserting.
+
+Only live unfinished runs are reused. While a run is queued or running, the
+process that owns it touches updated_at every OPTIMIZATION_HEARTBEAT_SECONDS;
+a queued/running row that this process does not own and that has been silent
+for OPTIMIZATION_STALE_AFTER_SECONDS was left by a crashed or restarted
+worker. It is marked failed and the submission starts a fresh run.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from database.session import AsyncSessionLocal
+from models.optimization import OptimizationRun
+from services.core_optimization_adapter import CoreOptimizationAdapter
+
+logger = logging.getLogger(__name__)
+
+MACHINE_TRIGGER_TYPE = "machine_generated_optimization"
+DEDUP_STATUSES = ("queued", "running", "completed")
+UNFINISHED_STATUSES = ("queued", "running")
+
+
+def run_fingerprint(engine_input: Dict[str, Any], params: Dict[str, Any]) -> str:
+    """
+    Stable hash of what a run would be asked to solve.
+    Independent of dict key order and of the row order the fleet was read in;
+    the derived metadata counts are left out.
+    """
+    payload = {key: value for key, value in engine_input.items() if key != "metadata"}
+    payload["vehicle_types"] = sorted(
+        engine_input.get("vehicle_types") or [], key=lambda v: str(v.get("name"))
+    )
+    payload["fleet_lookup"] = {
+        category: sorted(vehicles, key=lambda v: str(v.get("vehicle_number")))
+        for category, vehicles in (engine_input.get("fleet_lookup") or {}).items()
+    }
+    canonical = json.dumps({"input": payload, "params": params},
+                           sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _advisory_lock_key(fingerprint: str) -> int:
+    """Signed 64-bit key for pg_advisory_xact_lock"""
+    return int(fingerprint[:16], 16) - (1 << 63)
+
+
+def run_is_stale(status: str, created_at: Optional[datetime], updated_at: Optional[datetime],
+                 now: datetime, owned: bool = False) -> bool:
+    """Unfinished, not owned by this process and silent past OPTIMIZATION_STALE_AFTER_SECONDS"""
+    if status not in UNFINISHED_STATUSES or owned:
+        return False
+    last_seen = updated_at or created_at
+    if last_seen is None:
+        return True
+    return now - last_seen > timedelta(seconds=settings.OPTIMIZATION_STALE_AFTER_SECONDS)
+
+
+def build_results_summary(results: Dict[str, Any]) -> Dict[str, Any]:
+    """Summary columns stored with a completed machine-generated run"""
+    # Some adapters wrap engine output; normalize
+    optimization_results = (
+        results.get("optimization_results") if isinstance(results, dict) and results.get("optimization_results")
+        else (results if isinstance(results, dict) else {})
+    )
+
+    total_distance = 0.0
+    for cluster in optimization_results.get("clusters", []):
+        for vehicle in cluster.get("vehicles", []):
+            total_distance += float(vehicle.get("distance", 0.0) or 0.0)
+
+    return {
+        "total_cost": round(float(optimization_results.get("total_cost", 0.0) or 0), 2),
+        "total_clusters": len(optimization_results.get("clusters", [])),
+        "total_violations": int(optimization_results.get("total_violations", 0) or 0),
+        "total_distance": round(float(total_distance or 0), 2),
+        "matrix_cache": optimization_results.get("matrix_cache"),
+        "routing_calls": optimization_results.get("routing_calls"),
+        "solver": optimization_results.get("solver"),
+        "incremental": optimization_results.get("incremental"),
+        "cluster_reuse": optimization_results.get("cluster_reuse"),
+        "lns": {
+            key: optimization_results["lns"][key]
+            for key in ("constructive_cost", "improved_cost", "cost_delta", "iterations")
+        } if optimization_results.get("lns") else None,
+        "multi_trip": optimization_results.get("multi_trip"),
+        # Adapter runs carry the whole run's spans; bare engine output only the engine's
+        "perf": (results.get("perf") if isinstance(results, dict) else None) or optimization_results.get("perf"),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+class _ProgressWriter:
+    """
+    Thread-safe progress callback handed to the engine.
+    Snapshots are coalesced: at most one DB write in flight, always the latest.
+    """
+
+    def __init__(self, manager: "OptimizationJobManager", run_id: UUID,
+                 loop: asyncio.AbstractEventLoop):
+        self.manager = manager
+        self.run_id = run_id
+        self.loop = loop
+        self.latest: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def __call__(self, progress: Dict[str, Any]):
+        self.loop.call_soon_threadsafe(self._schedule, progress)
+
+    def _schedule(self, progress: Dict[str, Any]):
+        self.latest = progress
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._write())
+
+    async def _write(self):
+        while self.latest is not None:
+            progress, self.latest = self.latest, None
+            try:
+                await self.manager.update_run(self.run_id, progress=progress)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not record progress for run {self.run_id}: {e}")
+
+    async def flush(self):
+        if self._task is not None:
+            await self._task
+
+
+class OptimizationJobManager:
+    """Queue + worker pool for optimization runs"""
+
+    def __init__(self, max_concurrent_jobs: int):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_jobs,
+            thread_name_prefix="optimization-job"
+        )
+        self._slots = asyncio.Semaphore(max_concurrent_jobs)
+        self._tasks: Dict[str, asyncio.Task] = {}
+        # fingerprint → submission in progress in this process (single-flight)
+        self._submitting: Dict[str, asyncio.Future] = {}
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    @property
+    def in_flight(self) -> int:
+        """Jobs queued or running in this process"""
+        return len(self._tasks)
+
+    async def submit_once(self, db: AsyncSession, params: Dict[str, Any], fingerprint: str,
+                          engine_input: Optional[Dict[str, Any]] = None) -> Tuple[UUID, str, bool]:
+        """
+        Submit unless an equivalent run exists.
+        Returns (run id, its status, whether it was an existing run).
+        """
+        # Identical submissions racing in this process wait for the first one
+        while fingerprint in self._submitting:
+            found = await asyncio.shield(self._submitting[fingerprint])
+            if found is not None:
+                return found[0], found[1], True
+
+        future = asyncio.get_running_loop().create_future()
+        self._submitting[fingerprint] = future
+        found = None
+        try:
+            found = await self._submit_or_reuse(db, params, fingerprint, engine_input)
+            return found
+        finally:
+            self._submitting.pop(fingerprint, None)
+            # A failed submission resolves to None; waiters then try for themselves
+            future.set_result(found[:2] if found is not None else None)
+
+    async def _submit_or_reuse(self, db: AsyncSession, params: Dict[str, Any], fingerprint: str,
+                               engine_input: Optional[Dict[str, Any]]) -> Tuple[UUID, str, bool]:
+        # Serializes lookup + insert with other workers; released on commit/rollback
+        await db.execute(select(func.pg_advisory_xact_lock(_advisory_lock_key(fingerprint))))
+        existing = await self.find_run(db, fingerprint)
+        if existing is not None:
+            # Keeps any stale runs find_run marked failed
+            await db.commit()
+            logger.info(f"♻️ Optimization run {existing[0]} reused for identical inputs")
+            return existing[0], existing[1], True
+
+        run_id = await self.submit(db, params, fingerprint=fingerprint, engine_input=engine_input)
+        return run_id, "queued", False
+
+    async def find_run(self, db: AsyncSession, fingerprint: str) -> Optional[Tuple[UUID, str]]:
+        """
+        Newest live run with this fingerprint inside the dedup window: completed,
+        or queued/running and not stale. Stale runs found on the way are marked
+        failed (in db's transaction; the caller commits).
+        """
+        now = datetime.now(timezone.utc)
+        since = now - timedelta(minutes=settings.OPTIMIZATION_DEDUP_WINDOW_MINUTES)
+        result = await db.execute(
+            select(OptimizationRun.id, OptimizationRun.status,
+                   OptimizationRun.created_at, OptimizationRun.updated_at)
+            .where(
+                OptimizationRun.input_fingerprint == fingerprint,
+                OptimizationRun.status.in_(DEDUP_STATUSES),
+                OptimizationRun.created_at >= since,
+            )
+            .order_by(OptimizationRun.created_at.desc())
+        )
+
+        found, stale = None, []
+        for row in result:
+            if run_is_stale(row.status, row.created_at, row.updated_at, now, owned=str(row.id) in self._tasks):
+                stale.append(row.id)
+                continue
+            found = (row.id, row.status)
+            break
+
+        if stale:
+            await db.execute(
+                update(OptimizationRun)
+                .where(OptimizationRun.id.in_(stale), OptimizationRun.status.in_(UNFINISHED_STATUSES))
+                .values(**self._abandoned_values(now))
+            )
+            logger.warning(f"🧟 Marked {len(stale)} abandoned optimization run(s) failed: {stale}")
+        return found
+
+    @staticmethod
+    def _abandoned_values(now: datetime) -> Dict[str, Any]:
+        return {
+            "status": "failed",
+            "results_summary": {
+                "error": "Abandoned: the worker running it stopped responding",
+                "timestamp": now.isoformat(),
+            },
+            "progress": {"stage": "failed", "percent": 100},
+            "completed_at": now,
+        }
+
+    async def submit(self, db: AsyncSession, params: Dict[str, Any],
+                     fingerprint: Optional[str] = None,
+                     engine_input: Optional[Dict[str, Any]] = None) -> UUID:
+        """
+        Insert a queued OptimizationRun and schedule it; returns the run id.
+        engine_input (already loaded to fingerprint the run) saves the job reloading it.
+        """
+        stmt = insert(OptimizationRun).values(
+            trigger_type=MACHINE_TRIGGER_TYPE,
+            trigger_details={
+                "source": "Core Optimization Engine",
+                "params": params,
+            },
+            status="queued",
+            progress={"stage": "queued", "percent": 0},
+            input_config=params,
+            input_fingerprint=fingerprint,
+            started_at=None,
+        ).returning(OptimizationRun.id)
+
+        run_id = (await db.execute(stmt)).scalar_one()
+        await db.commit()
+
+        task = asyncio.create_task(self._run(run_id, params, engine_input))
+        self._tasks[str(run_id)] = task
+        task.add_done_callback(lambda _: self._tasks.pop(str(run_id), None))
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.create_task(self._beat())
+
+        logger.info(f"📥 Optimization run {run_id} queued")
+        return run_id
+
+    async def _beat(self):
+        """Touch updated_at on this process's unfinished runs until none are left"""
+        while self._tasks:
+            await asyncio.sleep(settings.OPTIMIZATION_HEARTBEAT_SECONDS)
+            run_ids = list(self._tasks)
+            if not run_ids:
+                break
+            try:
+                await self.touch_runs(run_ids)
+            except Exception as e:
+                logger.warning(f"⚠️ Could not record heartbeat for {len(run_ids)} run(s): {e}")
+
+    async def touch_runs(self, run_ids: List[str]):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(OptimizationRun)
+                .where(OptimizationRun.id.in_([UUID(run_id) for run_id in run_ids]),
+                       OptimizationRun.status.in_(UNFINISHED_STATUSES))
+                .values(updated_at=func.now())
+            )
+            await db.commit()
+
+    async def wait(self, run_id: UUID):
+        """Wait for a job started by this process (no-op if unknown/finished)"""
+        task = self._tasks.get(str(run_id))
+        if task is not None:
+            await asyncio.shield(task)
+
+    async def update_run(self, run_id: UUID, **values):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(OptimizationRun).where(OptimizationRun.id == run_id).values(**values)
+            )
+            await db.commit()
+
+    async def _run(self, run_id: UUID, params: Dict[str, Any],
+                   engine_input: Optional[Dict[str, Any]] = None):
+        async with self._slots:
+            await self.update_run(
+                run_id,
+                status="running",
+                started_at=datetime.now(timezone.utc),
+                progress={"stage": "starting", "percent": 0},
+            )
+            progress_writer = _ProgressWriter(self, run_id, asyncio.get_running_loop())
+
+            try:
+                async with AsyncSessionLocal() as db:
+                    results = await CoreOptimizationAdapter.run_optimization(
+                        db=db,
+                        progress_callback=progress_writer,
+                        executor=self.executor,
+                        engine_input=engine_input,
+                        **params
+                    )
+
+                if results is None:
+                    raise Exception("Optimization engine returned no result")
+                if isinstance(results, dict) and results.get("status") == "ERROR":
+                    raise Exception(results.get("message") or "Optimization error")
+
+                await progress_writer.flush()
+                summary = build_results_summary(results)
+                write_started = time.perf_counter()
+                await self.update_run(
+                    run_id,
+                    status="completed",
+                    result=results,
+                    results_summary=summary,
+                    progress={"stage": "completed", "percent": 100},
+                    completed_at=datetime.now(timezone.utc),
+                )
+                if summary.get("perf"):
+                    # The result write can only be timed once it is done; patch the small summary row
+                    summary["perf"]["db_write_seconds"] = round(time.perf_counter() - write_started, 4)
+                    await self.update_run(run_id, results_summary=summary)
+                logger.info(f"✅ Optimization run {run_id} completed")
+
+            except Exception as e:
+                logger.exception(f"❌ Optimization run {run_id} failed")
+                await progress_writer.flush()
+                await self.update_run(
+                    run_id,
+                    status="failed",
+                    results_summary={
+                        "error": str(e),
+                        "timestamp": datetime.now(timezone.utc).isoformat(),
+                    },
+                    progress={"stage": "failed", "percent": 100},
+                    completed_at=datetime.now(timezone.utc),
+                )
+
+    def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared by all requests in this worker process
+optimization_jobs = OptimizationJobManager(settings.OPTIMIZATION_MAX_CONCURRENT_JOBS)
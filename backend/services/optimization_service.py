@@ -8,24 +8,25 @@ Route optimization business logic with OpenRouteService integration
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List, Dict, Optional, Tuple
-import requests
 import json
 import os
 from datetime import datetime
 from models.vendor import Vendor
 from models.storage_hub import StorageHub
 from models.fleet import Fleet
+from scripts.routing_providers import RoutingProvider, ORSRoutingProvider, ORS_API_KEY, route_matrix_metrics
 
 
-API_KEY = "eyJvcmciOiI1YjNjZTM1OTc4NTExMTAwMDFjZjYyNDgiLCJpZCI6ImIyNjFmZWMzYWRhNTRmMDE5YzVjZWZkYTQ2MzRjNzk2IiwiaCI6Im11cm11cjY0In0="
+API_KEY = ORS_API_KEY
 
 
 
 class OptimizationService:
     """Service for route optimization operations"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, routing_provider: Optional[RoutingProvider] = None):
         self.db = db
+        self.routing_provider = routing_provider or ORSRoutingProvider(api_key=API_KEY)
         self.centroids = {}
         self.center_capacity = {}
         self.subareas = {}
@@ -231,78 +232,38 @@ class OptimizationService:
         if not farmer_list:
             return [], None
             
-        jobs = []
-        for idx, farmer_name in enumerate(farmer_list):
-            lat, lon = self.subareas[farmer_name]
-            jobs.append({
-                "id": idx,
-                "location": [lon, lat],
-                "delivery": [self.farmers_milk[farmer_name]]
-            })
-            
-        vehicle = {
-            "id": vehicle_id,
-            "start": [chilling_center_coords[1], chilling_center_coords[0]],
-            "end": [chilling_center_coords[1], chilling_center_coords[0]],
-            "profile": "driving-car",
-            "capacity": [vehicle_capacity]
-        }
-        
-        optimization_req_body = {
-            "jobs": jobs,
-            "vehicles": [vehicle]
-        }
-        
-        headers = {'Authorization': API_KEY, 'Content-Type': 'application/json'}
+        stops = [tuple(self.subareas[farmer_name]) for farmer_name in farmer_list]
+        demands = [self.farmers_milk[farmer_name] for farmer_name in farmer_list]
         
         try:
-            response = requests.post(
-                "https://api.openrouteservice.org/optimization",
-                json=optimization_req_body,
-                headers=headers,
-                timeout=30
+            order, optimized_data = self.routing_provider.optimize_route(
+                tuple(chilling_center_coords), stops, demands, vehicle_capacity, vehicle_id
             )
-            optimized_data = response.json()
-            
-            if "routes" in optimized_data and optimized_data["routes"]:
-                steps = optimized_data["routes"][0]["steps"]
-                route = [farmer_list[step["id"]] for step in steps if step["type"] == "job"]
-                return route, optimized_data
-            else:
-                return [], optimized_data
+            return [farmer_list[idx] for idx in order], optimized_data
         except Exception as e:
             print(f"Error in route optimization: {str(e)}")
             return [], None
     
+    def get_cluster_legs(self, chilling_center_coords: Tuple[float, float],
+                         farmer_names: List[str]) -> Tuple[Dict[str, int], Dict]:
+        """One distance + duration matrix over a hub and its farmers: (farmer → index, matrix)"""
+        points = [tuple(chilling_center_coords)] + [tuple(self.subareas[name]) for name in farmer_names]
+        matrix = self.routing_provider.matrix(points, points, metrics=("distance", "duration"))
+        return {name: i + 1 for i, name in enumerate(farmer_names)}, matrix
+    
     def get_route_metrics(self, ordered_names: List[str], 
-                         chilling_center_coords: Tuple[float, float]) -> Tuple[Optional[float], Optional[float]]:
-        """Get distance and time metrics for a route"""
-        coordinates = [[chilling_center_coords[1], chilling_center_coords[0]]]
-        
-        for name in ordered_names:
-            lat, lon = self.subareas[name]
-            coordinates.append([lon, lat])
-        coordinates.append([chilling_center_coords[1], chilling_center_coords[0]])
-        
-        unique_coords = set(tuple(c) for c in coordinates)
-        if len(unique_coords) < 2:
+                         chilling_center_coords: Tuple[float, float],
+                         legs: Optional[Tuple[Dict[str, int], Dict]] = None) -> Tuple[Optional[float], Optional[float]]:
+        """Distance and time of hub → farmers → hub, summed over the cluster matrix legs"""
+        if not ordered_names:
             return None, None
-            
-        url = 'https://api.openrouteservice.org/v2/directions/driving-car'
-        body = {"coordinates": coordinates, "format": "json"}
-        headers = {'Authorization': API_KEY, 'Content-Type': 'application/json'}
         
         try:
-            response = requests.post(url, json=body, headers=headers, timeout=30)
-            data = response.json()
-            
-            if 'error' in data:
-                return None, None
-                
-            summary = data['routes'][0]['summary']
-            distance_km = summary['distance'] / 1000
-            duration_min = summary['duration'] / 60
-            return round(distance_km, 2), round(duration_min, 2)
+            position, matrix = legs or self.get_cluster_legs(chilling_center_coords, ordered_names)
+            return route_matrix_metrics(
+                matrix['distances'], matrix['durations'],
+                [0, *(position[name] for name in ordered_names), 0]
+            )
         except Exception as e:
             print(f"Error getting route metrics: {str(e)}")
             return None, None
@@ -314,30 +275,11 @@ class OptimizationService:
         try:
             vehicle_types_list, fleet_lookup = await self.get_vehicle_types_from_db()
             
-            origins = [[lon, lat] for lat, lon in self.subareas.values()]
-            destinations = [[lon, lat] for lat, lon in self.centroids.values()]
-            all_locations = origins + destinations
-            sources = list(range(len(origins)))
-            dest_idx_start = len(origins)
-            destinations_indices = list(range(dest_idx_start, dest_idx_start + len(destinations)))
-            
-            matrix_req_body = {
-                "locations": all_locations,
-                "sources": sources,
-                "destinations": destinations_indices,
-                "metrics": ["distance"],
-                "units": "km"
-            }
+            origins = [tuple(coords) for coords in self.subareas.values()]
+            destinations = [tuple(coords) for coords in self.centroids.values()]
             
-            headers = {'Authorization': API_KEY, 'Content-Type': 'application/json'}
-            response = requests.post(
-                'https://api.openrouteservice.org/v2/matrix/driving-car',
-                json=matrix_req_body,
-                headers=headers,
-                timeout=30
-            )
-            data_response = response.json()
-            distance_matrix = data_response['distances']
+            matrix = self.routing_provider.matrix(origins, destinations, metrics=("distance", "duration"))
+            distance_matrix = matrix['distances'].tolist()
             
             cluster_assignments = {centroid: [] for centroid in self.centroids.keys()}
             subarea_names = list(self.subareas.keys())
@@ -367,6 +309,8 @@ class OptimizationService:
                 vehicle_assignments = self.assign_heterogeneous_fleet(
                     subarea_list, centroid_name, vehicle_types_list, fleet_lookup
                 )
+                # Every vehicle's distance and time come from this one matrix
+                legs = self.get_cluster_legs(chilling_center_coords, subarea_list) if vehicle_assignments else None
                 
                 cluster_data = {
                     'name': centroid_name,
@@ -390,7 +334,7 @@ class OptimizationService:
                     )
                     
                     distance_km, travel_time_min = self.get_route_metrics(
-                        optimized_route, chilling_center_coords
+                        optimized_route, chilling_center_coords, legs
                     )
                     
                     vehicle_info = {
@@ -0,0 +1,115 @@
+#services/spatial_index_service.py
+"""
+Spatial Index Service
+In-memory vendor / hub SpatialIndex, rebuilt from the active data when it changes
+
+Vendor and hub writes in this process invalidate the index directly. Writes
+from other worker processes are picked up by comparing a data version (row
+counts and last change times), checked at most once every
+SPATIAL_INDEX_VERSION_CHECK_SECONDS so /vendors/nearby stays query-free in
+between.
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Any
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.config import settings
+from models.vendor import Vendor
+from models.storage_hub import StorageHub
+from services.data_transformer import DataTransformer
+from scripts.spatial_index import SpatialIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+VENDOR_FIELDS = (
+    "id", "vendor_code", "vendor_name", "village", "latitude", "longitude",
+    "milk_quantity_cans", "milk_quantity_liters",
+)
+HUB_FIELDS = ("id", "hub_code", "hub_name", "location", "latitude", "longitude", "capacity_liters")
+
+
+class SpatialIndexService:
+    """Process-wide vendor and hub indexes, keyed by a cheap data version"""
+
+    _indexes: Optional[Dict[str, Any]] = None
+    _lock = asyncio.Lock()
+    _checked_at = 0.0     # time.monotonic() of the last version check
+    _generation = 0       # bumped by invalidate(); a rebuild that raced one is not kept
+
+    @staticmethod
+    async def _data_version(db: AsyncSession) -> tuple:
+        """Active row count and last change time of vendors and hubs"""
+        version = []
+        for model in (Vendor, StorageHub):
+            result = await db.execute(
+                select(func.count(model.id), func.max(model.updated_at), func.max(model.created_at))
+                .where(model.is_active == True)
+            )
+            version.extend(result.one())
+        return tuple(version)
+
+    @staticmethod
+    def _build(data: Dict) -> Dict[str, Any]:
+        def records(rows, fields):
+            return [
+                {field: getattr(row, field) for field in fields}
+                for row in rows if row.latitude is not None and row.longitude is not None
+            ]
+
+        vendors = records(data['vendors'], VENDOR_FIELDS)
+        hubs = records(data['hubs'], HUB_FIELDS)
+        return {
+            'vendors': SpatialIndex(
+                [(float(v['latitude']), float(v['longitude'])) for v in vendors], keys=vendors
+            ),
+            'hubs': SpatialIndex(
+                [(float(h['latitude']), float(h['longitude'])) for h in hubs], keys=hubs
+            ),
+        }
+
+    @staticmethod
+    async def get_indexes(db: AsyncSession) -> Dict[str, Any]:
+        """{'vendors': SpatialIndex, 'hubs': SpatialIndex}; keys are plain record dicts"""
+        cached = SpatialIndexService._indexes
+        if cached and time.monotonic() - SpatialIndexService._checked_at < settings.SPATIAL_INDEX_VERSION_CHECK_SECONDS:
+            return cached
+
+        generation = SpatialIndexService._generation
+        version = await SpatialIndexService._data_version(db)
+        cached = SpatialIndexService._indexes
+        if cached and cached['version'] == version:
+            SpatialIndexService._checked_at = time.monotonic()
+            return cached
+
+        async with SpatialIndexService._lock:
+            cached = SpatialIndexService._indexes
+            if cached and cached['version'] == version:
+                return cached
+
+            data = await DataTransformer.fetch_active_data(db)
+            indexes = SpatialIndexService._build(data)
+            indexes['version'] = version
+            if SpatialIndexService._generation == generation:
+                SpatialIndexService._indexes = indexes
+                SpatialIndexService._checked_at = time.monotonic()
+            logger.info(
+                f"📍 Spatial index rebuilt: {len(indexes['vendors'])} vendors, {len(indexes['hubs'])} hubs"
+            )
+            return indexes
+
+    @staticmethod
+    async def nearby_vendors(db: AsyncSession, lat: float, lng: float,
+                             radius_km: float, limit: int = 100) -> List[Dict]:
+        """Active vendors within radius_km of (lat, lng), nearest first"""
+        indexes = await SpatialIndexService.get_indexes(db)
+        hits = indexes['vendors'].within(lat, lng, radius_km)[:limit]
+        return [{**vendor, 'distance_km': round(km, 3)} for vendor, km in hits]
+
+    @staticmethod
+    def invalidate():
+        """Drop the index after a vendor or hub write; the next lookup rebuilds it"""
+        SpatialIndexService._indexes = None
+        SpatialIndexService._generation += 1
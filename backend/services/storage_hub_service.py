@@ -11,6 +11,7 @@ import uuid
 
 from models.storage_hub import StorageHub
 from schemas.storage_hub import StorageHubCreate, StorageHubUpdate
+from services.spatial_index_service import SpatialIndexService
 from utils.conversions import liters_to_cans, generate_storage_hub_code, extract_code_number
 
 
@@ -52,6 +53,8 @@ class StorageHubService:
                 capacity_cans=liters_to_cans(hub_dict["capacity_liters"]),
                 current_load_liters=0.0,
                 current_load_cans=0.0,
+                open_minute=hub_dict.get("open_minute"),
+                close_minute=hub_dict.get("close_minute"),
                 is_active=True,
                 upload_batch_id=batch_id
             )
@@ -59,6 +62,7 @@ class StorageHubService:
         
         db.add_all(hubs_to_insert)
         await db.commit()
+        SpatialIndexService.invalidate()
         
         return {
             "batch_id": batch_id,
@@ -151,6 +155,7 @@ class StorageHubService:
                 setattr(hub, field, value)
         
         await db.commit()
+        SpatialIndexService.invalidate()
         await db.refresh(hub)
         return hub
     
@@ -163,6 +168,7 @@ class StorageHubService:
         
         hub.is_active = False
         await db.commit()
+        SpatialIndexService.invalidate()
         
         return {"message": f"Storage Hub {hub.hub_code} deactivated successfully"}
     
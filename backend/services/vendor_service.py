@@ -11,6 +11,7 @@ import uuid
 
 from models.vendor import Vendor
 from schemas.vendor import VendorCreate, VendorUpdate
+from services.spatial_index_service import SpatialIndexService
 from utils.conversions import cans_to_liters, generate_vendor_code, extract_code_number
 
 
@@ -61,6 +62,8 @@ class VendorService:
                 contact_number=vendor_dict.get("contact_number"),
                 milk_quantity_cans=vendor_dict["milk_quantity_cans"],
                 milk_quantity_liters=cans_to_liters(vendor_dict["milk_quantity_cans"]),
+                pickup_start_minute=vendor_dict.get("pickup_start_minute"),
+                pickup_end_minute=vendor_dict.get("pickup_end_minute"),
                 is_active=True,
                 upload_batch_id=batch_id
             )
@@ -69,6 +72,7 @@ class VendorService:
         # Bulk insert
         db.add_all(vendors_to_insert)
         await db.commit()
+        SpatialIndexService.invalidate()
         
         return {
             "batch_id": batch_id,
@@ -211,6 +215,7 @@ class VendorService:
                 setattr(vendor, field, value)
         
         await db.commit()
+        SpatialIndexService.invalidate()
         await db.refresh(vendor)
         return vendor
     
@@ -232,6 +237,7 @@ class VendorService:
         
         vendor.is_active = False
         await db.commit()
+        SpatialIndexService.invalidate()
         
         return {"message": f"Vendor {vendor.vendor_code} deactivated successfully"}
     
@@ -0,0 +1,58 @@
+"""
+Test Benchmark Suite
+Seeded instance generator and the offline per-stage engine benchmark
+"""
+
+import json
+import os
+import tempfile
+from benchmarks.instances import generate_instance, describe
+from benchmarks.engine_stages import run, STAGES
+
+
+def test_instances_are_seeded_and_realistic():
+    first, again, other = generate_instance(2000, seed=7), generate_instance(2000, seed=7), generate_instance(2000, seed=8)
+    assert first == again
+    assert first['subareas'] != other['subareas']
+
+    summary = describe(first)
+    assert summary['vendors'] == 2000 and summary['hubs'] == 5
+    # Whole (or half) cans of 40 liters
+    assert all(milk % 20 == 0 and 40 <= milk <= 240 for milk in first['farmers_milk'].values())
+    # The fleet and the hubs can take all of the milk
+    assert sum(v['capacity'] * v['count'] for v in first['vehicle_types']) >= summary['total_milk_liters']
+    assert sum(first['center_capacity'].values()) >= summary['total_milk_liters']
+    # FleetCategorizer pricing: C1 is the smallest and cheapest
+    types = sorted(first['vehicle_types'], key=lambda v: v['capacity'])
+    assert [v['fixed_cost'] for v in types] == sorted(v['fixed_cost'] for v in types)
+    print(f"✅ Seeded instance: {summary}")
+
+
+def test_stage_benchmark_writes_results():
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "bench.json")
+        document = run([100, 400], seed=1, repeat=2, stages=STAGES, output=output)
+        with open(output) as f:
+            assert json.load(f) == json.loads(json.dumps(document))
+
+    assert [row['instance']['vendors'] for row in document['results']] == [100, 400]
+    for row in document['results']:
+        assert list(row['stages']) == STAGES
+        assert all(len(stage['runs']) == 2 and stage['seconds'] == min(stage['runs'])
+                   for stage in row['stages'].values())
+        assert row['stages']['packing']['unassigned'] == 0
+        assert row['stages']['pipeline']['unassigned'] == row['stages']['routing']['unassigned']
+    print("✅ Stage benchmark results written")
+
+
+def test_skipped_stages_are_not_reported():
+    with tempfile.TemporaryDirectory() as tmp:
+        document = run([200], seed=1, repeat=1, stages=["routing"], output=os.path.join(tmp, "bench.json"))
+    assert list(document['results'][0]['stages']) == ["routing"]
+    print("✅ Only requested stages are timed")
+
+
+if __name__ == "__main__":
+    test_instances_are_seeded_and_realistic()
+    test_stage_benchmark_writes_results()
+    test_skipped_stages_are_not_reported()
@@ -0,0 +1,131 @@
+"""
+Test Cluster Cache
+Solved clusters are memoized by input fingerprint and reused across runs
+(in-memory layer, no database required)
+"""
+
+import time
+from scripts.cluster_cache import ClusterCache
+from scripts.optimization_engine import OptimizationEngine
+from test_incremental_optimization import make_engine, HUBS, VEHICLE_TYPES, FLEET_LOOKUP, vehicle_numbers
+from test_matrix_cache import CountingProvider
+
+
+def counting_engine(milk_overrides=None):
+    source = make_engine(milk_overrides)
+    provider = CountingProvider()
+    engine = OptimizationEngine(routing_provider=provider)
+    engine.set_data(HUBS, source.center_capacity, source.subareas, source.farmers_milk)
+    return engine, provider
+
+
+def test_repeat_run_reuses_every_cluster():
+    cache = ClusterCache()
+    first = make_engine().run_optimization(480, 100, VEHICLE_TYPES, cluster_cache=cache)
+    assert first["cluster_reuse"]["reuse_ratio"] == 0.0
+    assert len(cache) == len(HUBS)
+
+    engine, provider = counting_engine()
+    again = engine.run_optimization(480, 100, VEHICLE_TYPES, cluster_cache=cache)
+
+    assert again["cluster_reuse"] == {
+        "clusters": len(HUBS), "from_previous_run": 0, "from_cache": len(HUBS), "reuse_ratio": 1.0
+    }
+    assert again["clusters"] == first["clusters"]
+    assert again["total_cost"] == first["total_cost"]
+    assert again["unused_vehicles"] == first["unused_vehicles"]
+    # Only the vendor → hub assignment matrix; no cluster was routed again
+    assert len(provider.requests) == 1 and again["routing_calls"]["vehicles"] == 0
+    print("✅ Unchanged clusters come from the cache with no routing work")
+
+
+def test_changed_cluster_is_resolved():
+    cache = ClusterCache()
+    make_engine().run_optimization(480, 100, VEHICLE_TYPES, cluster_cache=cache)
+
+    updated = make_engine({"South-V3": 180.0}).run_optimization(480, 100, VEHICLE_TYPES, cluster_cache=cache)
+
+    assert updated["cluster_reuse"]["from_cache"] == len(HUBS) - 1
+    south = next(c for c in updated["clusters"] if c["name"] == "South")
+    assert {f["name"]: f["milk_liters"] for v in south["vehicles"] for f in v["farmers"]}["South-V3"] == 180.0
+    # The new South plan is cached too
+    assert len(cache) == len(HUBS) + 1
+    print("✅ Only the changed cluster is re-solved")
+
+
+def test_constraints_and_fleet_gate_reuse():
+    cache = ClusterCache()
+    make_engine().run_optimization(480, 100, VEHICLE_TYPES, cluster_cache=cache)
+
+    stricter = make_engine().run_optimization(300, 100, VEHICLE_TYPES, cluster_cache=cache)
+    assert stricter["cluster_reuse"]["from_cache"] == 0
+
+    smaller = [dict(v, count=1) for v in VEHICLE_TYPES]
+    shrunk = make_engine().run_optimization(480, 100, smaller, cluster_cache=cache)
+    used = [v["type"] for c in shrunk["clusters"] for v in c["vehicles"]]
+    assert shrunk["cluster_reuse"]["from_cache"] <= 1
+    assert used.count("C1") <= 1 and used.count("C2") <= 1
+    print("✅ Constraint and fleet changes invalidate cached clusters")
+
+
+def test_short_fleet_plans_are_not_reused():
+    short = [dict(VEHICLE_TYPES[0], count=2), dict(VEHICLE_TYPES[1], count=1)]
+    cache = ClusterCache()
+    starved = make_engine().run_optimization(480, 100, short, cluster_cache=cache)
+    assert starved["unassigned_farmers"]
+    served_first = {c["name"] for c in starved["clusters"] if not c["unassigned_farmers"]}
+    assert len(cache) == len(served_first) < len(HUBS)
+
+    # The fleet comes back: every starved cluster is solved again, for the cache and the previous run
+    grown = make_engine().run_optimization(480, 100, VEHICLE_TYPES, cluster_cache=cache)
+    assert not grown["unassigned_farmers"]
+    assert grown["cluster_reuse"]["from_cache"] <= len(served_first)
+    incremental = make_engine().run_optimization(480, 100, VEHICLE_TYPES, previous_results=starved)
+    assert not incremental["unassigned_farmers"]
+    assert set(incremental["incremental"]["reused_clusters"]) <= served_first
+    print("✅ Clusters planned on a short fleet are re-solved once vehicles come back")
+
+
+def test_cached_clusters_keep_their_vehicles():
+    cache = ClusterCache()
+    # North grows by a vehicle once half its vendors send more milk
+    for milk_overrides in (None, {f"North-V{i}": 200.0 for i in range(10)}):
+        engine = make_engine(milk_overrides)
+        engine.fleet_lookup = FLEET_LOOKUP
+        results = engine.run_optimization(480, 100, VEHICLE_TYPES, solver="native", cluster_cache=cache)
+        if milk_overrides is None:
+            first = vehicle_numbers(results)
+
+    assert results["cluster_reuse"]["from_cache"] == 2
+    numbers = vehicle_numbers(results)
+    assert numbers["East"] == first["East"] and numbers["South"] == first["South"]
+    every = [n for cluster in numbers.values() for n in cluster]
+    assert None not in every and len(set(every)) == len(every)
+    print("✅ Clusters from the cache keep their vehicles; re-solved ones get others")
+
+
+def test_lru_ttl_and_copies():
+    cache = ClusterCache(max_entries=2)
+    cache.put("a", "North", {"name": "North", "vehicles": []})
+    cache.put("b", "South", {"name": "South", "vehicles": []})
+    cache.get("a")
+    cache.put("c", "East", {"name": "East", "vehicles": []})
+    assert cache.get("b") is None and cache.get("a") is not None and len(cache) == 2
+
+    copy = cache.get("a")
+    copy["vehicles"].append({"type": "C1"})
+    assert cache.get("a")["vehicles"] == []
+
+    cache.put("x", "North", {"name": "North"}, expires_at=time.time() - 1)
+    assert cache.get("x") is None
+    assert [entry["fingerprint"] for entry in cache.drain_pending()] == ["a", "b", "c", "x"]
+    print("✅ LRU bound, TTL expiry and independent copies")
+
+
+if __name__ == "__main__":
+    test_repeat_run_reuses_every_cluster()
+    test_changed_cluster_is_resolved()
+    test_constraints_and_fleet_gate_reuse()
+    test_short_fleet_plans_are_not_reused()
+    test_cached_clusters_keep_their_vehicles()
+    test_lru_ttl_and_copies()
@@ -0,0 +1,69 @@
+"""
+Test Fleet Packing
+Indexed heterogeneous packing matches the original greedy exactly
+"""
+
+import random
+from benchmarks.fleet_packing import legacy_assign_heterogeneous_fleet, VEHICLE_TYPES
+from scripts.fleet_packing import pack_heterogeneous_fleet
+
+FLEET_LOOKUP = {
+    "C1": [{"vehicle_number": f"TN-01-{i}"} for i in range(3)],
+    "C4": [],
+}
+
+
+def numbered_like_legacy():
+    """vehicle_info_for that hands out vehicles the way the original greedy numbered them"""
+    used = {}
+
+    def lookup(vehicle_type):
+        fleet = FLEET_LOOKUP.get(vehicle_type)
+        used_count = used.get(vehicle_type, 0)
+        used[vehicle_type] = used_count + 1
+        if not fleet:
+            return None
+        return fleet[used_count] if used_count < len(fleet) else fleet[0]
+    return lookup
+
+
+def test_matches_original_greedy():
+    for seed in range(30):
+        rng = random.Random(seed)
+        farmers_milk = {
+            f"F{i}": rng.choice([0, rng.randint(1, 600), rng.randint(1, 400) / 4, 0.1 * rng.randint(1, 9)])
+            for i in range(rng.randint(1, 400))
+        }
+        farmer_list = list(farmers_milk)
+        rng.shuffle(farmer_list)
+        counts = {v["name"]: rng.randint(0, 6) for v in VEHICLE_TYPES}
+
+        legacy_fleet, indexed_fleet = dict(counts), dict(counts)
+        expected = legacy_assign_heterogeneous_fleet(
+            farmer_list, farmers_milk, VEHICLE_TYPES, legacy_fleet, FLEET_LOOKUP
+        )
+        actual = pack_heterogeneous_fleet(
+            farmer_list, farmers_milk, VEHICLE_TYPES, indexed_fleet, numbered_like_legacy()
+        )
+
+        assert actual == expected, f"seed {seed}"
+        assert indexed_fleet == legacy_fleet
+    print("✅ Indexed packing identical to the original on 30 random clusters")
+
+
+def test_large_cluster():
+    rng = random.Random(1)
+    farmers_milk = {f"F{i}": rng.randint(5, 150) for i in range(10_000)}
+    fleet = {v["name"]: v["count"] for v in VEHICLE_TYPES}
+
+    assignments, unassigned = pack_heterogeneous_fleet(list(farmers_milk), farmers_milk, VEHICLE_TYPES, fleet)
+
+    packed = sum(len(a["farmers"]) for a in assignments)
+    assert packed + len(unassigned) == 10_000
+    assert all(a["total_milk"] <= a["vehicle_spec"]["capacity"] for a in assignments)
+    print(f"✅ 10,000 farmers packed into {len(assignments)} vehicles")
+
+
+if __name__ == "__main__":
+    test_matches_original_greedy()
+    test_large_cluster()
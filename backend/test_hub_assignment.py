@@ -0,0 +1,129 @@
+"""
+Test Hub Assignment
+Vectorized, capacity-aware vendor → hub assignment
+"""
+
+import time
+import numpy as np
+from scripts.hub_assignment import assign_vendors_to_hubs
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.optimization_engine import OptimizationEngine
+
+
+class UnroutableProvider(OfflineRoutingProvider):
+    """Offline distances, with every pair touching `blocked` unroutable (NaN, like a null ORS cell)"""
+
+    def __init__(self, blocked):
+        super().__init__()
+        self.blocked = set(blocked)
+
+    def matrix(self, sources, destinations, metrics=("duration",)):
+        result = super().matrix(sources, destinations, metrics)
+        for key in ("distances", "durations"):
+            if key in result:
+                block = np.array(result[key], dtype=np.float64)
+                block[[tuple(s) in self.blocked for s in sources], :] = np.nan
+                block[:, [tuple(d) in self.blocked for d in destinations]] = np.nan
+                result[key] = block
+        return result
+
+
+def test_nearest_hub_when_capacity_allows():
+    distances = np.array([[1.0, 5.0], [4.0, 2.0], [3.0, 9.0]])
+    result = assign_vendors_to_hubs(distances, [10, 10, 10], [100, 100])
+
+    assert result["hub_index"].tolist() == [0, 1, 0]
+    assert result["spilled"] == 0
+    assert result["fill_ratio"].tolist() == [0.2, 0.1]
+    print("✅ Nearest hub used when nothing is full")
+
+
+def test_full_hub_spills_least_regret_vendor():
+    # Both prefer hub 0 (room for one); vendor 1 loses less by moving
+    distances = np.array([[1.0, 20.0], [2.0, 3.0]])
+    result = assign_vendors_to_hubs(distances, [50, 50], [60, 60])
+
+    assert result["hub_index"].tolist() == [0, 1]
+    assert result["spilled"] == 1 and result["overflow"] == 0
+    print("✅ Least-regret vendor spills to the next-nearest hub")
+
+
+def test_unlimited_and_overflow():
+    distances = np.array([[1.0, 2.0], [1.0, 2.0], [1.0, 2.0]])
+    unlimited = assign_vendors_to_hubs(distances, [10, 10, 10], [None, 0])
+    assert unlimited["hub_index"].tolist() == [0, 0, 0]
+    assert np.isnan(unlimited["fill_ratio"]).all()
+
+    overflow = assign_vendors_to_hubs(distances, [10, 10, 10], [10, 10])
+    assert overflow["overflow"] == 1
+    assert sorted(overflow["hub_index"].tolist()) == [0, 0, 1]
+    print("✅ Unlimited hubs and overflow reporting")
+
+
+def test_unroutable_pairs_are_never_assigned():
+    distances = np.array([[np.nan, 5.0], [1.0, 2.0], [np.nan, np.inf]])
+    for capacities in ([None, None], [100, 100], [10, 100]):
+        result = assign_vendors_to_hubs(distances, [10, 10, 10], capacities)
+        assert result["hub_index"].tolist() == [1, 0, -1]
+        assert result["unreachable"] == 1
+    # A full reachable hub still beats an unroutable empty one
+    full = assign_vendors_to_hubs(np.array([[np.nan, 1.0], [5.0, 1.0]]), [10, 10], [100, 10])
+    assert full["hub_index"].tolist() == [1, 0]
+
+    vendor, hubs = (10.61, 78.56), {"A": (10.60, 78.55), "B": (10.75, 78.70)}
+    engine = OptimizationEngine(routing_provider=UnroutableProvider([vendor]))
+    engine.set_data(hubs, {"A": 1000.0, "B": 1000.0}, {"V0": vendor, "V1": (10.74, 78.69)}, {"V0": 40.0, "V1": 40.0})
+    clusters, hub_assignment, _ = engine.assign_clusters()
+    assert clusters == {"A": [], "B": ["V1"]} and hub_assignment["unreachable_vendors"] == ["V0"]
+    print("✅ Unroutable vendor-hub pairs are skipped; unreachable vendors reported")
+
+
+def test_shortlist_is_one_batch_and_never_guesses():
+    rng = np.random.default_rng(8)
+    hubs = {f"H{i}": (10.5 + dx, 78.5 + dy) for i, (dx, dy) in enumerate(rng.uniform(0, 0.4, (12, 2)))}
+    vendor = (10.65, 78.65)
+
+    class BatchCounting(UnroutableProvider):
+        batches = []
+
+        def matrix_many(self, blocks, metrics=("distance",)):
+            type(self).batches.append(len(blocks))
+            return super().matrix_many(blocks, metrics)
+
+    engine = OptimizationEngine(routing_provider=BatchCounting([vendor]))
+    engine.set_data(hubs, {h: 1000.0 for h in hubs}, {"V0": vendor, "V1": (10.7, 78.7)}, {"V0": 40.0, "V1": 40.0})
+    clusters, hub_assignment, _ = engine.assign_clusters()
+    # Every shortlisted hub column in a single matrix_many call
+    assert len(BatchCounting.batches) == 1 and 1 < BatchCounting.batches[0] <= len(hubs)
+
+    distances = engine.vendor_hub_distances(candidate_hubs=4)
+    # None of V0's shortlisted hubs could be routed: no hub is guessed for it
+    assert np.isinf(distances[0]).all() and np.isfinite(distances[1]).all()
+    assert hub_assignment["unreachable_vendors"] == ["V0"]
+    assert sum(clusters.values(), []) == ["V1"]
+    print("✅ Shortlisted hubs fetched in one batch; vendors with no routable hub stay unassigned")
+
+
+def test_capacity_respected_at_scale():
+    rng = np.random.default_rng(0)
+    distances = rng.uniform(1, 100, (50_000, 200))
+    demands = rng.uniform(20, 120, 50_000)
+    capacities = np.full(200, demands.sum() / 200 * 1.05)
+
+    started = time.perf_counter()
+    result = assign_vendors_to_hubs(distances, demands, capacities)
+    elapsed = time.perf_counter() - started
+
+    assert result["overflow"] == 0
+    assert (result["fill_ratio"] <= 1.0 + 1e-9).all()
+    assert elapsed < 1.0, elapsed
+    print(f"✅ 50,000 vendors x 200 hubs assigned in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    test_nearest_hub_when_capacity_allows()
+    test_full_hub_spills_least_regret_vendor()
+    test_unlimited_and_overflow()
+    test_unroutable_pairs_are_never_assigned()
+    test_shortlist_is_one_batch_and_never_guesses()
+    test_capacity_respected_at_scale()
@@ -0,0 +1,116 @@
+"""
+Test Incremental Re-optimization
+Only clusters whose inputs changed are re-solved; the rest are spliced in
+"""
+
+import json
+import numpy as np
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.optimization_engine import OptimizationEngine
+
+
+VEHICLE_TYPES = [
+    {"name": "C1", "capacity": 500.0, "count": 30, "service_time": 4,
+     "cost_per_km": 5.0, "fixed_cost": 300.0},
+    {"name": "C2", "capacity": 1500.0, "count": 10, "service_time": 4,
+     "cost_per_km": 8.0, "fixed_cost": 500.0},
+]
+HUBS = {"North": (10.70, 78.55), "South": (10.50, 78.55), "East": (10.60, 78.70)}
+
+
+FLEET_LOOKUP = {v["name"]: [{"vehicle_number": f"{v['name']}-{i}"} for i in range(v["count"])]
+                for v in VEHICLE_TYPES}
+
+
+def make_engine(milk_overrides=None):
+    rng = np.random.default_rng(9)
+    subareas = {}
+    for hub, (lat, lng) in HUBS.items():
+        for i, (dx, dy) in enumerate(rng.uniform(-0.03, 0.03, (25, 2))):
+            subareas[f"{hub}-V{i}"] = (lat + dx, lng + dy)
+    farmers_milk = {name: 60.0 for name in subareas}
+    farmers_milk.update(milk_overrides or {})
+
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    engine.set_data(HUBS, {hub: 100000.0 for hub in HUBS}, subareas, farmers_milk)
+    return engine
+
+
+def test_only_changed_cluster_is_resolved():
+    for solver in ("provider", "native"):
+        baseline = make_engine().run_optimization(480, 100, VEHICLE_TYPES, solver=solver)
+        # Stored runs come back from a JSON column
+        previous = json.loads(json.dumps(baseline))
+
+        updated = make_engine({"South-V3": 180.0}).run_optimization(
+            480, 100, VEHICLE_TYPES, solver=solver, previous_results=previous
+        )
+
+        assert updated["incremental"]["resolved_clusters"] == ["South"]
+        assert sorted(updated["incremental"]["reused_clusters"]) == ["East", "North"]
+        clusters = {c["name"]: c for c in updated["clusters"]}
+        assert clusters["North"]["vehicles"] == previous["clusters"][0]["vehicles"]
+        south_milk = {f["name"]: f["milk_liters"] for v in clusters["South"]["vehicles"] for f in v["farmers"]}
+        assert south_milk["South-V3"] == 180.0
+        assert abs(updated["total_cost"] - sum(c["cost"] for c in updated["clusters"])) < 1e-6
+        if solver == "provider":
+            assert updated["routing_calls"]["vehicles"] == len(clusters["South"]["vehicles"])
+    print("✅ Only the changed cluster is re-solved")
+
+
+def test_unchanged_data_reuses_everything():
+    baseline = make_engine().run_optimization(480, 100, VEHICLE_TYPES)
+    again = make_engine().run_optimization(480, 100, VEHICLE_TYPES, previous_results=baseline)
+
+    assert again["incremental"]["resolved_clusters"] == []
+    assert again["clusters"] == baseline["clusters"]
+    assert again["unused_vehicles"] == baseline["unused_vehicles"]
+    print("✅ Unchanged inputs reuse every cluster")
+
+
+def test_constraint_or_fleet_change_forces_resolve():
+    baseline = make_engine().run_optimization(480, 100, VEHICLE_TYPES)
+
+    stricter = make_engine().run_optimization(300, 100, VEHICLE_TYPES, previous_results=baseline)
+    assert stricter["incremental"]["reused_clusters"] == []
+
+    # One vehicle per type: at most one previous cluster still fits the fleet
+    smaller = [dict(v, count=1) for v in VEHICLE_TYPES]
+    shrunk = make_engine().run_optimization(480, 100, smaller, previous_results=baseline)
+    reused = shrunk["incremental"]["reused_clusters"]
+    used = [v["type"] for c in shrunk["clusters"] for v in c["vehicles"]]
+    assert len(reused) <= 1
+    assert used.count("C1") <= 1 and used.count("C2") <= 1
+    print("✅ Constraint and fleet changes invalidate reuse")
+
+
+def vehicle_numbers(results):
+    return {c["name"]: [v["vehicle_number"] for v in c["vehicles"]] for c in results["clusters"]}
+
+
+def test_resolved_clusters_skip_reused_vehicles():
+    for solver in ("provider", "native"):
+        engine = make_engine()
+        engine.fleet_lookup = FLEET_LOOKUP
+        baseline = json.loads(json.dumps(engine.run_optimization(480, 100, VEHICLE_TYPES, solver=solver)))
+
+        # North grows by a vehicle once half its vendors send more milk
+        engine = make_engine({f"North-V{i}": 200.0 for i in range(10)})
+        engine.fleet_lookup = FLEET_LOOKUP
+        updated = engine.run_optimization(480, 100, VEHICLE_TYPES, solver=solver, previous_results=baseline)
+
+        assert updated["incremental"]["resolved_clusters"] == ["North"]
+        numbers = vehicle_numbers(updated)
+        assert numbers["East"] == vehicle_numbers(baseline)["East"]
+        every = [n for cluster in numbers.values() for n in cluster]
+        unused = [v["vehicle_number"] for u in updated["unused_vehicles"] for v in u["vehicles"]]
+        assert None not in every and len(set(every)) == len(every), solver
+        assert not set(every) & set(unused)
+    print("✅ Re-solved clusters never get a vehicle a reused cluster holds")
+
+
+if __name__ == "__main__":
+    test_only_changed_cluster_is_resolved()
+    test_unchanged_data_reuses_everything()
+    test_constraint_or_fleet_change_forces_resolve()
+    test_resolved_clusters_skip_reused_vehicles()
@@ -0,0 +1,131 @@
+"""
+Test Large Neighbourhood Search
+Destroy / repair improvement of constructive plans, standalone and in the engine
+"""
+
+import numpy as np
+from scripts.lns import LNSImprover, DESTROY_OPERATORS, random_removal
+from scripts.fleet_packing import pack_heterogeneous_fleet
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.optimization_engine import OptimizationEngine
+from test_vrp_solver import district, VEHICLE_TYPES
+from test_incremental_optimization import make_engine, VEHICLE_TYPES as ENGINE_VEHICLE_TYPES
+
+
+def packed_plan(n=200, seed=3):
+    """Fleet-packing routes (no geography) over a random district"""
+    matrix, demands = district(n, seed=seed)
+    availability = {v['name']: v['count'] for v in VEHICLE_TYPES}
+    assignments, unassigned = pack_heterogeneous_fleet(
+        [str(i) for i in range(n)], {str(i): float(d) for i, d in enumerate(demands)},
+        VEHICLE_TYPES, availability
+    )
+    routes = [(a['vehicle_spec'], [int(f) for f in a['farmers']]) for a in assignments]
+    return matrix, demands, routes, [int(u['name']) for u in unassigned], availability
+
+
+def test_lns_improves_constructive_plan():
+    matrix, demands, routes, unassigned, availability = packed_plan()
+    spare = dict(availability)
+    result = LNSImprover(
+        matrix['distances'], matrix['durations'], demands, VEHICLE_TYPES, 480, 100, spare, seed=1
+    ).improve(routes, unassigned, time_budget_seconds=1.0)
+
+    stats = result['stats']
+    assert stats['cost_delta'] < 0
+    assert stats['improved_cost'] == round(stats['constructive_cost'] + stats['cost_delta'], 2)
+    assert stats['violations_after'] <= stats['violations_before']
+    served = [s for route in result['routes'] for s in route['stops']]
+    assert sorted(served + result['unassigned']) == list(range(len(demands)))
+    for route in result['routes']:
+        assert route['load'] <= route['vehicle_spec']['capacity'] + 1e-6
+    # Fleet handed back matches the improved plan
+    for spec in VEHICLE_TYPES:
+        used = sum(1 for route in result['routes'] if route['vehicle_spec']['name'] == spec['name'])
+        assert spare[spec['name']] == spec['count'] - used
+    print(f"✅ LNS cost {stats['constructive_cost']:.0f} → {stats['improved_cost']:.0f}")
+
+
+def test_unassigned_and_optional_stops_fill_spare_capacity():
+    distances = np.array([[0, 2, 3, 4], [2, 0, 1, 2], [3, 1, 0, 1], [4, 2, 1, 0]], dtype=float)
+    vehicle_types = [{"name": "C1", "capacity": 100.0, "count": 1, "service_time": 4,
+                      "cost_per_km": 5.0, "fixed_cost": 300.0}]
+    spare = {"C1": 0}
+    result = LNSImprover(
+        distances, None, [40, 40, 10], vehicle_types, 480, 100, spare,
+        optional_stops=[2], optional_capacity=10
+    ).improve([(vehicle_types[0], [0])], unassigned=[1], time_budget_seconds=0.2)
+
+    assert result['unassigned'] == []
+    assert result['optional_served'] == [2]
+    assert sorted(result['routes'][0]['stops']) == [0, 1, 2]
+    assert result['stats']['unassigned_before'] == 1 and result['stats']['unassigned_after'] == 0
+    print("✅ Leftover and optional stops go to the vehicle with spare capacity")
+
+
+def test_operators_are_pluggable():
+    matrix, demands, routes, unassigned, availability = packed_plan(80, seed=4)
+    calls = []
+
+    def logged_removal(lns, plan, count, rng):
+        calls.append(count)
+        return random_removal(lns, plan, count, rng)
+
+    result = LNSImprover(
+        matrix['distances'], matrix['durations'], demands, VEHICLE_TYPES, 480, 100, availability,
+        destroy_operators={"logged": logged_removal}
+    ).improve(routes, unassigned, time_budget_seconds=5.0, max_iterations=20)
+
+    assert len(calls) == 20 == result['stats']['iterations']
+    assert list(result['stats']['operators']) == ["logged", "greedy", "regret"]
+    assert set(DESTROY_OPERATORS) >= {"random", "related", "worst"}
+    print("✅ Custom destroy operator used by the search")
+
+
+def test_engine_lns_stage():
+    baseline = make_engine().run_optimization(480, 100, ENGINE_VEHICLE_TYPES)
+    results = make_engine().run_optimization(480, 100, ENGINE_VEHICLE_TYPES, lns_time_budget_seconds=1.0)
+
+    lns = results['lns']
+    assert lns['cost_delta'] <= 0
+    assert lns['elapsed_seconds'] < 3.0
+    assert [c['cluster'] for c in lns['clusters']] == ["North", "South", "East"]
+    assert results['total_cost'] <= baseline['total_cost'] + 1e-6
+    # Every farmer still served exactly once
+    served = [f['name'] for c in results['clusters'] for v in c['vehicles'] for f in v['farmers']]
+    assert sorted(served) == sorted(make_engine().subareas)
+    # Routing calls are those of the constructive plan
+    assert results['routing_calls'] == baseline['routing_calls']
+    print(f"✅ Engine LNS stage: {lns['constructive_cost']:.0f} → {lns['improved_cost']:.0f}")
+
+
+def test_engine_lns_rescues_other_hubs_leftovers():
+    # Fleet runs out before East; North's last vehicle is mostly empty
+    vehicle_types = [dict(ENGINE_VEHICLE_TYPES[0], count=2), dict(ENGINE_VEHICLE_TYPES[1], count=2)]
+    light_north = {f"North-V{i}": 20.0 for i in range(10)}
+    baseline = make_engine(light_north).run_optimization(480, 100, vehicle_types)
+    results = make_engine(light_north).run_optimization(
+        480, 100, vehicle_types, lns_time_budget_seconds=1.0
+    )
+
+    assert baseline['total_unassigned_farmers'] > 0
+    assert results['total_unassigned_farmers'] < baseline['total_unassigned_farmers']
+    rescued = results['lns']['rescued_farmers']
+    assert rescued and all(move['from'] == "East" for move in rescued)
+    clusters = {c['name']: c for c in results['clusters']}
+    for move in rescued:
+        served = {f['name'] for v in clusters[move['to']]['vehicles'] for f in v['farmers']}
+        assert move['farmer_name'] in served
+    served = [f['name'] for c in results['clusters'] for v in c['vehicles'] for f in v['farmers']]
+    assert len(served) == len(set(served))
+    assert len(served) + results['total_unassigned_farmers'] == len(make_engine().subareas)
+    print(f"✅ Unassigned farmers {baseline['total_unassigned_farmers']} → "
+          f"{results['total_unassigned_farmers']} ({len(rescued)} moved across hubs)")
+
+
+if __name__ == "__main__":
+    test_lns_improves_constructive_plan()
+    test_unassigned_and_optional_stops_fill_spare_capacity()
+    test_operators_are_pluggable()
+    test_engine_lns_stage()
+    test_engine_lns_rescues_other_hubs_leftovers()
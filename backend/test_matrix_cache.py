@@ -0,0 +1,115 @@
+"""
+Test Matrix Cache
+Pair-keyed routing matrix cache (in-memory layer, no database required)
+"""
+
+import time
+import numpy as np
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.matrix_cache import MatrixCache, CachedRoutingProvider, coord_key
+
+
+class CountingProvider(OfflineRoutingProvider):
+    """Offline estimator that records the size of every matrix request"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def matrix(self, sources, destinations, metrics=("distance",)):
+        self.requests.append((len(sources), len(destinations)))
+        return super().matrix(sources, destinations, metrics)
+
+
+VENDORS = [(10.60 + i * 0.01, 78.54 + i * 0.005) for i in range(6)]
+HUBS = [(10.61, 78.55), (10.55, 78.51)]
+
+
+def test_repeat_run_is_served_from_cache():
+    inner = CountingProvider()
+    cache = MatrixCache()
+    expected = inner.matrix(VENDORS, HUBS, ("distance", "duration"))
+    inner.requests.clear()
+
+    first = CachedRoutingProvider(inner, cache)
+    first.matrix(VENDORS, HUBS, ("distance", "duration"))
+    second = CachedRoutingProvider(inner, cache)
+    result = second.matrix(VENDORS, HUBS, ("distance", "duration"))
+
+    assert inner.requests == [(6, 2)]
+    assert second.cache_stats()["hits"] == 12 and second.cache_stats()["misses"] == 0
+    assert np.allclose(result["distances"], expected["distances"])
+    assert np.allclose(result["durations"], expected["durations"])
+    assert len(cache.drain_pending()) == 12
+    print("✅ Second run served entirely from cache")
+
+
+def test_only_missing_rows_and_columns_are_fetched():
+    inner = CountingProvider()
+    cache = MatrixCache()
+    CachedRoutingProvider(inner, cache).matrix(VENDORS[:4], HUBS)
+
+    provider = CachedRoutingProvider(inner, cache)
+    provider.matrix(VENDORS, HUBS + [(10.7, 78.6)])
+
+    # 2 new vendors x all 3 hubs, then the 4 known vendors x the new hub only
+    assert inner.requests[-2:] == [(2, 3), (4, 1)]
+    assert provider.cache_stats()["hits"] == 8
+    assert provider.cache_stats()["fetched_elements"] == 10
+    print("✅ Partial hits fetch only rows/columns containing a miss")
+
+
+def test_ttl_and_lru_eviction():
+    cache = MatrixCache(ttl_seconds=60, max_entries=2)
+    cache.put("ors", "a", "b", 1.0, 2.0)
+    cache.put("ors", "a", "c", 1.0, 2.0)
+    cache.put("ors", "a", "d", 1.0, 2.0)
+    assert cache.get("ors", "a", "b") is None
+    assert len(cache) == 2
+
+    cache.put("ors", "x", "y", 1.0, 2.0, expires_at=time.time() - 1)
+    assert cache.get("ors", "x", "y") is None
+    print("✅ TTL expiry and LRU bound enforced")
+
+
+def test_block_operations():
+    cache = MatrixCache()
+    keys = [f"p{i}" for i in range(300)]
+    rng = np.random.default_rng(1)
+    distances, durations = rng.uniform(1, 50, (300, 300)), rng.uniform(2, 90, (300, 300))
+    distances[4, 7] = np.nan   # unroutable pairs are cached too
+
+    started = time.perf_counter()
+    cache.put_block("ors", keys, keys, distances, None)
+    cache.put_block("ors", keys[:100], keys[:100], None, durations[:100, :100])
+    got_distance, _, hit = cache.get_block("ors", keys, keys, ("distance",))
+    _, got_duration, both = cache.get_block("ors", keys + ["new"], keys, ("distance", "duration"))
+    elapsed = time.perf_counter() - started
+
+    assert hit.all() and np.isnan(got_distance[4, 7])
+    assert np.allclose(np.nan_to_num(got_distance), np.nan_to_num(distances))
+    # Only pairs written with both metrics hit a two-metric lookup; the new key misses
+    assert both[:100, :100].all() and not both[100:].any() and not both[:, 100:].any()
+    assert np.allclose(got_duration[:100, :100], durations[:100, :100])
+    assert cache.get("ors", "p1", "p2") == (distances[1, 2], durations[1, 2])
+    assert len(cache) == 300 * 300 and len(cache.drain_pending()) == 300 * 300 + 100 * 100
+
+    cache.put_pairs("ors", ["p1", "q"], ["q", "p1"], [3.0, None], [None, 4.0], [time.time() + 60] * 2)
+    assert cache.get("ors", "p1", "q") == (3.0, None) and cache.get("ors", "q", "p1") == (None, 4.0)
+    assert not cache.drain_pending()
+    assert elapsed < 1.0, elapsed
+    print(f"✅ 90,000-pair blocks stored and looked up in {elapsed:.2f}s")
+
+
+def test_coordinate_quantization():
+    assert coord_key((10.6098825, 78.5434806)) == coord_key((10.6098829, 78.5434801))
+    assert coord_key((10.60988, 78.54348)) != coord_key((10.60998, 78.54348))
+    print("✅ Nearby duplicates share a cache key")
+
+
+if __name__ == "__main__":
+    test_repeat_run_is_served_from_cache()
+    test_only_missing_rows_and_columns_are_fetched()
+    test_ttl_and_lru_eviction()
+    test_block_operations()
+    test_coordinate_quantization()
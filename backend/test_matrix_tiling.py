@@ -0,0 +1,161 @@
+"""
+Test Matrix Tiling
+Tiled, concurrent ORS matrix requests against a local stub server
+"""
+
+import json
+import threading
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.routing_providers import (
+    ORSRoutingProvider, haversine_matrix, matrix_tiles
+)
+from scripts.async_routing import RoutingRequestError
+
+MAX_ELEMENTS = 60
+
+
+class StubORSHandler(BaseHTTPRequestHandler):
+    """/v2/matrix stub: haversine distances, 90 km/h durations, ORS-style element limit"""
+
+    requests_seen = []
+    fail_first = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+
+        if cls.fail_first > 0:
+            cls.fail_first -= 1
+            return self._reply(503, {"error": "busy"})
+
+        locations = [(lat, lng) for lng, lat in body["locations"]]
+        sources = [locations[i] for i in body["sources"]]
+        destinations = [locations[i] for i in body["destinations"]]
+        cls.requests_seen.append((len(sources), len(destinations)))
+
+        if len(sources) * len(destinations) > MAX_ELEMENTS:
+            return self._reply(400, {"error": {"code": 6004, "message": "Request too large"}})
+
+        distances = haversine_matrix(sources, destinations)
+        self._reply(200, {
+            "distances": distances.tolist(),
+            "durations": (distances / 90 * 3600).tolist(),
+        })
+
+    def _reply(self, status, payload):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubORSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def provider_for(server, **options):
+    return ORSRoutingProvider(
+        api_key="test", base_url=f"http://127.0.0.1:{server.server_address[1]}",
+        matrix_max_elements=MAX_ELEMENTS, retry_backoff=0.01, **options
+    )
+
+
+POINTS = [(10.5 + 0.01 * (i % 7), 78.4 + 0.013 * i) for i in range(23)]
+HUBS = [(10.55, 78.5), (10.6, 78.6), (10.52, 78.45)]
+
+
+def test_tiles_cover_matrix_within_limit():
+    for shape in [(23, 3), (3, 23), (23, 23), (1, 500), (100, 100)]:
+        covered = np.zeros(shape, dtype=int)
+        for rows, cols in matrix_tiles(*shape, MAX_ELEMENTS):
+            covered[rows, cols] += 1
+            assert (rows.stop - rows.start) * (cols.stop - cols.start) <= MAX_ELEMENTS
+        assert (covered == 1).all(), shape
+    print("✅ Tiles cover every element exactly once")
+
+
+def test_tiled_matrix_matches_stub():
+    server = stub_server()
+    StubORSHandler.requests_seen = []
+    try:
+        result = provider_for(server).matrix(POINTS, POINTS + HUBS, ("distance", "duration"))
+    finally:
+        server.shutdown()
+
+    expected = haversine_matrix(POINTS, POINTS + HUBS)
+    assert result["distances"].dtype == np.float32
+    assert np.allclose(result["distances"], expected, rtol=1e-5)
+    assert np.allclose(result["durations"], expected / 90 * 60, rtol=1e-5)
+    assert len(StubORSHandler.requests_seen) > 1
+    assert all(r * c <= MAX_ELEMENTS for r, c in StubORSHandler.requests_seen)
+    print(f"✅ 23x26 matrix assembled from {len(StubORSHandler.requests_seen)} blocks")
+
+
+def test_matrix_many_shares_one_client():
+    server = stub_server()
+    StubORSHandler.requests_seen = []
+    provider = provider_for(server)
+    clients = []
+    new_client = provider._new_client
+    provider._new_client = lambda: clients.append(1) or new_client()
+    blocks = [(POINTS[i::3], [hub]) for i, hub in enumerate(HUBS)] + [(POINTS, HUBS)]
+    try:
+        results = provider.matrix_many(blocks, ("distance", "duration"))
+    finally:
+        server.shutdown()
+
+    for (sources, destinations), result in zip(blocks, results):
+        assert np.allclose(result["distances"], haversine_matrix(sources, destinations), rtol=1e-5)
+    assert len(clients) == 1
+    assert len(StubORSHandler.requests_seen) > len(blocks)
+    print(f"✅ {len(blocks)} matrices fetched as {len(StubORSHandler.requests_seen)} requests on one client")
+
+
+def test_blocks_retry_then_fail_loudly():
+    server = stub_server()
+    try:
+        StubORSHandler.fail_first = 2
+        result = provider_for(server, max_retries=3).matrix(POINTS[:5], HUBS)
+        assert np.allclose(result["distances"], haversine_matrix(POINTS[:5], HUBS), rtol=1e-5)
+
+        StubORSHandler.fail_first = 10
+        try:
+            provider_for(server, max_retries=1).matrix(POINTS[:5], HUBS)
+            assert False, "should raise after retries"
+        except RoutingRequestError:
+            pass
+    finally:
+        StubORSHandler.fail_first = 0
+        server.shutdown()
+    print("✅ 503s retried with backoff, persistent failure raised")
+
+
+def test_oversized_block_reports_provider_error():
+    server = stub_server()
+    try:
+        provider = provider_for(server)
+        provider.matrix_max_elements = 10_000     # bypass tiling
+        provider.matrix(POINTS, POINTS)
+        assert False, "should raise"
+    except RoutingRequestError as e:
+        assert "Request too large" in str(e)
+    finally:
+        server.shutdown()
+    print("✅ Provider error surfaced instead of a KeyError")
+
+
+if __name__ == "__main__":
+    test_tiles_cover_matrix_within_limit()
+    test_tiled_matrix_matches_stub()
+    test_matrix_many_shares_one_client()
+    test_blocks_retry_then_fail_loudly()
+    test_oversized_block_reports_provider_error()
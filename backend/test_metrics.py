@@ -0,0 +1,91 @@
+"""
+Test Metrics
+Prometheus registry, per-route latency middleware and routing/cache collectors
+"""
+
+import asyncio
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.metrics import (
+    Registry, Counter, Histogram, MetricsMiddleware, HTTP_REQUEST_DURATION,
+    ROUTING_REQUEST_DURATION, ROUTING_REQUEST_ERRORS, REGISTRY, collect_matrix_cache,
+)
+from scripts.async_routing import AsyncRoutingClient
+from scripts.matrix_cache import shared_matrix_cache, CachedRoutingProvider
+from test_matrix_cache import CountingProvider, VENDORS, HUBS
+
+
+def test_text_format():
+    registry = Registry()
+    latency = registry.register(Histogram("demo_seconds", "Demo latency", ("route",), buckets=(0.1, 1.0)))
+    errors = registry.register(Counter("demo_errors_total", "Demo errors", ("reason",)))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        latency.observe(value, route="/a")
+    errors.inc(reason='bad "quote"')
+
+    text = registry.render()
+    assert '# TYPE demo_seconds histogram' in text
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{route="/a",le="1"} 3' in text
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 4' in text
+    assert 'demo_seconds_sum{route="/a"} 4.05' in text
+    assert 'demo_seconds_count{route="/a"} 4' in text
+    assert 'demo_errors_total{reason="bad \\"quote\\""} 1' in text
+    print("✅ Prometheus text format")
+
+
+def test_latency_labelled_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    for item_id in range(5):
+        client.get(f"/items/{item_id}")
+    client.get("/no/such/path")
+
+    assert HTTP_REQUEST_DURATION.count(method="GET", route="/items/{item_id}", status="200") == 5
+    assert HTTP_REQUEST_DURATION.count(method="GET", route="unmatched", status="404") == 1
+    print("✅ Request latency per route template")
+
+
+def test_routing_calls_and_errors_observed():
+    answers = iter([httpx.Response(503), httpx.Response(200, json={"ok": True})])
+    before = ROUTING_REQUEST_DURATION.count(provider="ors", kind="matrix")
+
+    async def call():
+        async with AsyncRoutingClient("https://ors.test", {}, retry_backoff=0, provider="ors") as client:
+            client._client = httpx.AsyncClient(
+                base_url="https://ors.test", transport=httpx.MockTransport(lambda request: next(answers))
+            )
+            return await client.post("/v2/matrix/driving-car", {"locations": []})
+
+    assert asyncio.run(call()) == {"ok": True}
+    assert ROUTING_REQUEST_DURATION.count(provider="ors", kind="matrix") == before + 2
+    assert ROUTING_REQUEST_ERRORS.value(provider="ors", kind="matrix", error="http_503") >= 1
+    print("✅ Routing call latency and retries observed")
+
+
+def test_matrix_cache_hit_ratio_collected():
+    cache = shared_matrix_cache()
+    hits, misses = cache.hits, cache.misses
+    for _ in range(2):
+        CachedRoutingProvider(CountingProvider(), cache).matrix(VENDORS, HUBS)
+    collect_matrix_cache()
+
+    assert cache.hits - hits >= 12 and cache.misses - misses <= 12
+    text = REGISTRY.render()
+    assert f"matrix_cache_hits_total {cache.hits}" in text
+    assert "matrix_cache_hit_ratio " in text and "db_pool_checked_out 0" in text
+    print("✅ Matrix cache and pool gauges collected at scrape time")
+
+
+if __name__ == "__main__":
+    test_text_format()
+    test_latency_labelled_by_route_template()
+    test_routing_calls_and_errors_observed()
+    test_matrix_cache_hit_ratio_collected()
@@ -0,0 +1,61 @@
+"""
+Test Parallel Cluster Solves
+Native-solver clusters planned on a process pool merge into the same plan
+as the sequential loop
+"""
+
+import numpy as np
+from scripts.vrp_solver import VRPSolver
+from test_incremental_optimization import make_engine, VEHICLE_TYPES
+
+
+def plan_of(results):
+    return (
+        [[(v["type"], [f["name"] for f in v["farmers"]]) for v in c["vehicles"]] for c in results["clusters"]],
+        results["total_cost"],
+        results["unassigned_farmers"],
+        results["unused_vehicles"],
+    )
+
+
+def test_pool_matches_sequential():
+    serial = make_engine().run_optimization(480, 100, VEHICLE_TYPES, solver="native")
+    pooled = make_engine().run_optimization(480, 100, VEHICLE_TYPES, solver="native", cluster_workers=2)
+
+    assert plan_of(pooled) == plan_of(serial)
+    assert pooled["parallel_solve"] == {"workers": 2, "clusters": 3, "replanned": 0}
+    assert "parallel_solve" not in serial
+    print("✅ Process-pool solve matches the sequential plan")
+
+
+def test_scarce_reference_vehicle_is_replanned():
+    # One large vehicle: only the first cluster can build routes around it
+    scarce = [dict(VEHICLE_TYPES[0], count=12), dict(VEHICLE_TYPES[1], count=1)]
+    serial = make_engine().run_optimization(480, 100, scarce, solver="native")
+    pooled = make_engine().run_optimization(480, 100, scarce, solver="native", cluster_workers=2)
+
+    assert plan_of(pooled) == plan_of(serial)
+    assert pooled["parallel_solve"]["replanned"] >= 1
+    print("✅ Clusters whose reference vehicle ran out are re-planned in order")
+
+
+def test_plan_then_assign_equals_solve():
+    rng = np.random.default_rng(3)
+    points = rng.uniform(0, 20, (15, 2))
+    distances = np.linalg.norm(points[:, None] - points[None], axis=-1)
+    demands = rng.uniform(50, 300, 14).tolist()
+
+    solved = VRPSolver(distances, None, demands, VEHICLE_TYPES, 480, 100).solve()
+    fleet = {v["name"]: v["count"] for v in VEHICLE_TYPES}
+    plan = VRPSolver(distances, None, demands, VEHICLE_TYPES, 480, 100, fleet_availability=dict(fleet)).plan()
+    assigned = VRPSolver(distances, None, demands, VEHICLE_TYPES, 480, 100, fleet_availability=fleet).assign_vehicles(plan)
+
+    assert assigned["routes"] == solved["routes"] and assigned["unassigned"] == solved["unassigned"]
+    assert sum(fleet.values()) == sum(v["count"] for v in VEHICLE_TYPES) - len(solved["routes"])
+    print("✅ plan() + assign_vehicles() is solve()")
+
+
+if __name__ == "__main__":
+    test_pool_matches_sequential()
+    test_scarce_reference_vehicle_is_replanned()
+    test_plan_then_assign_equals_solve()
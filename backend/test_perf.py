@@ -0,0 +1,84 @@
+"""
+Test Perf Recorder
+Per-stage spans, external call counters and the perf block of engine results
+"""
+
+import time
+import numpy as np
+from scripts.perf import PerfRecorder
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.optimization_engine import OptimizationEngine
+from test_incremental_optimization import make_engine, HUBS, VEHICLE_TYPES
+
+
+class MeteredProvider(OfflineRoutingProvider):
+    """Offline answers, reported as if each matrix came over the network"""
+
+    def matrix(self, sources, destinations, metrics=("distance",)):
+        result = super().matrix(sources, destinations, metrics)
+        self.record_call("/v2/matrix/driving-car", 8 * len(sources) * len(destinations) * len(metrics))
+        return result
+
+
+def test_spans_nest_and_merge():
+    perf = PerfRecorder(trace_memory=True)
+    with perf.span("engine"):
+        perf.stage("solving")
+        for _ in range(3):
+            with perf.span("matrix"):
+                perf.count("matrix", 100)
+                block = np.ones((500, 500))   # 2 MB, traced
+        perf.stage("routing")
+        perf.count("optimization", 40)
+        time.sleep(0.01)
+        perf.end_stage()
+    perf.close()
+    report = perf.report()
+
+    stages = {s['name']: s for s in report['stages']}
+    assert [s['name'] for s in report['stages']] == ["engine", "solving", "matrix", "routing"]
+    assert stages['matrix']['parent'] == "solving" and stages['matrix']['count'] == 3
+    assert stages['solving']['calls_by_kind'] == {"matrix": 3} and stages['solving']['bytes'] == 300
+    assert stages['engine']['external_calls'] == 4 and report['external_calls'] == 4
+    assert stages['routing']['seconds'] >= 0.01
+    assert stages['matrix']['peak_traced_mb'] >= 1.9
+    assert stages['engine']['peak_traced_mb'] >= stages['matrix']['peak_traced_mb']
+    print("✅ Spans nest, merge per name and collect calls")
+
+
+def test_engine_results_carry_perf():
+    for solver, middle in (("native", "solving"), ("provider", "packing")):
+        results = make_engine().run_optimization(480, 100, VEHICLE_TYPES, solver=solver, lns_time_budget_seconds=0.2)
+        names = [s['name'] for s in results['perf']['stages'] if s['parent'] is None]
+        assert names == ["assignment", middle, "routing", "lns", "assembly"]
+        assert results['perf']['total_seconds'] >= sum(
+            s['seconds'] for s in results['perf']['stages'] if s['parent'] is None
+        ) - 1e-3
+    # Provider solver: the routing stage fetches one matrix per cluster for its route legs
+    nested = {(s['parent'], s['name']): s for s in results['perf']['stages'] if s['parent'] is not None}
+    assert set(nested) <= {("routing", "matrix"), ("lns", "matrix")}
+    assert nested[("routing", "matrix")]['count'] == len(HUBS)
+    print("✅ Engine results report their stages")
+
+
+def test_external_calls_are_counted_per_stage():
+    engine = OptimizationEngine(routing_provider=MeteredProvider())
+    source = make_engine()
+    engine.set_data(HUBS, source.center_capacity, source.subareas, source.farmers_milk)
+    results = engine.run_optimization(480, 100, VEHICLE_TYPES, solver="native")
+
+    stages = {(s['parent'], s['name']): s for s in results['perf']['stages']}
+    assert stages[(None, "assignment")]['calls_by_kind'] == {"matrix": 1}
+    assert stages[("solving", "matrix")]['count'] == len(HUBS)
+    assert stages[(None, "solving")]['calls_by_kind'] == {"matrix": len(HUBS)}
+    assert results['perf']['external_calls'] == 1 + len(HUBS)
+    assert results['perf']['bytes'] > 0
+    # Detached once the run is over
+    assert engine.routing_provider.perf is None and engine.perf is None
+    print(f"✅ {results['perf']['external_calls']} external calls, {results['perf']['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    test_spans_nest_and_merge()
+    test_engine_results_carry_perf()
+    test_external_calls_are_counted_per_stage()
@@ -0,0 +1,120 @@
+"""
+Test Routing Fixtures
+ORS responses are recorded once and replayed offline; the local stand-in
+answers ORS-shaped requests deterministically
+"""
+
+import os
+import tempfile
+import httpx
+import numpy as np
+from scripts.ors_standin import create_app
+from scripts.routing_fixtures import FixtureStore, FixtureMissError, fixture_key
+from scripts.routing_providers import ORSRoutingProvider, OfflineRoutingProvider
+from scripts.optimization_engine import OptimizationEngine
+from test_incremental_optimization import HUBS, VEHICLE_TYPES, make_engine
+
+UNREACHABLE = "http://127.0.0.1:9"   # replay must never touch the network
+DEPOT = (10.60, 78.55)
+STOPS = [(10.61, 78.56), (10.62, 78.54), (10.59, 78.57)]
+
+
+def standin_provider(app, **options):
+    return ORSRoutingProvider(api_key="test", base_url="http://ors-standin",
+                              transport=httpx.ASGITransport(app=app), **options)
+
+
+def ask_everything(provider):
+    points = [DEPOT] + STOPS
+    matrix = provider.matrix(points, points, metrics=("distance", "duration"))
+    return (
+        matrix,
+        provider.route_metrics(points),
+        provider.optimize_route(DEPOT, STOPS, [60.0, 60.0, 60.0], 500.0)[0],
+    )
+
+
+def test_record_then_replay_without_network():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "ors.json.gz")
+        app = create_app()
+        recorded = ask_everything(standin_provider(app, fixtures=FixtureStore(path), fixture_mode="record"))
+        assert app.state.served["estimator"] == 3
+
+        store = FixtureStore(path)
+        assert len(store) == 3
+        replayer = ORSRoutingProvider(api_key="test", base_url=UNREACHABLE,
+                                      fixtures=store, fixture_mode="replay")
+        replayed = ask_everything(replayer)
+
+        for metric in ("distances", "durations"):
+            np.testing.assert_array_equal(recorded[0][metric], replayed[0][metric])
+        assert recorded[1:] == replayed[1:]
+
+        try:
+            replayer.route_metrics([DEPOT, STOPS[0]])
+            raise AssertionError("an unrecorded request was answered")
+        except FixtureMissError:
+            pass
+    print("✅ Recorded ORS responses replay identically with no network")
+
+
+def test_standin_matches_estimator():
+    estimator = OfflineRoutingProvider()
+    provider = standin_provider(create_app(estimator=estimator))
+    points = [DEPOT] + STOPS
+    via_http = provider.matrix(points, points, metrics=("distance", "duration"))
+    direct = estimator.matrix(points, points, metrics=("distance", "duration"))
+    np.testing.assert_allclose(via_http["distances"], direct["distances"], atol=0.01)
+    np.testing.assert_allclose(via_http["durations"], direct["durations"], atol=0.01)
+
+    order, _ = provider.optimize_route(DEPOT, STOPS, [60.0] * 3, 500.0)
+    assert order == estimator.optimize_route(DEPOT, STOPS, [60.0] * 3, 500.0)[0]
+    assert provider.route_metrics(points) == estimator.route_metrics(points)
+    print("✅ Stand-in answers match the offline estimator")
+
+
+def test_engine_run_against_standin_is_deterministic():
+    def run():
+        offline = make_engine()
+        engine = OptimizationEngine(routing_provider=standin_provider(create_app()))
+        engine.set_data(HUBS, offline.center_capacity, offline.subareas, offline.farmers_milk)
+        return engine.run_optimization(480, 100, VEHICLE_TYPES)
+
+    first, second = run(), run()
+    assert first["total_cost"] == second["total_cost"]
+    assert [c["vehicles"] for c in first["clusters"]] == [c["vehicles"] for c in second["clusters"]]
+    assert first["routing_calls"] == second["routing_calls"]
+    print("✅ End-to-end runs against the stand-in are deterministic")
+
+
+def test_route_geometry_is_optional():
+    offline = make_engine()
+    engine = OptimizationEngine(routing_provider=standin_provider(create_app()))
+    engine.set_data(HUBS, offline.center_capacity, offline.subareas, offline.farmers_milk)
+
+    results = engine.run_optimization(480, 100, VEHICLE_TYPES, route_geometry=True)
+
+    vehicles = [v for c in results["clusters"] for v in c["vehicles"]]
+    assert results["route_geometry"]["with_geometry"] == len(vehicles)
+    for cluster in results["clusters"]:
+        for vehicle in cluster["vehicles"]:
+            hub = list(HUBS[cluster["name"]])
+            assert vehicle["geometry"][0] == hub and vehicle["geometry"][-1] == hub
+            assert len(vehicle["geometry"]) == len(vehicle["route"]) + 2
+    assert "geometry" not in make_engine().run_optimization(480, 100, VEHICLE_TYPES)["clusters"][0]["vehicles"][0]
+    print("✅ Road geometry only fetched when asked for")
+
+
+def test_fixture_keys_ignore_key_order():
+    assert fixture_key("/optimization", {"a": 1, "b": [1, 2]}) == fixture_key("/optimization", {"b": [1, 2], "a": 1})
+    assert fixture_key("/optimization", {"a": 1}) != fixture_key("/v2/matrix/driving-car", {"a": 1})
+    print("✅ Fixture keys are canonical")
+
+
+if __name__ == "__main__":
+    test_record_then_replay_without_network()
+    test_standin_matches_estimator()
+    test_engine_run_against_standin_is_deterministic()
+    test_route_geometry_is_optional()
+    test_fixture_keys_ignore_key_order()
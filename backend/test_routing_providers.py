@@ -0,0 +1,216 @@
+"""
+Test Routing Providers
+Offline estimator backend and engine wiring (no network required)
+"""
+
+import asyncio
+import time
+from contextlib import nullcontext
+from scripts.routing_providers import (
+    OfflineRoutingProvider,
+    ORSRoutingProvider,
+    get_routing_provider,
+)
+from scripts.optimization_engine import OptimizationEngine
+
+
+HUB = (10.6134106, 78.5508431)
+VENDORS = {
+    "Arumugham": (10.6098825, 78.5434806),
+    "Kandasamy": (10.6048854, 78.5598019),
+    "Periyasamy": (10.6154730, 78.5600594),
+}
+MILK = {"Arumugham": 80.0, "Kandasamy": 60.0, "Periyasamy": 120.0}
+VEHICLE_TYPES = [
+    {"name": "C1", "capacity": 200.0, "count": 2, "service_time": 4,
+     "cost_per_km": 5.0, "fixed_cost": 300.0, "speed_kmph": 30.0},
+]
+
+
+def test_offline_matrix():
+    provider = OfflineRoutingProvider(circuity_factor=1.3, speed_kmph=40.0)
+    result = provider.matrix(list(VENDORS.values()), [HUB], metrics=("distance", "duration"))
+
+    assert result["distances"].shape == (3, 1)
+    assert (result["distances"] > 0).all()
+    # 40 km/h → 1.5 minutes per km
+    assert abs(result["durations"][0, 0] - result["distances"][0, 0] * 1.5) < 1e-9
+    print("✅ Offline matrix shape and speed model OK")
+
+
+def test_offline_route_metrics_uses_vehicle_speed():
+    provider = OfflineRoutingProvider(circuity_factor=1.0, speed_kmph=40.0)
+    coords = [HUB, VENDORS["Arumugham"], HUB]
+
+    dist_default, time_default = provider.route_metrics(coords)
+    dist_slow, time_slow = provider.route_metrics(coords, {"speed_kmph": 20.0})
+
+    assert dist_default == dist_slow
+    assert time_slow > time_default
+    print("✅ Offline route metrics honour per-vehicle speed")
+
+
+def test_offline_route_order_covers_all_stops():
+    provider = OfflineRoutingProvider()
+    order, _ = provider.optimize_route(HUB, list(VENDORS.values()), [1, 1, 1], 10)
+
+    assert sorted(order) == [0, 1, 2]
+    print("✅ Offline route order visits every stop once")
+
+
+def test_provider_factory():
+    assert isinstance(get_routing_provider("offline"), OfflineRoutingProvider)
+    assert isinstance(get_routing_provider("ors", api_key="x"), ORSRoutingProvider)
+    try:
+        get_routing_provider("carrier-pigeon")
+        assert False, "unknown backend should raise"
+    except ValueError:
+        pass
+    print("✅ Provider factory OK")
+
+
+def test_engine_runs_offline():
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    engine.set_data(
+        centroids={"Viralimalai Hub": HUB},
+        center_capacity={"Viralimalai Hub": 2000.0},
+        subareas=dict(VENDORS),
+        farmers_milk=dict(MILK),
+    )
+
+    results = engine.run_optimization(
+        deadline_minutes=480, max_distance_km=100, vehicle_types_list=VEHICLE_TYPES
+    )
+
+    vehicles = results["clusters"][0]["vehicles"]
+    routed = sorted(f["name"] for v in vehicles for f in v["farmers"])
+    assert routed == sorted(VENDORS)
+    assert all(v["distance"] and v["distance"] > 0 for v in vehicles)
+    print(f"✅ Engine solved offline: {len(vehicles)} vehicles, cost {results['total_cost']}")
+
+
+class SlowOfflineProvider(OfflineRoutingProvider):
+    """Offline estimator that simulates 0.2 s network latency per route call"""
+
+    async def optimize_route_async(self, *args, **kwargs):
+        await asyncio.sleep(0.2)
+        return self.optimize_route(*args, **kwargs)
+
+
+def test_vehicle_routes_fan_out_concurrently():
+    engine = OptimizationEngine(routing_provider=SlowOfflineProvider())
+    engine.set_data({"Hub": HUB}, {"Hub": 2000.0}, dict(VENDORS), dict(MILK))
+    jobs = [
+        (HUB, idx, {"vehicle_spec": VEHICLE_TYPES[0], "farmers": list(VENDORS)})
+        for idx in range(10)
+    ]
+
+    started = time.perf_counter()
+    evaluations = engine.evaluate_vehicle_routes(jobs)
+    elapsed = time.perf_counter() - started
+
+    assert len(evaluations) == 10
+    assert all(e["distance"] for e in evaluations)
+    # 10 vehicles x 0.2 s = 2 s if run serially
+    assert elapsed < 1.0, elapsed
+    print(f"✅ 10 vehicles evaluated concurrently in {elapsed:.2f}s")
+
+
+def test_evaluation_works_inside_running_event_loop():
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    engine.set_data({"Hub": HUB}, {"Hub": 2000.0}, dict(VENDORS), dict(MILK))
+    job = (HUB, 0, {"vehicle_spec": VEHICLE_TYPES[0], "farmers": list(VENDORS)})
+
+    async def call_from_loop():
+        return engine.evaluate_vehicle_routes([job])
+
+    assert asyncio.run(call_from_loop())[0]["distance"]
+    print("✅ Engine evaluation callable from within an event loop")
+
+
+class RecordingORSProvider(ORSRoutingProvider):
+    """
+    ORS provider answering /optimization locally with a canned VROOM response
+    and matrices from the offline estimator
+    """
+
+    def __init__(self):
+        super().__init__(api_key="test")
+        self.paths = []
+        self.matrix_metrics = []
+
+    def session(self):
+        return nullcontext(self)
+
+    def matrix(self, sources, destinations, metrics=("distance",)):
+        self.matrix_metrics.append(tuple(metrics))
+        return OfflineRoutingProvider().matrix(sources, destinations, metrics)
+
+    def _post(self, path, body):
+        self.paths.append(path)
+        # Ordering only: no geometry, metrics come from the matrix
+        assert "options" not in body
+        order = list(reversed(range(len(body["jobs"]))))
+        steps = [{"type": "start"}] + [{"type": "job", "id": i} for i in order] + [{"type": "end"}]
+        return {"routes": [{"steps": steps, "duration": 1530.0}]}
+
+
+def test_single_routing_call_per_vehicle():
+    provider = RecordingORSProvider()
+    engine = OptimizationEngine(routing_provider=provider)
+    engine.set_data({"Hub": HUB}, {"Hub": 2000.0}, dict(VENDORS), dict(MILK))
+    job = (HUB, 0, {"vehicle_spec": VEHICLE_TYPES[0], "farmers": list(VENDORS)})
+
+    evaluation = engine.evaluate_vehicle_routes([job])[0]
+
+    assert provider.paths == ["/optimization"]
+    assert provider.matrix_metrics == [("distance", "duration")]
+    assert evaluation["route"] == list(reversed(list(VENDORS)))
+    coords = [HUB] + [VENDORS[name] for name in evaluation["route"]] + [HUB]
+    distance, travel_time = OfflineRoutingProvider().route_metrics(coords)
+    assert abs(evaluation["distance"] - distance) <= 0.02
+    assert abs(evaluation["travel_time"] - travel_time) <= 0.02
+    print("✅ Order from one /optimization call, distance and duration from matrix legs")
+
+
+def test_matrix_legs_match_route_metrics():
+    provider = OfflineRoutingProvider()
+    engine = OptimizationEngine(routing_provider=provider)
+    engine.set_data({"Hub": HUB}, {"Hub": 2000.0}, dict(VENDORS), dict(MILK))
+    job = (HUB, 0, {"vehicle_spec": VEHICLE_TYPES[0], "farmers": list(VENDORS)})
+
+    evaluation = engine.evaluate_vehicle_routes([job])[0]
+
+    coords = [HUB] + [VENDORS[name] for name in evaluation["route"]] + [HUB]
+    distance, travel_time = provider.route_metrics(coords, VEHICLE_TYPES[0])
+    assert abs(evaluation["distance"] - distance) <= 0.02
+    # 30 km/h vehicle: slower than the matrix's default speed
+    assert abs(evaluation["travel_time"] - travel_time) <= 0.02
+    print("✅ Matrix-leg metrics match the estimator's per-vehicle route metrics")
+
+
+def test_routing_calls_recorded():
+    provider = RecordingORSProvider()
+    engine = OptimizationEngine(routing_provider=provider)
+    engine.set_data({"Hub": HUB}, {"Hub": 2000.0}, dict(VENDORS), dict(MILK))
+
+    results = engine.run_optimization(480, 100, VEHICLE_TYPES)
+
+    vehicles = len(results["clusters"][0]["vehicles"])
+    assert results["routing_calls"] == {
+        "vehicles": vehicles, "requests": vehicles, "requests_saved": 2 * vehicles
+    }
+    print(f"✅ {results['routing_calls']['requests_saved']} routing calls saved")
+
+
+if __name__ == "__main__":
+    test_offline_matrix()
+    test_offline_route_metrics_uses_vehicle_speed()
+    test_offline_route_order_covers_all_stops()
+    test_provider_factory()
+    test_engine_runs_offline()
+    test_vehicle_routes_fan_out_concurrently()
+    test_evaluation_works_inside_running_event_loop()
+    test_single_routing_call_per_vehicle()
+    test_matrix_legs_match_route_metrics()
+    test_routing_calls_recorded()
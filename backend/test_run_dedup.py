@@ -0,0 +1,183 @@
+"""
+Test Run Deduplication
+Identical optimization submissions share one run: inputs are fingerprinted
+and concurrent submissions are single-flighted (no database required)
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from core.config import settings
+from services.optimization_jobs import OptimizationJobManager, run_fingerprint, run_is_stale
+
+PARAMS = {"deadline_minutes": 480, "max_distance_km": 100.0, "routing_backend": "offline", "solver": "native"}
+
+
+def engine_input():
+    return {
+        "centroids": {"North": (10.6, 78.5), "South": (10.4, 78.5)},
+        "center_capacity": {"North": 5000.0, "South": 5000.0},
+        "subareas": {"V1": (10.61, 78.51), "V2": (10.41, 78.52)},
+        "farmers_milk": {"V1": 60.0, "V2": 80.0},
+        "pickup_windows": {},
+        "hub_windows": {},
+        "vehicle_types": [
+            {"name": "C1", "capacity": 400.0, "count": 2},
+            {"name": "C2", "capacity": 800.0, "count": 1},
+        ],
+        "fleet_lookup": {"C1": [{"vehicle_number": "TN-01"}, {"vehicle_number": "TN-02"}]},
+        "metadata": {"vendors_count": 2},
+    }
+
+
+class FakeSubmitManager(OptimizationJobManager):
+    """Counts real submissions; each takes a moment, like the DB round trips"""
+
+    def __init__(self, fail_first=False):
+        super().__init__(max_concurrent_jobs=1)
+        self.submissions = []
+        self.fail_first = fail_first
+
+    async def _submit_or_reuse(self, db, params, fingerprint, engine_input):
+        await asyncio.sleep(0.01)
+        if self.fail_first and not self.submissions:
+            self.submissions.append(None)
+            raise RuntimeError("database unavailable")
+        run_id = uuid.uuid4()
+        self.submissions.append(run_id)
+        return run_id, "queued", False
+
+
+class FakeDB:
+    """Answers find_run's select with canned rows and records the updates"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+
+    async def execute(self, statement):
+        if statement.is_select:
+            return list(self.rows)
+        self.updates.append(statement.compile().params)
+
+
+def run_row(status, silent_seconds, now):
+    seen = now - timedelta(seconds=silent_seconds)
+    return SimpleNamespace(id=uuid.uuid4(), status=status, created_at=seen, updated_at=seen)
+
+
+def test_fingerprint_is_canonical():
+    base = run_fingerprint(engine_input(), PARAMS)
+
+    shuffled = engine_input()
+    shuffled["vehicle_types"].reverse()
+    shuffled["fleet_lookup"]["C1"].reverse()
+    shuffled["farmers_milk"] = {"V2": 80.0, "V1": 60.0}
+    shuffled["metadata"] = {"vendors_count": 2, "loaded_at": "now"}
+    assert run_fingerprint(shuffled, dict(reversed(list(PARAMS.items())))) == base
+
+    changed = engine_input()
+    changed["farmers_milk"]["V2"] = 81.0
+    assert run_fingerprint(changed, PARAMS) != base
+    assert run_fingerprint(engine_input(), dict(PARAMS, deadline_minutes=360)) != base
+    print("✅ Fingerprints ignore ordering but not inputs or parameters")
+
+
+def test_concurrent_submissions_share_one_run():
+    manager = FakeSubmitManager()
+    fingerprint = run_fingerprint(engine_input(), PARAMS)
+
+    async def burst():
+        return await asyncio.gather(*(manager.submit_once(None, PARAMS, fingerprint) for _ in range(5)))
+
+    results = asyncio.run(burst())
+
+    assert len(manager.submissions) == 1
+    assert {run_id for run_id, _, _ in results} == {manager.submissions[0]}
+    assert [deduplicated for _, _, deduplicated in results] == [False, True, True, True, True]
+    assert not manager._submitting
+    print("✅ Concurrent identical submissions attach to one run")
+
+
+def test_failed_submission_lets_waiters_retry():
+    manager = FakeSubmitManager(fail_first=True)
+    fingerprint = run_fingerprint(engine_input(), PARAMS)
+
+    async def burst():
+        return await asyncio.gather(
+            *(manager.submit_once(None, PARAMS, fingerprint) for _ in range(3)),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(burst())
+
+    assert isinstance(results[0], RuntimeError)
+    assert len(manager.submissions) == 2
+    assert [r[0] for r in results[1:]] == [manager.submissions[1]] * 2
+    print("✅ A failed submission does not strand the requests waiting on it")
+
+
+def test_stale_runs_are_not_reused():
+    now = datetime.now(timezone.utc)
+    stale_after = settings.OPTIMIZATION_STALE_AFTER_SECONDS
+    assert run_is_stale("running", now, None, now + timedelta(seconds=stale_after + 1))
+    assert not run_is_stale("running", now, None, now + timedelta(seconds=stale_after + 1), owned=True)
+    assert not run_is_stale("completed", now, None, now + timedelta(days=1))
+    assert not run_is_stale("queued", now - timedelta(hours=1), now, now)
+
+    # Newest first: a crashed worker's running row, then a live queued one
+    crashed = run_row("running", stale_after * 2, now)
+    live = run_row("queued", 1, now)
+    db = FakeDB([crashed, live])
+    assert asyncio.run(OptimizationJobManager(1).find_run(db, "f" * 64)) == (live.id, "queued")
+    assert len(db.updates) == 1 and db.updates[0]["status"] == "failed"
+
+    # Only stale rows: nothing to reuse, a fresh run gets submitted
+    db = FakeDB([run_row("queued", stale_after * 2, now)])
+    assert asyncio.run(OptimizationJobManager(1).find_run(db, "f" * 64)) is None
+    assert len(db.updates) == 1
+
+    # A run this process still owns is live however long it has been silent
+    owned = run_row("running", stale_after * 2, now)
+    manager = OptimizationJobManager(1)
+    manager._tasks[str(owned.id)] = None
+    db = FakeDB([owned])
+    assert asyncio.run(manager.find_run(db, "f" * 64)) == (owned.id, "running")
+    assert not db.updates
+    print("✅ Unfinished runs left by a dead worker are failed, not reused")
+
+
+def test_heartbeat_touches_owned_runs():
+    touched = []
+
+    class BeatingManager(OptimizationJobManager):
+        async def touch_runs(self, run_ids):
+            touched.append(list(run_ids))
+
+    async def scenario():
+        manager = BeatingManager(1)
+        job = asyncio.get_running_loop().create_future()
+        manager._tasks["run-1"] = job
+        heartbeat = asyncio.create_task(manager._beat())
+        await asyncio.sleep(0.035)
+        manager._tasks.pop("run-1")
+        await asyncio.wait_for(heartbeat, 1)
+
+    interval = settings.OPTIMIZATION_HEARTBEAT_SECONDS
+    settings.OPTIMIZATION_HEARTBEAT_SECONDS = 0.01
+    try:
+        asyncio.run(scenario())
+    finally:
+        settings.OPTIMIZATION_HEARTBEAT_SECONDS = interval
+
+    assert touched and all(ids == ["run-1"] for ids in touched)
+    print("✅ Heartbeats keep this process's runs fresh and stop when none are left")
+
+
+if __name__ == "__main__":
+    test_fingerprint_is_canonical()
+    test_concurrent_submissions_share_one_run()
+    test_failed_submission_lets_waiters_retry()
+    test_stale_runs_are_not_reused()
+    test_heartbeat_touches_owned_runs()
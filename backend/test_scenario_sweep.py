@@ -0,0 +1,88 @@
+"""
+Test Scenario Sweep
+Grid of deadline / distance scenarios on shared, read-only matrices
+"""
+
+import numpy as np
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.optimization_engine import OptimizationEngine
+from scripts.scenario_sweep import SharedMatrices, run_scenario_sweep
+
+
+VEHICLE_TYPES = [
+    {"name": "C1", "capacity": 500.0, "count": 40, "service_time": 4,
+     "cost_per_km": 5.0, "fixed_cost": 300.0},
+    {"name": "C2", "capacity": 1500.0, "count": 15, "service_time": 4,
+     "cost_per_km": 8.0, "fixed_cost": 500.0},
+]
+SCENARIOS = [(240, 40.0), (240, 100.0), (480, 40.0), (480, 100.0)]
+
+
+class CountingProvider(OfflineRoutingProvider):
+    def __init__(self):
+        super().__init__()
+        self.matrix_calls = 0
+
+    def matrix(self, *args, **kwargs):
+        self.matrix_calls += 1
+        return super().matrix(*args, **kwargs)
+
+
+def make_engine():
+    rng = np.random.default_rng(21)
+    hubs = {"North": (10.70, 78.55), "South": (10.50, 78.55)}
+    subareas = {f"V{i}": (10.45 + dx, 78.45 + dy) for i, (dx, dy) in enumerate(rng.uniform(0, 0.3, (300, 2)))}
+    engine = OptimizationEngine(routing_provider=CountingProvider())
+    engine.set_data(hubs, {h: 100000.0 for h in hubs}, subareas, {v: 80.0 for v in subareas})
+    return engine
+
+
+def without_timing(rows):
+    return [{k: v for k, v in row.items() if k != "solve_seconds"} for row in rows]
+
+
+def test_sweep_fetches_matrices_once():
+    engine = make_engine()
+    sweep = run_scenario_sweep(engine, VEHICLE_TYPES, SCENARIOS, max_workers=1)
+
+    # One vendor-hub matrix + one matrix per cluster, whatever the scenario count
+    assert engine.routing_provider.matrix_calls == 1 + sweep["clusters"]
+    rows = sweep["scenarios"]
+    assert [(r["deadline_minutes"], r["max_distance_km"]) for r in rows] == SCENARIOS
+    by_scenario = {(r["deadline_minutes"], r["max_distance_km"]): r for r in rows}
+    assert by_scenario[(480, 100.0)]["violations"] <= by_scenario[(240, 40.0)]["violations"]
+    assert all(r["vehicles_used"] == sum(r["vehicles_by_type"].values()) for r in rows)
+    print(f"✅ {len(rows)} scenarios on {engine.routing_provider.matrix_calls} matrix calls")
+
+
+def test_process_pool_matches_serial():
+    serial = run_scenario_sweep(make_engine(), VEHICLE_TYPES, SCENARIOS, max_workers=1)
+    pooled = run_scenario_sweep(make_engine(), VEHICLE_TYPES, SCENARIOS, max_workers=2)
+
+    assert pooled["workers"] == 2
+    assert without_timing(pooled["scenarios"]) == without_timing(serial["scenarios"])
+    print("✅ Process pool results identical to the serial sweep")
+
+
+def test_shared_matrices_are_read_only():
+    matrix = np.arange(12, dtype=np.float64).reshape(3, 4)
+    shared = SharedMatrices({"a": matrix, "b": matrix.T.copy()})
+    try:
+        shm, views = SharedMatrices.attach(shared.spec)
+        assert np.array_equal(views["a"], matrix) and np.array_equal(views["b"], matrix.T)
+        try:
+            views["a"][0, 0] = 1.0
+            raise AssertionError("shared view should be read-only")
+        except ValueError:
+            pass
+        del views
+        shm.close()
+    finally:
+        shared.close()
+    print("✅ Shared matrices round-trip read-only")
+
+
+if __name__ == "__main__":
+    test_sweep_fetches_matrices_once()
+    test_process_pool_matches_serial()
+    test_shared_matrices_are_read_only()
@@ -0,0 +1,137 @@
+"""
+Test Spatial Index
+Grid radius / k-nearest queries against brute force, and engine hub shortlisting
+"""
+
+import asyncio
+import time
+import numpy as np
+from types import SimpleNamespace
+from core.config import settings
+from services.data_transformer import DataTransformer
+from services.spatial_index_service import SpatialIndexService
+from scripts.spatial_index import SpatialIndex
+from scripts.routing_providers import OfflineRoutingProvider, haversine_matrix
+from scripts.optimization_engine import OptimizationEngine
+
+
+def scatter(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.c_[rng.uniform(10.3, 10.9, n), rng.uniform(78.3, 78.9, n)]
+
+
+def test_within_matches_brute_force():
+    points = scatter(5000)
+    index = SpatialIndex(points)
+    rng = np.random.default_rng(1)
+
+    for lat, lng, radius in zip(rng.uniform(10.3, 10.9, 50), rng.uniform(78.3, 78.9, 50),
+                                rng.uniform(0.5, 15, 50)):
+        hits = index.within(lat, lng, radius)
+        distances = haversine_matrix([(lat, lng)], points)[0]
+        assert sorted(k for k, _ in hits) == sorted(np.flatnonzero(distances <= radius).tolist())
+        assert [d for _, d in hits] == sorted(d for _, d in hits)
+    print("✅ Radius queries match brute force")
+
+
+def test_nearest_and_neighbour_lists_match_brute_force():
+    points = scatter(2000, seed=2)
+    index = SpatialIndex(points)
+
+    full = haversine_matrix(points, points)
+    hits = index.nearest(10.6, 78.6, k=7)
+    assert [k for k, _ in hits] == np.argsort(haversine_matrix([(10.6, 78.6)], points)[0])[:7].tolist()
+
+    np.fill_diagonal(full, np.inf)
+    lists = index.neighbour_lists(10)
+    assert (np.sort(lists, axis=1) == np.sort(np.argsort(full, axis=1)[:, :10], axis=1)).all()
+    print("✅ k-nearest and neighbour lists match brute force")
+
+
+def test_sparse_and_empty_indexes():
+    single = SpatialIndex([(10.0, 78.0)], keys=["Hub"])
+    assert single.nearest(11.0, 79.0, k=3)[0][0] == "Hub"
+    assert single.neighbour_lists(5).shape == (1, 0)
+    assert SpatialIndex([]).within(10.0, 78.0, 50) == []
+    print("✅ Sparse and empty indexes")
+
+
+def test_lookups_are_sub_millisecond():
+    index = SpatialIndex(scatter(50000, seed=3))
+
+    started = time.perf_counter()
+    for _ in range(200):
+        index.within(10.6, 78.6, 2.0)
+    elapsed_ms = (time.perf_counter() - started) / 200 * 1000
+
+    assert elapsed_ms < 1.0, elapsed_ms
+    print(f"✅ Radius lookup over 50,000 vendors: {elapsed_ms:.3f} ms")
+
+
+def test_engine_shortlists_hubs():
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    hubs = {f"H{i}": tuple(p) for i, p in enumerate(scatter(30, seed=4))}
+    subareas = {f"V{i}": tuple(p) for i, p in enumerate(scatter(400, seed=5))}
+    engine.set_data(hubs, {h: 100000.0 for h in hubs}, subareas, {v: 50.0 for v in subareas})
+
+    shortlisted = engine.vendor_hub_distances(candidate_hubs=4)
+    full = OfflineRoutingProvider().matrix(list(subareas.values()), list(hubs.values()))["distances"]
+
+    # Nearest hub is always measured; unmeasured pairs rank behind measured ones
+    assert (np.argmin(shortlisted, axis=1) == np.argmin(full, axis=1)).all()
+    assert np.allclose(np.sort(shortlisted, axis=1)[:, :4], np.sort(full, axis=1)[:, :4])
+    print("✅ Engine requests road distances only for shortlisted hubs")
+
+
+def test_nearby_skips_version_queries_between_checks():
+    calls = {"version": 0, "fetch": 0}
+    vendor = SimpleNamespace(id=1, vendor_code="V001", vendor_name="A", village="X", latitude=10.5,
+                             longitude=78.5, milk_quantity_cans=2, milk_quantity_liters=80.0)
+
+    async def data_version(db):
+        calls["version"] += 1
+        return (1,)
+
+    async def fetch_active_data(db):
+        calls["fetch"] += 1
+        return {"vendors": [vendor], "hubs": []}
+
+    originals = (SpatialIndexService.__dict__["_data_version"], DataTransformer.__dict__["fetch_active_data"],
+                 settings.SPATIAL_INDEX_VERSION_CHECK_SECONDS)
+    SpatialIndexService._data_version = staticmethod(data_version)
+    DataTransformer.fetch_active_data = staticmethod(fetch_active_data)
+    SpatialIndexService.invalidate()
+
+    async def lookups(n):
+        for _ in range(n):
+            hits = await SpatialIndexService.nearby_vendors(None, 10.5, 78.5, 1.0)
+            assert [v["vendor_code"] for v in hits] == ["V001"]
+
+    try:
+        settings.SPATIAL_INDEX_VERSION_CHECK_SECONDS = 60
+        asyncio.run(lookups(20))
+        assert calls == {"version": 1, "fetch": 1}
+
+        # A write in this process drops the index at once
+        SpatialIndexService.invalidate()
+        asyncio.run(lookups(5))
+        assert calls == {"version": 2, "fetch": 2}
+
+        # With the interval elapsed the version is checked again, but unchanged data is not reloaded
+        settings.SPATIAL_INDEX_VERSION_CHECK_SECONDS = 0
+        asyncio.run(lookups(3))
+        assert calls == {"version": 5, "fetch": 2}
+    finally:
+        SpatialIndexService._data_version, DataTransformer.fetch_active_data = originals[:2]
+        settings.SPATIAL_INDEX_VERSION_CHECK_SECONDS = originals[2]
+        SpatialIndexService.invalidate()
+    print("✅ Nearby lookups query the data version at most once per interval")
+
+
+if __name__ == "__main__":
+    test_within_matches_brute_force()
+    test_nearest_and_neighbour_lists_match_brute_force()
+    test_sparse_and_empty_indexes()
+    test_lookups_are_sub_millisecond()
+    test_engine_shortlists_hubs()
+    test_nearby_skips_version_queries_between_checks()
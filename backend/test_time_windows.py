@@ -0,0 +1,119 @@
+"""
+Test Pickup Time Windows
+O(1) slack insertion checks, window-aware solving and engine reporting
+"""
+
+import numpy as np
+import pytest
+from pydantic import ValidationError
+from scripts.time_windows import TimeWindows
+from scripts.vrp_solver import VRPSolver
+from schemas.vendor import VendorCreate
+from test_vrp_solver import district, VEHICLE_TYPES
+from test_incremental_optimization import make_engine, VEHICLE_TYPES as ENGINE_VEHICLE_TYPES
+from test_matrix_cache import CountingProvider
+
+
+def random_windows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, 200, n)
+    return [(float(s), float(s + w)) for s, w in zip(start, rng.uniform(60, 240, n))]
+
+
+def test_insertion_check_matches_full_recheck():
+    matrix, _ = district(60, seed=1)
+    windows = TimeWindows.from_windows(matrix["durations"], random_windows(60), (0, 600), 4)
+    rng = np.random.default_rng(2)
+
+    checked = 0
+    for _ in range(200):
+        route = [int(s) for s in rng.choice(np.arange(1, 61), size=int(rng.integers(1, 8)), replace=False)]
+        if not windows.feasible(route):
+            continue
+        node = int(rng.choice([s for s in range(1, 61) if s not in route]))
+        fast = windows.insertion_feasible(route, node)
+        slow = [windows.feasible(route[:p] + [node] + route[p:]) for p in range(len(route) + 1)]
+        assert fast.tolist() == slow
+        checked += 1
+    assert checked > 20
+    print(f"✅ O(1) insertion checks agree with full re-checks on {checked} routes")
+
+
+def test_solver_keeps_routes_window_feasible():
+    matrix, demands = district(150, seed=3)
+    windows = TimeWindows.from_windows(matrix["durations"], random_windows(150, seed=4), (0, 480), 4)
+    for budget in (None, 0.5):
+        solution = VRPSolver(
+            matrix["distances"], matrix["durations"], demands, VEHICLE_TYPES, 480, 100,
+            time_windows=windows
+        ).solve(time_budget_seconds=budget)
+
+        assert solution["stats"]["time_window_violations"] == 0
+        for route in solution["routes"]:
+            assert windows.feasible([s + 1 for s in route["stops"]])
+        visited = sorted(s for r in solution["routes"] for s in r["stops"])
+        assert sorted(visited + solution["unassigned"]) == list(range(150))
+    print("✅ Solver routes meet every pickup window")
+
+
+def test_engine_reports_late_pickups():
+    engine = make_engine()
+    # Half of North's farmers must be collected in the first 10 minutes
+    windows = {f"North-V{i}": (0, 10) for i in range(12)}
+    engine.pickup_windows = windows
+    native = engine.run_optimization(480, 100, ENGINE_VEHICLE_TYPES, solver="native")
+    engine = make_engine()
+    engine.set_data(engine.centroids, engine.center_capacity, engine.subareas, engine.farmers_milk,
+                    pickup_windows=windows)
+    provider = engine.run_optimization(480, 100, ENGINE_VEHICLE_TYPES, solver="provider")
+
+    assert native["time_windows"]["vendors_with_windows"] == 12
+    # The native solver splits North so everyone with a window is reached in time
+    assert native["time_windows"]["late_pickups"] <= provider["time_windows"]["late_pickups"]
+    for result in (native, provider):
+        vehicles = [v for c in result["clusters"] for v in c["vehicles"]]
+        late = [f for v in vehicles for f in v["late_farmers"]]
+        assert sorted(late) == sorted(result["time_windows"]["late_farmers"])
+        assert all(v["is_violated"] for v in vehicles if v["late_farmers"])
+    print(f"✅ Late pickups: native {native['time_windows']['late_pickups']}, "
+          f"provider {provider['time_windows']['late_pickups']}")
+
+
+def test_late_pickups_reuse_cluster_matrices():
+    windows = {f"North-V{i}": (0, 10) for i in range(12)}
+    for solver in ("native", "provider"):
+        requests = []
+        for pickup_windows in ({}, windows):
+            engine = make_engine()
+            engine.routing_provider = CountingProvider()
+            engine.pickup_windows = pickup_windows
+            result = engine.run_optimization(480, 100, ENGINE_VEHICLE_TYPES, solver=solver)
+            requests.append(len(engine.routing_provider.requests))
+        # Checking windows costs no matrix request beyond the one per cluster
+        assert requests[0] == requests[1], solver
+        assert result["time_windows"]["late_pickups"] == len(result["time_windows"]["late_farmers"])
+    print("✅ Late pickups are checked on the cluster matrices already built")
+
+
+def test_no_windows_no_report():
+    results = make_engine().run_optimization(480, 100, ENGINE_VEHICLE_TYPES, solver="native")
+    assert "time_windows" not in results
+    assert all("late_farmers" not in v for c in results["clusters"] for v in c["vehicles"])
+    print("✅ Runs without windows are unchanged")
+
+
+def test_vendor_window_validation():
+    base = dict(vendor_name="Ravi", village="Keeranur", latitude=10.6, longitude=78.5, milk_quantity_cans=2)
+    assert VendorCreate(**base, pickup_start_minute=30, pickup_end_minute=90).pickup_end_minute == 90
+    with pytest.raises(ValidationError):
+        VendorCreate(**base, pickup_start_minute=90, pickup_end_minute=30)
+    print("✅ Pickup windows validated")
+
+
+if __name__ == "__main__":
+    test_insertion_check_matches_full_recheck()
+    test_solver_keeps_routes_window_feasible()
+    test_engine_reports_late_pickups()
+    test_late_pickups_reuse_cluster_matrices()
+    test_no_windows_no_report()
+    test_vendor_window_validation()
@@ -0,0 +1,80 @@
+"""
+Test Multi-trip Scheduling
+Routes chained onto physical vehicles within the deadline, unloading in between
+"""
+
+from collections import defaultdict
+from scripts.trip_scheduling import schedule_trips
+from test_incremental_optimization import make_engine, VEHICLE_TYPES
+
+
+def test_first_fit_decreasing_within_deadline():
+    durations = [200, 90, 150, 60, 250, 120]
+    availability = {"C1": 5}
+    schedule = schedule_trips(durations, ["C1"] * 6, availability, 480, unload_minutes=15)
+
+    assert all(slot is not None for slot in schedule)
+    by_vehicle = defaultdict(list)
+    for slot in schedule:
+        by_vehicle[slot['vehicle']].append((slot['start_minute'], slot['end_minute']))
+    # 870 minutes of driving + unloads fit in two 480-minute days
+    assert len(by_vehicle) == 2 and availability["C1"] == 3
+    for trips in by_vehicle.values():
+        trips.sort()
+        assert trips[-1][1] <= 480
+        for (_, end), (start, _) in zip(trips, trips[1:]):
+            assert start - end >= 15 - 1e-9
+    print("✅ Trips chained onto 2 vehicles within the deadline")
+
+
+def test_fleet_limit_and_open_vehicles():
+    availability = {"C1": 1}
+    open_vehicles = {"C1": [300.0]}
+    schedule = schedule_trips([100, 170, 500], ["C1"] * 3, availability, 480, 15, open_vehicles)
+
+    # Longest first: 500 is too long for anyone but still gets the one free
+    # vehicle, 170 fits after the open vehicle's day so far, 100 is left over
+    assert schedule[2]['vehicle'] == 1 and schedule[2]['start_minute'] == 0.0
+    assert schedule[1]['vehicle'] == 0 and schedule[1]['start_minute'] == 300.0
+    assert schedule[0] is None
+    assert availability["C1"] == 0 and len(open_vehicles["C1"]) == 2
+    print("✅ Open vehicles filled first; fleet limit respected")
+
+
+def test_engine_multi_trip_serves_short_fleet():
+    fleet = [dict(VEHICLE_TYPES[0], count=4), dict(VEHICLE_TYPES[1], count=1)]
+    for solver in ("provider", "native"):
+        single = make_engine().run_optimization(480, 100, fleet, solver=solver)
+        multi = make_engine().run_optimization(480, 100, fleet, solver=solver, multi_trip=True)
+
+        assert single['total_unassigned_farmers'] > 0
+        assert multi['total_unassigned_farmers'] < single['total_unassigned_farmers']
+        assert multi['multi_trip']['extra_trips'] > 0
+
+        for cluster in multi['clusters']:
+            for vehicle in cluster['vehicles']:
+                assert vehicle['end_minute'] <= 480
+                fixed = VEHICLE_TYPES[0 if vehicle['type'] == "C1" else 1]['fixed_cost']
+                assert (vehicle['cost'] > fixed) == (vehicle['trip'] == 1)
+        # No more vehicles out than the fleet has
+        assert multi['multi_trip']['vehicles'] <= sum(v['count'] for v in fleet)
+        served = [f['name'] for c in multi['clusters'] for v in c['vehicles'] for f in v['farmers']]
+        assert len(served) == len(set(served))
+        assert len(served) + multi['total_unassigned_farmers'] == len(make_engine().subareas)
+    print(f"✅ Short fleet: {single['total_unassigned_farmers']} → "
+          f"{multi['total_unassigned_farmers']} unassigned with {multi['multi_trip']['extra_trips']} extra trips")
+
+
+def test_single_trip_plans_unchanged():
+    fleet = [dict(VEHICLE_TYPES[0], count=30), dict(VEHICLE_TYPES[1], count=10)]
+    single = make_engine().run_optimization(480, 100, fleet)
+    assert 'multi_trip' not in single
+    assert all('trip' not in v for c in single['clusters'] for v in c['vehicles'])
+    print("✅ Single-trip plans unchanged")
+
+
+if __name__ == "__main__":
+    test_first_fit_decreasing_within_deadline()
+    test_fleet_limit_and_open_vehicles()
+    test_engine_multi_trip_serves_short_fleet()
+    test_single_trip_plans_unchanged()
@@ -0,0 +1,272 @@
+"""
+Test Native VRP Solver
+Savings construction, local search and fleet sizing (no network required)
+"""
+
+import time
+import numpy as np
+from scripts.routing_providers import OfflineRoutingProvider
+from scripts.vrp_solver import VRPSolver
+from scripts.optimization_engine import OptimizationEngine
+
+
+VEHICLE_TYPES = [
+    {"name": "C1", "capacity": 500.0, "count": 50, "service_time": 4,
+     "cost_per_km": 5.0, "fixed_cost": 300.0},
+    {"name": "C2", "capacity": 1500.0, "count": 20, "service_time": 4,
+     "cost_per_km": 8.0, "fixed_cost": 500.0},
+]
+HUB = (10.6134106, 78.5508431)
+
+
+def district(n, seed=7):
+    """n vendors scattered around a few villages near the hub"""
+    rng = np.random.default_rng(seed)
+    villages = np.asarray(HUB) + rng.uniform(-0.15, 0.15, (12, 2))
+    vendors = villages[rng.integers(0, len(villages), n)] + rng.normal(0, 0.005, (n, 2))
+    points = [HUB] + [tuple(v) for v in vendors]
+    matrix = OfflineRoutingProvider().matrix(points, points, ("distance", "duration"))
+    return matrix, rng.uniform(20, 120, n)
+
+
+def test_routes_cover_every_stop_within_limits():
+    matrix, demands = district(300)
+    solution = VRPSolver(
+        matrix["distances"], matrix["durations"], demands, VEHICLE_TYPES,
+        deadline_minutes=300, max_distance_km=80
+    ).solve()
+
+    visited = sorted(s for r in solution["routes"] for s in r["stops"])
+    assert sorted(visited + solution["unassigned"]) == list(range(300))
+    assert not solution["unassigned"]
+    for route in solution["routes"]:
+        spec = route["vehicle_spec"]
+        assert route["load"] <= spec["capacity"]
+        assert route["distance"] <= 80
+        assert route["travel_time"] + len(route["stops"]) * spec["service_time"] <= 300
+    print(f"✅ {len(solution['routes'])} feasible routes cover all 300 stops")
+
+
+def test_mixed_fleet_falls_back_to_smaller_vehicles():
+    matrix, _ = district(60, seed=5)
+    fleet = [
+        {"name": "big", "capacity": 1000.0, "count": 1, "service_time": 4, "cost_per_km": 8.0, "fixed_cost": 500.0},
+        {"name": "small", "capacity": 400.0, "count": 10, "service_time": 4, "cost_per_km": 5.0, "fixed_cost": 300.0},
+    ]
+    solution = VRPSolver(matrix["distances"], matrix["durations"], [40.0] * 60, fleet, 480, 100).solve()
+
+    assert not solution["unassigned"]
+    used = [r["vehicle_spec"]["name"] for r in solution["routes"]]
+    assert used.count("big") == 1 and 0 < used.count("small") <= 10
+    assert all(r["load"] <= r["vehicle_spec"]["capacity"] for r in solution["routes"])
+    assert solution["stats"]["fleet_replans"] >= 1
+    print(f"✅ Mixed fleet serves every stop ({used.count('small')} small trucks after the big one)")
+
+
+def test_local_search_never_lengthens_routes():
+    matrix, demands = district(200, seed=3)
+    solution = VRPSolver(
+        matrix["distances"], matrix["durations"], demands, VEHICLE_TYPES, 480, 100
+    ).solve()
+
+    stats = solution["stats"]
+    assert stats["improved_distance"] <= stats["construction_distance"]
+    print(f"✅ Local search: {stats['construction_distance']} → {stats['improved_distance']} km")
+
+
+def test_two_opt_untangles_crossed_route():
+    square = [HUB, (10.62, 78.55), (10.62, 78.56), (10.63, 78.56), (10.63, 78.55)]
+    matrix = OfflineRoutingProvider().matrix(square, square)
+    solver = VRPSolver(matrix["distances"], None, [1, 1, 1, 1], VEHICLE_TYPES, 480, 100)
+
+    crossed = [1, 3, 2, 4]
+    untangled = solver.two_opt(list(crossed))
+    assert solver.route_distance(untangled) < solver.route_distance(crossed)
+    print("✅ 2-opt removes a crossing")
+
+
+def test_fleet_limits_leave_overflow_unassigned():
+    matrix, demands = district(100, seed=5)
+    availability = {"C1": 1, "C2": 0}
+    solution = VRPSolver(
+        matrix["distances"], matrix["durations"], demands, VEHICLE_TYPES, 480, 100,
+        fleet_availability=availability
+    ).solve()
+
+    assert len(solution["routes"]) == 1
+    assert availability == {"C1": 0, "C2": 0}
+    assert len(solution["unassigned"]) + len(solution["routes"][0]["stops"]) == 100
+    print("✅ Fleet counts respected, overflow reported as unassigned")
+
+
+def test_large_district_is_fast():
+    matrix, demands = district(2000, seed=11)
+    types = [dict(v, count=v["count"] * 10) for v in VEHICLE_TYPES]
+
+    started = time.perf_counter()
+    solution = VRPSolver(matrix["distances"], matrix["durations"], demands, types, 480, 100).solve()
+    elapsed = time.perf_counter() - started
+
+    assert not solution["unassigned"]
+    assert elapsed < 20, elapsed
+    print(f"✅ 2,000 vendors planned in {elapsed:.2f}s")
+
+
+def test_warm_start_repairs_seed_and_keeps_routes_stable():
+    matrix, demands = district(400, seed=13)
+    args = (matrix["distances"], matrix["durations"], demands, VEHICLE_TYPES, 480, 100)
+    cold = VRPSolver(*args).solve()
+
+    # Yesterday's routes, minus stop 0 and plus an unknown stop 999; stops 1-4 uncovered
+    seed = [[s for s in r["stops"] if s not in (0, 1, 2, 3, 4)] for r in cold["routes"]]
+    seed[0].append(999)
+
+    started = time.perf_counter()
+    warm = VRPSolver(*args).solve(seed)
+    warm_seconds = time.perf_counter() - started
+
+    visited = sorted(s for r in warm["routes"] for s in r["stops"])
+    assert visited == list(range(400))
+    assert warm["stats"]["warm_start"]["inserted_stops"] + warm["stats"]["warm_start"]["seeded_stops"] == 400
+    assert warm["stats"]["improved_distance"] <= cold["stats"]["improved_distance"] * 1.05
+    unchanged = {tuple(r["stops"]) for r in cold["routes"]} & {tuple(r["stops"]) for r in warm["routes"]}
+    assert len(unchanged) >= len(cold["routes"]) // 2
+    print(f"✅ Warm start: {len(unchanged)}/{len(cold['routes'])} routes unchanged in {warm_seconds:.2f}s "
+          f"(cold {cold['stats']['solve_seconds']}s)")
+
+
+def test_time_budget_returns_best_plan_with_trace():
+    matrix, demands = district(1500, seed=17)
+    types = [dict(v, count=v["count"] * 10) for v in VEHICLE_TYPES]
+    args = (matrix["distances"], matrix["durations"], demands, types, 480, 100)
+    unbounded = VRPSolver(*args).solve()
+
+    started = time.perf_counter()
+    anytime = VRPSolver(*args).solve(time_budget_seconds=1.0)
+    elapsed = time.perf_counter() - started
+
+    trace = anytime["stats"]["trace"]
+    assert trace[0]["phase"] == "construction"
+    assert [p["distance"] for p in trace] == sorted((p["distance"] for p in trace), reverse=True)
+    assert anytime["stats"]["improved_distance"] <= unbounded["stats"]["improved_distance"] + 1e-6
+    assert sorted(s for r in anytime["routes"] for s in r["stops"]) == list(range(1500))
+    for route in anytime["routes"]:
+        spec = route["vehicle_spec"]
+        assert route["load"] <= spec["capacity"] and route["distance"] <= 100
+    # Construction always completes; improvement stops at the budget
+    assert elapsed < 1.0 + unbounded["stats"]["solve_seconds"] + 0.5, elapsed
+    print(f"✅ Anytime: {trace[0]['distance']} → {trace[-1]['distance']} km in {elapsed:.2f}s")
+
+
+def test_tiny_time_budget_still_feasible():
+    matrix, demands = district(300, seed=19)
+    solution = VRPSolver(
+        matrix["distances"], matrix["durations"], demands, VEHICLE_TYPES, 480, 100
+    ).solve(time_budget_seconds=1e-6)
+
+    assert not solution["unassigned"]
+    assert solution["stats"]["improved_distance"] == solution["stats"]["construction_distance"]
+    print("✅ Expired budget returns the constructed plan")
+
+
+def test_engine_native_solver():
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    rng = np.random.default_rng(1)
+    subareas = {f"V{i}": (HUB[0] + dx, HUB[1] + dy) for i, (dx, dy) in
+                enumerate(rng.uniform(-0.05, 0.05, (40, 2)))}
+    engine.set_data({"Hub": HUB}, {"Hub": 10000.0}, subareas,
+                    {name: 60.0 for name in subareas})
+
+    results = engine.run_optimization(480, 100, VEHICLE_TYPES, solver="native")
+
+    vehicles = results["clusters"][0]["vehicles"]
+    assert results["solver"] == "native"
+    assert sorted(f["name"] for v in vehicles for f in v["farmers"]) == sorted(subareas)
+    assert all(sorted(v["route"]) == sorted(f["name"] for f in v["farmers"]) for v in vehicles)
+    assert results["routing_calls"]["requests"] == 0
+    print(f"✅ Engine native solver: {len(vehicles)} vehicles, cost {results['total_cost']}")
+
+
+def test_engine_warm_start_from_stored_run():
+    rng = np.random.default_rng(4)
+    subareas = {f"V{i}": (HUB[0] + dx, HUB[1] + dy) for i, (dx, dy) in
+                enumerate(rng.uniform(-0.05, 0.05, (60, 2)))}
+
+    def engine_for(names):
+        engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+        engine.set_data({"Hub": HUB}, {"Hub": 10000.0}, {n: subareas[n] for n in names},
+                        {n: 60.0 for n in names})
+        return engine
+
+    first = engine_for(list(subareas)[:55]).run_optimization(480, 100, VEHICLE_TYPES, solver="native")
+    # Manual schedules carry farmer objects; route order may be stale
+    first["clusters"][0]["vehicles"][0]["route"] = []
+
+    second = engine_for(list(subareas)[5:]).run_optimization(
+        480, 100, VEHICLE_TYPES, solver="native", seed_results=first
+    )
+
+    vehicles = second["clusters"][0]["vehicles"]
+    assert sorted(f["name"] for v in vehicles for f in v["farmers"]) == sorted(list(subareas)[5:])
+    assert second["warm_start"] == {"applied": True, "seeded_clusters": ["Hub"]}
+    assert second["solver_stats"][0]["warm_start"]["inserted_stops"] >= 1
+    print("✅ Engine warm start from a stored run")
+
+
+
+def test_engine_time_budget_trace():
+    engine = OptimizationEngine(routing_provider=OfflineRoutingProvider())
+    rng = np.random.default_rng(6)
+    hubs = {"Hub": HUB, "Hub2": (HUB[0] + 0.1, HUB[1] + 0.1)}
+    subareas = {f"V{i}": (HUB[0] + dx, HUB[1] + dy) for i, (dx, dy) in
+                enumerate(rng.uniform(-0.05, 0.15, (200, 2)))}
+    engine.set_data(hubs, {h: 100000.0 for h in hubs}, subareas, {n: 60.0 for n in subareas})
+
+    results = engine.run_optimization(480, 100, VEHICLE_TYPES, solver="native", time_budget_seconds=0.5)
+
+    budget = results["time_budget"]
+    assert budget["applied"] and budget["seconds"] == 0.5
+    assert {p["cluster"] for p in budget["trace"]} == set(hubs)
+    assert all("trace" not in stats for stats in results["solver_stats"])
+    print(f"✅ Engine time budget: {len(budget['trace'])} trace points, {budget['elapsed_seconds']}s")
+
+
+def test_engine_vehicle_numbers_are_unique():
+    from test_incremental_optimization import make_engine
+    single_type = [{"name": "C1", "capacity": 500.0, "count": 30, "service_time": 4,
+                    "cost_per_km": 5.0, "fixed_cost": 300.0}]
+    runs = [
+        {"solver": "native"},
+        {"solver": "provider"},
+        {"solver": "native", "lns_time_budget_seconds": 0.3},
+        {"solver": "native", "multi_trip": True},
+    ]
+    for options in runs:
+        engine = make_engine()
+        engine.fleet_lookup = {"C1": [{"vehicle_number": f"C1-{i}"} for i in range(30)]}
+        results = engine.run_optimization(480, 100, single_type, **options)
+
+        first_trips = [v["vehicle_number"] for c in results["clusters"] for v in c["vehicles"]
+                       if v.get("trip", 1) == 1]
+        unused = [v["vehicle_number"] for u in results["unused_vehicles"] for v in u["vehicles"]]
+        assert None not in first_trips and len(first_trips) >= len(results["clusters"])
+        assert len(set(first_trips)) == len(first_trips), options
+        assert not set(first_trips) & set(unused)
+        assert len(first_trips) + len(unused) == 30
+    print("✅ Every route drives its own physical vehicle")
+
+
+if __name__ == "__main__":
+    test_routes_cover_every_stop_within_limits()
+    test_mixed_fleet_falls_back_to_smaller_vehicles()
+    test_local_search_never_lengthens_routes()
+    test_two_opt_untangles_crossed_route()
+    test_fleet_limits_leave_overflow_unassigned()
+    test_large_district_is_fast()
+    test_warm_start_repairs_seed_and_keeps_routes_stable()
+    test_time_budget_returns_best_plan_with_trace()
+    test_tiny_time_budget_still_feasible()
+    test_engine_native_solver()
+    test_engine_warm_start_from_stored_run()
+    test_engine_time_budget_trace()
+    test_engine_vehicle_numbers_are_unique()
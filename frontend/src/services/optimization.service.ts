@@ -2,15 +2,42 @@
 import { api } from "../lib/api-client";
 import { API } from "../lib/api-endpoints";
 
+const RUN_POLL_INTERVAL_MS = 1500;
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export const OptimizationService = {
-  // Run Optimization
-  runOptimization: async (deadlineMinutes?: number, maxDistanceKm?: number) => {
+  // Run Optimization — queues a background run, then polls until it finishes
+  runOptimization: async (
+    deadlineMinutes?: number,
+    maxDistanceKm?: number,
+    onProgress?: (progress: any) => void
+  ) => {
     const params = new URLSearchParams();
     if (deadlineMinutes) params.append("deadline_minutes", String(deadlineMinutes));
     if (maxDistanceKm) params.append("max_distance_km", String(maxDistanceKm));
     const url = `${API.optimization}/run${params.toString() ? `?${params.toString()}` : ""}`;
-    const res = await api.post(url);
-    // API returns { status, data: {...} } — keep the raw response object
+    const queued = await api.post(url);
+    const runId = queued.data?.data?.run_id;
+
+    while (true) {
+      await sleep(RUN_POLL_INTERVAL_MS);
+      const res = await OptimizationService.getRun(runId);
+      const run = res.data;
+      onProgress?.(run.progress);
+
+      if (run.status === "completed") {
+        // Same shape as the old synchronous response: { status, data: result }
+        return { status: "success", data: run.result };
+      }
+      if (run.status === "failed") {
+        throw new Error(run.results_summary?.error || "Optimization failed");
+      }
+    }
+  },
+
+  // Poll a single run (status, progress, result once completed)
+  getRun: async (runId: string) => {
+    const res = await api.get(`${API.optimization}/runs/${runId}`);
     return res.data;
   },
 